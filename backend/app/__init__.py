@@ -1,7 +1,21 @@
 from flask import Flask, request
 
 from .routes import register_routes
+from .utils.cache import init_caches
 from .utils.db import database_proxy, initialize_database
+from .utils.deletion import init_deletions
+from .utils.forum_events import init_forum_events
+from .utils.forum_search import init_forum_search
+from .utils.hot_posts import init_hot_ranking
+from .utils.notifications import init_notifications
+from .utils.ownership import init_ownership_cache
+from .utils.post_views import init_post_views
+from .utils.rate_limit import init_rate_limiter
+from .utils.redis_helper import init_redis_pool
+from .utils.revocation import init_revocation_cache
+from .utils.revocation_filter import init_revocation_filter
+from .utils.session_log import init_session_log
+from .utils.thesis_search import init_thesis_search
 
 
 def create_app(config_name="testing"):
@@ -27,6 +41,22 @@ def create_app(config_name="testing"):
 
     # Initialize database
     initialize_database(app)
+    init_forum_search(app)
+    init_thesis_search(app)
+
+    # Create the shared Redis connection pool
+    init_redis_pool(app)
+    init_revocation_cache(app)
+    init_revocation_filter(app)
+    init_rate_limiter(app)
+    init_ownership_cache(app)
+    init_session_log(app)
+    init_caches(app)
+    init_forum_events(app)
+    init_post_views(app)
+    init_hot_ranking(app)
+    init_deletions(app)
+    init_notifications(app)
 
     # Register API routes
     register_routes(app)
@@ -45,10 +75,11 @@ def create_app(config_name="testing"):
         app.logger.debug(f"Request Headers: {headers}")
         app.logger.debug(f"Request Body: {request.get_data()}")
 
-    # Ensure the database connection is closed after each request
+    # Ensure the database connection is closed after each request. Batch
+    # sub-requests end inside the batch's transaction and leave it open.
     @app.teardown_appcontext
     def close_db_connection(exception=None):
-        if not database_proxy.is_closed():
+        if not database_proxy.is_closed() and not database_proxy.in_transaction():
             database_proxy.close()
             app.logger.info("Database connection closed.")
 
@@ -1,4 +1,5 @@
 import os
+import tempfile
 
 
 class Config:
@@ -27,8 +28,177 @@ class Config:
         and port.
     :type DB_CONNECTION_INFO: dict
     :ivar REDIS_CONNECTION_INFO: Dictionary containing configuration settings for
-        the Redis connection, including host, port, and database index.
+        the Redis connection, including host, port, database index, the size
+        of the shared connection pool and socket timeouts in seconds, and the
+        size and socket timeout of the pool used for bulk commands.
     :type REDIS_CONNECTION_INFO: dict
+    :ivar REDIS_BREAKER_FAILURE_THRESHOLD: Consecutive failed Redis commands that
+        open the circuit breaker.
+    :type REDIS_BREAKER_FAILURE_THRESHOLD: int
+    :ivar REDIS_BREAKER_RESET_TIMEOUT: Seconds the breaker stays open before a
+        trial command is let through.
+    :type REDIS_BREAKER_RESET_TIMEOUT: float
+    :ivar REDIS_DEGRADED_POLICY: ``serve_stale`` to keep authenticating from the
+        last-known local revocation state while Redis is unavailable, or
+        ``fail_closed`` to reject requests that need Redis.
+    :type REDIS_DEGRADED_POLICY: str
+    :ivar REDIS_STALE_GRACE_SECONDS: How long into a Redis outage stale state may
+        be served under ``serve_stale``.
+    :type REDIS_STALE_GRACE_SECONDS: int
+    :ivar RATELIMIT_ENABLED: Whether request rate limits are enforced.
+    :type RATELIMIT_ENABLED: bool
+    :ivar RATELIMIT_STORAGE: ``redis`` to share counters between processes, or
+        ``memory`` to keep them per process. Redis failures fall back to memory.
+    :type RATELIMIT_STORAGE: str
+    :ivar RATELIMITS: Rate limit rules by name. Each has a ``window`` in seconds
+        and ``limits`` mapping a scope (``ip``, ``user`` or ``institution``) to
+        the requests allowed per window. The ``write`` rule applies to every
+        POST, PUT, PATCH and DELETE request under ``/api/``.
+    :type RATELIMITS: dict
+    :ivar BATCH_MAX_REQUESTS: Maximum number of sub-requests accepted by a single
+        call to the batch endpoint.
+    :type BATCH_MAX_REQUESTS: int
+    :ivar IDENTITY_CACHE_TTL: Seconds a user's identity record (role, admin and
+        active flags) stays cached in Redis for authorization checks.
+    :type IDENTITY_CACHE_TTL: int
+    :ivar OWNERSHIP_CACHE_SIZE: Entries each process keeps in its LRU of thesis
+        owners and child-to-thesis mappings.
+    :type OWNERSHIP_CACHE_SIZE: int
+    :ivar OWNERSHIP_LOCAL_TTL: Seconds a process trusts an LRU entry before
+        reading it from Redis again.
+    :type OWNERSHIP_LOCAL_TTL: int
+    :ivar OWNERSHIP_CACHE_TTL: Seconds ownership entries are kept in Redis.
+    :type OWNERSHIP_CACHE_TTL: int
+    :ivar SESSION_LOG_BATCH_SIZE: Maximum session log rows written per insert.
+    :type SESSION_LOG_BATCH_SIZE: int
+    :ivar SESSION_LOG_FLUSH_INTERVAL: Seconds a login may wait in the queue for
+        its batch to fill before it is written.
+    :type SESSION_LOG_FLUSH_INTERVAL: float
+    :ivar SESSION_LOG_QUEUE_SIZE: Logins each process may hold in memory; more
+        are dropped while the database is behind.
+    :type SESSION_LOG_QUEUE_SIZE: int
+    :ivar SESSION_LOG_BACKGROUND: Whether a background thread writes queued
+        logins.
+    :type SESSION_LOG_BACKGROUND: bool
+    :ivar SESSION_LOG_RETENTION_DAYS: Days of individual session log entries
+        kept before ``cli db compact-sessions`` rolls them up into daily counts.
+    :type SESSION_LOG_RETENTION_DAYS: int
+    :ivar SESSION_LOG_COMPACT_CHUNK_SIZE: Session log IDs compacted per
+        transaction.
+    :type SESSION_LOG_COMPACT_CHUNK_SIZE: int
+    :ivar FORUM_CACHE_TTL: Seconds cached forum listings, posts and comment
+        pages are kept in Redis and in each process.
+    :type FORUM_CACHE_TTL: int
+    :ivar FORUM_CACHE_SIZE: Forum cache entries each process keeps in memory.
+    :type FORUM_CACHE_SIZE: int
+    :ivar CACHE_GENERATION_TTL: Seconds a process trusts the generation of a
+        cache namespace before re-reading it from Redis, which bounds how long
+        it can serve entries another process has invalidated.
+    :type CACHE_GENERATION_TTL: float
+    :ivar FORUM_EVENTS_STREAM_LENGTH: Approximate number of forum events kept
+        in Redis for clients resuming an event stream.
+    :type FORUM_EVENTS_STREAM_LENGTH: int
+    :ivar FORUM_EVENTS_QUEUE_SIZE: Events buffered for each event stream
+        connection; a client that falls further behind is disconnected and
+        resumes when it reconnects.
+    :type FORUM_EVENTS_QUEUE_SIZE: int
+    :ivar FORUM_EVENTS_HEARTBEAT: Seconds between keep-alive comments on an
+        idle event stream.
+    :type FORUM_EVENTS_HEARTBEAT: float
+    :ivar FORUM_EVENTS_MAX_AGE: Seconds an event stream stays open before the
+        server ends it and the client reconnects, so streams cannot hold every
+        worker thread indefinitely.
+    :type FORUM_EVENTS_MAX_AGE: float
+    :ivar FORUM_EVENTS_PUBSUB_ENABLED: Whether workers subscribe to forum
+        events published by other workers over Redis pub/sub.
+    :type FORUM_EVENTS_PUBSUB_ENABLED: bool
+    :ivar POST_VIEWS_FLUSH_INTERVAL: Seconds between writes of tallied post
+        views to Redis and of their totals to the database.
+    :type POST_VIEWS_FLUSH_INTERVAL: float
+    :ivar POST_VIEWS_BATCH_SIZE: Posts whose view counts are written per
+        statement.
+    :type POST_VIEWS_BATCH_SIZE: int
+    :ivar POST_VIEWS_MAX_PENDING: Views each process may hold in memory while
+        Redis is unavailable; more are dropped.
+    :type POST_VIEWS_MAX_PENDING: int
+    :ivar POST_VIEWS_BACKGROUND: Whether a background thread flushes post
+        views.
+    :type POST_VIEWS_BACKGROUND: bool
+    :ivar HOT_DECAY_SECONDS: Seconds over which a post loses the rank a
+        tenfold advantage in comments and views gives it in the hot listing.
+    :type HOT_DECAY_SECONDS: float
+    :ivar HOT_MAX_POSTS: Posts kept in the hot ranking.
+    :type HOT_MAX_POSTS: int
+    :ivar HOT_WINDOW_DAYS: Days of post activity the background job rescores.
+    :type HOT_WINDOW_DAYS: int
+    :ivar HOT_RESCORE_INTERVAL: Seconds between rescoring runs of the hot
+        ranking.
+    :type HOT_RESCORE_INTERVAL: float
+    :ivar HOT_RESCORE_BACKGROUND: Whether a background thread rescores the hot
+        ranking.
+    :type HOT_RESCORE_BACKGROUND: bool
+    :ivar DELETION_CHUNK_SIZE: Rows the deletion engine deletes per
+        transaction when purging deleted posts and users.
+    :type DELETION_CHUNK_SIZE: int
+    :ivar DELETION_CHUNK_PAUSE: Seconds the deletion engine waits between
+        chunks.
+    :type DELETION_CHUNK_PAUSE: float
+    :ivar DELETION_INTERVAL: Seconds between passes of the deletion worker.
+    :type DELETION_INTERVAL: float
+    :ivar DELETION_LEASE_SECONDS: Seconds after which a purge that made no
+        progress is taken over by another worker.
+    :type DELETION_LEASE_SECONDS: float
+    :ivar DELETION_MAX_ATTEMPTS: Failures after which a purge is given up.
+    :type DELETION_MAX_ATTEMPTS: int
+    :ivar DELETION_BACKGROUND: Whether a background thread purges deleted
+        posts and users.
+    :type DELETION_BACKGROUND: bool
+    :ivar NOTIFICATIONS_FLUSH_INTERVAL: Seconds between passes of the
+        notification fan-out worker.
+    :type NOTIFICATIONS_FLUSH_INTERVAL: float
+    :ivar NOTIFICATIONS_BATCH_SIZE: Comment events fanned out, and inbox rows
+        inserted, at a time.
+    :type NOTIFICATIONS_BATCH_SIZE: int
+    :ivar NOTIFICATIONS_COUNTER_TTL: Seconds an unread notification counter is
+        kept in Redis before it is recounted.
+    :type NOTIFICATIONS_COUNTER_TTL: int
+    :ivar NOTIFICATIONS_WORKER_LEASE: Seconds a fan-out worker that stopped
+        renewing its lease keeps its unfinished events before other workers
+        queue them again.
+    :type NOTIFICATIONS_WORKER_LEASE: int
+    :ivar NOTIFICATIONS_BACKGROUND: Whether a background thread fans out
+        notifications.
+    :type NOTIFICATIONS_BACKGROUND: bool
+    :ivar THESIS_SEARCH_BACKEND: Implementation of thesis search: ``native``
+        for the database's full-text search (SQLite FTS5 or MySQL FULLTEXT),
+        ``inverted`` for an inverted index kept in ordinary tables, or ``auto``
+        for native search where the database supports it.
+    :type THESIS_SEARCH_BACKEND: str
+    :ivar PASSWORD_HASH_METHOD: werkzeug method new password hashes are made
+        with. Stored hashes made with other parameters are replaced on the next
+        successful login. ``cli user calibrate-hash`` suggests a value for the
+        host's hardware.
+    :type PASSWORD_HASH_METHOD: str
+    :ivar JWT_EXPIRY_SECONDS: Lifetime of issued JWT tokens in seconds.
+    :type JWT_EXPIRY_SECONDS: int
+    :ivar REVOCATION_CACHE_TTL: Seconds a worker trusts its cached copy of a
+        user's revocation epoch before re-reading it from Redis.
+    :type REVOCATION_CACHE_TTL: int
+    :ivar REVOCATION_PUBSUB_ENABLED: Whether workers subscribe to revocation
+        epoch updates over Redis pub/sub.
+    :type REVOCATION_PUBSUB_ENABLED: bool
+    :ivar REVOCATION_FILTER_PATH: Memory-mapped file holding the Bloom filter of
+        blacklisted tokens shared by the workers on a host.
+    :type REVOCATION_FILTER_PATH: str
+    :ivar REVOCATION_FILTER_CAPACITY: Number of blacklisted tokens the filter is
+        sized for.
+    :type REVOCATION_FILTER_CAPACITY: int
+    :ivar REVOCATION_FILTER_ERROR_RATE: False positive rate of the filter at
+        capacity; each false positive costs one Redis lookup.
+    :type REVOCATION_FILTER_ERROR_RATE: float
+    :ivar REVOCATION_FILTER_REFRESH_INTERVAL: Seconds between rebuilds of the
+        filter from Redis.
+    :type REVOCATION_FILTER_REFRESH_INTERVAL: int
     """
 
     SECRET_KEY = os.getenv("SECRET_KEY", "dev")
@@ -50,7 +220,85 @@ class Config:
         "host": "localhost",
         "port": 6379,
         "db": 0,
+        "max_connections": int(os.getenv("REDIS_MAX_CONNECTIONS", 50)),
+        "socket_timeout": float(os.getenv("REDIS_SOCKET_TIMEOUT", 0.25)),
+        "socket_connect_timeout": float(os.getenv("REDIS_CONNECT_TIMEOUT", 0.25)),
+        # Scans, blacklist rebuilds and pub/sub use a separate, smaller pool
+        "bulk_max_connections": int(os.getenv("REDIS_BULK_MAX_CONNECTIONS", 10)),
+        "bulk_socket_timeout": float(os.getenv("REDIS_BULK_SOCKET_TIMEOUT", 30)),
     }
+    REDIS_BREAKER_FAILURE_THRESHOLD = int(
+        os.getenv("REDIS_BREAKER_FAILURE_THRESHOLD", 5)
+    )
+    REDIS_BREAKER_RESET_TIMEOUT = float(os.getenv("REDIS_BREAKER_RESET_TIMEOUT", 10))
+    REDIS_DEGRADED_POLICY = os.getenv("REDIS_DEGRADED_POLICY", "serve_stale")
+    REDIS_STALE_GRACE_SECONDS = int(os.getenv("REDIS_STALE_GRACE_SECONDS", 60))
+    RATELIMIT_ENABLED = True
+    RATELIMIT_STORAGE = os.getenv("RATELIMIT_STORAGE", "redis")
+    RATELIMITS = {
+        "signin": {"window": 60, "limits": {"ip": 20, "user": 5}},
+        "register": {"window": 3600, "limits": {"ip": 10, "institution": 500}},
+        "export": {"window": 60, "limits": {"user": 10}},
+        "upload": {"window": 60, "limits": {"user": 10}},
+        "write": {"window": 60, "limits": {"ip": 300}},
+    }
+    BATCH_MAX_REQUESTS = int(os.getenv("BATCH_MAX_REQUESTS", 20))
+    IDENTITY_CACHE_TTL = int(os.getenv("IDENTITY_CACHE_TTL", 60))
+    OWNERSHIP_CACHE_SIZE = int(os.getenv("OWNERSHIP_CACHE_SIZE", 10000))
+    OWNERSHIP_LOCAL_TTL = int(os.getenv("OWNERSHIP_LOCAL_TTL", 60))
+    OWNERSHIP_CACHE_TTL = int(os.getenv("OWNERSHIP_CACHE_TTL", 86400))
+    SESSION_LOG_BATCH_SIZE = int(os.getenv("SESSION_LOG_BATCH_SIZE", 500))
+    SESSION_LOG_FLUSH_INTERVAL = float(os.getenv("SESSION_LOG_FLUSH_INTERVAL", 2))
+    SESSION_LOG_QUEUE_SIZE = int(os.getenv("SESSION_LOG_QUEUE_SIZE", 10000))
+    SESSION_LOG_BACKGROUND = True
+    SESSION_LOG_RETENTION_DAYS = int(os.getenv("SESSION_LOG_RETENTION_DAYS", 90))
+    SESSION_LOG_COMPACT_CHUNK_SIZE = int(
+        os.getenv("SESSION_LOG_COMPACT_CHUNK_SIZE", 10000)
+    )
+    FORUM_CACHE_TTL = int(os.getenv("FORUM_CACHE_TTL", 300))
+    FORUM_CACHE_SIZE = int(os.getenv("FORUM_CACHE_SIZE", 1000))
+    CACHE_GENERATION_TTL = float(os.getenv("CACHE_GENERATION_TTL", 1))
+    FORUM_EVENTS_STREAM_LENGTH = int(os.getenv("FORUM_EVENTS_STREAM_LENGTH", 1000))
+    FORUM_EVENTS_QUEUE_SIZE = int(os.getenv("FORUM_EVENTS_QUEUE_SIZE", 100))
+    FORUM_EVENTS_HEARTBEAT = float(os.getenv("FORUM_EVENTS_HEARTBEAT", 15))
+    FORUM_EVENTS_MAX_AGE = float(os.getenv("FORUM_EVENTS_MAX_AGE", 300))
+    FORUM_EVENTS_PUBSUB_ENABLED = True
+    POST_VIEWS_FLUSH_INTERVAL = float(os.getenv("POST_VIEWS_FLUSH_INTERVAL", 10))
+    POST_VIEWS_BATCH_SIZE = int(os.getenv("POST_VIEWS_BATCH_SIZE", 500))
+    POST_VIEWS_MAX_PENDING = int(os.getenv("POST_VIEWS_MAX_PENDING", 10000))
+    POST_VIEWS_BACKGROUND = True
+    HOT_DECAY_SECONDS = float(os.getenv("HOT_DECAY_SECONDS", 45000))
+    HOT_MAX_POSTS = int(os.getenv("HOT_MAX_POSTS", 1000))
+    HOT_WINDOW_DAYS = int(os.getenv("HOT_WINDOW_DAYS", 14))
+    HOT_RESCORE_INTERVAL = float(os.getenv("HOT_RESCORE_INTERVAL", 300))
+    HOT_RESCORE_BACKGROUND = True
+    DELETION_CHUNK_SIZE = int(os.getenv("DELETION_CHUNK_SIZE", 500))
+    DELETION_CHUNK_PAUSE = float(os.getenv("DELETION_CHUNK_PAUSE", 0.05))
+    DELETION_INTERVAL = float(os.getenv("DELETION_INTERVAL", 5))
+    DELETION_LEASE_SECONDS = float(os.getenv("DELETION_LEASE_SECONDS", 300))
+    DELETION_MAX_ATTEMPTS = int(os.getenv("DELETION_MAX_ATTEMPTS", 5))
+    DELETION_BACKGROUND = True
+    NOTIFICATIONS_FLUSH_INTERVAL = float(os.getenv("NOTIFICATIONS_FLUSH_INTERVAL", 2))
+    NOTIFICATIONS_BATCH_SIZE = int(os.getenv("NOTIFICATIONS_BATCH_SIZE", 500))
+    NOTIFICATIONS_COUNTER_TTL = int(os.getenv("NOTIFICATIONS_COUNTER_TTL", 3600))
+    NOTIFICATIONS_WORKER_LEASE = int(os.getenv("NOTIFICATIONS_WORKER_LEASE", 60))
+    NOTIFICATIONS_BACKGROUND = True
+    THESIS_SEARCH_BACKEND = os.getenv("THESIS_SEARCH_BACKEND", "auto")
+    PASSWORD_HASH_METHOD = os.getenv("PASSWORD_HASH_METHOD", "scrypt:32768:8:1")
+    JWT_EXPIRY_SECONDS = int(os.getenv("JWT_EXPIRY_SECONDS", 3600))
+    REVOCATION_CACHE_TTL = int(os.getenv("REVOCATION_CACHE_TTL", 300))
+    REVOCATION_PUBSUB_ENABLED = True
+    REVOCATION_FILTER_PATH = os.getenv(
+        "REVOCATION_FILTER_PATH",
+        os.path.join(tempfile.gettempdir(), "thesis-genius-revocation.bloom"),
+    )
+    REVOCATION_FILTER_CAPACITY = int(os.getenv("REVOCATION_FILTER_CAPACITY", 100000))
+    REVOCATION_FILTER_ERROR_RATE = float(
+        os.getenv("REVOCATION_FILTER_ERROR_RATE", 0.001)
+    )
+    REVOCATION_FILTER_REFRESH_INTERVAL = int(
+        os.getenv("REVOCATION_FILTER_REFRESH_INTERVAL", 60)
+    )
 
 
 class DevelopmentConfig(Config):
@@ -106,6 +354,26 @@ class TestingConfig(Config):
         "port": None,
     }
     TESTING = True
+    # A single in-process cache needs no cross-worker notifications in tests
+    REVOCATION_PUBSUB_ENABLED = False
+    # Keep the filter private to each test app and build it once
+    REVOCATION_FILTER_PATH = None
+    REVOCATION_FILTER_REFRESH_INTERVAL = 0
+    # fakeredis cannot run the Lua sliding-window script
+    RATELIMIT_STORAGE = "memory"
+    # Production-strength hashing would dominate the suite's run time
+    PASSWORD_HASH_METHOD = "pbkdf2:sha256:1000"
+    # A writer thread would not see the in-memory test database; tests flush
+    SESSION_LOG_BACKGROUND = False
+    # Events are delivered within the process that publishes them
+    FORUM_EVENTS_PUBSUB_ENABLED = False
+    # Tests flush post views and notifications, rescore hot posts and purge
+    # explicitly
+    POST_VIEWS_BACKGROUND = False
+    HOT_RESCORE_BACKGROUND = False
+    DELETION_BACKGROUND = False
+    NOTIFICATIONS_BACKGROUND = False
+    DELETION_CHUNK_PAUSE = 0
 
 
 class ProductionConfig(Config):
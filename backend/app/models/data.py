@@ -1,8 +1,8 @@
 from datetime import datetime, timezone
 
-from peewee import (AutoField, BooleanField, CharField, DateTimeField,
-                    ForeignKeyField, IntegerField, Model, TextField,
-                    TimestampField)
+from peewee import (AutoField, BooleanField, CharField, DateField,
+                    DateTimeField, ForeignKeyField, IntegerField, Model,
+                    TextField, TimestampField)
 
 from ..utils.db import database_proxy
 
@@ -76,6 +76,9 @@ class User(BaseModel):
     :type created_at: DateTimeField
     :ivar updated_at: The timestamp when the user record was last updated.
     :type updated_at: DateTimeField
+    :ivar deleted_at: When the user was deleted. Deleted users stay until the
+        deletion engine has purged their data.
+    :type deleted_at: DateTimeField
     """
 
     id = AutoField(column_name="user_id", primary_key=True)
@@ -94,6 +97,7 @@ class User(BaseModel):
     created_at = DateTimeField(default=datetime.now(timezone.utc))
     updated_at = DateTimeField(default=datetime.now(timezone.utc))
     profile_picture = CharField(null=True)
+    deleted_at = DateTimeField(null=True)
 
     class Meta:
         table_name = "users"
@@ -139,6 +143,9 @@ class Thesis(BaseModel):
     :type created_at: DateTimeField
     :ivar updated_at: The timestamp when the thesis was last updated.
     :type updated_at: DateTimeField
+    :ivar version: Incremented by every write to the thesis or one of its
+        sections; its workspace ETag is derived from it.
+    :type version: IntegerField
     :ivar student: A reference to the student who authored the thesis.
     :type student: ForeignKeyField
 
@@ -152,6 +159,7 @@ class Thesis(BaseModel):
     status = CharField()
     created_at = DateTimeField(default=datetime.now(timezone.utc))
     updated_at = DateTimeField(default=datetime.now(timezone.utc))
+    version = IntegerField(default=0)
     student = ForeignKeyField(
         User, backref="theses", column_name="student_id", on_delete="CASCADE"
     )
@@ -592,6 +600,19 @@ class Posts(BaseModel):
     :ivar updated_at: Timestamp for when the post was last updated. Defaults to the
         current UTC time.
     :type updated_at: DateTimeField
+    :ivar comment_count: Number of comments on the post, kept up to date by the
+        forum service in the same transaction as the comment writes.
+    :type comment_count: IntegerField
+    :ivar last_activity_at: When the post was created or last commented on.
+    :type last_activity_at: DateTimeField
+    :ivar view_count: Number of times the post was viewed, written in batches
+        by the post view counter.
+    :type view_count: IntegerField
+    :ivar unique_viewers: Estimated number of distinct viewers of the post.
+    :type unique_viewers: IntegerField
+    :ivar deleted_at: When the post was deleted. Deleted posts are hidden and
+        removed with their comments by the deletion engine.
+    :type deleted_at: DateTimeField
     """
 
     id = AutoField()
@@ -603,6 +624,11 @@ class Posts(BaseModel):
     content = TextField()
     created_at = DateTimeField(default=datetime.now(timezone.utc))
     updated_at = DateTimeField(default=datetime.now(timezone.utc))
+    comment_count = IntegerField(default=0)
+    last_activity_at = DateTimeField(null=True, index=True)
+    view_count = IntegerField(default=0)
+    unique_viewers = IntegerField(default=0)
+    deleted_at = DateTimeField(null=True)
 
     class Meta:
         table_name = "posts"
@@ -631,7 +657,27 @@ class PostComment(BaseModel):
     :type created_at: DateTimeField
     :ivar updated_at: Timestamp representing the last update time of the comment.
     :type updated_at: DateTimeField
-    """
+    :ivar parent: The comment this one replies to, or None for a top-level
+        comment.
+    :type parent: ForeignKeyField
+    :ivar path: Materialized path: the ``path_segment`` of every comment from
+        the top-level one down to this one. Sorting by path lists each thread
+        depth first in creation order, and a comment's replies at any depth
+        are the range of paths it prefixes. Indexed with the post for subtree
+        scans, and with the post and depth for paging one level of a thread.
+    :type path: CharField
+    :ivar depth: Nesting level, 0 for top-level comments.
+    :type depth: IntegerField
+    :ivar reply_count: Number of replies below the comment at any depth, kept
+        up to date by the forum service.
+    :type reply_count: IntegerField
+    """
+
+    # Characters per path segment; base 36 fits IDs below 36**6 (2.1 billion)
+    PATH_SEGMENT_WIDTH = 6
+    PATH_DIGITS = "0123456789abcdefghijklmnopqrstuvwxyz"
+    PATH_MAX_LENGTH = 255
+    MAX_DEPTH = PATH_MAX_LENGTH // PATH_SEGMENT_WIDTH - 1
 
     id = AutoField()
     user = ForeignKeyField(User, backref="comments")
@@ -639,10 +685,61 @@ class PostComment(BaseModel):
     content = TextField()
     created_at = DateTimeField(default=datetime.now(timezone.utc))
     updated_at = DateTimeField(default=datetime.now(timezone.utc))
+    parent = ForeignKeyField(
+        "self", backref="replies", column_name="parent_id", null=True
+    )
+    path = CharField(max_length=PATH_MAX_LENGTH, default="")
+    depth = IntegerField(default=0)
+    reply_count = IntegerField(default=0)
 
     class Meta:
         table_name = "post_comments"
-        indexes = ((("id", "user_id"), True),)
+        indexes = (
+            (("id", "user_id"), True),
+            (("post_id", "path"), False),
+            (("post_id", "depth", "path"), False),
+        )
+
+    @classmethod
+    def path_segment(cls, comment_id):
+        """
+        Encodes a comment ID as a fixed-width base 36 path segment, so paths
+        compare like the ID sequences they encode.
+
+        :param comment_id: The comment's ID.
+        :type comment_id: int
+        :rtype: str
+        """
+        digits = ""
+        while comment_id:
+            comment_id, digit = divmod(comment_id, 36)
+            digits = cls.PATH_DIGITS[digit] + digits
+        return digits.rjust(cls.PATH_SEGMENT_WIDTH, "0")
+
+    @classmethod
+    def thread_range(cls, first, last=None):
+        """
+        Returns a condition on ``path`` that matches the comments from path
+        ``first`` through the end of the subtree of path ``last``, as one
+        index range. The upper bound is the next string in the path alphabet
+        rather than a sentinel character, so the range holds under any
+        collation that sorts digits before letters, not only byte order.
+
+        :param first: The first path in the range.
+        :type first: str
+        :param last: The path whose subtree ends the range. Defaults to
+            ``first``, which matches that comment and its replies.
+        :type last: str, optional
+        :rtype: peewee.Expression
+        """
+        condition = cls.path >= first
+        # Drop trailing last digits, which have no next digit, then step the
+        # final one: "0az" is followed by "0b"
+        prefix = (first if last is None else last).rstrip(cls.PATH_DIGITS[-1])
+        if prefix:
+            successor = cls.PATH_DIGITS[cls.PATH_DIGITS.index(prefix[-1]) + 1]
+            condition &= cls.path < prefix[:-1] + successor
+        return condition
 
     def get_user_id(self):
         return str(self.user)
@@ -661,7 +758,8 @@ class SessionLog(BaseModel):
     :type id: AutoField
     :ivar user: The user associated with this session.
     :type user: ForeignKeyField
-    :ivar login_time: The login timestamp for the session.
+    :ivar login_time: The login timestamp for the session, indexed for
+        time-range reports and compaction.
     :type login_time: TimestampField
     """
 
@@ -669,12 +767,153 @@ class SessionLog(BaseModel):
     user = ForeignKeyField(
         User, backref="sessions", column_name="user_id", on_delete="CASCADE"
     )
-    login_time = TimestampField(default=datetime.now(timezone.utc))
+    login_time = TimestampField(default=datetime.now(timezone.utc), index=True)
 
     class Meta:
         table_name = "session_log"
 
 
+class SessionLogDaily(BaseModel):
+    """
+    Represents a user's login count for one day.
+
+    Session log entries older than the retention period are compacted into these
+    rows, which keep activity reports working while the raw log stays small.
+
+    :ivar id: The unique identifier for the daily count.
+    :type id: AutoField
+    :ivar user: The user whose logins are counted.
+    :type user: ForeignKeyField
+    :ivar day: The UTC date the logins happened on.
+    :type day: DateField
+    :ivar logins: The number of logins on that day.
+    :type logins: IntegerField
+    """
+
+    id = AutoField(primary_key=True)
+    user = ForeignKeyField(
+        User, backref="daily_sessions", column_name="user_id", on_delete="CASCADE"
+    )
+    day = DateField()
+    logins = IntegerField(default=0)
+
+    class Meta:
+        table_name = "session_log_daily"
+        indexes = ((("user", "day"), True),)
+
+
+class Notification(BaseModel):
+    """
+    Represents an entry in a user's notification inbox.
+
+    Rows are written by the notification feed's worker when a comment is
+    added: one per user to notify, so reading an inbox is a range scan of the
+    recipient's rows by ID. Each row carries a preview of the comment and
+    needs no join to be shown. A user has at most one notification per
+    comment, so an event written twice adds no duplicates.
+
+    :ivar id: The unique identifier for the notification; inboxes are listed
+        newest first by ID.
+    :type id: AutoField
+    :ivar user: The user notified.
+    :type user: ForeignKeyField
+    :ivar actor: The user whose comment caused the notification.
+    :type actor: ForeignKeyField
+    :ivar kind: ``comment`` on the recipient's post, ``reply`` to their
+        comment, or ``thread`` for a reply in a thread they took part in.
+    :type kind: CharField
+    :ivar post_id: The post commented on.
+    :type post_id: IntegerField
+    :ivar comment_id: The new comment.
+    :type comment_id: IntegerField
+    :ivar preview: The start of the comment.
+    :type preview: CharField
+    :ivar created_at: When the comment was added.
+    :type created_at: DateTimeField
+    :ivar read_at: When the recipient marked the notification read, or None.
+    :type read_at: DateTimeField
+    """
+
+    PREVIEW_LENGTH = 140
+
+    id = AutoField()
+    user = ForeignKeyField(
+        User, backref="notifications", column_name="user_id", on_delete="CASCADE"
+    )
+    actor = ForeignKeyField(
+        User,
+        backref="caused_notifications",
+        column_name="actor_id",
+        on_delete="CASCADE",
+    )
+    kind = CharField(max_length=20)
+    post_id = IntegerField(index=True)
+    comment_id = IntegerField()
+    preview = CharField(max_length=PREVIEW_LENGTH)
+    created_at = DateTimeField()
+    read_at = DateTimeField(null=True)
+
+    class Meta:
+        table_name = "notifications"
+        indexes = (
+            (("user", "id"), False),
+            (("user", "comment_id"), True),
+        )
+
+
+class DeletionJob(BaseModel):
+    """
+    Tracks the purge of a soft-deleted post or user.
+
+    The job is created in the same transaction that marks the entity deleted.
+    The deletion engine then removes the entity's rows step by step, updating
+    ``step`` and ``purged_rows`` in the transaction of every chunk it deletes,
+    so the job reports its progress and resumes where it stopped.
+
+    :ivar id: The unique identifier for the job.
+    :type id: AutoField
+    :ivar entity: What is purged: ``post`` or ``user``.
+    :type entity: CharField
+    :ivar entity_id: The ID of the post or user.
+    :type entity_id: IntegerField
+    :ivar status: ``pending``, ``running``, ``done`` or ``failed``.
+    :type status: CharField
+    :ivar step: The step being purged, or None before the first chunk.
+    :type step: CharField
+    :ivar purged_rows: Rows deleted so far.
+    :type purged_rows: IntegerField
+    :ivar attempts: Failed attempts so far.
+    :type attempts: IntegerField
+    :ivar error: The last failure, if any.
+    :type error: TextField
+    :ivar created_at: When the entity was deleted.
+    :type created_at: DateTimeField
+    :ivar updated_at: When the job was claimed or last made progress.
+    :type updated_at: DateTimeField
+    :ivar finished_at: When the purge completed.
+    :type finished_at: DateTimeField
+    """
+
+    id = AutoField()
+    entity = CharField(max_length=20)
+    entity_id = IntegerField()
+    status = CharField(max_length=20, default="pending")
+    step = CharField(max_length=64, null=True)
+    purged_rows = IntegerField(default=0)
+    attempts = IntegerField(default=0)
+    error = TextField(null=True)
+    created_at = DateTimeField()
+    updated_at = DateTimeField()
+    finished_at = DateTimeField(null=True)
+
+    class Meta:
+        table_name = "deletion_jobs"
+        indexes = (
+            (("entity", "entity_id"), True),
+            (("status", "updated_at"), False),
+        )
+
+
 class Settings(BaseModel):
     """
     Represents the Settings model.
@@ -2,6 +2,7 @@ from flask import jsonify, request  # Added imports
 from flask_cors import CORS
 
 from .auth import auth_bp
+from .batch import batch_bp
 from .format import format_bp
 from .forum import forum_bp
 from .status import status_bp
@@ -46,6 +47,7 @@ def register_routes(app):
         app.register_blueprint(thesis_bp)
         app.register_blueprint(forum_bp)
         app.register_blueprint(format_bp)
+        app.register_blueprint(batch_bp)
     except Exception as e:
         app.logger.error(f"Failed to register blueprints: {e}")
         raise
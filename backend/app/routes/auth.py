@@ -7,17 +7,20 @@ from peewee import IntegrityError
 
 from ..services.userservice import UserService
 from ..utils.auth import jwt_required
+from ..utils.rate_limit import rate_limit
+from ..utils.session_log import record_login
 
 auth_bp = Blueprint("auth", __name__, url_prefix="/api/auth")
 
 
 @auth_bp.route("/signin", methods=["POST"])
+@rate_limit("signin")
 def signin():
     """
     Handles user sign-in requests by authenticating the user credentials. Checks the
     presence of required fields in the request body, validates user credentials via
     the UserService, and generates a JWT token upon successful authentication. Logs
-    successful logins and errors.
+    successful logins and errors, and queues a session log entry for each login.
 
     :raises KeyError: If the data dictionary is missing required keys (email or password).
     :raises Exception: For any generic errors during the sign-in process.
@@ -49,7 +52,8 @@ def signin():
             # Generate a new JWT token
             token = user_service.generate_token(user["id"])
 
-            # Log login details
+            # Log login details; the session log row is written in the background
+            record_login(user["id"])
             app.logger.info(
                 f"User {user['id']} logged in successfully at {datetime.now(timezone.utc)}"
             )
@@ -64,6 +68,7 @@ def signin():
 
 
 @auth_bp.route("/register", methods=["POST"])
+@rate_limit("register")
 def register():
     """
     Handles the user registration process by validating input data, creating a new user,
@@ -168,8 +173,8 @@ def register():
 def signout():
     """
     Handles the user sign-out process. This route requires the caller to be authenticated
-    using JWT. It extracts the user ID from the request context and the token from the
-    Authorization header, then delegates the logout process to the UserService. Returns a
+    using JWT. It extracts the user ID and the token ID (``jti``) from the request
+    context, then delegates the logout process to the UserService. Returns a
     JSON response indicating the success or failure of the logout process.
 
     :raises Exception: If an unexpected error occurs during the sign-out process.
@@ -181,15 +186,15 @@ def signout():
     # Instantiate the UserService
     user_service = UserService(app.logger)
     try:
-        # Extract user ID and token from the context
+        # Extract user ID and token ID from the context
         user_id = g.user_id
-        token = request.headers.get("Authorization", "").replace("Bearer ", "")
+        jti = g.get("token_jti")
 
-        if not token:
+        if not jti:
             return jsonify({"success": False, "message": "Token is missing"}), 400
 
         # Call the logout method
-        success = user_service.logout(user_id, token)
+        success = user_service.logout(user_id, jti)
         if success:
             return jsonify({"success": True, "message": "Logged out successfully"}), 200
         else:
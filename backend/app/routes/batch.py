@@ -0,0 +1,190 @@
+from flask import Blueprint
+from flask import current_app as app
+from flask import g, jsonify, request
+
+from ..utils.auth import jwt_required
+from ..utils.db import database_proxy
+
+batch_bp = Blueprint("batch_api", __name__, url_prefix="/api/batch")
+
+ALLOWED_METHODS = {"GET", "POST", "PUT", "DELETE"}
+
+
+def _validate_sub_request(index, sub_request):
+    """
+    Checks a single batch entry and returns an error message if it is invalid.
+
+    :param index: Position of the entry in the batch, used in the message.
+    :type index: int
+    :param sub_request: The entry as sent by the client.
+    :type sub_request: Any
+    :return: An error message, or None if the entry is valid.
+    :rtype: str or None
+    """
+    if not isinstance(sub_request, dict):
+        return f"Request {index} must be an object"
+    method = str(sub_request.get("method", "GET")).upper()
+    path = sub_request.get("path")
+    if method not in ALLOWED_METHODS:
+        return f"Request {index} uses unsupported method {method}"
+    if not isinstance(path, str) or not path.startswith("/api/"):
+        return f"Request {index} must target an /api/ path"
+    if path.startswith(batch_bp.url_prefix):
+        return f"Request {index} cannot nest a batch request"
+    return None
+
+
+def _dispatch(sub_request, environ_base, batch_auth, commit_hooks):
+    """
+    Runs one sub-request through the application's URL map in-process.
+
+    Each sub-request gets its own application context, so nothing one
+    sub-request leaves in ``g`` is seen by the next. It runs every
+    ``before_request`` hook, including the rate limits, as if it had been
+    sent on its own by the same client. The database connection stays open
+    across sub-requests because they run inside the batch's transaction, and
+    side effects outside the database are queued until it commits (see
+    ``after_commit``).
+
+    :param sub_request: A validated batch entry with ``method``, ``path`` and
+        optional ``body``.
+    :type sub_request: dict
+    :param environ_base: WSGI environ values of the batch request, such as the
+        client address and headers, forwarded to every sub-request.
+    :type environ_base: dict
+    :param batch_auth: The token validated for the batch with its user ID and
+        JTI, which ``jwt_required`` trusts instead of decoding the token again.
+    :type batch_auth: tuple
+    :param commit_hooks: The batch's queue of side effects to run once its
+        transaction commits.
+    :type commit_hooks: list
+    :return: A dictionary with the sub-response ``status`` and ``body``. A
+        streamed response is closed unread and reported as a 400.
+    :rtype: dict
+    """
+    method = str(sub_request.get("method", "GET")).upper()
+    with app.app_context(), app.test_request_context(
+        sub_request["path"],
+        method=method,
+        json=sub_request.get("body"),
+        environ_base=environ_base,
+    ):
+        g.batch_auth = batch_auth
+        g.commit_hooks = commit_hooks
+        try:
+            response = app.full_dispatch_request()
+        except Exception as e:
+            app.logger.error(
+                f"Batch sub-request {method} {sub_request['path']} failed: {e}"
+            )
+            return {
+                "status": 500,
+                "body": {"success": False, "message": "An internal error occurred"},
+            }
+        if response.is_streamed:
+            # Reading a stream such as the forum events would never finish
+            # while the batch holds its transaction open
+            response.close()
+            return {
+                "status": 400,
+                "body": {
+                    "success": False,
+                    "message": "Streaming responses cannot be batched",
+                },
+            }
+        body = response.get_json(silent=True)
+        if body is None:
+            body = response.get_data(as_text=True)
+        return {"status": response.status_code, "body": body}
+
+
+def _environ_base():
+    """
+    Returns the environ values of the current request that sub-requests
+    inherit: the client address and the request headers.
+    """
+    environ = {
+        key: value for key, value in request.environ.items() if key.startswith("HTTP_")
+    }
+    environ["REMOTE_ADDR"] = request.remote_addr
+    return environ
+
+
+@batch_bp.route("", methods=["POST"])
+@jwt_required
+def run_batch():
+    """
+    Executes several API calls in one HTTP round trip.
+
+    The payload is ``{"requests": [{"method": "GET", "path": "/api/...",
+    "body": {...}}, ...], "atomic": false}``. The bearer token is validated
+    once for the whole batch; sub-requests are dispatched in order through the
+    Flask URL map, share one database connection and run inside a single
+    transaction. When ``atomic`` is true and any sub-request returns a status
+    of 400 or above, the transaction is rolled back. Side effects outside the
+    database, such as cache invalidation, forum events and notifications, take
+    place only once the transaction has committed, so a rolled back batch
+    leaves none behind.
+
+    :return: A JSON response with one ``{"status", "body"}`` entry per
+        sub-request in the order they were sent, or 400 if the payload is
+        invalid.
+    :rtype: tuple
+    """
+    data = request.get_json(silent=True) or {}
+    sub_requests = data.get("requests")
+    if not isinstance(sub_requests, list) or not sub_requests:
+        return (
+            jsonify({"success": False, "message": "requests must be a non-empty list"}),
+            400,
+        )
+
+    max_requests = app.config["BATCH_MAX_REQUESTS"]
+    if len(sub_requests) > max_requests:
+        return (
+            jsonify(
+                {
+                    "success": False,
+                    "message": f"A batch may contain at most {max_requests} requests",
+                }
+            ),
+            400,
+        )
+
+    for index, sub_request in enumerate(sub_requests):
+        error = _validate_sub_request(index, sub_request)
+        if error:
+            return jsonify({"success": False, "message": error}), 400
+
+    environ_base = _environ_base()
+    # Let jwt_required in each sub-request trust the token validated above.
+    batch_auth = (
+        request.headers["Authorization"].replace("Bearer ", ""),
+        g.user_id,
+        g.get("token_jti"),
+    )
+    atomic = bool(data.get("atomic", False))
+    results = []
+    rolled_back = False
+    commit_hooks = []
+
+    with database_proxy.atomic() as transaction:
+        for sub_request in sub_requests:
+            results.append(
+                _dispatch(sub_request, environ_base, batch_auth, commit_hooks)
+            )
+        if atomic and any(result["status"] >= 400 for result in results):
+            transaction.rollback()
+            rolled_back = True
+
+    if not rolled_back:
+        for hook in commit_hooks:
+            try:
+                hook()
+            except Exception as e:
+                app.logger.error(f"Batch commit hook {hook.func.__name__} failed: {e}")
+
+    return (
+        jsonify({"success": True, "results": results, "rolled_back": rolled_back}),
+        200,
+    )
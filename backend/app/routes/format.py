@@ -6,12 +6,14 @@ from flask import jsonify, make_response, request, send_file
 from ..services.apaservice import APAService
 from ..utils.auth import jwt_required
 from ..utils.formatter import APAFormatter
+from ..utils.rate_limit import rate_limit
 
 format_bp = Blueprint("format_bp", __name__, url_prefix="/api/format")
 
 
 @format_bp.route("/apa/<int:thesis_id>", methods=["GET"])
 @jwt_required
+@rate_limit("export")
 def get_apa_format(thesis_id):
     """
     Return the thesis data in different formats:
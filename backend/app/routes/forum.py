@@ -1,12 +1,21 @@
-from flask import Blueprint
+from flask import Blueprint, Response
 from flask import current_app as app
-from flask import g, jsonify, request
+from flask import g, jsonify, request, stream_with_context
 
 from ..services.forumservice import ForumService
-from ..utils.auth import jwt_required
+from ..utils.auth import jwt_required, optional_jwt
+from ..utils.forum_events import get_forum_events
+from ..utils.post_views import record_post_view
+from ..utils.serializers import (POST_DETAIL_COLUMNS, column_names,
+                                 requested_fields)
 
 forum_bp = Blueprint("forum_api", __name__, url_prefix="/api/forum")
 
+POST_DETAIL_FIELDS = column_names(POST_DETAIL_COLUMNS)
+
+# Largest page of search results a client may ask for.
+SEARCH_MAX_LIMIT = 50
+
 
 @forum_bp.route("/posts", methods=["GET"])
 def list_posts():
@@ -19,7 +28,12 @@ def list_posts():
     :param per_page: The number of posts to include per page. Default is 10.
     :type per_page: int
     :param order_by: The field by which posts are ordered, including sort direction. Default is 'created_at.desc'.
+        'hot' ranks posts by recent comments and views and pages by ``cursor`` instead of ``page``.
     :type order_by: str
+    :param cursor: With ``order_by=hot``, the ``next_cursor`` of the previous page.
+    :type cursor: str
+    :param fields: Comma-separated post fields to select. Default is every summary field.
+    :type fields: str
 
     :return: A JSON response containing forum posts and a status code. The response includes a 'success' field
              (True if posts are fetched successfully; False otherwise). On success, it also includes paginated
@@ -33,21 +47,113 @@ def list_posts():
         order_by = request.args.get("order_by", default="created_at.desc")
 
         posts_data = forum_service.get_all_posts(
-            page=page, per_page=per_page, order_by=order_by
+            page=page,
+            per_page=per_page,
+            order_by=order_by,
+            fields=requested_fields("post"),
+            cursor=request.args.get("cursor"),
         )
         return jsonify({"success": True, **posts_data}), 200
+    except ValueError as e:
+        return jsonify({"success": False, "message": str(e)}), 400
     except Exception as e:
         app.logger.error(f"Error fetching posts: {e}")
         return jsonify({"success": False, "message": "Failed to fetch posts"}), 500
 
 
+@forum_bp.route("/search", methods=["GET"])
+def search_forum():
+    """
+    Searches forum posts and comments by full text. Results are ranked by
+    relevance and carry an HTML-escaped title and snippet with the matches
+    wrapped in ``<mark>`` tags. Pass the returned ``next_cursor`` as ``cursor``
+    to fetch the next page.
+
+    :param q: The words to search for.
+    :type q: str
+    :param limit: The number of results per page, at most 50. Default is 20.
+    :type limit: int
+    :param cursor: The ``next_cursor`` of the previous page.
+    :type cursor: str
+    :return: A JSON response with the results and the next page's cursor, or
+        None on the last page. A missing query or invalid cursor gets a 400
+        status code.
+    :rtype: tuple
+    """
+    forum_service = ForumService(app.logger)
+    try:
+        query = request.args.get("q", default="")
+        limit = request.args.get("limit", default=20, type=int)
+        cursor = request.args.get("cursor")
+        if not 1 <= limit <= SEARCH_MAX_LIMIT:
+            raise ValueError(f"limit must be between 1 and {SEARCH_MAX_LIMIT}.")
+
+        results = forum_service.search(query, limit=limit, cursor=cursor)
+        return jsonify({"success": True, **results}), 200
+    except ValueError as e:
+        return jsonify({"success": False, "message": str(e)}), 400
+    except Exception as e:
+        app.logger.error(f"Error searching forum: {e}")
+        return jsonify({"success": False, "message": "Failed to search forum"}), 500
+
+
+@forum_bp.route("/events", methods=["GET"])
+def forum_events():
+    """
+    Streams new posts and comments as Server-Sent Events, so clients no longer
+    need to poll the listings. Each event has an ID, a type (``post`` or
+    ``comment``) and a JSON payload; idle streams get a keep-alive comment.
+
+    A client reconnecting with the ``Last-Event-ID`` header, as ``EventSource``
+    does, or the ``last_event_id`` parameter is first sent the events it
+    missed. If those are no longer available it gets a ``reset`` event and
+    should reload the forum. Clients that fall too far behind are disconnected
+    and resume the same way, as do all clients once their stream has been open
+    for ``FORUM_EVENTS_MAX_AGE`` seconds.
+
+    :param post_id: Only stream comments on this post.
+    :type post_id: int
+    :param last_event_id: ID of the last event received.
+    :type last_event_id: str
+    :return: A ``text/event-stream`` response, or a JSON error with a 400
+        status code if the event ID is invalid.
+    :rtype: flask.Response | tuple
+    """
+    try:
+        last_event_id = request.headers.get("Last-Event-ID") or request.args.get(
+            "last_event_id"
+        )
+        post_id = request.args.get("post_id", type=int)
+        events = get_forum_events().stream(last_event_id, post_id=post_id)
+    except ValueError as e:
+        return jsonify({"success": False, "message": str(e)}), 400
+    except Exception as e:
+        app.logger.error(f"Error opening forum event stream: {e}")
+        return (
+            jsonify({"success": False, "message": "Failed to open event stream"}),
+            500,
+        )
+
+    return Response(
+        stream_with_context(events),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @forum_bp.route("/posts/<int:post_id>", methods=["GET"])
+@optional_jwt
 def view_post(post_id):
     """
     Fetch and display the details of a specific forum post along with associated comments.
 
     This endpoint retrieves a forum post identified by its ID, alongside user details and
-    paginated comments associated with the post.
+    paginated comments associated with the post. ``?fields=`` (or ``fields[post]``)
+    and ``fields[comment]`` limit the columns selected for the post and comments.
+    With ``?threaded=true`` comments are paged by top-level thread, each with
+    ``depth`` levels of replies nested under ``replies`` (default 2).
+    A bearer token is optional; when valid, the view is counted against the
+    signed-in user instead of the client address.
 
     :param post_id: The unique identifier of the forum post to be retrieved.
     :type post_id: int
@@ -60,9 +166,10 @@ def view_post(post_id):
     forum_service = ForumService(app.logger)
     try:
         # Fetch the post by ID
-        post = forum_service.get_post_by_id(post_id)
+        post = forum_service.get_post_by_id(post_id, fields=requested_fields("post"))
         if not post:
             return jsonify({"success": False, "message": "Post not found"}), 404
+        record_post_view(post_id)
 
         # Pagination for comments
         page = request.args.get("page", default=1, type=int)
@@ -70,7 +177,12 @@ def view_post(post_id):
 
         # Fetch comments for the post
         comments_data = forum_service.get_post_comments(
-            post_id, page=page, per_page=per_page
+            post_id,
+            page=page,
+            per_page=per_page,
+            fields=requested_fields("comment", primary=False),
+            threaded=request.args.get("threaded", "").lower() in ("1", "true"),
+            depth=request.args.get("depth", default=2, type=int),
         )
 
         # Format and return the response
@@ -79,12 +191,7 @@ def view_post(post_id):
                 {
                     "success": True,
                     "post": {
-                        "id": post["id"],
-                        "title": post["title"],
-                        "description": post["description"],
-                        "content": post["content"],
-                        "created_at": post["created_at"],
-                        "updated_at": post["updated_at"],
+                        name: post[name] for name in POST_DETAIL_FIELDS if name in post
                     },
                     "user": {
                         "id": post["user_id"],  # User ID from the joined User table
@@ -97,6 +204,8 @@ def view_post(post_id):
             ),
             200,
         )
+    except ValueError as e:
+        return jsonify({"success": False, "message": str(e)}), 400
     except Exception as e:
         app.logger.error(f"Error fetching post {post_id}: {e}")
         return jsonify({"success": False, "message": "Failed to fetch post"}), 500
@@ -209,7 +318,8 @@ def add_comment(post_id):
     This function interacts with the forum service to handle comment creation
     for a given post. It requires the user to be authenticated and extracts
     the user ID from the user context (global `g` object). The function
-    expects the request payload to contain the 'content' field.
+    expects the request payload to contain the 'content' field, and a
+    'parent_id' to reply to another comment on the post.
 
     :param post_id: ID of the post to which the comment will be added
     :type post_id: int
@@ -225,11 +335,24 @@ def add_comment(post_id):
 
         user_id = g.user_id
         comment = forum_service.add_comment_to_post(
-            user_id, post_id, {"content": data["content"]}
+            user_id,
+            post_id,
+            {"content": data["content"], "parent_id": data.get("parent_id")},
         )
         if comment:
-            return jsonify({"success": True, "comment": comment["content"]}), 201
+            return (
+                jsonify(
+                    {
+                        "success": True,
+                        "comment": comment["content"],
+                        "id": comment["id"],
+                    }
+                ),
+                201,
+            )
         return jsonify({"success": False, "message": "Failed to add comment"}), 400
+    except ValueError as e:
+        return jsonify({"success": False, "message": str(e)}), 400
     except Exception as e:
         app.logger.error(f"Error adding comment to post {post_id}: {e}")
         return jsonify({"success": False, "message": "An internal error occurred"}), 500
@@ -270,6 +393,50 @@ def delete_post(post_id):
         return jsonify({"success": False, "message": "An internal error occurred"}), 500
 
 
+@forum_bp.route(
+    "/posts/<int:post_id>/comments/<int:comment_id>/replies", methods=["GET"]
+)
+def list_replies(post_id, comment_id):
+    """
+    Pages the direct replies to a comment, each with its own replies nested
+    like the threads of a post. Clients use it to expand the replies a
+    threaded page left collapsed.
+
+    :param post_id: The post the comment belongs to.
+    :type post_id: int
+    :param comment_id: The comment whose replies are listed.
+    :type comment_id: int
+    :param page: The page of replies. Default is 1.
+    :type page: int
+    :param per_page: The number of replies per page. Default is 10.
+    :type per_page: int
+    :param depth: Levels of replies nested below each reply. Default is 2.
+    :type depth: int
+    :return: A JSON response with the page of replies, or a 404 status code if
+        the comment is not on the post.
+    :rtype: tuple
+    """
+    forum_service = ForumService(app.logger)
+    try:
+        replies = forum_service.get_post_comments(
+            post_id,
+            page=request.args.get("page", default=1, type=int),
+            per_page=request.args.get("per_page", default=10, type=int),
+            fields=requested_fields("comment"),
+            threaded=True,
+            parent_id=comment_id,
+            depth=request.args.get("depth", default=2, type=int),
+        )
+        if replies is None:
+            return jsonify({"success": False, "message": "Comment not found"}), 404
+        return jsonify({"success": True, "replies": replies}), 200
+    except ValueError as e:
+        return jsonify({"success": False, "message": str(e)}), 400
+    except Exception as e:
+        app.logger.error(f"Error fetching replies to comment {comment_id}: {e}")
+        return jsonify({"success": False, "message": "Failed to fetch replies"}), 500
+
+
 @forum_bp.route("/posts/<int:post_id>/comments/<int:comment_id>", methods=["GET"])
 @jwt_required
 def get_comment(post_id, comment_id):
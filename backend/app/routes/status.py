@@ -1,4 +1,6 @@
-from flask import Blueprint, jsonify
+from flask import Blueprint
+from flask import current_app as app
+from flask import jsonify
 
 status_bp = Blueprint("status", __name__, url_prefix="/api/status")
 
@@ -101,21 +103,30 @@ def readiness_check():
     status of the application.
 
     An HTTP 200 response with `{"status": "ready"}` indicates that all system dependencies
-    are fully operational. Otherwise, error information is returned alongside the HTTP
-    status code, signaling the system's unready state and specific dependency failures.
-
-    :raises redis.exceptions.RedisError: Raised if Redis is unreachable or responds with an error.
+    are fully operational. While Redis is unavailable but the degraded policy still allows
+    serving cached revocation state, the response is 200 with `{"status": "degraded"}` so
+    a Redis blip does not take every instance out of rotation. Otherwise, error information
+    is returned alongside the HTTP status code, signaling the system's unready state and
+    specific dependency failures.
+
+    :raises RedisUnavailableError: Raised if Redis is unreachable, responds with an error or
+        its circuit breaker is open.
     :raises PeeweeException: Raised if the database connection or query execution fails.
     :raises Exception: Raised if an unknown error occurs during the readiness check.
 
     :return: Tuple containing a JSON response object with readiness status and HTTP status code.
     :rtype: tuple
     """
-    import redis
     from peewee import PeeweeException
 
     from ..utils.db import database_proxy
-    from ..utils.redis_helper import get_redis_client
+    from ..utils.redis_helper import (
+        RedisUnavailableError,
+        call_redis,
+        get_redis_breaker,
+        get_redis_client,
+        serve_stale_allowed,
+    )
 
     try:
         # Example: Check database connection
@@ -127,10 +138,22 @@ def readiness_check():
 
         # Check Redis connection
         redis_client = get_redis_client()
-        redis_client.ping()  # Simple command to validate Redis connection
+        call_redis(redis_client.ping)  # Simple command to validate Redis connection
 
         return jsonify({"status": "ready"}), 200
-    except redis.exceptions.RedisError as re:
+    except RedisUnavailableError as re:
+        if serve_stale_allowed():
+            return (
+                jsonify(
+                    {
+                        "status": "degraded",
+                        "error": "Redis Error",
+                        "details": str(re),
+                        "redis_breaker": get_redis_breaker().state,
+                    }
+                ),
+                200,
+            )
         return (
             jsonify({"status": "unready", "error": "Redis Error", "details": str(re)}),
             503,
@@ -151,6 +174,32 @@ def readiness_check():
         )
 
 
+@status_bp.route("/metrics", methods=["GET"])
+def metrics():
+    """
+    Reports runtime metrics of the Redis access layer: the circuit breaker's
+    state and failure counters, and the degraded policy in effect.
+
+    :return: A JSON response with the metrics and a 200 status code.
+    :rtype: tuple
+    """
+    from ..utils.redis_helper import get_redis_breaker, serve_stale_allowed
+
+    return (
+        jsonify(
+            {
+                "redis": {
+                    "breaker": get_redis_breaker().snapshot(),
+                    "degraded_policy": app.config["REDIS_DEGRADED_POLICY"],
+                    "serving_stale": serve_stale_allowed()
+                    and get_redis_breaker().outage_seconds() is not None,
+                }
+            }
+        ),
+        200,
+    )
+
+
 @status_bp.route("/alive", methods=["GET"])
 def alive_check():
     """
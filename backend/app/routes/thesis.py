@@ -6,10 +6,37 @@ from playhouse.shortcuts import model_to_dict
 from ..models.data import Thesis
 from ..services.thesisservice import ThesisService
 from ..utils.auth import jwt_required
+from ..utils.ownership import thesis_owner_required
+from ..utils.serializers import requested_fields
 
 thesis_bp = Blueprint("thesis_api", __name__, url_prefix="/api/thesis")
 
 
+@thesis_bp.after_request
+def touch_changed_thesis(response):
+    """
+    Moves the ``updated_at`` of the thesis a successful write addressed, so the
+    workspace ETag changes whenever any of its sections does. Writes to the
+    thesis row itself set ``updated_at`` in ``ThesisService.update_thesis``.
+
+    :param response: The response to the request.
+    :type response: flask.Response
+    :return: The response, unchanged.
+    :rtype: flask.Response
+    """
+    if (
+        request.method in ("POST", "PUT", "DELETE")
+        and response.status_code < 400
+        and g.get("thesis_id")
+    ):
+        ThesisService.touch_thesis(g.thesis_id)
+    return response
+
+
+# Largest page of search results a client may ask for.
+SEARCH_MAX_LIMIT = 50
+
+
 @thesis_bp.route("/theses", methods=["GET"])
 @jwt_required
 def list_theses():
@@ -18,8 +45,9 @@ def list_theses():
 
     This function handles the HTTP GET request to retrieve theses linked to the
     currently authenticated user. It utilizes a ThesisService instance to fetch
-    user-specific theses and returns them in a JSON response. If an exception
-    occurs, an error is logged, and a failure response is returned.
+    user-specific theses and returns them in a JSON response. A comma-separated
+    ``?fields=`` parameter limits the columns selected for each thesis. If an
+    exception occurs, an error is logged, and a failure response is returned.
 
     :raises Exception: If there is an error fetching theses for the user.
 
@@ -31,13 +59,57 @@ def list_theses():
     thesis_service = ThesisService(app.logger)
     user_id = g.user_id
     try:
-        theses = thesis_service.get_user_theses(user_id)
+        theses = thesis_service.get_user_theses(
+            user_id, fields=requested_fields("thesis")
+        )
         return jsonify({"success": True, "theses": theses}), 200
+    except ValueError as e:
+        return jsonify({"success": False, "message": str(e)}), 400
     except Exception as e:
         app.logger.error(f"Error fetching theses for user {user_id}: {e}")
         return jsonify({"success": False, "message": "Failed to fetch theses"}), 500
 
 
+@thesis_bp.route("/search", methods=["GET"])
+@jwt_required
+def search_theses():
+    """
+    Searches the authenticated user's theses by full text: titles, abstracts,
+    body pages, chapters, references and appendices. Each result names the
+    section it was found in, its ID and thesis, and the character offset of
+    the match in the section's text, along with an HTML-escaped snippet with
+    the matches wrapped in ``<mark>`` tags. Pass the returned ``next_cursor``
+    as ``cursor`` to fetch the next page.
+
+    :param q: The words to search for.
+    :type q: str
+    :param limit: The number of results per page, at most 50. Default is 20.
+    :type limit: int
+    :param cursor: The ``next_cursor`` of the previous page.
+    :type cursor: str
+    :return: A JSON response with the results and the next page's cursor, or
+        None on the last page. A missing query or invalid cursor gets a 400
+        status code.
+    :rtype: tuple
+    """
+    thesis_service = ThesisService(app.logger)
+    user_id = g.user_id
+    try:
+        query = request.args.get("q", default="")
+        limit = request.args.get("limit", default=20, type=int)
+        cursor = request.args.get("cursor")
+        if not 1 <= limit <= SEARCH_MAX_LIMIT:
+            raise ValueError(f"limit must be between 1 and {SEARCH_MAX_LIMIT}.")
+
+        results = thesis_service.search(user_id, query, limit=limit, cursor=cursor)
+        return jsonify({"success": True, **results}), 200
+    except ValueError as e:
+        return jsonify({"success": False, "message": str(e)}), 400
+    except Exception as e:
+        app.logger.error(f"Error searching theses of user {user_id}: {e}")
+        return jsonify({"success": False, "message": "Failed to search theses"}), 500
+
+
 @thesis_bp.route("/<int:thesis_id>", methods=["GET"])
 @jwt_required
 def get_thesis(thesis_id):
@@ -48,7 +120,7 @@ def get_thesis(thesis_id):
     thesis ID. The endpoint requires the user to be authenticated via a JWT, and the
     thesis must be accessible by the requesting user. If the thesis exists and is accessible,
     the details are returned in the response; otherwise, an appropriate error message
-    is provided.
+    is provided. ``?fields=`` restricts the selected columns.
 
     :param thesis_id: The unique identifier of the thesis to fetch.
     :type thesis_id: int
@@ -60,13 +132,11 @@ def get_thesis(thesis_id):
     thesis_service = ThesisService(app.logger)
     try:
         user_id = g.user_id
-        thesis = thesis_service.get_thesis_by_id(thesis_id, user_id)
+        thesis_dict = thesis_service.get_thesis_details(
+            thesis_id, user_id, fields=requested_fields("thesis")
+        )
 
-        if thesis:
-            thesis_dict = model_to_dict(
-                thesis, exclude=[Thesis.student]
-            )  # Exclude the student object
-            thesis_dict["student_id"] = thesis.student_id  # Add student_id explicitly
+        if thesis_dict:
             return (
                 jsonify(
                     {
@@ -84,13 +154,97 @@ def get_thesis(thesis_id):
             ),
             404,
         )
+    except ValueError as e:
+        return jsonify({"success": False, "message": str(e)}), 400
     except Exception as e:
         app.logger.error(f"Error fetching thesis {thesis_id}: {e}")
         return jsonify({"success": False, "message": "An internal error occurred"}), 500
 
 
+@thesis_bp.route("/<int:thesis_id>/outline", methods=["GET"])
+@jwt_required
+@thesis_owner_required
+def get_thesis_outline(thesis_id):
+    """
+    Returns a lightweight outline of a thesis: chapter names and ordering,
+    body page numbers and appendix titles, without any body text. Editors use
+    this to render navigation and fetch section content on demand.
+
+    :param thesis_id: The unique identifier of the thesis to outline.
+    :type thesis_id: int
+    :return: A JSON response with the outline, 404 if the thesis does not
+        belong to the user, or 500 on an internal error.
+    :rtype: tuple
+    """
+    thesis_service = ThesisService(app.logger)
+    try:
+        outline = thesis_service.get_thesis_outline(thesis_id)
+        return jsonify({"success": True, "outline": outline}), 200
+    except Exception as e:
+        app.logger.error(f"Error fetching outline for thesis {thesis_id}: {e}")
+        return jsonify({"success": False, "message": "An internal error occurred"}), 500
+
+
+@thesis_bp.route("/<int:thesis_id>/workspace", methods=["GET"])
+@jwt_required
+@thesis_owner_required
+def get_thesis_workspace(thesis_id):
+    """
+    Returns the complete editor state for a thesis in one response so opening
+    the editor needs a single authenticated round trip instead of one per
+    section.
+
+    The optional ``include`` query parameter is a comma-separated list of
+    sections to load (see ``ThesisService.WORKSPACE_SECTIONS``); the thesis
+    itself is always returned. Responses carry an ETag, and a request whose
+    ``If-None-Match`` matches the current state receives ``304 Not Modified``.
+
+    :param thesis_id: The unique identifier of the thesis to load.
+    :type thesis_id: int
+    :return: A JSON response with the workspace, 304 if unchanged, 400 for an
+        unknown section, 404 if the thesis is not accessible, or 500 on error.
+    :rtype: flask.Response or tuple
+    """
+    thesis_service = ThesisService(app.logger)
+    include = request.args.get("include")
+    sections = (
+        [section.strip() for section in include.split(",") if section.strip()]
+        if include
+        else None
+    )
+    try:
+        # Answer unchanged workspaces before loading any section
+        etag = thesis_service.get_workspace_etag(thesis_id, g.user_id, sections)
+        if etag is None:
+            workspace = None
+        elif request.if_none_match.contains(etag):
+            response = app.response_class(status=304)
+            response.set_etag(etag)
+            return response
+        else:
+            workspace = thesis_service.get_workspace(thesis_id, g.user_id, sections)
+    except ValueError as e:
+        return jsonify({"success": False, "message": str(e)}), 400
+    except Exception as e:
+        app.logger.error(f"Error fetching workspace for thesis {thesis_id}: {e}")
+        return jsonify({"success": False, "message": "An internal error occurred"}), 500
+
+    if workspace is None:
+        return (
+            jsonify(
+                {"success": False, "message": "Thesis not found or not accessible."}
+            ),
+            404,
+        )
+
+    response = jsonify({"success": True, "workspace": workspace})
+    response.set_etag(etag)
+    return response
+
+
 @thesis_bp.route("/<int:thesis_id>/cover-page", methods=["GET"])
 @jwt_required
+@thesis_owner_required
 def get_cover_page(thesis_id):
     """
     Retrieves the cover page details for a specific thesis.
@@ -111,6 +265,7 @@ def get_cover_page(thesis_id):
 
 @thesis_bp.route("/<int:thesis_id>/cover-page", methods=["PUT"])
 @jwt_required
+@thesis_owner_required
 def update_cover_page(thesis_id):
     """
     Updates the cover page details for a specific thesis.
@@ -142,6 +297,7 @@ def update_cover_page(thesis_id):
 
 @thesis_bp.route("/<int:thesis_id>/table-of-contents", methods=["GET"])
 @jwt_required
+@thesis_owner_required
 def get_toc(thesis_id):
     thesis_service = ThesisService(app.logger)
     try:
@@ -154,6 +310,7 @@ def get_toc(thesis_id):
 
 @thesis_bp.route("/<int:thesis_id>/table-of-contents", methods=["PUT"])
 @jwt_required
+@thesis_owner_required
 def update_toc(thesis_id):
     thesis_service = ThesisService(app.logger)
     try:
@@ -375,6 +532,7 @@ def delete_thesis(thesis_id):
 # ----------------- ABSTRACT ROUTES -----------------
 @thesis_bp.route("/<int:thesis_id>/abstract", methods=["GET"])
 @jwt_required
+@thesis_owner_required
 def get_abstract(thesis_id):
     """
     Retrieves the abstract for a specific thesis identified by the provided ID.
@@ -405,6 +563,7 @@ def get_abstract(thesis_id):
 
 @thesis_bp.route("/<int:thesis_id>/abstract", methods=["POST"])
 @jwt_required
+@thesis_owner_required
 def create_or_update_abstract(thesis_id):
     """
     Creates or updates an abstract for a thesis with the provided `thesis_id`.
@@ -437,6 +596,7 @@ def create_or_update_abstract(thesis_id):
 
 @thesis_bp.route("/<int:thesis_id>/abstract", methods=["DELETE"])
 @jwt_required
+@thesis_owner_required
 def delete_abstract(thesis_id):
     """
     Deletes the abstract of a thesis identified by its ID.
@@ -463,6 +623,7 @@ def delete_abstract(thesis_id):
 # ----------------- BODY PAGE ROUTES -----------------
 @thesis_bp.route("/<int:thesis_id>/body-pages", methods=["GET"])
 @jwt_required
+@thesis_owner_required
 def get_body_pages(thesis_id):
     """
     Retrieve all body pages for a specific thesis identified by its ID.
@@ -503,6 +664,7 @@ def get_body_pages(thesis_id):
 
 @thesis_bp.route("/<int:thesis_id>/body-pages", methods=["POST"])
 @jwt_required
+@thesis_owner_required
 def add_body_page(thesis_id):
     """
     Add a new body page to an existing thesis. This function allows adding a body page
@@ -537,6 +699,7 @@ def add_body_page(thesis_id):
 
 @thesis_bp.route("/<int:thesis_id>/body-pages/<int:page_id>", methods=["PUT"])
 @jwt_required
+@thesis_owner_required
 def update_body_page(thesis_id, page_id):
     """
     Updates a thesis body page with the provided details. It uses the ThesisService
@@ -565,6 +728,7 @@ def update_body_page(thesis_id, page_id):
 
 @thesis_bp.route("/<int:thesis_id>/body-pages/<int:page_id>", methods=["DELETE"])
 @jwt_required
+@thesis_owner_required
 def delete_body_page(thesis_id, page_id):
     """
     Deletes a body page from a thesis by its page ID. This function is protected
@@ -596,13 +760,16 @@ def delete_body_page(thesis_id, page_id):
 
 
 @thesis_bp.route("/<int:thesis_id>/chapters", methods=["GET"])
+@jwt_required
+@thesis_owner_required
 def get_chapters_for_thesis(thesis_id):
     """
     Retrieves all chapters for a specific thesis based on its ID. The chapters
     are returned in a list of dictionaries, each containing information about
-    the chapter's ID, name, content, and order. If there are no chapters, an
-    empty list is returned. Handles unexpected exceptions and returns an error
-    response in such cases.
+    the chapter's ID, name, content, and order. Passing ``?view=summary`` omits
+    the content so navigation views only transfer names and ordering. If there
+    are no chapters, an empty list is returned. Handles unexpected exceptions
+    and returns an error response in such cases.
 
     :param thesis_id: Unique identifier for the thesis
     :type thesis_id: int
@@ -613,23 +780,20 @@ def get_chapters_for_thesis(thesis_id):
     """
     thesis_service = ThesisService(app.logger)
     try:
-        chapters = thesis_service.get_chapters_for_thesis(thesis_id)
-        if not chapters:
-            return jsonify({"chapters": []}), 200  # or 404 if you prefer
-
-        # Convert each Chapter object to a dict
-        results = []
-        for ch in chapters:
-            results.append(
-                {"id": ch.id, "name": ch.name, "content": ch.content, "order": ch.order}
-            )
-
-        return jsonify({"chapters": results}), 200
+        summary = request.args.get("view") == "summary"
+        chapters = thesis_service.get_chapters_for_thesis(
+            thesis_id, summary=summary, fields=requested_fields("chapter")
+        )
+        return jsonify({"chapters": chapters}), 200
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 
 @thesis_bp.route("/<int:thesis_id>/chapters", methods=["POST"])
+@jwt_required
+@thesis_owner_required
 def create_chapter_for_thesis(thesis_id):
     """
     Creates a new chapter for a specific thesis.
@@ -674,6 +838,8 @@ def create_chapter_for_thesis(thesis_id):
 
 
 @thesis_bp.route("/<int:thesis_id>/chapters/<int:chapter_id>", methods=["GET"])
+@jwt_required
+@thesis_owner_required
 def get_single_chapter(thesis_id, chapter_id):
     """
     Handles retrieving a single chapter associated with a specific thesis. This endpoint
@@ -713,6 +879,8 @@ def get_single_chapter(thesis_id, chapter_id):
 
 
 @thesis_bp.route("/<int:thesis_id>/chapters/<int:chapter_id>", methods=["PUT"])
+@jwt_required
+@thesis_owner_required
 def update_single_chapter(thesis_id, chapter_id):
     """
     Handles the update of a single chapter for a specific thesis. It verifies that the chapter
@@ -757,6 +925,8 @@ def update_single_chapter(thesis_id, chapter_id):
 
 
 @thesis_bp.route("/<int:thesis_id>/chapters/<int:chapter_id>", methods=["DELETE"])
+@jwt_required
+@thesis_owner_required
 def delete_single_chapter(thesis_id, chapter_id):
     """
     Deletes a specific chapter associated with a given thesis ID. This endpoint
@@ -796,6 +966,7 @@ def delete_single_chapter(thesis_id, chapter_id):
 # --- References Endpoints ---
 @thesis_bp.route("/<int:thesis_id>/references", methods=["POST"])
 @jwt_required
+@thesis_owner_required
 def add_reference(thesis_id):
     """
     Handles the HTTP POST request to add a reference to a thesis. This endpoint
@@ -824,6 +995,7 @@ def add_reference(thesis_id):
 
 @thesis_bp.route("/<int:thesis_id>/references", methods=["GET"])
 @jwt_required
+@thesis_owner_required
 def list_references(thesis_id):
     """
     Fetch the list of references associated with a specific thesis.
@@ -841,7 +1013,9 @@ def list_references(thesis_id):
     """
     thesis_service = ThesisService(app.logger)
     try:
-        references = thesis_service.get_references(thesis_id)
+        references = thesis_service.get_references(
+            thesis_id, fields=requested_fields("reference")
+        )
         return jsonify({"success": True, "references": references}), 200
     except Exception as e:
         app.logger.error(f"Error fetching references: {e}")
@@ -850,6 +1024,7 @@ def list_references(thesis_id):
 
 @thesis_bp.route("/reference/<int:reference_id>", methods=["PUT"])
 @jwt_required
+@thesis_owner_required
 def update_reference(reference_id):
     """
     Updates a reference entry identified by its ID with new data. This function
@@ -878,6 +1053,7 @@ def update_reference(reference_id):
 
 @thesis_bp.route("/reference/<int:reference_id>", methods=["DELETE"])
 @jwt_required
+@thesis_owner_required
 def delete_reference(reference_id):
     """
     Handles the deletion of a reference with the given ID. This endpoint is protected
@@ -908,6 +1084,7 @@ def delete_reference(reference_id):
 # --- Footnotes Endpoints ---
 @thesis_bp.route("/<int:thesis_id>/footnotes", methods=["POST"])
 @jwt_required
+@thesis_owner_required
 def add_footnote(thesis_id):
     """
     Add a new footnote to a specific thesis by its ID. This endpoint is protected
@@ -933,6 +1110,7 @@ def add_footnote(thesis_id):
 
 @thesis_bp.route("/<int:thesis_id>/footnotes", methods=["GET"])
 @jwt_required
+@thesis_owner_required
 def list_footnotes(thesis_id):
     """
     Fetches and returns the list of footnotes associated with a specific thesis.
@@ -952,7 +1130,9 @@ def list_footnotes(thesis_id):
     """
     thesis_service = ThesisService(app.logger)
     try:
-        footnotes = thesis_service.get_footnotes(thesis_id)
+        footnotes = thesis_service.get_footnotes(
+            thesis_id, fields=requested_fields("footnote")
+        )
         return jsonify({"success": True, "footnotes": footnotes}), 200
     except Exception as e:
         app.logger.error(f"Error fetching footnotes: {e}")
@@ -961,6 +1141,7 @@ def list_footnotes(thesis_id):
 
 @thesis_bp.route("/footnote/<int:footnote_id>", methods=["PUT"])
 @jwt_required
+@thesis_owner_required
 def update_footnote(footnote_id):
     """
     Updates an existing footnote with provided data.
@@ -993,6 +1174,7 @@ def update_footnote(footnote_id):
 
 @thesis_bp.route("/footnote/<int:footnote_id>", methods=["DELETE"])
 @jwt_required
+@thesis_owner_required
 def delete_footnote(footnote_id):
     """
     Deletes a footnote with the given ID.
@@ -1026,6 +1208,7 @@ def delete_footnote(footnote_id):
 # --- Tables Endpoints ---
 @thesis_bp.route("/<int:thesis_id>/list-of-tables", methods=["POST"])
 @jwt_required
+@thesis_owner_required
 def add_table(thesis_id):
     """
     This function is an endpoint to add a new table to a specific thesis. It uses the provided
@@ -1052,6 +1235,7 @@ def add_table(thesis_id):
 
 @thesis_bp.route("/<int:thesis_id>/list-of-tables", methods=["GET"])
 @jwt_required
+@thesis_owner_required
 def list_tables(thesis_id):
     """
     Fetches and returns the tables associated with a specific thesis.
@@ -1070,7 +1254,7 @@ def list_tables(thesis_id):
     """
     thesis_service = ThesisService(app.logger)
     try:
-        tables = thesis_service.get_tables(thesis_id)
+        tables = thesis_service.get_tables(thesis_id, fields=requested_fields("table"))
         return jsonify({"success": True, "tables": tables}), 200
     except Exception as e:
         app.logger.error(f"Error fetching tables: {e}")
@@ -1079,6 +1263,7 @@ def list_tables(thesis_id):
 
 @thesis_bp.route("/table/<int:table_id>", methods=["PUT"])
 @jwt_required
+@thesis_owner_required
 def update_table(table_id):
     """
     Updates a table in the thesis management system with the provided data.
@@ -1110,6 +1295,7 @@ def update_table(table_id):
 
 @thesis_bp.route("/table/<int:table_id>", methods=["DELETE"])
 @jwt_required
+@thesis_owner_required
 def delete_table(table_id):
     """
     Deletes a table identified by its unique ID. This function handles the HTTP DELETE
@@ -1141,6 +1327,7 @@ def delete_table(table_id):
 # --- Figures Endpoints ---
 @thesis_bp.route("/<int:thesis_id>/list-of-figures", methods=["POST"])
 @jwt_required
+@thesis_owner_required
 def add_figure(thesis_id):
     """
     Adds a new figure to a thesis by its ID.
@@ -1166,6 +1353,7 @@ def add_figure(thesis_id):
 
 @thesis_bp.route("/<int:thesis_id>/list-of-figures", methods=["GET"])
 @jwt_required
+@thesis_owner_required
 def list_figures(thesis_id):
     """
     Fetches the figures associated with a given thesis ID. This endpoint is
@@ -1185,7 +1373,9 @@ def list_figures(thesis_id):
     """
     thesis_service = ThesisService(app.logger)
     try:
-        figures = thesis_service.get_figures(thesis_id)
+        figures = thesis_service.get_figures(
+            thesis_id, fields=requested_fields("figure")
+        )
         return jsonify({"success": True, "figures": figures}), 200
     except Exception as e:
         app.logger.error(f"Error fetching figures: {e}")
@@ -1194,6 +1384,7 @@ def list_figures(thesis_id):
 
 @thesis_bp.route("/<int:thesis_id>/figure/<int:figure_id>", methods=["PUT"])
 @jwt_required
+@thesis_owner_required
 def update_figure(thesis_id, figure_id):
     """
     Updates a specific figure by its ID with the provided new data. This endpoint
@@ -1220,6 +1411,7 @@ def update_figure(thesis_id, figure_id):
 
 @thesis_bp.route("/figure/<int:figure_id>", methods=["DELETE"])
 @jwt_required
+@thesis_owner_required
 def delete_figure(figure_id):
     """
     Deletes a figure by its ID. This endpoint is protected and requires JWT
@@ -1249,6 +1441,7 @@ def delete_figure(figure_id):
 # --- Appendices Endpoints ---
 @thesis_bp.route("/<int:thesis_id>/appendices", methods=["POST"])
 @jwt_required
+@thesis_owner_required
 def add_appendix(thesis_id):
     """
     Adds an appendix to a thesis.
@@ -1278,6 +1471,7 @@ def add_appendix(thesis_id):
 
 @thesis_bp.route("/<int:thesis_id>/appendices", methods=["GET"])
 @jwt_required
+@thesis_owner_required
 def list_appendices(thesis_id):
     """
     Fetches and returns the list of appendices associated with a specific thesis.
@@ -1298,7 +1492,9 @@ def list_appendices(thesis_id):
     """
     thesis_service = ThesisService(app.logger)
     try:
-        appendices = thesis_service.get_appendices(thesis_id)
+        appendices = thesis_service.get_appendices(
+            thesis_id, fields=requested_fields("appendix")
+        )
         return jsonify({"success": True, "appendices": appendices}), 200
     except Exception as e:
         app.logger.error(f"Error fetching appendices: {e}")
@@ -1307,6 +1503,7 @@ def list_appendices(thesis_id):
 
 @thesis_bp.route("/appendix/<int:appendix_id>", methods=["PUT"])
 @jwt_required
+@thesis_owner_required
 def update_appendix(appendix_id):
     """
     Updates an existing appendix identified by the provided appendix ID. The function
@@ -1336,6 +1533,7 @@ def update_appendix(appendix_id):
 
 @thesis_bp.route("/appendix/<int:appendix_id>", methods=["DELETE"])
 @jwt_required
+@thesis_owner_required
 def delete_appendix(appendix_id):
     """
     Deletes an appendix with the specified `appendix_id`. This function is bound to the
@@ -1367,6 +1565,8 @@ def delete_appendix(appendix_id):
 
 
 @thesis_bp.route("/<int:thesis_id>/copyright", methods=["GET"])
+@jwt_required
+@thesis_owner_required
 def get_copyright_page(thesis_id):
     """
     Retrieves the copyright page content for a specified thesis using the given
@@ -1394,6 +1594,8 @@ def get_copyright_page(thesis_id):
 
 
 @thesis_bp.route("/<int:thesis_id>/copyright", methods=["PUT"])
+@jwt_required
+@thesis_owner_required
 def create_or_update_copyright_page(thesis_id):
     """
     Handles the creation or update of the copyright page for a given thesis. This endpoint
@@ -1420,6 +1622,8 @@ def create_or_update_copyright_page(thesis_id):
 
 
 @thesis_bp.route("/<int:thesis_id>/signature", methods=["GET"])
+@jwt_required
+@thesis_owner_required
 def get_signature_page(thesis_id):
     """
     Fetches the signature page for a specific thesis using the provided thesis ID.
@@ -1448,6 +1652,8 @@ def get_signature_page(thesis_id):
 
 
 @thesis_bp.route("/<int:thesis_id>/signature", methods=["PUT"])
+@jwt_required
+@thesis_owner_required
 def create_or_update_signature_page(thesis_id):
     """
     Handles the creation or update of a signature page for a given thesis.
@@ -1475,6 +1681,8 @@ def create_or_update_signature_page(thesis_id):
 
 
 @thesis_bp.route("/<int:thesis_id>/other-info", methods=["GET"])
+@jwt_required
+@thesis_owner_required
 def get_other_info_page(thesis_id):
     """
     Fetches other information page for a specific thesis based on its ID.
@@ -1502,6 +1710,8 @@ def get_other_info_page(thesis_id):
 
 
 @thesis_bp.route("/<int:thesis_id>/other-info", methods=["PUT"])
+@jwt_required
+@thesis_owner_required
 def create_or_update_other_info_page(thesis_id):
     """
     Handles the creation or update of the "Other Info" page for a thesis.
@@ -1528,6 +1738,8 @@ def create_or_update_other_info_page(thesis_id):
 
 
 @thesis_bp.route("/<int:thesis_id>/dedication", methods=["GET"])
+@jwt_required
+@thesis_owner_required
 def get_dedication_page(thesis_id):
     """
     Fetches the dedication page content for a specific thesis by its ID. If no content exists
@@ -1550,6 +1762,8 @@ def get_dedication_page(thesis_id):
 
 
 @thesis_bp.route("/<int:thesis_id>/dedication", methods=["PUT"])
+@jwt_required
+@thesis_owner_required
 def create_or_update_dedication_page(thesis_id):
     """
     Handles the creation or update of the dedication page for a specific thesis identified
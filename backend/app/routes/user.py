@@ -2,14 +2,23 @@ from flask import Blueprint
 from flask import current_app as app
 from flask import g, jsonify, request
 
+from ..services.notificationservice import NotificationService
 from ..services.userservice import UserService
 from ..utils.auth import admin_required, jwt_required
+from ..utils.deletion import get_deletions
+from ..utils.rate_limit import rate_limit
+from ..utils.redis_helper import get_token_registry_stats
+from ..utils.serializers import requested_fields
 
 user_bp = Blueprint("user_api", __name__, url_prefix="/api/user")
 
+# Largest page of notifications a client may ask for.
+NOTIFICATIONS_MAX_LIMIT = 50
+
 
 @user_bp.route("/profile-picture", methods=["POST"])
 @jwt_required
+@rate_limit("upload")
 def upload_profile_picture():
     """Endpoint to upload and update a user's profile picture."""
     user_service = UserService(app.logger)
@@ -32,8 +41,9 @@ def get_user_profile():
     """
     Handles the GET request to retrieve a user's profile information. The user's ID is
     retrieved from the global context (g), and user data is fetched using the UserService.
-    If the user is not found, returns a 404 response. In case of an internal error, logs
-    the error and returns a 500 response.
+    If the user is not found, returns a 404 response. A comma-separated ``?fields=``
+    parameter limits the selected columns; unknown names return a 400 response. In
+    case of an internal error, logs the error and returns a 500 response.
 
     :raises Exception: If an error occurs while fetching user profile data.
     :return: JSON response containing user profile data or an error message, along with the
@@ -44,11 +54,15 @@ def get_user_profile():
     user_service = UserService(app.logger)
     try:
         user_id = g.user_id
-        user_data = user_service.fetch_user_data(user_id)
+        user_data = user_service.fetch_user_data(
+            user_id, fields=requested_fields("user")
+        )
         if not user_data:
             return jsonify({"success": False, "message": "User not found"}), 404
 
         return jsonify({"success": True, "user": user_data}), 200
+    except ValueError as e:
+        return jsonify({"success": False, "message": str(e)}), 400
     except Exception as e:
         app.logger.error(f"Error fetching user profile: {e}")
         return jsonify({"success": False, "message": "An internal error occurred"}), 500
@@ -170,8 +184,8 @@ def activate_user(user_id):
     :param user_id: The ID of the user to be activated.
     :type user_id: int
     :return: A JSON response containing the success status and a message. Returns an HTTP
-        status code of 200 if the operation succeeds, 400 if the user is already active or
-        not found, and 500 in case of an unexpected server error.
+        status code of 200 if the operation succeeds, 400 if the user is already active,
+        deleted or not found, and 500 in case of an unexpected server error.
     :rtype: tuple
     """
     user_service = UserService(app.logger)
@@ -186,7 +200,10 @@ def activate_user(user_id):
             )
         return (
             jsonify(
-                {"success": False, "message": "User is already active or not found"}
+                {
+                    "success": False,
+                    "message": "User is already active, deleted or not found",
+                }
             ),
             400,
         )
@@ -202,21 +219,157 @@ def delete_user(user_id):
     """
     Deletes and deactivates a user by their ID. The endpoint requires the user to have a valid JWT
     and admin privileges to perform the action. If the specified user is not found, a 404 error
-    is returned. If the deactivation process is successful, a success message is returned with
-    a 200 status code. Otherwise, an error message with a 500 status code is returned.
+    is returned. The user is deactivated and hidden at once and their data is purged in the
+    background; the response has a 202 status code and the purge's progress, which
+    ``GET /api/user/deletions/<deletion_id>`` reports until it is done. Otherwise, an error
+    message with a 500 status code is returned.
 
-    :param user_id: ID of the user to be deactivated
+    :param user_id: ID of the user to be deleted
     :type user_id: int
     :return: A JSON object containing a success or error message along with the corresponding
              HTTP status code
     :rtype: Tuple[Response, int]
     """
     user_service = UserService(app.logger)
-    user = user_service.fetch_user_data(user_id)
+    user = user_service.fetch_user_data(user_id, fields=["id"])
     if not user:
         return jsonify({"error": f"User with ID {user_id} not found"}), 404
 
-    success = user_service.update_user(user_id, {"is_active": False})
-    if success:
-        return jsonify({"message": f"User {user_id} deactivated successfully"}), 200
-    return jsonify({"error": f"Failed to deactivate user {user_id}"}), 500
+    deletion = user_service.delete_user(user_id)
+    if deletion:
+        return (
+            jsonify(
+                {
+                    "message": f"User {user_id} deleted successfully",
+                    "deletion": deletion,
+                }
+            ),
+            202,
+        )
+    return jsonify({"error": f"Failed to delete user {user_id}"}), 500
+
+
+@user_bp.route("/deletions/<int:deletion_id>", methods=["GET"])
+@jwt_required
+@admin_required
+def deletion_progress(deletion_id):
+    """
+    Reports the progress of the purge of a deleted user or post: its status,
+    the step it is at and the rows deleted so far. Requires admin privileges.
+
+    :param deletion_id: ID of the purge, as returned when the user was deleted
+    :type deletion_id: int
+    :return: A JSON response with the progress and a 200 status code, or 404 if
+        there is no such purge.
+    :rtype: tuple
+    """
+    deletion = get_deletions().progress(deletion_id)
+    if not deletion:
+        return jsonify({"error": f"Deletion {deletion_id} not found"}), 404
+    return jsonify({"success": True, "deletion": deletion}), 200
+
+
+@user_bp.route("/token-stats", methods=["GET"])
+@jwt_required
+@admin_required
+def token_stats():
+    """
+    Reports the size and memory footprint of the token registry and blacklist
+    kept in Redis. Requires admin privileges.
+
+    :return: A JSON response with the registry statistics and a 200 status code,
+        or 500 if Redis could not be queried.
+    :rtype: tuple
+    """
+    try:
+        return jsonify({"success": True, "stats": get_token_registry_stats()}), 200
+    except Exception as e:
+        app.logger.error(f"Error collecting token registry stats: {e}")
+        return jsonify({"success": False, "message": "An internal error occurred"}), 500
+
+
+@user_bp.route("/notifications", methods=["GET"])
+@jwt_required
+def list_notifications():
+    """
+    Lists the current user's notifications about comments on their posts,
+    replies to their comments and replies in threads they took part in, newest
+    first. Pass the returned ``next_cursor`` as ``cursor`` to fetch the next
+    page.
+
+    :param limit: The number of notifications per page, at most 50. Default is 20.
+    :type limit: int
+    :param cursor: The ``next_cursor`` of the previous page.
+    :type cursor: str
+    :param unread: ``true`` to list only unread notifications.
+    :type unread: str
+    :return: A JSON response with the notifications, the next page's cursor and
+        the unread count. An invalid limit or cursor gets a 400 status code.
+    :rtype: tuple
+    """
+    notification_service = NotificationService(app.logger)
+    try:
+        limit = request.args.get("limit", default=20, type=int)
+        if not 1 <= limit <= NOTIFICATIONS_MAX_LIMIT:
+            raise ValueError(f"limit must be between 1 and {NOTIFICATIONS_MAX_LIMIT}.")
+        inbox = notification_service.get_inbox(
+            g.user_id,
+            limit=limit,
+            cursor=request.args.get("cursor"),
+            unread_only=request.args.get("unread", "").lower() == "true",
+        )
+        return jsonify({"success": True, **inbox}), 200
+    except ValueError as e:
+        return jsonify({"success": False, "message": str(e)}), 400
+    except Exception as e:
+        app.logger.error(f"Error fetching notifications of user {g.user_id}: {e}")
+        return jsonify({"success": False, "message": "An internal error occurred"}), 500
+
+
+@user_bp.route("/notifications/unread-count", methods=["GET"])
+@jwt_required
+def unread_notification_count():
+    """
+    Returns the current user's number of unread notifications. It is served
+    from a Redis counter, so clients can poll it instead of the posts they
+    follow.
+
+    :return: A JSON response with the unread count and a 200 status code.
+    :rtype: tuple
+    """
+    notification_service = NotificationService(app.logger)
+    try:
+        unread = notification_service.get_unread_count(g.user_id)
+        return jsonify({"success": True, "unread": unread}), 200
+    except Exception as e:
+        app.logger.error(f"Error counting notifications of user {g.user_id}: {e}")
+        return jsonify({"success": False, "message": "An internal error occurred"}), 500
+
+
+@user_bp.route("/notifications/read", methods=["POST"])
+@jwt_required
+def mark_notifications_read():
+    """
+    Marks the current user's notifications read: those listed in ``ids``, or
+    every unread notification when ``ids`` is omitted.
+
+    :return: A JSON response with the number of notifications marked and a 200
+        status code, or 400 if ``ids`` is not a list of integers.
+    :rtype: tuple
+    """
+    notification_service = NotificationService(app.logger)
+    data = request.get_json(silent=True) or {}
+    ids = data.get("ids")
+    if ids is not None and (
+        not isinstance(ids, list) or not all(isinstance(i, int) for i in ids)
+    ):
+        return (
+            jsonify({"success": False, "message": "ids must be a list of integers"}),
+            400,
+        )
+    try:
+        marked = notification_service.mark_read(g.user_id, ids)
+        return jsonify({"success": True, "marked": marked}), 200
+    except Exception as e:
+        app.logger.error(f"Error marking notifications of user {g.user_id}: {e}")
+        return jsonify({"success": False, "message": "An internal error occurred"}), 500
@@ -1,8 +1,6 @@
-import hashlib
-
 from app.models.data import Settings
 from app.utils.db import database_proxy
-from werkzeug.security import check_password_hash, generate_password_hash
+from app.utils.passwords import hash_password, legacy_password_hash, verify_password
 
 
 class DBService:
@@ -142,7 +140,9 @@ class DBService:
         """
         try:
             setting, _ = Settings.get_or_create(name="password")
-            setting.value = generate_password_hash(password)
+            setting.value = hash_password(
+                password, method=self.app.config["PASSWORD_HASH_METHOD"]
+            )
             setting.save()
             self.app.logger.info("Password saved successfully.")
         except Exception as e:
@@ -154,9 +154,10 @@ class DBService:
 
         This method retrieves the hashed password from the database settings table
         using the key 'password'. It then compares the provided plain-text password
-        against the retrieved hashed value. If the password setting does not exist
-        or any error occurs during the process, appropriate logs are generated and
-        the method will return `False`.
+        against the retrieved hashed value, and stores a fresh hash when the stored
+        one was made with other parameters than ``PASSWORD_HASH_METHOD``. If the
+        password setting does not exist or any error occurs during the process,
+        appropriate logs are generated and the method will return `False`.
 
         :param password: The plain-text password input to validate.
         :type password: str
@@ -166,7 +167,14 @@ class DBService:
         try:
             setting = Settings.get_or_none(name="password")
             if setting and setting.value:
-                return check_password_hash(setting.value, password)
+                matches, needs_rehash = verify_password(
+                    setting.value,
+                    password,
+                    method=self.app.config["PASSWORD_HASH_METHOD"],
+                )
+                if matches and needs_rehash:
+                    self.save_password(password)
+                return matches
             self.app.logger.warning("Password not found.")
             return False
         except Exception as e:
@@ -179,7 +187,8 @@ class DBService:
         Legacy passwords are identified by a specific hash length (64 characters).
         The method retrieves the password setting, computes the hash for the
         provided password using a private method, and compares it with the stored
-        hash to confirm verification.
+        hash to confirm verification. A verified legacy hash is migrated right away
+        by saving the password again with the configured hash method.
 
         :param password: The plaintext password to verify.
         :type password: str
@@ -190,7 +199,10 @@ class DBService:
         try:
             setting = Settings.get_or_none(name="password")
             if setting and len(setting.value) == 64:  # Legacy hash length
-                return setting.value == self._password_salt(password)
+                if setting.value != self._password_salt(password):
+                    return False
+                self.save_password(password)
+                return True
             return False
         except Exception as e:
             self.app.logger.error(f"Failed to verify legacy password: {e}")
@@ -208,5 +220,4 @@ class DBService:
         :return: The SHA-256 hashed password as a hexadecimal string.
         :rtype: str
         """
-        salt = "thesis-genius-salt"
-        return hashlib.sha256((password + salt).encode("utf-8")).hexdigest()
+        return legacy_password_hash(password)
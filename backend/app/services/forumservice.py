@@ -1,8 +1,19 @@
 from datetime import datetime, timezone
 
-from peewee import PeeweeException
+from peewee import Case, PeeweeException, fn
 
 from ..models.data import PostComment, Posts, User
+from ..utils import redis_helper
+from ..utils.cache import get_cache
+from ..utils.db import database_proxy
+from ..utils.deletion import get_deletions
+from ..utils.forum_events import get_forum_events
+from ..utils.forum_search import get_forum_search
+from ..utils.hot_posts import get_hot_ranking
+from ..utils.notifications import get_notifications
+from ..utils.serializers import (COMMENT_COLUMNS, POST_AUTHOR_COLUMNS,
+                                 POST_DETAIL_COLUMNS, POST_SUMMARY_COLUMNS,
+                                 restrict_columns)
 
 
 class ForumService:
@@ -14,6 +25,15 @@ class ForumService:
     MSG_FAIL_UPDATE = "No rows updated for post {post_id}."
     MSG_DELETE_ERROR = "Error deleting {item} {item_id} for post {post_id}: {error}"
 
+    # Cache namespaces: every listing page, and one post with its comment pages
+    LISTINGS_NAMESPACE = "posts"
+    POST_NAMESPACE = "post:{post_id}"
+
+    # Most replies loaded below one page of threads; the rest are collapsed
+    THREAD_REPLY_LIMIT = 200
+    # Upper bound on the reply levels loaded below each thread
+    THREAD_MAX_DEPTH = 10
+
     def __init__(self, logger):
         """
         Initialize the ForumService with a logger instance.
@@ -58,6 +78,60 @@ class ForumService:
             "per_page": per_page,
         }
 
+    @staticmethod
+    def _paginate_with_total(query, page=1, per_page=10):
+        """
+        Paginate the given Peewee query in a single statement. The total is
+        selected alongside every row with a window function instead of a
+        separate COUNT; only a page past the end needs a second query.
+        :param query: Peewee query object returning dictionaries.
+        :param page: Page number.
+        :param per_page: Items per page.
+        :return: Dictionary with paginated results.
+        """
+        rows = list(
+            query.select_extend(fn.COUNT(Posts.id).over().alias("total_rows"))
+            .paginate(page, per_page)
+            .dicts()
+        )
+        total = rows[0]["total_rows"] if rows else query.count()
+        for row in rows:
+            del row["total_rows"]
+        return {
+            "results": rows,
+            "total": total,
+            "page": page,
+            "per_page": per_page,
+        }
+
+    @staticmethod
+    def _cached(namespace, columns, args, loader):
+        """
+        Reads a query result through the forum cache. Errors raised by the
+        loader propagate uncached, so fallbacks returned by ``_safe_execute``
+        are never cached.
+        :param namespace: Cache namespace the result is invalidated with.
+        :param columns: The selected columns, which are part of the key.
+        :param args: Other arguments the result depends on.
+        :param loader: Runs the query on a miss.
+        """
+        key = ":".join(
+            [*(str(arg) for arg in args), ",".join(column.name for column in columns)]
+        )
+        return get_cache("forum").get_or_load(namespace, key, loader)
+
+    def _invalidate(self, post_id=None, listings=False):
+        """
+        Invalidates cached reads after a write.
+        :param post_id: Post whose detail and comment pages changed.
+        :param listings: Whether listing pages changed.
+        """
+        cache = get_cache("forum")
+        if listings:
+            cache.bump(self.LISTINGS_NAMESPACE)
+        if post_id is not None:
+            cache.bump(self.POST_NAMESPACE.format(post_id=post_id))
+
     def create_post(self, user_id, post_data):
         """
         Create a new forum post.
@@ -67,73 +141,165 @@ class ForumService:
         """
 
         def execute_create():
-            post = Posts.create(
-                user=user_id,
-                title=post_data["title"],
-                content=post_data["content"],
-                created_at=datetime.now(timezone.utc),
-                updated_at=datetime.now(timezone.utc),
-            )
-            return post.id  # Return the ID of the newly created post
+            now = datetime.now(timezone.utc)
+            with database_proxy.atomic():
+                post = Posts.create(
+                    user=user_id,
+                    title=post_data["title"],
+                    content=post_data["content"],
+                    created_at=now,
+                    updated_at=now,
+                    last_activity_at=now,
+                )
+                get_forum_search().index_post(post.id, post.title, None, post.content)
+            return post  # Return the newly created post
 
-        post_id = self._safe_execute(
+        post = self._safe_execute(
             execute_create,
             log_error_msg=f"Error creating post for user {user_id}: {{error}}",
             on_error=None,
         )
 
-        if post_id:
-            self.logger.info(f"Post {post_id} created successfully by user {user_id}.")
-            return {"id": post_id, **post_data}
+        if post:
+            self.logger.info(f"Post {post.id} created successfully by user {user_id}.")
+            self._invalidate(listings=True)
+            get_hot_ranking().update([post.id])
+            get_forum_events().publish(
+                "post",
+                {
+                    "post_id": post.id,
+                    "user_id": user_id,
+                    "title": post.title,
+                    "created_at": post.created_at,
+                },
+            )
+            return {"id": post.id, **post_data}
 
         self.logger.error(
             f"Post creation failed for user {user_id} with data {post_data}."
         )
         return None
 
-    def get_all_posts(self, page=1, per_page=10, order_by=None):
+    @staticmethod
+    def _resolve_order_by(order_by):
         """
-        Fetch all forum posts with pagination and optional sorting.
+        Translate an ``order_by`` string such as ``"created_at.desc"`` into a
+        Peewee ordering on the Posts model.
+        :param order_by: Field name with an optional ``.asc``/``.desc`` suffix.
+        :return: An ordering expression, or None if the field is unknown.
         """
+        field_name, _, direction = order_by.partition(".")
+        field = Posts._meta.fields.get(field_name)
+        if field is None:
+            return None
+        return field.desc() if direction.lower() == "desc" else field.asc()
+
+    def get_all_posts(
+        self, page=1, per_page=10, order_by=None, fields=None, cursor=None
+    ):
+        """
+        Fetch forum posts with pagination and optional sorting.
+
+        Rows carry a truncated ``preview`` of the post body instead of the full
+        description and content; the detail endpoint loads the full text.
+        Author display fields are joined and comment counts are stored on the
+        post, so a page is a single query whatever its size. Pages are cached
+        until a post is created, updated or deleted. Deleted posts are left
+        out while they wait to be purged.
+
+        ``order_by="hot"`` ranks posts by recent comments and views. The order
+        is read from the hot ranking in Redis and paged by ``cursor`` instead
+        of ``page``; the result has a ``next_cursor`` and no total.
+        :param fields: Optional field names to select; ``id`` is always included.
+            Author columns are always joined.
+        :param cursor: For the hot order, the ``next_cursor`` of the previous
+            page.
+        :raises ValueError: If ``fields`` names an unknown column or the cursor
+            is invalid.
+        """
+        columns = restrict_columns(POST_SUMMARY_COLUMNS, fields)
+        if order_by == "hot":
+            return self._safe_execute(
+                lambda: self._get_hot_posts(per_page, cursor, columns),
+                log_error_msg=self.MSG_ERROR_FETCH_POSTS,
+            )
 
         def fetch_query():
-            query = Posts.select().dicts()
-            if order_by:
-                query = query.order_by(order_by)
-            return self._paginate_query(query, page, per_page)
+            query = (
+                Posts.select(*columns, *POST_AUTHOR_COLUMNS)
+                .join(User, on=(Posts.user == User.id))
+                .where(Posts.deleted_at.is_null())
+                .dicts()
+            )
+            ordering = self._resolve_order_by(order_by) if order_by else None
+            if ordering is not None:
+                query = query.order_by(ordering, Posts.id.desc())
+            return self._paginate_with_total(query, page, per_page)
 
         return self._safe_execute(
-            fetch_query,
+            lambda: self._cached(
+                self.LISTINGS_NAMESPACE,
+                columns,
+                (page, per_page, order_by),
+                fetch_query,
+            ),
             log_error_msg=self.MSG_ERROR_FETCH_POSTS,
             on_error={"results": [], "total": 0, "page": page, "per_page": per_page},
         )
 
-    def get_post_by_id(self, post_id):
+    def _get_hot_posts(self, per_page, cursor, columns):
         """
-        Fetch a single post by ID, including user data.
+        Loads a page of the hot ranking: its post IDs from Redis, then the
+        posts by primary key in one query. While Redis is unavailable the most
+        recently active posts are served as a single page instead.
         """
+        try:
+            post_ids, next_cursor = get_hot_ranking().page(per_page, cursor)
+        except redis_helper.RedisUnavailableError as e:
+            self.logger.warning(f"Serving recent posts instead of hot posts: {e}")
+            post_ids, next_cursor = None, None
+
+        query = (
+            Posts.select(*columns, *POST_AUTHOR_COLUMNS)
+            .join(User, on=(Posts.user == User.id))
+            .where(Posts.deleted_at.is_null())
+            .dicts()
+        )
+        if post_ids is None:
+            rows = list(
+                query.order_by(Posts.last_activity_at.desc(), Posts.id.desc()).limit(
+                    per_page
+                )
+            )
+        elif post_ids:
+            # Posts deleted since they were ranked are skipped
+            by_id = {row["id"]: row for row in query.where(Posts.id.in_(post_ids))}
+            rows = [by_id[post_id] for post_id in post_ids if post_id in by_id]
+        else:
+            rows = []
+        return {"results": rows, "next_cursor": next_cursor, "per_page": per_page}
+
+    def get_post_by_id(self, post_id, fields=None):
+        """
+        Fetch a single post by ID, including user data. Found posts are cached
+        until the post is updated or deleted or its comments change.
+        :param fields: Optional post field names to select; ``id`` is always
+            included. Author columns are always joined.
+        :raises ValueError: If ``fields`` names an unknown column.
+        """
+        columns = restrict_columns(POST_DETAIL_COLUMNS, fields)
 
         def fetch_post():
             try:
                 # Fetch the post with joined user data as a dictionary
                 post = (
                     Posts.select(
-                        Posts.id,
-                        Posts.title,
-                        Posts.description,
-                        Posts.content,
-                        Posts.user.alias(
-                            "post_user"
-                        ),  # Alias to avoid potential conflicts
-                        Posts.created_at,
-                        Posts.updated_at,
-                        User.id.alias("user_id"),  # User fields
-                        User.username,
-                        User.first_name,
-                        User.last_name,
+                        *columns,
+                        Posts.user.alias("post_user"),  # Avoid clashing with user_id
+                        *POST_AUTHOR_COLUMNS,
                     )
                     .join(User, on=(Posts.user == User.id))  # Join the User table
-                    .where(Posts.id == post_id)
+                    .where((Posts.id == post_id) & Posts.deleted_at.is_null())
                     .dicts()  # Return results as dictionaries, not model instances
                     .get()  # Get only one result
                 )
@@ -146,31 +312,70 @@ class ForumService:
                 return None
 
         return self._safe_execute(
-            fetch_post,
+            lambda: self._cached(
+                self.POST_NAMESPACE.format(post_id=post_id), columns, (), fetch_post
+            ),
             log_error_msg=f"Database error fetching post {post_id}: {{error}}",
             on_error=None,
         )
 
-    def get_post_comments(self, post_id, page=1, per_page=10, order_by=None):
+    def get_post_comments(
+        self,
+        post_id,
+        page=1,
+        per_page=10,
+        order_by=None,
+        fields=None,
+        threaded=False,
+        parent_id=None,
+        depth=2,
+    ):
         """
         Fetch all comments for a specific post with pagination and optional sorting,
-        including related user data for each comment.
+        including related user data for each comment. Pages are cached with the
+        post.
+
+        In threaded mode pages are made of threads instead: the post's
+        top-level comments, or the direct replies to ``parent_id``, in the order
+        they were written, each with up to ``depth`` levels of replies nested
+        under ``replies``. Every comment carries its ``reply_count`` at any
+        depth and ``collapsed_replies``, the number of those not included,
+        which can be loaded by requesting the comment's own replies.
+        :param fields: Optional comment field names to select; ``id`` is always
+            included. Author columns are always joined.
+        :param threaded: Whether to page by thread and nest replies.
+        :param parent_id: In threaded mode, the comment whose replies are paged
+            instead of the top-level comments.
+        :param depth: In threaded mode, the levels of replies included below
+            each thread, at most ``THREAD_MAX_DEPTH``.
+        :return: The page of comments, or None if ``parent_id`` is not a comment
+            on the post.
+        :raises ValueError: If ``fields`` names an unknown column.
         """
+        columns = restrict_columns(COMMENT_COLUMNS, fields)
+        if threaded:
+            depth = max(0, min(depth, self.THREAD_MAX_DEPTH))
+            return self._safe_execute(
+                lambda: self._cached(
+                    self.POST_NAMESPACE.format(post_id=post_id),
+                    columns,
+                    ("thread", parent_id, page, per_page, depth),
+                    lambda: self._fetch_threads(
+                        post_id, parent_id, page, per_page, depth, columns
+                    ),
+                ),
+                log_error_msg=f"Database error fetching threads for post {post_id}: {{error}}",
+                on_error={
+                    "results": [],
+                    "total": 0,
+                    "page": page,
+                    "per_page": per_page,
+                },
+            )
 
         def fetch_comments():
             query = (
-                PostComment.select(
-                    PostComment.id,
-                    PostComment.content,
-                    PostComment.created_at,
-                    PostComment.updated_at,
-                    PostComment.user,
-                    PostComment.post,
-                    User.id.alias("user_id"),  # Include user fields via join
-                    User.username,
-                    User.first_name,
-                    User.last_name,
-                )
+                PostComment.select(*columns, *POST_AUTHOR_COLUMNS)
                 .join(
                     User, on=(PostComment.user == User.id)
                 )  # Join User table using foreign key
@@ -182,11 +387,92 @@ class ForumService:
             return self._paginate_query(query, page, per_page)
 
         return self._safe_execute(
-            fetch_comments,
+            lambda: self._cached(
+                self.POST_NAMESPACE.format(post_id=post_id),
+                columns,
+                ("comments", page, per_page, order_by),
+                fetch_comments,
+            ),
             log_error_msg=f"Database error fetching comments for post {post_id}: {{error}}",
             on_error={"results": [], "total": 0, "page": page, "per_page": per_page},
         )
 
+    def _fetch_threads(self, post_id, parent_id, page, per_page, depth, columns):
+        """
+        Loads one page of threads with their nested replies in two queries:
+        the page of thread roots, one level of the tree paged in path order,
+        then every reply below them as a single range scan over paths, since
+        consecutive threads cover a contiguous range.
+        """
+        if parent_id is None:
+            level = 0
+            siblings = PostComment.post == post_id
+        else:
+            parent = PostComment.get_or_none(
+                (PostComment.id == parent_id) & (PostComment.post == post_id)
+            )
+            if parent is None:
+                return None
+            level = parent.depth + 1
+            siblings = (PostComment.post == post_id) & PostComment.thread_range(
+                parent.path
+            )
+
+        # Threading needs these columns even if they were not requested
+        requested = {column.name for column in columns}
+        internal = [
+            column
+            for column in (PostComment.parent, PostComment.depth, PostComment.path)
+            if column.name not in requested
+        ]
+        selected = [*columns, *internal]
+        if "reply_count" not in requested:
+            selected.append(PostComment.reply_count)
+
+        def select_comments():
+            return (
+                PostComment.select(*selected, *POST_AUTHOR_COLUMNS)
+                .join(User, on=(PostComment.user == User.id))
+                .order_by(PostComment.path)
+                .dicts()
+            )
+
+        roots = self._paginate_query(
+            select_comments().where(siblings & (PostComment.depth == level)),
+            page,
+            per_page,
+        )
+        threads = roots["results"]
+        replies = []
+        if threads and depth > 0:
+            replies = list(
+                select_comments()
+                .where(
+                    (PostComment.post == post_id)
+                    & PostComment.thread_range(threads[0]["path"], threads[-1]["path"])
+                    & (PostComment.depth > level)
+                    & (PostComment.depth <= level + depth)
+                )
+                .limit(self.THREAD_REPLY_LIMIT)
+            )
+
+        # Rows come in path order, so every parent precedes its replies
+        nodes = {}
+        for comment in threads + replies:
+            comment["replies"] = []
+            nodes[comment["id"]] = comment
+            if comment["depth"] > level:
+                nodes[comment["parent"]]["replies"].append(comment)
+        for comment in reversed(threads + replies):
+            loaded = sum(1 + reply["loaded"] for reply in comment["replies"])
+            comment["loaded"] = loaded
+            comment["collapsed_replies"] = comment["reply_count"] - loaded
+        for comment in nodes.values():
+            del comment["loaded"]
+            for column in internal:
+                del comment[column.name]
+        return roots
+
     def update_post(self, post_id, post_data, user_id):
         """
         Update a forum post.
@@ -197,12 +483,27 @@ class ForumService:
         """
 
         def execute_update():
-            # Update the post and set the updated_at field
-            return (
-                Posts.update(**post_data, updated_at=datetime.now(timezone.utc))
-                .where((Posts.id == post_id) & (Posts.user == user_id))
-                .execute()
-            )
+            with database_proxy.atomic():
+                # Update the post and set the updated_at field
+                updated = (
+                    Posts.update(**post_data, updated_at=datetime.now(timezone.utc))
+                    .where(
+                        (Posts.id == post_id)
+                        & (Posts.user == user_id)
+                        & Posts.deleted_at.is_null()
+                    )
+                    .execute()
+                )
+                if updated:
+                    post = (
+                        Posts.select(Posts.title, Posts.description, Posts.content)
+                        .where(Posts.id == post_id)
+                        .get()
+                    )
+                    get_forum_search().index_post(
+                        post_id, post.title, post.description, post.content
+                    )
+            return updated
 
         updated_rows = self._safe_execute(
             execute_update,
@@ -212,6 +513,7 @@ class ForumService:
 
         if updated_rows > 0:
             self.logger.info(f"Post {post_id} updated successfully by user {user_id}.")
+            self._invalidate(post_id, listings=True)
             # Combine the updated data along with the post_id to return detailed info
             return {"id": post_id, **post_data}
         elif updated_rows == 0:
@@ -226,39 +528,113 @@ class ForumService:
 
     def add_comment_to_post(self, user_id, post_id, comment_data):
         """
-        Add a comment to a specific post.
+        Add a comment to a specific post, counting it on the post and moving
+        the post's last activity time in the same transaction. A comment with
+        a ``parent_id`` is a reply: its path extends the parent's, and it is
+        counted in the ``reply_count`` of every comment above it.
         :param user_id: ID of the user adding the comment.
         :param post_id: ID of the post to which the comment is being added.
-        :param comment_data: Dictionary containing comment details (content).
+        :param comment_data: Dictionary containing comment details (content,
+            optionally parent_id).
         :return: Dictionary with the created comment's details or None if creation fails.
+        :raises ValueError: If the parent is not a comment on the post or the
+            reply would be nested too deeply.
         """
+        parent_id = comment_data.get("parent_id")
 
         def execute_add_comment():
-            comment = PostComment.create(
-                user=user_id,
-                post=post_id,
-                content=comment_data["content"],
-                created_at=datetime.now(timezone.utc),
-                updated_at=datetime.now(timezone.utc),
-            )
-            return {"id": comment.id, "content": comment.content}
-
-        return self._safe_execute(
+            now = datetime.now(timezone.utc)
+            with database_proxy.atomic():
+                parent = None
+                if parent_id is not None:
+                    parent = PostComment.get_or_none(
+                        (PostComment.id == parent_id) & (PostComment.post == post_id)
+                    )
+                    if parent is None:
+                        raise ValueError(
+                            self.MSG_COMMENT_NOT_FOUND.format(
+                                comment_id=parent_id, post_id=post_id
+                            )
+                        )
+                    if parent.depth >= PostComment.MAX_DEPTH:
+                        raise ValueError("Replies cannot be nested any deeper.")
+                comment = PostComment.create(
+                    user=user_id,
+                    post=post_id,
+                    content=comment_data["content"],
+                    created_at=now,
+                    updated_at=now,
+                    parent=parent,
+                    depth=parent.depth + 1 if parent else 0,
+                )
+                comment.path = (parent.path if parent else "") + (
+                    PostComment.path_segment(comment.id)
+                )
+                comment.save(only=[PostComment.path])
+                if parent:
+                    PostComment.update(reply_count=PostComment.reply_count + 1).where(
+                        PostComment.id.in_(_path_ids(parent.path))
+                    ).execute()
+                counted = (
+                    Posts.update(
+                        comment_count=Posts.comment_count + 1, last_activity_at=now
+                    )
+                    .where((Posts.id == post_id) & Posts.deleted_at.is_null())
+                    .execute()
+                )
+                if not counted:
+                    raise ValueError(self.MSG_POST_NOT_FOUND.format(post_id=post_id))
+                get_forum_search().index_comment(comment.id, post_id, comment.content)
+            return {
+                "id": comment.id,
+                "content": comment.content,
+                "parent_id": parent_id,
+                "created_at": comment.created_at,
+            }
+
+        comment = self._safe_execute(
             execute_add_comment,
             log_error_msg=f"Error adding comment to post {post_id} by user {user_id}: {{error}}",
             on_error=None,
         )
+        if comment:
+            self._invalidate(post_id, listings=True)
+            get_hot_ranking().update([post_id])
+            get_forum_events().publish(
+                "comment",
+                {
+                    "post_id": post_id,
+                    "comment_id": comment["id"],
+                    "parent_id": parent_id,
+                    "user_id": user_id,
+                    "content": comment["content"],
+                    "created_at": comment.pop("created_at"),
+                },
+            )
+            get_notifications().enqueue(
+                {
+                    "post_id": post_id,
+                    "comment_id": comment["id"],
+                    "parent_id": parent_id,
+                    "user_id": user_id,
+                    "content": comment["content"],
+                }
+            )
+        return comment
 
     def delete_post(self, post_id, user_id):
         """
-        Delete a forum post with authorization.
+        Delete a forum post with authorization. The post is marked deleted,
+        which hides it at once, and its purge is scheduled in the same
+        transaction; the deletion engine removes its comments and the post
+        in the background.
         :param post_id: ID of the post to be deleted.
         :param user_id: ID of the user attempting to delete the post.
         :return: True if the post was deleted successfully, False otherwise.
         """
 
         def execute_delete():
-            post = Posts.get_or_none(Posts.id == post_id)
+            post = Posts.get_or_none((Posts.id == post_id) & Posts.deleted_at.is_null())
             if not post:
                 self.logger.warning(f"Post {post_id} not found.")
                 return False
@@ -270,10 +646,15 @@ class ForumService:
                 )
                 return False
 
-            # Perform the deletion
-            self.delete_all_comments(post_id)
-            post.delete_instance()
+            with database_proxy.atomic():
+                Posts.update(deleted_at=datetime.now(timezone.utc)).where(
+                    Posts.id == post_id
+                ).execute()
+                get_deletions().schedule("post", post_id)
+                get_forum_search().remove_post(post_id)
             self.logger.info(f"Post {post_id} deleted successfully by user {user_id}.")
+            self._invalidate(post_id, listings=True)
+            get_hot_ranking().remove(post_id)
             return True
 
         return self._safe_execute(
@@ -284,7 +665,8 @@ class ForumService:
 
     def delete_comment(self, post_id, comment_id, user_id):
         """
-        Deletes a comment associated with a specific post, given its ID. The function ensures that only
+        Deletes a comment associated with a specific post, given its ID, together with
+        every reply below it. The function ensures that only
         the authorized user can delete the comment. If the comment is not found or the user lacks
         authorization to delete it, the method logs appropriate warnings and does not perform the
         deletion. The function will handle execution safely and return a boolean indicating the success
@@ -301,6 +683,14 @@ class ForumService:
             comment = PostComment.get_or_none(
                 (PostComment.id == comment_id) & (PostComment.post == post_id)
             )
+            if not comment:
+                self.logger.warning(
+                    self.MSG_COMMENT_NOT_FOUND.format(
+                        comment_id=comment_id, post_id=post_id
+                    )
+                )
+                return False
+
             # Check if the user is authorized to delete the comment
             if comment.user_id != user_id:
                 self.logger.warning(
@@ -308,23 +698,48 @@ class ForumService:
                 )
                 return False
 
-            if not comment:
-                self.logger.warning(
-                    self.MSG_COMMENT_NOT_FOUND.format(
-                        comment_id=comment_id, post_id=post_id
-                    )
+            with database_proxy.atomic():
+                subtree = (PostComment.post == post_id) & PostComment.thread_range(
+                    comment.path
                 )
-                return False
-            comment.delete_instance()
+                removed_ids = [
+                    row[0]
+                    for row in PostComment.select(PostComment.id)
+                    .where(subtree)
+                    .tuples()
+                ]
+                PostComment.delete().where(subtree).execute()
+                Posts.update(
+                    comment_count=Case(
+                        None,
+                        [
+                            (
+                                Posts.comment_count > len(removed_ids),
+                                Posts.comment_count - len(removed_ids),
+                            )
+                        ],
+                        0,
+                    )
+                ).where(Posts.id == post_id).execute()
+                if comment.parent_id is not None:
+                    PostComment.update(
+                        reply_count=PostComment.reply_count - len(removed_ids)
+                    ).where(PostComment.id.in_(_path_ids(comment.path)[:-1])).execute()
+                for removed_id in removed_ids:
+                    get_forum_search().remove_comment(removed_id)
             return True
 
-        return self._safe_execute(
+        deleted = self._safe_execute(
             fetch_and_delete,
             log_error_msg=self.MSG_DELETE_ERROR.format(
                 item="comment", item_id=comment_id, post_id=post_id, error="{error}"
             ),
             on_error=False,
         )
+        if deleted:
+            self._invalidate(post_id, listings=True)
+            get_hot_ranking().update([post_id])
+        return deleted
 
     def get_comment_by_id(self, post_id, comment_id):
         """
@@ -349,14 +764,7 @@ class ForumService:
 
         def fetch_comment():
             comment = (
-                PostComment.select(
-                    PostComment.id,
-                    PostComment.content,
-                    PostComment.created_at,
-                    PostComment.updated_at,
-                    PostComment.user,
-                    PostComment.post,
-                )
+                PostComment.select(*COMMENT_COLUMNS)
                 .where((PostComment.id == comment_id) & (PostComment.post == post_id))
                 .dicts()
                 .get()
@@ -386,10 +794,14 @@ class ForumService:
         """
 
         def execute_update():
-            query = PostComment.update(content=new_content).where(
-                (PostComment.id == comment_id) & (PostComment.post == post_id)
-            )
-            return query.execute()
+            with database_proxy.atomic():
+                query = PostComment.update(content=new_content).where(
+                    (PostComment.id == comment_id) & (PostComment.post == post_id)
+                )
+                updated = query.execute()
+                if updated:
+                    get_forum_search().index_comment(comment_id, post_id, new_content)
+            return updated
 
         updated_rows = self._safe_execute(
             execute_update,
@@ -401,6 +813,7 @@ class ForumService:
             self.logger.info(
                 f"Comment {comment_id} for post {post_id} updated successfully."
             )
+            self._invalidate(post_id)
             return True
 
         self.logger.warning(
@@ -410,7 +823,8 @@ class ForumService:
 
     def delete_all_comments(self, post_id):
         """
-        Deletes all comments associated with a specific post.
+        Deletes all comments associated with a specific post and resets its
+        comment count in the same transaction.
 
         This method attempts to delete all comments linked to a given post ID.
         If the deletion is successful, it logs an informational message and returns
@@ -423,8 +837,13 @@ class ForumService:
         """
 
         def execute_deletion():
-            query = PostComment.delete().where(PostComment.post == post_id)
-            return query.execute()
+            with database_proxy.atomic():
+                deleted = (
+                    PostComment.delete().where(PostComment.post == post_id).execute()
+                )
+                Posts.update(comment_count=0).where(Posts.id == post_id).execute()
+                get_forum_search().remove_comments(post_id)
+            return deleted
 
         deleted_rows = self._safe_execute(
             execute_deletion,
@@ -434,7 +853,36 @@ class ForumService:
 
         if deleted_rows > 0:
             self.logger.info(f"All comments for post {post_id} deleted successfully.")
+            self._invalidate(post_id, listings=True)
+            get_hot_ranking().update([post_id])
             return True
 
         self.logger.warning(f"No comments found to delete for post {post_id}.")
         return False
+
+    def search(self, query, limit=20, cursor=None):
+        """
+        Full-text search over posts and comments, ranked by relevance with the
+        matches highlighted.
+
+        :param query: Words to search for.
+        :type query: str
+        :param limit: Maximum number of results.
+        :type limit: int
+        :param cursor: The ``next_cursor`` of the previous page, if any.
+        :type cursor: str, optional
+        :return: The results and the cursor of the next page, or None on the
+            last page.
+        :rtype: dict
+        :raises ValueError: If the query has no words or the cursor is invalid.
+        """
+        return get_forum_search().search(query, limit=limit, cursor=cursor)
+
+
+def _path_ids(path):
+    """
+    Returns the IDs of the comments a materialized path runs through, from the
+    top-level comment down.
+    """
+    width = PostComment.PATH_SEGMENT_WIDTH
+    return [int(path[i : i + width], 36) for i in range(0, len(path), width)]
@@ -0,0 +1,104 @@
+from datetime import datetime, timezone
+
+from ..models.data import Notification
+from ..utils.fulltext import decode_cursor, encode_cursor
+from ..utils.notifications import get_notifications
+
+NOTIFICATION_COLUMNS = (
+    Notification.id,
+    Notification.actor,
+    Notification.kind,
+    Notification.post_id,
+    Notification.comment_id,
+    Notification.preview,
+    Notification.created_at,
+    Notification.read_at,
+)
+
+
+class NotificationService:
+    """
+    Reads and updates users' notification inboxes. The inbox rows are written
+    by the notification feed when comments are added.
+
+    :ivar logger: Logger used for informational and error messages.
+    :type logger: logging.Logger
+    """
+
+    def __init__(self, logger):
+        self.logger = logger
+
+    def get_inbox(self, user_id, limit=20, cursor=None, unread_only=False):
+        """
+        Returns a page of a user's notifications, newest first. Pages are read
+        by keyset on the ``(user_id, id)`` index, so every page costs the same.
+
+        :param user_id: The recipient.
+        :type user_id: int
+        :param limit: Notifications per page.
+        :type limit: int
+        :param cursor: The ``next_cursor`` of the previous page, if any.
+        :type cursor: str, optional
+        :param unread_only: Only list unread notifications.
+        :type unread_only: bool
+        :return: The notifications, the next page's cursor or None on the
+            last page, and the user's unread count.
+        :rtype: dict
+        :raises ValueError: If the cursor is invalid.
+        """
+        query = Notification.select(*NOTIFICATION_COLUMNS).where(
+            Notification.user == user_id
+        )
+        if cursor:
+            # Notifications are ordered by ID alone
+            _, before = decode_cursor(cursor)
+            query = query.where(Notification.id < before)
+        if unread_only:
+            query = query.where(Notification.read_at.is_null())
+        rows = list(query.order_by(Notification.id.desc()).limit(limit + 1).dicts())
+
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor(0, rows[-1]["id"])
+        return {
+            "results": rows,
+            "next_cursor": next_cursor,
+            "unread": get_notifications().unread_count(user_id),
+        }
+
+    def get_unread_count(self, user_id):
+        """
+        Returns a user's number of unread notifications, normally from Redis
+        without a database query.
+
+        :param user_id: The recipient.
+        :type user_id: int
+        :rtype: int
+        """
+        return get_notifications().unread_count(user_id)
+
+    def mark_read(self, user_id, notification_ids=None):
+        """
+        Marks a user's notifications read.
+
+        :param user_id: The recipient.
+        :type user_id: int
+        :param notification_ids: The notifications to mark, or None to mark
+            every unread notification.
+        :type notification_ids: list[int], optional
+        :return: The number of notifications marked.
+        :rtype: int
+        """
+        condition = (Notification.user == user_id) & Notification.read_at.is_null()
+        if notification_ids is not None:
+            condition &= Notification.id.in_(notification_ids)
+        marked = (
+            Notification.update(read_at=datetime.now(timezone.utc))
+            .where(condition)
+            .execute()
+        )
+        if marked:
+            get_notifications().forget_unread(user_id)
+        self.logger.info(f"Marked {marked} notifications of user {user_id} read.")
+        return marked
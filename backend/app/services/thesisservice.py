@@ -1,12 +1,33 @@
+import hashlib
 from datetime import datetime, timezone
 
-from peewee import DoesNotExist, IntegrityError, PeeweeException
+from peewee import DoesNotExist, IntegrityError, PeeweeException, Value, fn
 from playhouse.shortcuts import model_to_dict
 
 from ..models.data import (Abstract, Appendix, BodyPage, Chapter,
                            CopyrightPage, DedicationPage, Figure, Footnote,
                            OtherInfoPage, Reference, SignaturePage, TableEntry,
                            TableOfContents, Thesis, User)
+from ..utils.ownership import (forget_child, forget_thesis, remember_child,
+                               remember_thesis)
+from ..utils.serializers import (APPENDIX_COLUMNS, APPENDIX_SUMMARY_COLUMNS,
+                                 BODY_PAGE_COLUMNS, BODY_PAGE_SUMMARY_COLUMNS,
+                                 CHAPTER_COLUMNS, CHAPTER_SUMMARY_COLUMNS,
+                                 FIGURE_COLUMNS, FOOTNOTE_COLUMNS,
+                                 REFERENCE_COLUMNS, TABLE_COLUMNS,
+                                 THESIS_COLUMNS, THESIS_DETAIL_COLUMNS,
+                                 TOC_COLUMNS, project, restrict_columns)
+from ..utils.thesis_search import (get_thesis_search, index_section,
+                                   reference_text, remove_section,
+                                   remove_thesis_sections)
+
+# Front-matter page models keyed by the name they are returned under.
+FRONT_MATTER_PAGES = (
+    ("copyright", CopyrightPage),
+    ("signature", SignaturePage),
+    ("other_info", OtherInfoPage),
+    ("dedication", DedicationPage),
+)
 
 
 class ThesisService:
@@ -20,6 +41,21 @@ class ThesisService:
     :type logger: Logger
     """
 
+    # Sections that can be requested from ``get_workspace``.
+    WORKSPACE_SECTIONS = (
+        "cover_page",
+        "abstract",
+        "table_of_contents",
+        "body_pages",
+        "chapters",
+        "references",
+        "footnotes",
+        "tables",
+        "figures",
+        "appendices",
+        "front_matter",
+    )
+
     def __init__(self, logger):
         """
         Represents a class for handling logging functionality. This class is used
@@ -37,7 +73,7 @@ class ThesisService:
         """
         self.logger = logger
 
-    def get_user_theses(self, user_id, status=None, order_by=None):
+    def get_user_theses(self, user_id, status=None, order_by=None, fields=None):
         """
         Fetches a list of theses for a specific user, with optional status
         filtering and sorting. This function queries the database for theses
@@ -56,6 +92,9 @@ class ThesisService:
             ordered. If provided, the list of theses will be sorted based on
             this field.
         :type order_by: str, optional
+        :param fields: (Optional) Field names to select; defaults to every
+            column. ``id`` is always included.
+        :type fields: list[str], optional
         :return: A list of dictionaries, where each dictionary represents a
             thesis belonging to the specified user and matches the applied
             filters, if any.
@@ -66,7 +105,9 @@ class ThesisService:
             during the execution of the function.
         """
         try:
-            query = Thesis.select().where(Thesis.student_id == user_id)
+            query = Thesis.select(*restrict_columns(THESIS_COLUMNS, fields)).where(
+                Thesis.student_id == user_id
+            )
             if status:
                 query = query.where(Thesis.status == status)
             if order_by:
@@ -103,10 +144,16 @@ class ThesisService:
         :raises Exception: Raised when any unexpected error occurs.
         """
         try:
-            query = Thesis.select().where(Thesis.student_id == user_id)
-            total = query.count()  # Total number of records
-            theses = query.paginate(page, per_page)
-            return [model_to_dict(thesis) for thesis in theses], total
+            total = Thesis.select().where(Thesis.student_id == user_id).count()
+            theses = project(
+                Thesis,
+                THESIS_COLUMNS,
+                Thesis.student_id == user_id,
+                order_by=Thesis.id,
+                page=page,
+                per_page=per_page,
+            )
+            return theses, total
         except PeeweeException as db_error:
             self.logger.error(
                 f"Database error fetching theses for user {user_id}: {db_error}"
@@ -118,6 +165,26 @@ class ThesisService:
             )
             raise
 
+    def search(self, user_id, query, limit=20, cursor=None):
+        """
+        Full-text search over the titles, abstracts, body pages, chapters,
+        references and appendices of a user's theses.
+
+        :param user_id: The user whose theses are searched.
+        :type user_id: int
+        :param query: Words to search for.
+        :type query: str
+        :param limit: Maximum number of results.
+        :type limit: int
+        :param cursor: The ``next_cursor`` of the previous page, if any.
+        :type cursor: str, optional
+        :return: The results, each naming its section and the offset of the
+            match, and the cursor of the next page, or None on the last page.
+        :rtype: dict
+        :raises ValueError: If the query has no words or the cursor is invalid.
+        """
+        return get_thesis_search().search(user_id, query, limit=limit, cursor=cursor)
+
     def get_thesis_by_id(self, thesis_id, user_id=None):
         """
         Fetches a thesis record by its unique identifier and optionally filters by
@@ -148,6 +215,34 @@ class ThesisService:
             )
             return None
 
+    def get_thesis_details(self, thesis_id, user_id, fields=None):
+        """
+        Fetches a single thesis owned by the given user as a dictionary, selecting
+        only the requested columns. The owner is reported as ``student_id``.
+
+        :param thesis_id: Unique identifier for the thesis.
+        :type thesis_id: int
+        :param user_id: The ID of the user who must own the thesis.
+        :type user_id: int
+        :param fields: Optional field names to select; defaults to every
+            column. ``id`` is always included.
+        :type fields: list[str], optional
+        :return: The thesis as a dictionary, or None if it is not accessible.
+        :rtype: dict or None
+        :raises ValueError: If ``fields`` names an unknown column.
+        """
+        columns = restrict_columns(THESIS_DETAIL_COLUMNS, fields)
+        try:
+            return (
+                Thesis.select(*columns)
+                .where((Thesis.id == thesis_id) & (Thesis.student_id == user_id))
+                .dicts()
+                .get_or_none()
+            )
+        except Exception as e:
+            self.logger.error(f"Failed to fetch thesis {thesis_id}: {e}")
+            raise
+
     def get_cover_page(self, thesis_id, user_id=None):
         """
         Retrieves the cover page details for a given thesis.
@@ -215,6 +310,10 @@ class ThesisService:
 
             if update_data:
                 Thesis.update(**update_data).where(Thesis.id == thesis_id).execute()
+                if "title" in update_data:
+                    index_section(
+                        "title", thesis_id, thesis_id, update_data["title"], user_id
+                    )
 
             # Return the updated cover page details
             return {
@@ -303,12 +402,12 @@ class ThesisService:
         """
         try:
             # Fetch stored TOC entries
-            toc_entries = (
-                TableOfContents.select()
-                .where(TableOfContents.thesis_id == thesis_id)
-                .order_by(TableOfContents.order)
+            result = project(
+                TableOfContents,
+                TOC_COLUMNS,
+                TableOfContents.thesis_id == thesis_id,
+                order_by=TableOfContents.order,
             )
-            result = [model_to_dict(entry) for entry in toc_entries]
 
             # If no entries exist, generate TOC dynamically
             if not result:
@@ -324,7 +423,7 @@ class ThesisService:
 
                 # Fetch body pages and generate section entries
                 body_pages = (
-                    BodyPage.select()
+                    BodyPage.select(BodyPage.page_number)
                     .where(BodyPage.thesis_id == thesis_id)
                     .order_by(BodyPage.page_number)
                 )
@@ -398,6 +497,7 @@ class ThesisService:
             abstract, created = Abstract.get_or_create(thesis=thesis)
             abstract.text = abstract_data
             abstract.save()
+            index_section("abstract", abstract.id, thesis.id, abstract.text)
             self.logger.info(
                 f"Abstract {'created' if created else 'updated'} for thesis {thesis_id}."
             )
@@ -441,6 +541,7 @@ class ThesisService:
                 self.logger.warning(f"Abstract for thesis {thesis_id} not found.")
                 return False
             abstract.delete_instance()
+            remove_section("abstract", abstract.id)
             self.logger.info(f"Abstract for thesis {thesis_id} deleted successfully.")
             return True
         except Exception as e:
@@ -470,6 +571,7 @@ class ThesisService:
             )
             body_page.body = body_text
             body_page.save()
+            index_section("body_page", body_page.id, thesis.id, body_page.body)
             self.logger.info(
                 f"Body page {page_number} for thesis {thesis_id} {'created' if created else 'updated'}."
             )
@@ -490,8 +592,12 @@ class ThesisService:
         :rtype: list[dict]
         """
         try:
-            pages = BodyPage.select().where(BodyPage.thesis_id == thesis_id)
-            result = [model_to_dict(page) for page in pages]
+            result = project(
+                BodyPage,
+                BODY_PAGE_COLUMNS,
+                BodyPage.thesis_id == thesis_id,
+                order_by=BodyPage.page_number,
+            )
 
             if not result:
                 self.logger.warning(
@@ -524,6 +630,7 @@ class ThesisService:
                 return False
 
             body_page.delete_instance()
+            remove_section("body_page", page_id)
             self.logger.info(
                 f"Body page {page_id} deleted successfully from thesis {thesis_id}."
             )
@@ -532,23 +639,226 @@ class ThesisService:
             self.logger.error(f"Error deleting body page {page_id}: {e}")
             raise
 
-    def get_chapters_for_thesis(self, thesis_id):
+    def get_chapters_for_thesis(self, thesis_id, summary=False, fields=None):
         """
         Return all chapters for a given thesis, ordered if 'order' is used.
+
+        :param thesis_id: The ID of the thesis whose chapters are listed.
+        :type thesis_id: int
+        :param summary: When True, leave out the chapter content so only the
+            id, name and order are read from the database.
+        :type summary: bool
+        :param fields: Optional field names to select. Takes precedence over
+            ``summary``; ``id`` is always included.
+        :type fields: list[str], optional
+        :return: A list of chapter dictionaries.
+        :rtype: list[dict]
         """
         try:
-            chapters = (
-                Chapter.select()
-                .where(Chapter.thesis_id == thesis_id)
-                .order_by(Chapter.order)
+            return project(
+                Chapter,
+                (
+                    restrict_columns(CHAPTER_COLUMNS, fields)
+                    if fields
+                    else CHAPTER_SUMMARY_COLUMNS if summary else CHAPTER_COLUMNS
+                ),
+                Chapter.thesis_id == thesis_id,
+                order_by=(Chapter.order, Chapter.id),
             )
-            return list(chapters)
         except DoesNotExist:
             return []
         except Exception as e:
             # Log or handle the error as you do elsewhere
             raise e
 
+    def get_thesis_outline(self, thesis_id):
+        """
+        Builds a lightweight outline of a thesis for navigation views. Only
+        titles, ordering and page numbers are selected; chapter content, page
+        bodies and appendix text are left for the detail endpoints.
+
+        :param thesis_id: The ID of the thesis to outline.
+        :type thesis_id: int
+        :return: A dictionary with ``chapters``, ``body_pages`` and
+            ``appendices`` summary lists.
+        :rtype: dict
+        :raises Exception: If an error occurs while querying the outline.
+        """
+        try:
+            return {
+                "chapters": self.get_chapters_for_thesis(thesis_id, summary=True),
+                "body_pages": project(
+                    BodyPage,
+                    BODY_PAGE_SUMMARY_COLUMNS,
+                    BodyPage.thesis_id == thesis_id,
+                    order_by=BodyPage.page_number,
+                ),
+                "appendices": project(
+                    Appendix,
+                    APPENDIX_SUMMARY_COLUMNS,
+                    Appendix.thesis_id == thesis_id,
+                    order_by=Appendix.id,
+                ),
+            }
+        except Exception as e:
+            self.logger.error(f"Error building outline for thesis {thesis_id}: {e}")
+            raise
+
+    def get_workspace(self, thesis_id, user_id, include=None):
+        """
+        Loads the editor state for a thesis in a single call. The thesis row is
+        read once and reused for the cover page, each list section is one
+        projected query and the front-matter pages are fetched together with a
+        single UNION, all inside one transaction so the sections are consistent
+        with each other.
+
+        :param thesis_id: The ID of the thesis to load.
+        :type thesis_id: int
+        :param user_id: The ID of the user who must own the thesis.
+        :type user_id: int
+        :param include: Optional iterable of section names to load. Defaults to
+            every name in ``WORKSPACE_SECTIONS``.
+        :type include: Iterable[str], optional
+        :return: A dictionary with the thesis and each requested section, or
+            None if the thesis does not exist or belongs to another user.
+        :rtype: dict or None
+        :raises ValueError: If ``include`` names an unknown section.
+        :raises Exception: If an error occurs while loading the workspace.
+        """
+        sections = self._workspace_sections(include)
+
+        try:
+            with Thesis._meta.database.atomic():
+                thesis = (
+                    Thesis.select(
+                        *THESIS_COLUMNS,
+                        # The date part as text, however the engine stores it
+                        fn.SUBSTR(Thesis.due_date, 1, 10)
+                        .coerce(False)
+                        .alias("due_day"),
+                    )
+                    .where((Thesis.id == thesis_id) & (Thesis.student_id == user_id))
+                    .dicts()
+                    .get_or_none()
+                )
+                if thesis is None:
+                    return None
+                due_day = thesis.pop("due_day")
+
+                loaders = {
+                    "cover_page": lambda: self._cover_page_from_row(thesis, due_day),
+                    "abstract": lambda: Abstract.select(Abstract.text)
+                    .where(Abstract.thesis_id == thesis_id)
+                    .scalar(),
+                    "table_of_contents": lambda: self.get_table_of_contents(thesis_id),
+                    "body_pages": lambda: self.get_body_pages(thesis_id),
+                    "chapters": lambda: self.get_chapters_for_thesis(thesis_id),
+                    "references": lambda: self.get_references(thesis_id),
+                    "footnotes": lambda: self.get_footnotes(thesis_id),
+                    "tables": lambda: self.get_tables(thesis_id),
+                    "figures": lambda: self.get_figures(thesis_id),
+                    "appendices": lambda: self.get_appendices(thesis_id),
+                    "front_matter": lambda: self._get_front_matter(thesis_id),
+                }
+                workspace = {"thesis": thesis}
+                for section in sections:
+                    workspace[section] = loaders[section]()
+                return workspace
+        except Exception as e:
+            self.logger.error(f"Error loading workspace for thesis {thesis_id}: {e}")
+            raise
+
+    def get_workspace_etag(self, thesis_id, user_id, include=None):
+        """
+        Returns a validator for the workspace of a thesis without loading it,
+        so a conditional request for an unchanged workspace costs a single
+        primary key lookup. It is derived from the thesis' ``version``, which
+        every write to the thesis or one of its sections increments (see
+        ``touch_thesis``), and from the requested sections. Unlike
+        ``updated_at``, which MySQL stores to the second, it changes with
+        every write.
+
+        :param thesis_id: The ID of the thesis.
+        :type thesis_id: int
+        :param user_id: The ID of the user who must own the thesis.
+        :type user_id: int
+        :param include: Optional iterable of section names, as for
+            ``get_workspace``.
+        :type include: Iterable[str], optional
+        :return: The ETag, or None if the thesis does not exist or belongs to
+            another user.
+        :rtype: str or None
+        :raises ValueError: If ``include`` names an unknown section.
+        """
+        sections = self._workspace_sections(include)
+        row = (
+            Thesis.select(Thesis.version)
+            .where((Thesis.id == thesis_id) & (Thesis.student_id == user_id))
+            .tuples()
+            .first()
+        )
+        if row is None:
+            return None
+        validator = f"{thesis_id}:{row[0]}:{','.join(sections)}"
+        return hashlib.sha1(validator.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def touch_thesis(thesis_id):
+        """
+        Records that a thesis or one of its sections changed by moving its
+        ``updated_at`` forward and incrementing its ``version``, which changes
+        its workspace ETag.
+
+        :param thesis_id: The ID of the thesis.
+        :type thesis_id: int
+        """
+        Thesis.update(
+            updated_at=datetime.now(timezone.utc), version=Thesis.version + 1
+        ).where(Thesis.id == thesis_id).execute()
+
+    def _workspace_sections(self, include):
+        sections = self.WORKSPACE_SECTIONS if include is None else tuple(include)
+        unknown = set(sections) - set(self.WORKSPACE_SECTIONS)
+        if unknown:
+            raise ValueError(
+                f"Unknown workspace sections: {', '.join(sorted(unknown))}"
+            )
+        return sections
+
+    @staticmethod
+    def _cover_page_from_row(thesis, due_day):
+        """
+        Builds the cover page dictionary from an already loaded thesis row and
+        its due date as ``YYYY-MM-DD`` text, matching the shape returned by
+        ``get_cover_page``.
+        """
+        return {
+            "title": thesis["title"],
+            "author": thesis["author"],
+            "affiliation": thesis["affiliation"],
+            "course": thesis["course"],
+            "instructor": thesis["instructor"],
+            "due_date": due_day,
+        }
+
+    @staticmethod
+    def _get_front_matter(thesis_id):
+        """
+        Fetches the content of every front-matter page of a thesis with one
+        UNION ALL query. Pages that have not been written yet map to an empty
+        string, mirroring the individual page endpoints.
+        """
+        query = None
+        for name, model in FRONT_MATTER_PAGES:
+            part = model.select(Value(name).alias("section"), model.content).where(
+                model.thesis == thesis_id
+            )
+            query = part if query is None else query.union_all(part)
+        front_matter = {name: "" for name, _ in FRONT_MATTER_PAGES}
+        for row in query.dicts():
+            front_matter[row["section"]] = row["content"] or ""
+        return front_matter
+
     def get_chapter(self, chapter_id):
         """
         Return a single chapter by ID.
@@ -571,6 +881,7 @@ class ThesisService:
                 content=content or "",
                 order=order,
             )
+            index_section("chapter", chapter.id, chapter.thesis_id, chapter.content)
             return chapter
         except Exception as e:
             raise e
@@ -594,11 +905,14 @@ class ThesisService:
             if "order" in new_data:
                 chapter.order = new_data["order"]
             chapter.save()
+            if "content" in new_data:
+                index_section(
+                    "chapter", chapter.id, chapter.thesis_id, chapter.content
+                )
             return chapter
         except Exception as e:
             raise e
 
-    @staticmethod
     def delete_chapter(self, chapter_id):
         """
         Delete a chapter by ID.
@@ -612,6 +926,7 @@ class ThesisService:
 
         try:
             chapter.delete_instance()
+            remove_section("chapter", chapter_id)
             return True
         except Exception as e:
             raise e
@@ -671,6 +986,8 @@ class ThesisService:
                 status=status,
                 student=student_id,
             )
+            remember_thesis(thesis.id, thesis.student_id)
+            index_section("title", thesis.id, thesis.id, title, thesis.student_id)
 
             # Conditionally create abstract
             if abstract:
@@ -736,10 +1053,15 @@ class ThesisService:
 
             # Perform the update
             updated_data["updated_at"] = datetime.now(timezone.utc)
+            updated_data["version"] = Thesis.version + 1
             query = Thesis.update(**updated_data).where(
                 (Thesis.id == thesis_id) & (Thesis.student_id == user_id)
             )
             updated_rows = query.execute()
+            if updated_rows and "title" in updated_data:
+                index_section(
+                    "title", thesis_id, thesis_id, updated_data["title"], user_id
+                )
 
             if "abstract" in updated_data:
                 self.add_abstract(thesis.id, updated_data.get("abstract"))
@@ -783,6 +1105,7 @@ class ThesisService:
             body_page.page_number = page_number
             body_page.body = body_text
             body_page.save()
+            index_section("body_page", body_page.id, thesis_id, body_page.body)
 
             self.logger.info(f"Body page {page_id} updated successfully.")
             return body_page
@@ -815,6 +1138,8 @@ class ThesisService:
                 return False
 
             thesis.delete_instance()
+            forget_thesis(thesis_id)
+            remove_thesis_sections(thesis_id)
             self.logger.info(f"Thesis {thesis_id} deleted successfully.")
             return True
         except Exception as e:
@@ -847,13 +1172,17 @@ class ThesisService:
                 raise ValueError(f"Thesis with ID {thesis_id} not found.")
 
             reference = Reference.create(thesis=thesis, **reference_data)
+            remember_child("reference", reference.id, thesis.id)
+            index_section(
+                "reference", reference.id, thesis.id, reference_text(reference)
+            )
             self.logger.info(f"Reference added to thesis {thesis_id}: {reference_data}")
             return reference
         except Exception as e:
             self.logger.error(f"Error adding reference to thesis {thesis_id}: {e}")
             raise
 
-    def get_references(self, thesis_id):
+    def get_references(self, thesis_id, fields=None):
         """
         Fetches references for a given thesis from the database.
 
@@ -867,6 +1196,9 @@ class ThesisService:
             need to be fetched.
         :type thesis_id: Any compatible type that matches `thesis_id` requirement in the
             database ORM query
+        :param fields: Optional field names to select; defaults to every
+            column. ``id`` is always included.
+        :type fields: list[str], optional
         :return: A list of dictionaries, each representing a reference associated
             with the given thesis.
         :rtype: List[Dict[str, Any]]
@@ -875,8 +1207,12 @@ class ThesisService:
             from the database.
         """
         try:
-            references = Reference.select().where(Reference.thesis_id == thesis_id)
-            return [model_to_dict(ref) for ref in references]
+            return project(
+                Reference,
+                restrict_columns(REFERENCE_COLUMNS, fields),
+                Reference.thesis_id == thesis_id,
+                order_by=Reference.id,
+            )
         except Exception as e:
             self.logger.error(f"Error fetching references for thesis {thesis_id}: {e}")
             raise
@@ -907,6 +1243,12 @@ class ThesisService:
             query.execute()
 
             updated_reference = Reference.get(Reference.id == reference_id)
+            index_section(
+                "reference",
+                reference_id,
+                updated_reference.thesis_id,
+                reference_text(updated_reference),
+            )
             self.logger.info(f"Reference {reference_id} updated successfully.")
             return updated_reference
         except Exception as e:
@@ -933,6 +1275,8 @@ class ThesisService:
                 raise ValueError(f"Reference with ID {reference_id} not found.")
 
             reference.delete_instance()
+            forget_child("reference", reference_id)
+            remove_section("reference", reference_id)
             self.logger.info(f"Reference {reference_id} deleted successfully.")
             return True
         except Exception as e:
@@ -966,32 +1310,40 @@ class ThesisService:
                 raise ValueError(f"Thesis with ID {thesis_id} not found.")
 
             footnote = Footnote.create(thesis=thesis, **footnote_data)
+            remember_child("footnote", footnote.id, thesis.id)
             self.logger.info(f"Footnote added to thesis {thesis_id}: {footnote_data}")
             return footnote
         except Exception as e:
             self.logger.error(f"Error adding footnote to thesis {thesis_id}: {e}")
             raise
 
-    def get_footnotes(self, thesis_id):
+    def get_footnotes(self, thesis_id, fields=None):
         """
         Fetches all footnotes associated with a given thesis.
 
         This method retrieves footnotes from the database corresponding to a specific
-        thesis ID. Each footnote record is converted to a dictionary using the
-        `model_to_dict` utility before being added to the result list. If an error
+        thesis ID using a single projected query, so each row is returned as a
+        plain dictionary without fetching the related thesis. If an error
         occurs during the retrieval process, an exception is logged, and the same
         exception is raised.
 
         :param thesis_id: ID of the thesis for which footnotes need to be retrieved.
         :type thesis_id: int
+        :param fields: Optional field names to select; defaults to every
+            column. ``id`` is always included.
+        :type fields: list[str], optional
         :return: A list of dictionaries, each representing a footnote record.
         :rtype: list[dict]
         :raises Exception: If there is an error while fetching footnotes from
             the database.
         """
         try:
-            footnotes = Footnote.select().where(Footnote.thesis_id == thesis_id)
-            return [model_to_dict(fn) for fn in footnotes]
+            return project(
+                Footnote,
+                restrict_columns(FOOTNOTE_COLUMNS, fields),
+                Footnote.thesis_id == thesis_id,
+                order_by=Footnote.id,
+            )
         except Exception as e:
             self.logger.error(f"Error fetching footnotes for thesis {thesis_id}: {e}")
             raise
@@ -1047,6 +1399,7 @@ class ThesisService:
                 raise ValueError(f"Footnote with ID {footnote_id} not found.")
 
             footnote.delete_instance()
+            forget_child("footnote", footnote_id)
             self.logger.info(f"Footnote {footnote_id} deleted successfully.")
             return True
         except Exception as e:
@@ -1077,13 +1430,14 @@ class ThesisService:
                 raise ValueError(f"Thesis with ID {thesis_id} not found.")
 
             table = TableEntry.create(thesis=thesis, **table_data)
+            remember_child("table", table.id, thesis.id)
             self.logger.info(f"Table added to thesis {thesis_id}: {table_data}")
             return table
         except Exception as e:
             self.logger.error(f"Error adding table to thesis {thesis_id}: {e}")
             raise
 
-    def get_tables(self, thesis_id):
+    def get_tables(self, thesis_id, fields=None):
         """
         Fetches the tables associated with a given thesis ID from the database and
         returns them in dictionary form. This method queries the `TableEntry` model
@@ -1093,6 +1447,9 @@ class ThesisService:
         :param thesis_id: The unique identifier of the thesis for which tables need
             to be fetched.
         :type thesis_id: int
+        :param fields: Optional field names to select; defaults to every
+            column. ``id`` is always included.
+        :type fields: list[str], optional
         :return: A list of dictionaries where each dictionary represents a table
             associated with the given thesis ID.
         :rtype: list[dict]
@@ -1100,8 +1457,12 @@ class ThesisService:
             database.
         """
         try:
-            tables = TableEntry.select().where(TableEntry.thesis_id == thesis_id)
-            return [model_to_dict(tbl) for tbl in tables]
+            return project(
+                TableEntry,
+                restrict_columns(TABLE_COLUMNS, fields),
+                TableEntry.thesis_id == thesis_id,
+                order_by=TableEntry.id,
+            )
         except Exception as e:
             self.logger.error(f"Error fetching tables for thesis {thesis_id}: {e}")
             raise
@@ -1159,6 +1520,7 @@ class ThesisService:
                 raise ValueError(f"Table with ID {table_id} not found.")
 
             table.delete_instance()
+            forget_child("table", table_id)
             self.logger.info(f"Table {table_id} deleted successfully.")
             return True
         except Exception as e:
@@ -1188,13 +1550,14 @@ class ThesisService:
                 raise ValueError(f"Thesis with ID {thesis_id} not found.")
 
             figure = Figure.create(thesis=thesis, **figure_data)
+            remember_child("figure", figure.id, thesis.id)
             self.logger.info(f"Figure added to thesis {thesis_id}: {figure_data}")
             return figure
         except Exception as e:
             self.logger.error(f"Error adding figure to thesis {thesis_id}: {e}")
             raise
 
-    def get_figures(self, thesis_id):
+    def get_figures(self, thesis_id, fields=None):
         """
         Fetches all figures associated with a specific thesis.
 
@@ -1208,6 +1571,9 @@ class ThesisService:
                           are to be retrieved. Must match a valid `thesis_id`
                           in the database.
         :type thesis_id: int
+        :param fields: Optional field names to select; defaults to every
+            column. ``id`` is always included.
+        :type fields: list[str], optional
         :return: A list of dictionaries where each dictionary represents a
                  figure associated with the given thesis ID.
         :rtype: list[dict]
@@ -1215,8 +1581,12 @@ class ThesisService:
                            or executing the database query.
         """
         try:
-            figures = Figure.select().where(Figure.thesis_id == thesis_id)
-            return [model_to_dict(fig) for fig in figures]
+            return project(
+                Figure,
+                restrict_columns(FIGURE_COLUMNS, fields),
+                Figure.thesis_id == thesis_id,
+                order_by=Figure.id,
+            )
         except Exception as e:
             self.logger.error(f"Error fetching figures for thesis {thesis_id}: {e}")
             raise
@@ -1277,6 +1647,7 @@ class ThesisService:
                 raise ValueError(f"Figure with ID {figure_id} not found.")
 
             figure.delete_instance()
+            forget_child("figure", figure_id)
             self.logger.info(f"Figure {figure_id} deleted successfully.")
             return True
         except Exception as e:
@@ -1305,13 +1676,15 @@ class ThesisService:
                 raise ValueError(f"Thesis with ID {thesis_id} not found.")
 
             appendix = Appendix.create(thesis=thesis, **appendix_data)
+            remember_child("appendix", appendix.id, thesis.id)
+            index_section("appendix", appendix.id, thesis.id, appendix.content)
             self.logger.info(f"Appendix added to thesis {thesis_id}: {appendix_data}")
             return appendix
         except Exception as e:
             self.logger.error(f"Error adding appendix to thesis {thesis_id}: {e}")
             raise
 
-    def get_appendices(self, thesis_id):
+    def get_appendices(self, thesis_id, fields=None):
         """
         Fetches appendices associated with the provided thesis ID.
 
@@ -1321,6 +1694,9 @@ class ThesisService:
 
         :param thesis_id: ID of the thesis for which appendices are to be fetched.
         :type thesis_id: int
+        :param fields: Optional field names to select; defaults to every
+            column. ``id`` is always included.
+        :type fields: list[str], optional
         :return: A list of dictionaries, where each dictionary represents an appendix
             associated with the provided thesis ID.
         :rtype: list[dict]
@@ -1328,8 +1704,12 @@ class ThesisService:
             data processing.
         """
         try:
-            appendices = Appendix.select().where(Appendix.thesis_id == thesis_id)
-            return [model_to_dict(app) for app in appendices]
+            return project(
+                Appendix,
+                restrict_columns(APPENDIX_COLUMNS, fields),
+                Appendix.thesis_id == thesis_id,
+                order_by=Appendix.id,
+            )
         except Exception as e:
             self.logger.error(f"Error fetching appendices for thesis {thesis_id}: {e}")
             raise
@@ -1358,6 +1738,12 @@ class ThesisService:
             query.execute()
 
             updated_appendix = Appendix.get(Appendix.id == appendix_id)
+            index_section(
+                "appendix",
+                appendix_id,
+                updated_appendix.thesis_id,
+                updated_appendix.content,
+            )
             self.logger.info(f"Appendix {appendix_id} updated successfully.")
             return updated_appendix
         except Exception as e:
@@ -1384,6 +1770,8 @@ class ThesisService:
                 raise ValueError(f"Appendix with ID {appendix_id} not found.")
 
             appendix.delete_instance()
+            forget_child("appendix", appendix_id)
+            remove_section("appendix", appendix_id)
             self.logger.info(f"Appendix {appendix_id} deleted successfully.")
             return True
         except Exception as e:
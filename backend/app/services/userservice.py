@@ -1,14 +1,21 @@
 import imghdr
 import os
 import uuid
+from datetime import datetime, timezone
 
 from peewee import DoesNotExist, IntegrityError
 from playhouse.shortcuts import model_to_dict
-from werkzeug.security import check_password_hash, generate_password_hash
 
-from ..models.data import Role, User
+from ..models.data import Posts, Role, User
 from ..utils.auth import generate_token
+from ..utils.cache import get_cache
+from ..utils.db import database_proxy
+from ..utils.deletion import get_deletions
+from ..utils.identity import invalidate_identity
+from ..utils.passwords import hash_password, verify_password
 from ..utils.redis_helper import blacklist_token
+from ..utils.revocation import bump_revocation_epoch
+from ..utils.serializers import ROLE_COLUMNS, USER_COLUMNS, restrict_columns
 
 DEFAULT_ROLE = "Student"
 ADMIN_ROLE = "Admin"
@@ -67,6 +74,16 @@ class UserService:
             self.logger.warning(f"User with ID {user_id} not found.")
         return user
 
+    def _rehash_password(self, user, password):
+        try:
+            User.update(password=hash_password(password)).where(
+                User.id == user.id
+            ).execute()
+            self.logger.info(f"Password hash of user {user.id} upgraded.")
+        except Exception as e:
+            # The login already succeeded; the next one retries the upgrade
+            self.logger.error(f"Failed to rehash password of user {user.id}: {e}")
+
     def _get_role(self, role_name):
         role = Role.get_or_none(Role.name == role_name)
         if not role:
@@ -80,7 +97,10 @@ class UserService:
         checks whether the provided email corresponds to an active user
         in the database and validates the provided password against the
         stored password hash. If authentication is successful, the user's
-        details are returned as a dictionary.
+        details are returned as a dictionary. When the stored hash is a legacy
+        SHA-256 hash or was made with other parameters than the configured
+        ``PASSWORD_HASH_METHOD``, it is replaced with a fresh hash of the
+        password that was just verified.
 
         :param email: The email address of the user to authenticate.
         :type email: str
@@ -96,7 +116,10 @@ class UserService:
             if not user or not user.is_active:
                 return None
 
-            if check_password_hash(user.password, password):
+            matches, needs_rehash = verify_password(user.password, password)
+            if matches:
+                if needs_rehash:
+                    self._rehash_password(user, password)
                 self.logger.info(f"User {user.id} authenticated successfully.")
                 return model_to_dict(user)
 
@@ -164,7 +187,7 @@ class UserService:
                 is_admin = role == ADMIN_ROLE
 
             # Hash the password
-            hashed_password = generate_password_hash(password)
+            hashed_password = hash_password(password)
 
             # Create the user
             user = User.create(
@@ -198,30 +221,49 @@ class UserService:
             self.logger.error(f"Error creating user: {e}")
             raise
 
-    def fetch_user_data(self, user_id):
+    def fetch_user_data(self, user_id, fields=None):
         """
         Fetches user data for a given user ID.
 
-        This method retrieves user information from the database using the user ID.
-        If the user exists, the data is converted into a dictionary format. If the
-        user has a role attribute, the role information is also converted into a
-        dictionary and included in the resulting response. Success and error logging
-        is performed during the process to provide detailed status updates.
+        This method retrieves user information and the user's role from the
+        database with a single joined, projected query. The password hash is
+        never selected. When ``fields`` is given only those columns are read;
+        ``role`` may be listed to include the nested role dictionary. Success
+        and error logging is performed during the process to provide detailed
+        status updates.
 
         :param user_id: The unique identifier of the user to fetch data for.
         :type user_id: int
+        :param fields: Optional field names to select; defaults to every
+            column plus ``role``. ``id`` is always included.
+        :type fields: list[str], optional
         :return: A dictionary containing user data if the user exists or None if no
             user is found or an error occurs.
         :rtype: dict | None
+        :raises ValueError: If ``fields`` names an unknown column.
         """
+        include_role = not fields or "role" in fields
+        user_fields = None
+        if fields:
+            user_fields = [name for name in fields if name != "role"] or ["id"]
+        columns = restrict_columns(USER_COLUMNS, user_fields)
+
         try:
-            user = self._get_user_by_id(user_id)
-            if not user:
+            query = User.select(*columns)
+            if include_role:
+                query = query.select_extend(*ROLE_COLUMNS).join(
+                    Role, on=(User.role == Role.id)
+                )
+            user_data = query.where(User.id == user_id).dicts().get_or_none()
+            if not user_data:
+                self.logger.warning(f"User with ID {user_id} not found.")
                 return None
 
-            user_data = model_to_dict(user)
-            if "role" in user_data:
-                user_data["role"] = model_to_dict(user.role)
+            if include_role:
+                user_data["role"] = {
+                    "id": user_data.pop("role_id"),
+                    "name": user_data.pop("role_name"),
+                }
 
             self.logger.info(f"User {user_id} data fetched successfully.")
             return user_data
@@ -233,7 +275,8 @@ class UserService:
         """
         Updates a user's information in the database based on the given user ID and
         update dictionary. Logs the operation status and handles any exceptions
-        that may occur during the update process.
+        that may occur during the update process. The user's cached identity is
+        invalidated once the row has changed.
 
         :param user_id: The ID of the user to be updated.
         :type user_id: int
@@ -250,6 +293,7 @@ class UserService:
         try:
             updated_rows = User.update(**updates).where(User.id == user_id).execute()
             if updated_rows > 0:
+                invalidate_identity(user_id)
                 self.logger.info(f"User {user_id} updated successfully.")
                 return True
 
@@ -305,8 +349,9 @@ class UserService:
         """
         Changes the activation status of a user in the system. This method modifies the
         activation state of a user based on the provided `user_id` and `is_active` parameters.
-        Additionally, if a `token` is supplied, it invalidates the token if the user is being
-        deactivated.
+        Deactivating a user revokes every token issued to them by advancing their
+        revocation epoch; if a `token` is supplied, it is also blacklisted. The
+        status of a deleted user, whose data is being purged, cannot be changed.
 
         :param user_id: The unique identifier of the user whose activation status is
                         to be changed.
@@ -314,12 +359,13 @@ class UserService:
         :param is_active: A boolean indicating the desired activation state of the user.
                           `True` to activate the user or `False` to deactivate the user.
         :type is_active: bool
-        :param token: Optional. The JWT token associated with the user to be invalidated
-                      when the user is being deactivated. Expected to be None if no token
-                      is to be invalidated.
+        :param token: Optional. The ID (``jti``) of the JWT token associated with the user
+                      to be invalidated when the user is being deactivated. Expected to be
+                      None if no token is to be invalidated.
         :type token: str, optional
         :return: Returns `True` if the user's activation status is successfully changed;
-                 returns `False` if the user's status was already in the desired state.
+                 returns `False` if the user's status was already in the desired state
+                 or the user has been deleted.
         :rtype: bool
         :raises: 404 if the user with the provided `user_id` is not found,
                  500 in case of unexpected errors during execution.
@@ -342,14 +388,23 @@ class UserService:
                 self.logger.info(f"User {user_id} is already {status}.")
                 return False
 
-            # Update and save the user's status
-            user.is_active = is_active
-            user.save()
+            # Update the user's status unless they were deleted, even meanwhile
+            updated = (
+                User.update(is_active=is_active)
+                .where((User.id == user_id) & User.deleted_at.is_null())
+                .execute()
+            )
+            if not updated:
+                self.logger.warning(f"User {user_id} is deleted; status unchanged.")
+                return False
+            invalidate_identity(user_id)
 
-            # Invalidate the token if provided and the user is deactivated
-            if token and not is_active:
-                blacklist_token(token)
-                self.logger.info(f"JWT token invalidated for user {user_id}.")
+            # Revoke the user's tokens when they are deactivated
+            if not is_active:
+                bump_revocation_epoch(user_id)
+                if token:
+                    blacklist_token(token)
+                    self.logger.info(f"JWT token invalidated for user {user_id}.")
 
             # Log a success message
             action = "activated" if is_active else "deactivated"
@@ -363,6 +418,46 @@ class UserService:
 
             abort(500, description="Internal server error.")
 
+    def delete_user(self, user_id):
+        """
+        Deletes a user. The user is marked deleted and deactivated, their posts
+        are hidden and the purge of their data is scheduled, all in one
+        transaction; every token issued to them is revoked. The deletion
+        engine then removes their comments, posts, theses and remaining rows
+        in the background, so the request does not wait for them.
+
+        :param user_id: The ID of the user to delete.
+        :type user_id: int
+        :return: The progress of the purge, or None if the user does not exist
+            or the deletion failed.
+        :rtype: dict | None
+        """
+        from ..services.forumservice import ForumService
+
+        try:
+            now = datetime.now(timezone.utc)
+            with database_proxy.atomic():
+                user = self._get_user_by_id(user_id)
+                if not user:
+                    return None
+                if user.deleted_at is None:
+                    User.update(is_active=False, deleted_at=now).where(
+                        User.id == user_id
+                    ).execute()
+                    Posts.update(deleted_at=now).where(
+                        (Posts.user == user_id) & Posts.deleted_at.is_null()
+                    ).execute()
+                job = get_deletions().schedule("user", user_id)
+
+            invalidate_identity(user_id)
+            bump_revocation_epoch(user_id)
+            get_cache("forum").bump(ForumService.LISTINGS_NAMESPACE)
+            self.logger.info(f"User {user_id} deleted; purge {job.id} scheduled.")
+            return get_deletions().progress(job.id)
+        except Exception as e:
+            self.logger.error(f"Error deleting user {user_id}: {e}")
+            return None
+
     def logout(self, user_id, token):
         """
         Logs out a user by invalidating their JWT token.
@@ -377,7 +472,7 @@ class UserService:
 
         :param user_id: Unique identifier of the user.
         :type user_id: int
-        :param token: JWT token to be invalidated.
+        :param token: ID (``jti``) of the JWT token to be invalidated.
         :type token: str
         :return: True if the user was logged out successfully.
         :rtype: bool
@@ -391,6 +486,7 @@ class UserService:
                 abort(404, description="User not found.")
 
             blacklist_token(token)
+            bump_revocation_epoch(user_id)
             self.logger.info(
                 f"User {user_id} logged out successfully, JWT token invalidated."
             )
@@ -1,7 +1,7 @@
 import inspect
 import os
 import sys
-from datetime import datetime, timedelta, timezone
+from datetime import datetime, timezone
 
 import fakeredis
 import pytest
@@ -33,6 +33,8 @@ def app():
             )
         ]
         database_proxy.create_tables(database_models, safe=True)
+        app.extensions["forum_search"].create()
+        app.extensions["thesis_search"].create()
 
         yield app
         # Dynamically retrieve all models from data.py
@@ -53,6 +55,8 @@ def app():
         ]
         if tables_to_drop:
             database_proxy.drop_tables(tables_to_drop, safe=True)
+        app.extensions["forum_search"].drop()
+        app.extensions["thesis_search"].drop()
         database_proxy.close()
 
 
@@ -71,47 +75,35 @@ def mock_redis(monkeypatch):
     def mock_get_redis_client():
         return redis_mock
 
-    def mock_blacklist_token(token, ttl=3600):
-        redis_mock.setex(f"blacklist:{token}", ttl, "true")
+    def now():
+        return datetime.now(timezone.utc).timestamp()
 
-    def mock_is_token_blacklisted(token):
-        return redis_mock.exists(f"blacklist:{token}") > 0
+    def mock_blacklist_token(jti, ttl=3600):
+        redis_mock.zadd("revoked_tokens", {jti: now() + ttl})
 
-    def mock_add_token_to_user(user_id, token, expiry_seconds):
+    def mock_is_token_blacklisted(jti):
+        expiry = redis_mock.zscore("revoked_tokens", jti)
+        return expiry is not None and expiry > now()
+
+    def mock_add_token_to_user(user_id, jti, expiry_seconds):
         token_key = f"user:{user_id}:tokens"
-        expiry_time = (
-            datetime.now(timezone.utc) + timedelta(seconds=expiry_seconds)
-        ).timestamp()
-        redis_mock.hset(token_key, token, str(expiry_time))
+        redis_mock.zadd(token_key, {jti: now() + expiry_seconds})
         redis_mock.expire(token_key, expiry_seconds)
 
     def mock_get_user_tokens(user_id):
         token_key = f"user:{user_id}:tokens"
-        return redis_mock.hgetall(token_key)
+        return dict(redis_mock.zrangebyscore(token_key, now(), "+inf", withscores=True))
 
     def mock_revoke_user_tokens(user_id):
         """
         Mock revoking all tokens for a user by blacklisting them.
         """
-        token_key = f"user:{user_id}:tokens"
-        tokens = redis_mock.hkeys(token_key)
-
-        for token in tokens:
-            # Decode token and expiry values (if needed)
-            token_str = token if isinstance(token, str) else token.decode("utf-8")
-            expiry = redis_mock.hget(token_key, token_str)
-            expiry = (
-                float(expiry)
-                if isinstance(expiry, str)
-                else float(expiry.decode("utf-8"))
-            )
-
-            # Calculate remaining TTL
-            remaining_ttl = max(0, int(expiry - datetime.now(timezone.utc).timestamp()))
-            redis_mock.setex(f"blacklist:{token_str}", remaining_ttl, "true")
+        tokens = mock_get_user_tokens(user_id)
+        if tokens:
+            redis_mock.zadd("revoked_tokens", tokens)
 
         # Delete user's token list
-        redis_mock.delete(token_key)
+        redis_mock.delete(f"user:{user_id}:tokens")
 
     def mock_is_token_expired(token):
         """
@@ -129,6 +121,9 @@ def mock_redis(monkeypatch):
     monkeypatch.setattr(
         "app.utils.redis_helper.get_redis_client", mock_get_redis_client
     )
+    monkeypatch.setattr(
+        "app.utils.redis_helper.get_redis_bulk_client", mock_get_redis_client
+    )
     monkeypatch.setattr("app.utils.redis_helper.blacklist_token", mock_blacklist_token)
     monkeypatch.setattr(
         "app.utils.redis_helper.is_token_blacklisted", mock_is_token_blacklisted
@@ -197,3 +192,24 @@ def user_token(client, create_role):
     token = login_response.json["token"]
     assert token is not None
     return token
+
+
+@pytest.fixture
+def query_counter(app, monkeypatch):
+    """
+    Count the SQL statements issued against the test database.
+
+    Reset ``counter["count"]`` before the block under test and read it after;
+    ``counter["statements"]`` keeps the SQL text of every statement.
+    """
+    counter = {"count": 0, "statements": []}
+    database = database_proxy.obj
+    execute_sql = database.execute_sql
+
+    def counting_execute_sql(sql, params=None, *args, **kwargs):
+        counter["count"] += 1
+        counter["statements"].append(sql)
+        return execute_sql(sql, params, *args, **kwargs)
+
+    monkeypatch.setattr(database, "execute_sql", counting_execute_sql)
+    return counter
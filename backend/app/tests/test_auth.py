@@ -1,4 +1,7 @@
+from unittest.mock import MagicMock
+
 import pytest
+
 from app.models.data import Role, User
 
 
@@ -161,11 +164,14 @@ def test_signout_blacklists_token(client, login_user, mock_redis):
     """
     Test that signing out blacklists the user's token.
     """
+    import jwt
+
     token = login_user
+    jti = jwt.decode(token, options={"verify_signature": False})["jti"]
 
     # Ensure the token is not blacklisted initially
     redis_client = mock_redis
-    assert redis_client.exists(f"blacklist:{token}") == 0
+    assert redis_client.zscore("revoked_tokens", jti) is None
 
     # Sign out the user
     response = client.post(
@@ -176,7 +182,86 @@ def test_signout_blacklists_token(client, login_user, mock_redis):
     assert response.json["success"] is True
 
     # Ensure the token is now blacklisted
-    assert redis_client.exists(f"blacklist:{token}") == 1
+    assert redis_client.zscore("revoked_tokens", jti) is not None
+
+
+def test_tokens_without_an_id_are_rejected(client, login_user):
+    """
+    Tokens without a ``jti`` cannot be blacklisted on signout, so they are not
+    accepted at all.
+    """
+    import jwt
+
+    payload = jwt.decode(login_user, options={"verify_signature": False})
+    del payload["jti"]
+    token = jwt.encode(
+        payload, client.application.config["SECRET_KEY"], algorithm="HS256"
+    )
+
+    response = client.get(
+        "/api/user/notifications", headers={"Authorization": f"Bearer {token}"}
+    )
+    assert response.status_code == 401
+    assert response.json["message"] == "Invalid token"
+
+
+def test_signout_revokes_every_session(client, login_user):
+    """
+    Signing out advances the user's revocation epoch, so tokens from other
+    sessions stop working too.
+    """
+    other_session = client.post(
+        "/api/auth/signin",
+        json={"email": "test@example.com", "password": "password123"},
+    ).json["token"]
+
+    response = client.post(
+        "/api/auth/signout", headers={"Authorization": f"Bearer {login_user}"}
+    )
+    assert response.status_code == 200
+
+    response = client.get(
+        "/api/user/profile", headers={"Authorization": f"Bearer {other_session}"}
+    )
+    assert response.status_code == 401
+    assert response.json["message"] == "Token has been revoked"
+
+    # A token issued after the sign out is accepted
+    new_token = client.post(
+        "/api/auth/signin",
+        json={"email": "test@example.com", "password": "password123"},
+    ).json["token"]
+    response = client.get(
+        "/api/user/profile", headers={"Authorization": f"Bearer {new_token}"}
+    )
+    assert response.status_code == 200
+
+
+def test_revocation_check_is_served_from_memory(client, login_user, mock_redis):
+    """
+    Repeated authenticated requests read the revocation epoch from the local
+    cache instead of Redis.
+    """
+    import jwt
+
+    payload = jwt.decode(login_user, options={"verify_signature": False})
+    assert payload["jti"]
+    assert payload["rev"] == 0
+
+    reads = []
+    original_get = mock_redis.get
+
+    def counting_get(key):
+        reads.append(key)
+        return original_get(key)
+
+    mock_redis.get = counting_get
+    for _ in range(3):
+        response = client.get(
+            "/api/user/profile", headers={"Authorization": f"Bearer {login_user}"}
+        )
+        assert response.status_code == 200
+    assert reads == []
 
 
 def test_activate_user(client, login_admin_user, register_user):
@@ -207,3 +292,136 @@ def test_activate_user(client, login_admin_user, register_user):
     # Verify the user's account is now active
     target_user.refresh_from_db()
     assert target_user.is_active is True
+
+
+def test_token_stats_reports_registry_size(client, login_admin_user, login_user):
+    """
+    Admins can see how many tokens the registry and blacklist hold.
+    """
+    response = client.get(
+        "/api/user/token-stats",
+        headers={"Authorization": f"Bearer {login_user}"},
+    )
+    assert response.status_code == 403
+
+    client.post("/api/auth/signout", headers={"Authorization": f"Bearer {login_user}"})
+    response = client.get(
+        "/api/user/token-stats",
+        headers={"Authorization": f"Bearer {login_admin_user}"},
+    )
+    assert response.status_code == 200
+    stats = response.json["stats"]
+    assert stats["user_registries"] == 2
+    assert stats["registered_tokens"] == 2
+    assert stats["revoked_tokens"] == 1
+
+
+def test_admin_checks_use_cached_identity(
+    client, login_admin_user, login_user, query_counter
+):
+    """
+    Admin checks read the cached identity record instead of the database, and
+    a role change takes effect on the next request.
+    """
+    from app.services.userservice import UserService
+
+    admin_headers = {"Authorization": f"Bearer {login_admin_user}"}
+    assert client.get("/api/user/token-stats", headers=admin_headers).status_code == 200
+
+    query_counter["count"] = 0
+    assert client.get("/api/user/token-stats", headers=admin_headers).status_code == 200
+    assert query_counter["count"] == 0
+
+    user_headers = {"Authorization": f"Bearer {login_user}"}
+    assert client.get("/api/user/token-stats", headers=user_headers).status_code == 403
+
+    user = User.get(User.email == "test@example.com")
+    UserService(client.application.logger).update_user(user.id, {"is_admin": True})
+    assert client.get("/api/user/token-stats", headers=user_headers).status_code == 200
+
+
+def test_delete_user_hides_them_then_purges_their_data(
+    client, login_admin_user, login_user
+):
+    """
+    Deleting a user revokes their tokens and hides their posts at once; their
+    rows are purged in the background, including their replies elsewhere.
+    """
+    from app.models.data import (
+        Abstract,
+        BodyPage,
+        PostComment,
+        Posts,
+        SessionLog,
+        Thesis,
+    )
+    from app.services.forumservice import ForumService
+    from app.utils.deletion import get_deletions
+
+    user = User.get(User.email == "test@example.com")
+    admin = User.get(User.email == "admin@example.com")
+    response = client.post(
+        "/api/thesis/new",
+        json={
+            "title": "Thesis",
+            "status": "Draft",
+            "abstract": "Abstract",
+            "body_pages": [{"page_number": n, "body": "Page"} for n in range(3)],
+        },
+        headers={"Authorization": f"Bearer {login_user}"},
+    )
+    assert response.status_code == 201
+    service = ForumService(MagicMock())
+    own_post = service.create_post(user.id, {"title": "Mine", "content": "x"})["id"]
+    service.add_comment_to_post(admin.id, own_post, {"content": "Nice"})
+    admin_post = service.create_post(admin.id, {"title": "Theirs", "content": "y"})[
+        "id"
+    ]
+    reply = service.add_comment_to_post(user.id, admin_post, {"content": "Hi"})
+    service.add_comment_to_post(
+        admin.id, admin_post, {"content": "Hello", "parent_id": reply["id"]}
+    )
+    service.add_comment_to_post(admin.id, admin_post, {"content": "Bump"})
+
+    response = client.delete(
+        f"/api/user/{user.id}", headers={"Authorization": f"Bearer {login_admin_user}"}
+    )
+    assert response.status_code == 202
+    deletion_id = response.json["deletion"]["id"]
+    assert response.json["deletion"]["status"] == "pending"
+    assert (
+        client.get(
+            "/api/user/profile", headers={"Authorization": f"Bearer {login_user}"}
+        ).status_code
+        == 401
+    )
+    listing = client.get("/api/forum/posts").json["results"]
+    assert [post["id"] for post in listing] == [admin_post]
+
+    # A user being purged cannot be reactivated
+    response = client.put(
+        f"/api/user/activate/{user.id}",
+        headers={"Authorization": f"Bearer {login_admin_user}"},
+    )
+    assert response.status_code == 400
+    assert User.get_by_id(user.id).is_active is False
+
+    deletions = get_deletions()
+    deletions.chunk_size = 2
+    assert deletions.run_pending() == 1
+    response = client.get(
+        f"/api/user/deletions/{deletion_id}",
+        headers={"Authorization": f"Bearer {login_admin_user}"},
+    )
+    assert response.status_code == 200
+    assert response.json["deletion"]["status"] == "done"
+    assert response.json["deletion"]["step"] == "user"
+
+    assert not User.get_or_none(User.id == user.id)
+    assert not Thesis.select().where(Thesis.student == user.id).exists()
+    assert not Abstract.select().exists() and not BodyPage.select().exists()
+    assert not SessionLog.select().where(SessionLog.user == user.id).exists()
+    assert not Posts.get_or_none(Posts.id == own_post)
+    remaining = PostComment.select().where(PostComment.post == admin_post)
+    assert [comment.content for comment in remaining] == ["Bump"]
+    assert Posts.get_by_id(admin_post).comment_count == 1
@@ -0,0 +1,222 @@
+import pytest
+
+
+@pytest.fixture
+def auth_headers(user_token):
+    """
+    Authorization headers for the registered test user.
+    """
+    return {"Authorization": f"Bearer {user_token}"}
+
+
+@pytest.fixture
+def thesis_id(client, auth_headers):
+    """
+    Fixture to create a thesis owned by the test user.
+    """
+    response = client.post(
+        "/api/thesis/new",
+        json={"title": "Batch Thesis", "status": "Draft"},
+        headers=auth_headers,
+    )
+    assert response.status_code == 201
+    return response.json["id"]
+
+
+def test_batch_returns_results_in_order(client, auth_headers, thesis_id):
+    """
+    Sub-requests are dispatched in order and their responses returned as-is.
+    """
+    response = client.post(
+        "/api/batch",
+        json={
+            "requests": [
+                {"method": "GET", "path": "/api/user/profile"},
+                {
+                    "method": "POST",
+                    "path": f"/api/thesis/{thesis_id}/footnotes",
+                    "body": {"content": "Batched footnote"},
+                },
+                {"method": "GET", "path": f"/api/thesis/{thesis_id}/footnotes"},
+                {"method": "GET", "path": "/api/thesis/999"},
+            ]
+        },
+        headers=auth_headers,
+    )
+    assert response.status_code == 200
+    results = response.json["results"]
+    assert [result["status"] for result in results] == [200, 201, 200, 404]
+    assert results[2]["body"]["footnotes"][0]["content"] == "Batched footnote"
+    assert response.json["rolled_back"] is False
+
+
+def test_batch_validates_token_once(client, auth_headers, monkeypatch):
+    """
+    The token is decoded for the batch only, not for each sub-request.
+    """
+    from app.utils import auth
+
+    calls = []
+    original = auth.jwt.decode
+
+    def counting_decode(token, *args, **kwargs):
+        calls.append(token)
+        return original(token, *args, **kwargs)
+
+    monkeypatch.setattr(auth.jwt, "decode", counting_decode)
+    response = client.post(
+        "/api/batch",
+        json={"requests": [{"path": "/api/thesis/theses"}] * 3},
+        headers=auth_headers,
+    )
+    assert [result["status"] for result in response.json["results"]] == [200] * 3
+    assert len(calls) == 1
+
+
+def test_batch_atomic_rolls_back_on_failure(client, auth_headers, thesis_id):
+    """
+    With ``atomic`` set, a failing sub-request undoes the earlier writes.
+    """
+    response = client.post(
+        "/api/batch",
+        json={
+            "atomic": True,
+            "requests": [
+                {
+                    "method": "POST",
+                    "path": f"/api/thesis/{thesis_id}/footnotes",
+                    "body": {"content": "Rolled back"},
+                },
+                {"method": "DELETE", "path": "/api/thesis/footnote/999"},
+            ],
+        },
+        headers=auth_headers,
+    )
+    assert response.status_code == 200
+    assert response.json["rolled_back"] is True
+
+    footnotes = client.get(f"/api/thesis/{thesis_id}/footnotes", headers=auth_headers)
+    assert footnotes.json["footnotes"] == []
+
+
+def test_batch_side_effects_wait_for_commit(client, auth_headers, mock_redis):
+    """
+    Events, notifications, ranking and cache updates of a batch happen only
+    once it commits, so a rolled back batch leaves none behind.
+    """
+    response = client.post(
+        "/api/forum/posts/new",
+        json={"title": "Batched", "content": "Post"},
+        headers=auth_headers,
+    )
+    post_id = response.json["id"]
+    events = mock_redis.xlen("forum:events")
+    hot = mock_redis.zrange("forum:hot", 0, -1, withscores=True)
+
+    comment = {
+        "method": "POST",
+        "path": f"/api/forum/posts/{post_id}/comments",
+        "body": {"content": "Batched comment"},
+    }
+    response = client.post(
+        "/api/batch",
+        json={
+            "atomic": True,
+            "requests": [
+                {
+                    "method": "POST",
+                    "path": "/api/thesis/new",
+                    "body": {"title": "Rolled back", "status": "Draft"},
+                },
+                comment,
+                {"method": "DELETE", "path": "/api/thesis/footnote/999"},
+            ],
+        },
+        headers=auth_headers,
+    )
+    assert response.json["rolled_back"] is True
+    thesis_id = response.json["results"][0]["body"]["id"]
+    assert mock_redis.exists(f"thesis:{thesis_id}:owner") == 0
+    assert mock_redis.xlen("forum:events") == events
+    assert mock_redis.llen("notifications:queue") == 0
+    assert mock_redis.zrange("forum:hot", 0, -1, withscores=True) == hot
+
+    response = client.post(
+        "/api/batch", json={"requests": [comment]}, headers=auth_headers
+    )
+    assert response.json["results"][0]["status"] == 201
+    assert mock_redis.xlen("forum:events") == events + 1
+    assert mock_redis.llen("notifications:queue") == 1
+
+
+def test_batch_rejects_streamed_responses(client, auth_headers):
+    """
+    Streams such as the forum events never end, so they are closed unread
+    and reported as failed items instead of holding the batch open.
+    """
+    response = client.post(
+        "/api/batch",
+        json={
+            "requests": [
+                {"method": "GET", "path": "/api/forum/events"},
+                {"method": "GET", "path": "/api/user/profile"},
+            ]
+        },
+        headers=auth_headers,
+    )
+    assert response.status_code == 200
+    results = response.json["results"]
+    assert [result["status"] for result in results] == [400, 200]
+    assert results[0]["body"]["message"] == "Streaming responses cannot be batched"
+    assert client.application.extensions["forum_events"]._connections == set()
+
+
+@pytest.mark.parametrize(
+    "payload",
+    [
+        {},
+        {"requests": []},
+        {"requests": [{"path": "/not-api"}]},
+        {"requests": [{"method": "PATCH", "path": "/api/thesis/theses"}]},
+        {"requests": [{"path": "/api/batch"}]},
+        {"requests": [{"path": "/api/thesis/theses"}] * 21},
+    ],
+)
+def test_batch_rejects_invalid_payloads(client, auth_headers, payload):
+    """
+    Malformed, oversized or nested batches are rejected with 400.
+    """
+    response = client.post("/api/batch", json=payload, headers=auth_headers)
+    assert response.status_code == 400
+    assert response.json["success"] is False
+
+
+def test_batch_requires_auth(client):
+    """
+    The batch endpoint itself requires a bearer token.
+    """
+    response = client.post("/api/batch", json={"requests": [{"path": "/api/x"}]})
+    assert response.status_code == 401
+
+
+def test_batch_sub_requests_count_against_rate_limits(
+    app, client, auth_headers, thesis_id
+):
+    """
+    Every write in a batch counts against the caller's per-IP write limit.
+    """
+    app.config["RATELIMITS"] = {"write": {"window": 60, "limits": {"ip": 3}}}
+    footnote = {
+        "method": "POST",
+        "path": f"/api/thesis/{thesis_id}/footnotes",
+        "body": {"content": "Limited"},
+    }
+    response = client.post(
+        "/api/batch",
+        json={"requests": [footnote] * 3},
+        headers=auth_headers,
+        environ_base={"REMOTE_ADDR": "10.1.2.3"},
+    )
+    # The batch itself is the first write
+    statuses = [result["status"] for result in response.json["results"]]
+    assert statuses == [201, 201, 429]
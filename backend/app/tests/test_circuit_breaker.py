@@ -0,0 +1,74 @@
+import pytest
+import redis
+
+from app.utils.circuit_breaker import CircuitBreaker, CircuitOpenError
+
+
+def failing(*args, **kwargs):
+    raise redis.ConnectionError("Connection refused")
+
+
+def test_breaker_opens_and_recovers(monkeypatch):
+    """
+    The breaker rejects calls once the threshold is reached and closes again
+    after a successful trial call.
+    """
+    clock = [100.0]
+    monkeypatch.setattr("app.utils.circuit_breaker.time.monotonic", lambda: clock[0])
+    breaker = CircuitBreaker(
+        "redis", failure_threshold=2, reset_timeout=5, exceptions=(redis.RedisError,)
+    )
+
+    for _ in range(2):
+        with pytest.raises(redis.ConnectionError):
+            breaker.call(failing)
+    assert breaker.state == CircuitBreaker.OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.call(lambda: "ok")
+
+    clock[0] += 5
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert breaker.call(lambda: "ok") == "ok"
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.snapshot()["total_rejected"] == 1
+
+
+def test_auth_serves_cached_epoch_while_redis_is_down(
+    app, client, user_token, mock_redis, monkeypatch
+):
+    """
+    Under the serve_stale policy a known user keeps authenticating from the
+    local revocation cache; under fail_closed the request is refused.
+    """
+    headers = {"Authorization": f"Bearer {user_token}"}
+    assert client.get("/api/user/profile", headers=headers).status_code == 200
+
+    # Expire the cached epoch so the next request has to ask Redis
+    monkeypatch.setattr(app.extensions["revocation_cache"], "ttl", 0)
+    monkeypatch.setattr(mock_redis, "get", failing)
+    response = client.get("/api/user/profile", headers=headers)
+    assert response.status_code == 200
+
+    app.config["REDIS_DEGRADED_POLICY"] = "fail_closed"
+    response = client.get("/api/user/profile", headers=headers)
+    assert response.status_code == 503
+
+
+def test_ready_reports_degraded_state(app, client, mock_redis, monkeypatch):
+    """
+    A Redis failure makes the service degraded rather than unready while stale
+    state may be served, and the breaker state shows up in the metrics.
+    """
+    monkeypatch.setattr(mock_redis, "ping", failing)
+
+    response = client.get("/api/status/ready")
+    assert response.status_code == 200
+    assert response.json["status"] == "degraded"
+
+    metrics = client.get("/api/status/metrics").json["redis"]
+    assert metrics["breaker"]["total_failures"] == 1
+    assert metrics["serving_stale"] is True
+
+    app.config["REDIS_DEGRADED_POLICY"] = "fail_closed"
+    response = client.get("/api/status/ready")
+    assert response.status_code == 503
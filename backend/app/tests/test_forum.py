@@ -1,9 +1,13 @@
-from unittest.mock import MagicMock
+import json
+from datetime import datetime
+from unittest.mock import MagicMock, patch
 
 import pytest
-from app.services.forumservice import ForumService
 from peewee import PeeweeException
 
+from app.services.forumservice import ForumService
+from app.utils.cache import get_cache
+
 # Constants for test
 POST_ID = 1
 COMMENT_ID = 1
@@ -289,3 +293,592 @@ def test_delete_all_comments_failure(mock_forum_service):
     mock_forum_service.delete_all_comments.assert_called_once_with(
         post_id=INVALID_POST_ID
     )
+
+
+def test_list_posts_returns_previews(client, user_token):
+    """Post listings carry a truncated preview instead of the full body."""
+    from app.models.data import User
+    from app.utils.serializers import PREVIEW_LENGTH
+
+    user = User.get(User.email == "test@example.com")
+    service = ForumService(MagicMock())
+    service.create_post(user.id, {"title": "Older", "content": "x" * 1000})
+    service.create_post(user.id, {"title": "Newer", "content": "short"})
+
+    response = client.get("/api/forum/posts?order_by=id.desc")
+    assert response.status_code == 200
+    results = response.json["results"]
+    assert [post["title"] for post in results] == ["Newer", "Older"]
+    assert "content" not in results[0]
+    assert "description" not in results[0]
+    assert len(results[1]["preview"]) == PREVIEW_LENGTH
+
+
+def test_forum_reads_are_cached_until_a_write(client, user_token, query_counter):
+    """Repeated listing and detail reads skip the database until a write."""
+    from app.models.data import User
+
+    user = User.get(User.email == "test@example.com")
+    service = ForumService(MagicMock())
+    post_id = service.create_post(user.id, {"title": "Cached", "content": "body"})["id"]
+    first_listing = client.get("/api/forum/posts").json
+    first_detail = client.get(f"/api/forum/posts/{post_id}").json
+
+    query_counter["count"] = 0
+    assert client.get("/api/forum/posts").json == first_listing
+    assert client.get(f"/api/forum/posts/{post_id}").json == first_detail
+    assert query_counter["count"] == 0
+
+    # Comments change the counts and activity times shown in listings
+    early = service.add_comment_to_post(user.id, post_id, {"content": "Early"})
+    assert client.get("/api/forum/posts").json["results"][0]["comment_count"] == 1
+    service.delete_comment(post_id, early["id"], user.id)
+    assert client.get("/api/forum/posts").json["results"][0]["comment_count"] == 0
+    service.add_comment_to_post(user.id, post_id, {"content": "Gone"})
+    service.delete_all_comments(post_id)
+    assert client.get("/api/forum/posts").json["results"][0]["comment_count"] == 0
+
+    service.update_post(post_id, {"title": "Renamed"}, user.id)
+    service.add_comment_to_post(user.id, post_id, {"content": "First!"})
+    listing = client.get("/api/forum/posts").json
+    detail = client.get(f"/api/forum/posts/{post_id}").json
+    assert listing["results"][0]["title"] == "Renamed"
+    assert detail["post"]["title"] == "Renamed"
+    assert [c["content"] for c in detail["comments"]["results"]] == ["First!"]
+
+
+def test_forum_cache_loads_a_missing_key_once(app):
+    """Concurrent misses on one key run the loader a single time."""
+    import threading
+    import time
+
+    cache = get_cache("forum")
+    calls = []
+
+    def loader():
+        calls.append(1)
+        time.sleep(0.1)
+        return {"created_at": datetime(2024, 1, 1, 12, 0)}
+
+    results = []
+
+    def read():
+        with app.app_context():
+            results.append(cache.get_or_load("posts", "p1", loader))
+
+    threads = [threading.Thread(target=read) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert results == [{"created_at": datetime(2024, 1, 1, 12, 0)}] * 5
+
+
+def test_list_posts_is_one_query_with_counts_and_authors(
+    client, user_token, query_counter
+):
+    """A listing page joins authors and reads stored comment counts."""
+    from app.models.data import Posts, User
+
+    user = User.get(User.email == "test@example.com")
+    service = ForumService(MagicMock())
+    post_ids = [
+        service.create_post(user.id, {"title": f"Post {i}", "content": "body"})["id"]
+        for i in range(3)
+    ]
+    service.add_comment_to_post(user.id, post_ids[0], {"content": "One"})
+    comment = service.add_comment_to_post(user.id, post_ids[0], {"content": "Two"})
+    service.add_comment_to_post(user.id, post_ids[1], {"content": "Three"})
+    assert service.delete_comment(post_ids[0], comment["id"], user.id)
+
+    query_counter["count"] = 0
+    response = client.get("/api/forum/posts?order_by=id.asc")
+    assert response.status_code == 200
+    assert query_counter["count"] == 1
+    assert response.json["total"] == 3
+    results = response.json["results"]
+    assert [post["comment_count"] for post in results] == [1, 1, 0]
+    assert all(post["username"] == user.username for post in results)
+    assert all(post["last_activity_at"] for post in results)
+
+    service.delete_all_comments(post_ids[1])
+    assert Posts.get_by_id(post_ids[1]).comment_count == 0
+
+
+def test_search_ranks_highlights_and_follows_writes(client, user_token):
+    """Search finds posts and comments, and the index follows forum writes."""
+    from app.models.data import User
+
+    user = User.get(User.email == "test@example.com")
+    service = ForumService(MagicMock())
+    citing = service.create_post(
+        user.id, {"title": "Citing <sources>", "content": "How to cite a thesis."}
+    )["id"]
+    other = service.create_post(
+        user.id, {"title": "Formatting", "content": "Margins and fonts."}
+    )["id"]
+    comment = service.add_comment_to_post(
+        user.id, other, {"content": "You should cite the style guide."}
+    )
+
+    response = client.get("/api/forum/search?q=cite")
+    assert response.status_code == 200
+    results = response.json["results"]
+    assert {(r["kind"], r["post_id"]) for r in results} == {
+        ("post", citing),
+        ("comment", other),
+    }
+    assert all("<mark>cite</mark>" in r["snippet"] for r in results)
+    assert response.json["next_cursor"] is None
+
+    response = client.get("/api/forum/search?q=citing")
+    assert response.json["results"][0]["title"] == (
+        "<mark>Citing</mark> &lt;sources&gt;"
+    )
+
+    service.update_comment(other, comment["id"], "Use the style guide.")
+    service.delete_post(citing, user.id)
+    assert client.get("/api/forum/search?q=cite").json["results"] == []
+
+    assert client.get("/api/forum/search?q=%21%21").status_code == 400
+
+
+def test_search_pages_by_cursor(client, user_token):
+    """Following next_cursor walks every match exactly once."""
+    from app.models.data import User
+
+    user = User.get(User.email == "test@example.com")
+    service = ForumService(MagicMock())
+    post_ids = {
+        service.create_post(
+            user.id, {"title": f"Chapter {i}", "content": "bibliography " * (i + 1)}
+        )["id"]
+        for i in range(5)
+    }
+
+    seen = []
+    cursor = ""
+    while cursor is not None:
+        response = client.get(
+            f"/api/forum/search?q=bibliography&limit=2&cursor={cursor}"
+        )
+        assert response.status_code == 200
+        page = response.json
+        assert len(page["results"]) <= 2
+        seen += [result["post_id"] for result in page["results"]]
+        cursor = page["next_cursor"]
+
+    assert sorted(seen) == sorted(post_ids)
+    assert client.get("/api/forum/search?q=x&cursor=bogus").status_code == 400
+
+
+def test_event_stream_delivers_and_resumes(app, user_token):
+    """New posts and comments are pushed live and replayed on reconnect."""
+    from app.models.data import User
+    from app.utils.forum_events import get_forum_events
+
+    user = User.get(User.email == "test@example.com")
+    service = ForumService(MagicMock())
+    hub = get_forum_events()
+    stream = hub.stream()
+    assert next(stream).startswith("retry:")
+
+    post_id = service.create_post(user.id, {"title": "Live", "content": "body"})["id"]
+    event = next(stream)
+    assert "event: post\n" in event
+    assert '"title": "Live"' in event
+    first_id = event.split("\n")[0].removeprefix("id: ")
+
+    post_stream = hub.stream(post_id=post_id)
+    next(post_stream)
+    other_id = service.create_post(user.id, {"title": "Other", "content": "x"})["id"]
+    service.add_comment_to_post(user.id, other_id, {"content": "Elsewhere"})
+    service.add_comment_to_post(user.id, post_id, {"content": "Hello"})
+    assert '"content": "Hello"' in next(post_stream)
+    live = [next(stream) for _ in range(3)]
+    assert [e.split("\n")[1] for e in live] == [
+        "event: post",
+        "event: comment",
+        "event: comment",
+    ]
+
+    # A client reconnecting after the first event gets everything after it
+    resumed = hub.stream(first_id)
+    next(resumed)
+    assert [next(resumed) for _ in range(3)] == live
+
+    # An ID older than anything kept asks the client to reload
+    resumed = hub.stream("1-0")
+    next(resumed)
+    assert "event: reset\n" in next(resumed)
+    stream.close()
+    post_stream.close()
+    resumed.close()
+
+
+def test_event_stream_drops_clients_that_fall_behind(client, app):
+    """A connection whose queue fills is flushed and then closed."""
+    from app.utils.forum_events import get_forum_events
+
+    hub = get_forum_events()
+    hub.queue_size = 2
+    stream = hub.stream()
+    next(stream)
+    for i in range(4):
+        hub.publish("post", {"post_id": i})
+
+    assert len(list(stream)) == 2
+    assert hub._connections == set()
+
+    response = client.get("/api/forum/events?last_event_id=bogus")
+    assert response.status_code == 400
+    response = client.get("/api/forum/events")
+    assert response.mimetype == "text/event-stream"
+    assert next(response.response).startswith(b"retry:")
+    response.close()
+
+
+def test_event_streams_end_after_their_max_age(app):
+    """Streams end on their own so they cannot hold a worker forever."""
+    from app.utils.forum_events import get_forum_events
+
+    hub = get_forum_events()
+    hub.heartbeat = 0.05
+    hub.max_age = 0.2
+    stream = hub.stream()
+    assert next(stream).startswith("retry:")
+    assert len(list(stream)) <= 4
+    assert hub._connections == set()
+
+
+def test_threaded_comments_nest_page_and_collapse(client, user_token, query_counter):
+    """Threads are paged by top-level comment with nested, counted replies."""
+    from app.models.data import PostComment, Posts, User
+
+    user = User.get(User.email == "test@example.com")
+    service = ForumService(MagicMock())
+    post_id = service.create_post(user.id, {"title": "Threads", "content": "x"})["id"]
+
+    def reply(content, parent_id=None):
+        return service.add_comment_to_post(
+            user.id, post_id, {"content": content, "parent_id": parent_id}
+        )["id"]
+
+    first = reply("First")
+    answer = reply("Answer", first)
+    nested = reply("Nested", answer)
+    reply("Deepest", nested)
+    reply("Second answer", first)
+    second = reply("Second")
+    reply("Third")
+
+    query_counter["count"] = 0
+    response = client.get(
+        f"/api/forum/posts/{post_id}?threaded=true&per_page=2&depth=2"
+    )
+    assert response.status_code == 200
+    assert query_counter["count"] <= 4
+    comments = response.json["comments"]
+    assert comments["total"] == 3
+    threads = comments["results"]
+    assert [t["content"] for t in threads] == ["First", "Second"]
+    assert threads[0]["reply_count"] == 4
+    assert [r["content"] for r in threads[0]["replies"]] == [
+        "Answer",
+        "Second answer",
+    ]
+    nested_reply = threads[0]["replies"][0]["replies"][0]
+    assert nested_reply["content"] == "Nested"
+    assert nested_reply["replies"] == []
+    assert nested_reply["collapsed_replies"] == 1
+    assert threads[0]["collapsed_replies"] == 1
+    assert threads[1]["replies"] == []
+
+    response = client.get(f"/api/forum/posts/{post_id}/comments/{nested}/replies")
+    assert [r["content"] for r in response.json["replies"]["results"]] == ["Deepest"]
+    assert (
+        client.get(f"/api/forum/posts/{post_id}/comments/999/replies").status_code
+        == 404
+    )
+
+    with pytest.raises(ValueError):
+        service.add_comment_to_post(
+            user.id, post_id, {"content": "Orphan", "parent_id": 999}
+        )
+
+    # Deleting a comment removes its replies and updates every count above it
+    assert service.delete_comment(post_id, answer, user.id)
+    assert PostComment.get_by_id(first).reply_count == 1
+    assert Posts.get_by_id(post_id).comment_count == 4
+    assert PostComment.get_or_none(PostComment.id == nested) is None
+    assert PostComment.get_by_id(second).reply_count == 0
+
+    # Subtrees end at the next path in the alphabet, not at a sentinel
+    # character that only sorts last under byte order
+    def bounds(*paths):
+        return PostComment.select().where(PostComment.thread_range(*paths)).sql()[1]
+
+    assert bounds("00000z") == ["00000z", "00001"]
+    assert bounds("000001", "00009z") == ["000001", "0000a"]
+    assert bounds("zzzzzz") == ["zzzzzz"]
+
+
+def test_post_views_are_counted_in_batches(
+    client, user_token, query_counter, mock_redis
+):
+    """Views are tallied without writes and flushed as one update per batch."""
+    from app.models.data import User
+    from app.utils.deletion import get_deletions
+    from app.utils.post_views import get_post_views
+
+    user = User.get(User.email == "test@example.com")
+    service = ForumService(MagicMock())
+    post_ids = [
+        service.create_post(user.id, {"title": f"Post {i}", "content": "x"})["id"]
+        for i in range(2)
+    ]
+
+    query_counter["statements"].clear()
+    for address in ("10.0.0.1", "10.0.0.2", "10.0.0.1"):
+        client.get(
+            f"/api/forum/posts/{post_ids[0]}", environ_base={"REMOTE_ADDR": address}
+        )
+    # A signed-in viewer counts as themselves, not as their address; a bad
+    # token is ignored rather than rejected
+    for token in (user_token, "bogus"):
+        response = client.get(
+            f"/api/forum/posts/{post_ids[0]}",
+            headers={"Authorization": f"Bearer {token}"},
+            environ_base={"REMOTE_ADDR": "10.0.0.1"},
+        )
+        assert response.status_code == 200
+    client.get(f"/api/forum/posts/{post_ids[1]}")
+    statements = query_counter["statements"]
+    assert not any(sql.lstrip().upper().startswith("UPDATE") for sql in statements)
+
+    counter = get_post_views()
+    counter.batch_size = 1
+    assert counter.flush() == 2
+    assert counter.flush() == 0
+
+    detail = client.get(f"/api/forum/posts/{post_ids[0]}").json["post"]
+    assert (detail["view_count"], detail["unique_viewers"]) == (5, 3)
+    listing = client.get("/api/forum/posts?order_by=id.asc").json["results"]
+    assert [(p["view_count"], p["unique_viewers"]) for p in listing] == [
+        (5, 3),
+        (1, 1),
+    ]
+
+    # Purging a post drops its viewers' HyperLogLog
+    assert mock_redis.exists(f"post:{post_ids[0]}:viewers")
+    service.delete_post(post_ids[0], user.id)
+    get_deletions().run_pending()
+    assert not mock_redis.exists(f"post:{post_ids[0]}:viewers")
+
+
+def test_hot_posts_rank_by_activity_and_page_by_cursor(client, user_token):
+    """Commented and viewed posts rise, pages walk every post once."""
+    from app.models.data import User
+    from app.utils.hot_posts import get_hot_ranking
+    from app.utils.post_views import get_post_views
+
+    user = User.get(User.email == "test@example.com")
+    service = ForumService(MagicMock())
+    post_ids = [
+        service.create_post(user.id, {"title": f"Post {i}", "content": "x"})["id"]
+        for i in range(5)
+    ]
+    service.add_comment_to_post(user.id, post_ids[0], {"content": "First!"})
+    for address in ("10.0.0.1", "10.0.0.2"):
+        client.get(
+            f"/api/forum/posts/{post_ids[1]}", environ_base={"REMOTE_ADDR": address}
+        )
+    get_post_views().flush()
+
+    response = client.get("/api/forum/posts?order_by=hot&per_page=2")
+    assert response.status_code == 200
+    assert [post["id"] for post in response.json["results"]] == post_ids[:2]
+
+    seen = []
+    cursor = ""
+    while cursor is not None:
+        page = client.get(
+            f"/api/forum/posts?order_by=hot&per_page=2&cursor={cursor}"
+        ).json
+        assert len(page["results"]) <= 2
+        seen += [post["id"] for post in page["results"]]
+        cursor = page["next_cursor"]
+    assert sorted(seen) == sorted(post_ids)
+
+    service.delete_post(post_ids[0], user.id)
+    response = client.get("/api/forum/posts?order_by=hot&per_page=1")
+    assert [post["id"] for post in response.json["results"]] == [post_ids[1]]
+    assert get_hot_ranking().rescore() == 4
+    assert client.get("/api/forum/posts?order_by=hot&cursor=bogus").status_code == 400
+
+
+def test_deleted_posts_are_hidden_then_purged_in_chunks(client, user_token):
+    """A deleted post disappears at once; its rows go one chunk at a time."""
+    from app.models.data import DeletionJob, PostComment, Posts, User
+    from app.utils.deletion import get_deletions
+
+    user = User.get(User.email == "test@example.com")
+    service = ForumService(MagicMock())
+    post_id = service.create_post(user.id, {"title": "Doomed", "content": "x"})["id"]
+    first = service.add_comment_to_post(user.id, post_id, {"content": "Root"})
+    for i in range(4):
+        service.add_comment_to_post(
+            user.id, post_id, {"content": f"Reply {i}", "parent_id": first["id"]}
+        )
+
+    assert service.delete_post(post_id, user.id) is True
+    assert client.get(f"/api/forum/posts/{post_id}").status_code == 404
+    assert client.get("/api/forum/posts").json["results"] == []
+    assert client.get("/api/forum/search?q=doomed").json["results"] == []
+    with pytest.raises(ValueError):
+        service.add_comment_to_post(user.id, post_id, {"content": "Too late"})
+    assert PostComment.select().where(PostComment.post == post_id).count() == 5
+
+    deletions = get_deletions()
+    deletions.chunk_size = 2
+    job = DeletionJob.get(DeletionJob.entity == "post")
+    assert deletions.run_pending() == 1
+    progress = deletions.progress(job.id)
+    assert (progress["status"], progress["step"], progress["purged_rows"]) == (
+        "done",
+        "post",
+        6,
+    )
+    assert not Posts.get_or_none(Posts.id == post_id)
+    assert PostComment.select().where(PostComment.post == post_id).count() == 0
+    assert deletions.run_pending() == 0
+
+
+def test_comments_fan_out_into_notification_inboxes(client, user_token, query_counter):
+    """Authors, repliers and thread participants are notified in batches."""
+    from redis.client import Pipeline
+
+    from app.models.data import User
+    from app.utils.notifications import (
+        LEASE_KEY,
+        UNREAD_KEY,
+        NotificationFeed,
+        get_notifications,
+    )
+    from app.utils.redis_helper import get_redis_client
+
+    tokens = {"author": user_token}
+    for name in ("bea", "cy"):
+        client.post(
+            "/api/auth/register",
+            json={
+                "first_name": name,
+                "last_name": "User",
+                "email": f"{name}@example.com",
+                "institution": "National University",
+                "username": name,
+                "password": "password123",
+                "role": "Student",
+            },
+        )
+        tokens[name] = client.post(
+            "/api/auth/signin",
+            json={"email": f"{name}@example.com", "password": "password123"},
+        ).json["token"]
+    users = {
+        name: User.get(User.email == f"{email}@example.com").id
+        for name, email in (("author", "test"), ("bea", "bea"), ("cy", "cy"))
+    }
+
+    def inbox(name, query=""):
+        return client.get(
+            f"/api/user/notifications{query}",
+            headers={"Authorization": f"Bearer {tokens[name]}"},
+        ).json
+
+    def unread(name):
+        return client.get(
+            "/api/user/notifications/unread-count",
+            headers={"Authorization": f"Bearer {tokens[name]}"},
+        ).json["unread"]
+
+    service = ForumService(MagicMock())
+    post_id = service.create_post(users["author"], {"title": "Q", "content": "?"})["id"]
+    top = service.add_comment_to_post(users["bea"], post_id, {"content": "Answer"})
+    reply = service.add_comment_to_post(
+        users["cy"], post_id, {"content": "Disagree", "parent_id": top["id"]}
+    )
+    service.add_comment_to_post(
+        users["author"], post_id, {"content": "Why?", "parent_id": reply["id"]}
+    )
+    assert unread("author") == 0
+
+    assert get_notifications().flush() == 5
+    assert get_notifications().flush() == 0
+    assert (unread("author"), unread("bea"), unread("cy")) == (2, 2, 1)
+    # Counters are recounted once, then served from Redis
+    query_counter["statements"].clear()
+    assert (unread("author"), unread("bea"), unread("cy")) == (2, 2, 1)
+    assert not any("notifications" in sql for sql in query_counter["statements"])
+    assert [n["kind"] for n in inbox("bea")["results"]] == ["thread", "reply"]
+    assert [(n["kind"], n["preview"]) for n in inbox("cy")["results"]] == [
+        ("reply", "Why?")
+    ]
+
+    first = inbox("author", "?limit=1")
+    assert [n["comment_id"] for n in first["results"]] == [reply["id"]]
+    second = inbox("author", f"?limit=1&cursor={first['next_cursor']}")
+    assert [n["comment_id"] for n in second["results"]] == [top["id"]]
+    assert second["next_cursor"] is None
+    assert inbox("author", "?cursor=bogus")["success"] is False
+
+    headers = {"Authorization": f"Bearer {tokens['author']}"}
+    response = client.post(
+        "/api/user/notifications/read",
+        json={"ids": [first["results"][0]["id"]]},
+        headers=headers,
+    )
+    assert response.json["marked"] == 1
+    assert unread("author") == 1
+    assert [n["comment_id"] for n in inbox("author", "?unread=true")["results"]] == [
+        top["id"]
+    ]
+    client.post("/api/user/notifications/read", json={}, headers=headers)
+    assert unread("author") == 0
+
+    # A counter dropped between the worker's check and its increment is not
+    # recreated holding only the new notifications
+    feed = get_notifications()
+    original_mget = Pipeline.mget
+
+    def mget_then_mark_read(pipeline, keys):
+        counters = original_mget(pipeline, keys)
+        feed.forget_unread(users["author"])
+        return counters
+
+    service.add_comment_to_post(users["bea"], post_id, {"content": "Again"})
+    with patch.object(Pipeline, "mget", mget_then_mark_read):
+        assert feed.flush() == 1
+    key = UNREAD_KEY.format(user_id=users["author"])
+    assert get_redis_client().get(key) is None
+    assert unread("author") == 1
+    assert get_redis_client().ttl(key) > 0
+
+    # Events taken by a worker that stopped before committing are queued
+    # again once its lease expires, but not while it is still running
+    other = NotificationFeed(client.application, background=False)
+    service.add_comment_to_post(users["cy"], post_id, {"content": "Crash"})
+    taken = feed._take()
+    assert len(taken) == 1
+    other._recover()
+    assert other.flush() == 0
+    get_redis_client().delete(LEASE_KEY.format(worker=feed._worker_name()))
+    other._recover()
+    assert other.flush() == 1
+    assert unread("author") == 2
+
+    # An event written twice adds no rows and is not counted twice
+    assert feed._fan_out([json.loads(taken[0])]) == 0
+    assert unread("author") == 2
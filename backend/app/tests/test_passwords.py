@@ -0,0 +1,55 @@
+from app.models.data import User
+from app.utils.passwords import calibrate_hash_method, legacy_password_hash
+
+
+def signin(client, password="password123"):
+    return client.post(
+        "/api/auth/signin", json={"email": "test@example.com", "password": password}
+    )
+
+
+def stored_hash():
+    return User.get(User.email == "test@example.com").password
+
+
+def test_legacy_hash_is_migrated_on_login(app, client, user_token):
+    """
+    A user with a legacy SHA-256 hash can sign in, after which the hash is
+    replaced by one made with the configured method.
+    """
+    User.update(password=legacy_password_hash("password123")).where(
+        User.email == "test@example.com"
+    ).execute()
+
+    assert signin(client, "wrong-password").status_code == 401
+    assert stored_hash() == legacy_password_hash("password123")
+
+    assert signin(client).status_code == 200
+    assert stored_hash().startswith(app.config["PASSWORD_HASH_METHOD"] + "$")
+    assert signin(client).status_code == 200
+
+
+def test_hash_is_upgraded_when_method_changes(app, client, user_token):
+    """
+    Raising the configured cost rehashes a password on its next login only.
+    """
+    old_hash = stored_hash()
+    assert signin(client).status_code == 200
+    assert stored_hash() == old_hash
+
+    app.config["PASSWORD_HASH_METHOD"] = "pbkdf2:sha256:2000"
+    assert signin(client).status_code == 200
+    assert stored_hash().startswith("pbkdf2:sha256:2000$")
+
+
+def test_calibration_picks_strongest_method_within_budget(monkeypatch):
+    """
+    The strongest candidate whose hashing time fits the budget is chosen.
+    """
+    timings = {"scrypt:16384:8:1": 40, "scrypt:32768:8:1": 90, "scrypt:65536:8:1": 180}
+    monkeypatch.setattr(
+        "app.utils.passwords._time_hash", lambda method, rounds: timings[method]
+    )
+
+    assert calibrate_hash_method(100) == ("scrypt:32768:8:1", 90)
+    assert calibrate_hash_method(10) == ("scrypt:16384:8:1", 40)
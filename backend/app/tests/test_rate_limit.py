@@ -0,0 +1,108 @@
+import pytest
+
+from app.utils.rate_limit import MemoryStore
+
+
+def signin(client, email, remote_addr="127.0.0.1"):
+    return client.post(
+        "/api/auth/signin",
+        json={"email": email, "password": "wrong-password"},
+        environ_base={"REMOTE_ADDR": remote_addr},
+    )
+
+
+def test_signin_is_limited_per_account(client):
+    """
+    Repeated sign-in attempts against one account get a 429 with Retry-After,
+    while other accounts, and the same account from other clients, can still
+    sign in.
+    """
+    for _ in range(5):
+        assert signin(client, "victim@example.com").status_code == 401
+
+    response = signin(client, "victim@example.com")
+    assert response.status_code == 429
+    assert 1 <= int(response.headers["Retry-After"]) <= 60
+
+    assert signin(client, "other@example.com").status_code == 401
+    assert signin(client, "victim@example.com", "10.0.0.2").status_code == 401
+
+
+def test_rejected_requests_are_not_charged_to_other_scopes(app, client):
+    """
+    A request rejected by one scope does not use up the limits of the others.
+    """
+    app.config["RATELIMITS"] = {
+        "signin": {"window": 60, "limits": {"user": 1, "ip": 3}}
+    }
+
+    assert signin(client, "victim@example.com").status_code == 401
+    for _ in range(3):
+        assert signin(client, "victim@example.com").status_code == 429
+    assert signin(client, "other@example.com").status_code == 401
+    assert signin(client, "third@example.com").status_code == 401
+
+
+def test_limits_fall_back_to_memory_without_redis(app, client):
+    """
+    When the Redis store cannot be used, limits keep applying in process.
+    """
+    app.config["RATELIMIT_STORAGE"] = "redis"
+    app.config["RATELIMITS"] = {"signin": {"window": 60, "limits": {"ip": 2}}}
+
+    assert signin(client, "a@example.com").status_code == 401
+    assert signin(client, "b@example.com").status_code == 401
+    assert signin(client, "c@example.com").status_code == 429
+
+
+def test_memory_store_window_slides(monkeypatch):
+    """
+    Hits leave the window once it has passed them.
+    """
+    clock = [1000.0]
+    monkeypatch.setattr("app.utils.rate_limit.time.monotonic", lambda: clock[0])
+    store = MemoryStore()
+
+    assert store.hit("key", 2, 10) == (True, 1, 0)
+    clock[0] += 4
+    assert store.hit("key", 2, 10) == (True, 0, 0)
+    allowed, remaining, retry_after = store.hit("key", 2, 10)
+    assert (allowed, remaining, retry_after) == (False, 0, 6)
+
+    clock[0] += 6
+    assert store.hit("key", 2, 10)[0] is True
+
+
+def test_redis_store_runs_the_sliding_window_script(
+    app, client, mock_redis, monkeypatch
+):
+    """
+    The Lua script used in production slides its window on the Redis clock and
+    does not charge requests it rejects.
+    """
+    pytest.importorskip("lupa")
+    clock = [1000.0]
+    monkeypatch.setattr(
+        "fakeredis.commands_mixins.server_mixin.time.time", lambda: clock[0]
+    )
+    app.config["RATELIMIT_STORAGE"] = "redis"
+    app.config["RATELIMITS"] = {
+        "signin": {"window": 10, "limits": {"user": 1, "ip": 2}}
+    }
+
+    assert signin(client, "victim@example.com").status_code == 401
+    clock[0] += 4
+    response = signin(client, "victim@example.com")
+    assert response.status_code == 429
+    assert int(response.headers["Retry-After"]) == 6
+    assert mock_redis.zcard("ratelimit:signin:ip:127.0.0.1") == 1
+
+    # The rejected attempt left the address one hit to spare
+    assert signin(client, "other@example.com").status_code == 401
+    assert signin(client, "third@example.com").status_code == 429
+
+    # A hit still counts just before the window has passed it, not after
+    clock[0] += 5.999
+    assert signin(client, "victim@example.com").status_code == 429
+    clock[0] += 0.001
+    assert signin(client, "victim@example.com").status_code == 401
@@ -1,11 +1,22 @@
 from datetime import datetime, timedelta, timezone
 
-from app.utils.redis_helper import (add_token_to_user, blacklist_token,
-                                    get_user_tokens, is_token_blacklisted,
-                                    is_token_expired, revoke_user_tokens)
-
-
-def test_add_token_to_user(mock_redis):
+from app.utils import redis_helper
+from app.utils.redis_helper import (
+    add_token_to_user,
+    blacklist_token,
+    get_revoked_tokens,
+    get_user_tokens,
+    is_token_blacklisted,
+    is_token_expired,
+    revoke_user_tokens,
+)
+
+# Captured before the autouse fixture replaces them with the fakeredis client.
+real_get_redis_client = redis_helper.get_redis_client
+real_get_redis_bulk_client = redis_helper.get_redis_bulk_client
+
+
+def test_add_token_to_user(app, mock_redis):
     """
     Test adding a token to a user's token list in Redis.
     """
@@ -18,13 +29,26 @@ def test_add_token_to_user(mock_redis):
     redis_client = mock_redis
     token_key = f"user:{user_id}:tokens"
 
-    assert redis_client.hexists(token_key, token)
-    expiry = redis_client.hget(token_key, token)
-    assert float(expiry) > datetime.now(timezone.utc).timestamp()
+    expiry = redis_client.zscore(token_key, token)
+    assert expiry > datetime.now(timezone.utc).timestamp()
     assert redis_client.ttl(token_key) == expiry_seconds
 
 
-def test_blacklist_token(mock_redis):
+def test_add_token_to_user_prunes_expired_tokens(app, mock_redis):
+    """
+    Adding a token drops entries of the user's registry that have expired.
+    """
+    token_key = "user:1:tokens"
+    past = datetime.now(timezone.utc).timestamp() - 10
+    mock_redis.zadd(token_key, {"stale_token": past})
+
+    add_token_to_user(1, "new_token", 3600)
+
+    assert mock_redis.zscore(token_key, "stale_token") is None
+    assert mock_redis.zscore(token_key, "new_token") is not None
+
+
+def test_blacklist_token(app, mock_redis):
     """
     Test blacklisting a token in Redis.
     """
@@ -34,11 +58,12 @@ def test_blacklist_token(mock_redis):
     blacklist_token(token, ttl)
 
     redis_client = mock_redis
-    assert redis_client.exists(f"blacklist:{token}")
-    assert (redis_client.ttl(f"blacklist:{token}") > 0 <= ttl) is True
+    expiry = redis_client.zscore("revoked_tokens", token)
+    now = datetime.now(timezone.utc).timestamp()
+    assert now < expiry <= now + ttl
 
 
-def test_is_token_blacklisted(mock_redis):
+def test_is_token_blacklisted(app, mock_redis):
     """
     Test checking if a token is blacklisted.
     """
@@ -49,7 +74,19 @@ def test_is_token_blacklisted(mock_redis):
     assert is_token_blacklisted("non_blacklisted_token") is False
 
 
-def test_get_user_tokens(mock_redis):
+def test_get_revoked_tokens_prunes_expired_entries(app, mock_redis):
+    """
+    Expired blacklist entries are removed from the sorted set when it is read.
+    """
+    now = datetime.now(timezone.utc).timestamp()
+    mock_redis.zadd("revoked_tokens", {"expired": now - 10, "live": now + 60})
+
+    assert get_revoked_tokens() == ["live"]
+    assert mock_redis.zscore("revoked_tokens", "expired") is None
+    assert is_token_blacklisted("expired") is False
+
+
+def test_get_user_tokens(app, mock_redis):
     """
     Test fetching all tokens issued to a user.
     """
@@ -71,7 +108,7 @@ def test_get_user_tokens(mock_redis):
     assert token2 in decoded_tokens
 
 
-def test_revoke_user_tokens(mock_redis):
+def test_revoke_user_tokens(app, mock_redis):
     """
     Test revoking all tokens for a user.
     """
@@ -85,8 +122,8 @@ def test_revoke_user_tokens(mock_redis):
 
     # Assert tokens exist in the user's token list
     redis_client = mock_redis
-    assert redis_client.hexists(f"user:{user_id}:tokens", token1) is True
-    assert redis_client.hexists(f"user:{user_id}:tokens", token2) is True
+    assert redis_client.zscore(f"user:{user_id}:tokens", token1) is not None
+    assert redis_client.zscore(f"user:{user_id}:tokens", token2) is not None
 
     # Revoke all tokens
     revoke_user_tokens(user_id)
@@ -96,14 +133,14 @@ def test_revoke_user_tokens(mock_redis):
     assert redis_client.exists(token_key) == 0
 
     # Verify the tokens are blacklisted
-    blacklist_token_key1 = f"blacklist:{token1}"
-    blacklist_token_key2 = f"blacklist:{token2}"
-
-    assert redis_client.exists(blacklist_token_key1) == 1
-    assert redis_client.exists(blacklist_token_key2) == 1
+    assert redis_client.zscore("revoked_tokens", token1) is not None
+    assert redis_client.zscore("revoked_tokens", token2) is not None
     assert is_token_blacklisted(token1) is True
     assert is_token_blacklisted(token2) is True
 
+    # Verify the user's revocation epoch moved forward
+    assert redis_client.get(f"user:{user_id}:revocation_epoch") == b"1"
+
 
 def test_is_token_expired(mock_redis):
     """
@@ -125,3 +162,46 @@ def test_is_token_expired(mock_redis):
         f"token:{token}:expiry", datetime.now(timezone.utc).timestamp() - 10
     )
     assert is_token_expired(token) is True
+
+
+def test_get_redis_client_shares_app_pool(app):
+    """
+    Clients are bound to the pool created by the app factory.
+    """
+    pool = app.extensions["redis_pool"]
+    first = real_get_redis_client()
+    second = real_get_redis_client()
+
+    assert first.connection_pool is pool
+    assert second.connection_pool is pool
+
+
+def test_bulk_commands_use_a_pool_with_a_longer_timeout(app):
+    """
+    Scans and pub/sub get their own pool, so its longer timeout does not
+    apply to request handling and its commands do not trip the short one.
+    """
+    pool = app.extensions["redis_bulk_pool"]
+    client = real_get_redis_bulk_client()
+
+    assert client.connection_pool is pool
+    assert pool is not app.extensions["redis_pool"]
+    timeout = pool.connection_kwargs["socket_timeout"]
+    assert timeout > app.extensions["redis_pool"].connection_kwargs["socket_timeout"]
+
+
+def test_revoke_user_tokens_skips_expired_tokens(app, mock_redis):
+    """
+    Tokens whose expiry has passed are dropped without a blacklist entry.
+    """
+    user_id = 1
+    token_key = f"user:{user_id}:tokens"
+    past = datetime.now(timezone.utc).timestamp() - 10
+    mock_redis.zadd(token_key, {"stale_token": past})
+    add_token_to_user(user_id, "live_token", 3600)
+
+    revoke_user_tokens(user_id)
+
+    assert mock_redis.exists(token_key) == 0
+    assert is_token_blacklisted("live_token") is True
+    assert mock_redis.zscore("revoked_tokens", "stale_token") is None
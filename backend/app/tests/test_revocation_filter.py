@@ -0,0 +1,69 @@
+import time
+
+import jwt
+
+from app.utils.redis_helper import blacklist_token
+from app.utils.revocation_filter import RevocationFilter
+
+
+def test_blacklisted_token_is_rejected(client, user_token, mock_redis):
+    """
+    A blacklisted token is refused, and accepted tokens are checked without
+    asking Redis.
+    """
+    headers = {"Authorization": f"Bearer {user_token}"}
+    lookups = []
+    original_zscore = mock_redis.zscore
+
+    def counting_zscore(*args):
+        lookups.append(args)
+        return original_zscore(*args)
+
+    mock_redis.zscore = counting_zscore
+    for _ in range(3):
+        response = client.get("/api/user/profile", headers=headers)
+        assert response.status_code == 200
+    assert lookups == []
+
+    blacklist_token(jwt.decode(user_token, options={"verify_signature": False})["jti"])
+    response = client.get("/api/user/profile", headers=headers)
+    assert response.status_code == 401
+    assert response.json["message"] == "Token is expired and blacklisted"
+
+
+def test_file_backed_filter_is_shared(app, mock_redis, tmp_path):
+    """
+    Filters mapping the same file see each other's entries, and a rebuild
+    picks up tokens blacklisted directly in Redis.
+    """
+    path = str(tmp_path / "revocation.bloom")
+    first = RevocationFilter(app, path=path, capacity=1000, refresh_interval=0)
+    second = RevocationFilter(app, path=path, capacity=1000, refresh_interval=0)
+
+    now = time.time()
+    mock_redis.zadd("revoked_tokens", {"old_token": now + 60})
+    assert first.is_blacklisted("old_token") is True
+    assert second.is_blacklisted("old_token") is True
+
+    # Blacklisted after both filters were built: only the shared bits tell the
+    # second filter to look the token up
+    mock_redis.zadd("revoked_tokens", {"new_token": now + 60})
+    first.add(["new_token"])
+    assert second.is_blacklisted("new_token") is True
+    assert second.is_blacklisted("valid_token") is False
+
+
+def test_unbuilt_filter_falls_back_to_redis(app, mock_redis, monkeypatch):
+    """
+    Until the filter has been built every token is confirmed against Redis.
+    """
+    revocation_filter = RevocationFilter(app, capacity=1000, refresh_interval=0)
+
+    def failing_rebuild():
+        raise ConnectionError("Redis unavailable")
+
+    monkeypatch.setattr(revocation_filter, "rebuild", failing_rebuild)
+    mock_redis.zadd("revoked_tokens", {"revoked_token": time.time() + 60})
+
+    assert revocation_filter.is_blacklisted("revoked_token") is True
+    assert revocation_filter.is_blacklisted("valid_token") is False
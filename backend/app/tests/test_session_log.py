@@ -0,0 +1,57 @@
+from datetime import datetime, timedelta, timezone
+
+from app.models.data import SessionLog, SessionLogDaily, User
+from app.utils.session_log import compact_session_logs, get_session_log
+
+
+def test_signin_queues_session_log(client, user_token, query_counter):
+    """
+    Signing in queues the session log entry instead of inserting it, and a
+    flush writes queued entries with a single insert.
+    """
+    writer = get_session_log()
+    writer.flush()
+    query_counter["statements"].clear()
+    for _ in range(3):
+        response = client.post(
+            "/api/auth/signin",
+            json={"email": "test@example.com", "password": "password123"},
+        )
+        assert response.status_code == 200
+    assert writer.pending() == 3
+    assert not any("session_log" in sql for sql in query_counter["statements"])
+
+    query_counter["statements"].clear()
+    assert writer.flush() == 3
+    inserts = [sql for sql in query_counter["statements"] if "INSERT" in sql]
+    assert len(inserts) == 1
+    user = User.get(User.email == "test@example.com")
+    assert SessionLog.select().where(SessionLog.user == user).count() == 4
+
+
+def test_compaction_rolls_old_entries_into_daily_counts(app, user_token):
+    """
+    Entries past the retention period become daily counts; recent ones stay.
+    """
+    get_session_log().flush()
+    user = User.get(User.email == "test@example.com")
+    SessionLog.delete().execute()
+    now = datetime(2024, 6, 30, 12, 0, tzinfo=timezone.utc)
+    old_day = datetime(2024, 1, 10, 9, 0, tzinfo=timezone.utc)
+    SessionLog.insert_many(
+        [
+            {"user": user.id, "login_time": old_day},
+            {"user": user.id, "login_time": old_day + timedelta(hours=3)},
+            {"user": user.id, "login_time": now - timedelta(days=1)},
+        ]
+    ).execute()
+
+    # One ID per chunk still sums the day across chunks
+    assert compact_session_logs(90, now=now, chunk_size=1) == 2
+    assert SessionLog.select().count() == 1
+    daily = SessionLogDaily.get(SessionLogDaily.user == user)
+    assert (daily.day, daily.logins) == (old_day.date(), 2)
+
+    SessionLog.insert(user=user.id, login_time=old_day).execute()
+    assert compact_session_logs(90, now=now) == 1
+    assert SessionLogDaily.get(SessionLogDaily.user == user).logins == 3
@@ -1,3 +1,6 @@
+from datetime import date, datetime, timezone
+from unittest.mock import patch
+
 import pytest
 
 
@@ -90,16 +93,16 @@ def test_add_body_page_success(client, user_token, sample_thesis):
 
 def test_add_body_page_failure(client, user_token, sample_thesis):
     """
-    Test failure when adding a body page to a thesis.
+    Test failure when adding a body page to a thesis that does not exist.
     """
     response = client.post(
         "/api/thesis/417/body-pages",
         json={"page_number": 1, "body": "Test body content"},
         headers={"Authorization": f"Bearer {user_token}"},
     )
-    assert response.status_code == 400
+    assert response.status_code == 404
     assert response.json["success"] is False
-    assert response.json["message"] == "Failed to add body page"
+    assert response.json["message"] == "Thesis not found or not accessible."
 
 
 def test_add_body_page_invalid_payload(client, user_token, sample_thesis):
@@ -487,3 +490,375 @@ def test_delete_appendix(client, user_token, sample_thesis):
     )
     assert delete_response.status_code == 200
     assert delete_response.json["success"] is True
+
+
+# --- Serialization Tests ---
+def test_list_endpoints_use_constant_queries(app, query_counter, sample_thesis):
+    """
+    Listing child rows runs one query regardless of how many rows exist and
+    returns the thesis as a raw id instead of a nested object.
+    """
+    from app.models.data import Reference
+    from app.services.thesisservice import ThesisService
+
+    service = ThesisService(app.logger)
+    counts = []
+    for batch in (1, 20):
+        for i in range(batch):
+            Reference.create(thesis=sample_thesis, author=f"A{i}", title=f"T{i}")
+        query_counter["count"] = 0
+        references = service.get_references(sample_thesis)
+        counts.append(query_counter["count"])
+
+    assert counts == [1, 1]
+    assert len(references) == 21
+    assert references[0]["thesis"] == sample_thesis
+
+
+def test_paginated_theses_use_constant_queries(app, query_counter, user_token):
+    """
+    Paginated thesis listing runs a count and a single projected select.
+    """
+    from app.models.data import Thesis, User
+    from app.services.thesisservice import ThesisService
+
+    user = User.get(User.email == "test@example.com")
+    for i in range(15):
+        Thesis.create(title=f"Thesis {i}", status="Draft", student=user)
+
+    service = ThesisService(app.logger)
+    query_counter["count"] = 0
+    theses, total = service.get_user_theses_paginated(user.id, page=1, per_page=10)
+
+    assert query_counter["count"] == 2
+    assert total == 15
+    assert len(theses) == 10
+    assert theses[0]["student"] == user.id
+    assert "password" not in theses[0]
+
+
+def test_thesis_outline_omits_body_text(client, user_token, sample_thesis):
+    """
+    The outline lists chapters and pages without their content.
+    """
+    headers = {"Authorization": f"Bearer {user_token}"}
+    client.post(
+        f"/api/thesis/{sample_thesis}/chapters",
+        json={"name": "Introduction", "content": "Long text", "order": 1},
+        headers=headers,
+    )
+    client.post(
+        f"/api/thesis/{sample_thesis}/body-pages",
+        json={"page_number": 1, "body": "Body text"},
+        headers=headers,
+    )
+
+    response = client.get(f"/api/thesis/{sample_thesis}/outline", headers=headers)
+    assert response.status_code == 200
+    outline = response.json["outline"]
+    assert outline["chapters"] == [{"id": 1, "name": "Introduction", "order": 1}]
+    assert outline["body_pages"][0]["page_number"] == 1
+    assert "body" not in outline["body_pages"][0]
+
+    summary = client.get(
+        f"/api/thesis/{sample_thesis}/chapters?view=summary", headers=headers
+    )
+    assert "content" not in summary.json["chapters"][0]
+    full = client.get(f"/api/thesis/{sample_thesis}/chapters", headers=headers)
+    assert full.json["chapters"][0]["content"] == "Long text"
+
+
+def test_thesis_outline_not_found(client, user_token):
+    """
+    Requesting the outline of a thesis the user does not own returns 404.
+    """
+    response = client.get(
+        "/api/thesis/999/outline",
+        headers={"Authorization": f"Bearer {user_token}"},
+    )
+    assert response.status_code == 404
+
+
+# --- Workspace Tests ---
+def test_get_workspace(client, user_token, sample_thesis):
+    """
+    The workspace returns every editor section in one response.
+    """
+    headers = {"Authorization": f"Bearer {user_token}"}
+    client.post(
+        f"/api/thesis/{sample_thesis}/footnotes",
+        json={"content": "A footnote."},
+        headers=headers,
+    )
+    client.put(
+        f"/api/thesis/{sample_thesis}/dedication",
+        json={"content": "For my family."},
+        headers=headers,
+    )
+
+    response = client.get(f"/api/thesis/{sample_thesis}/workspace", headers=headers)
+    assert response.status_code == 200
+    workspace = response.json["workspace"]
+    assert workspace["thesis"]["title"] == "Sample Thesis"
+    assert workspace["cover_page"]["title"] == "Sample Thesis"
+    due_date = workspace["cover_page"]["due_date"]
+    assert due_date == date.fromisoformat(due_date).isoformat()
+    assert workspace["footnotes"][0]["content"] == "A footnote."
+    assert workspace["front_matter"] == {
+        "copyright": "",
+        "signature": "",
+        "other_info": "",
+        "dedication": "For my family.",
+    }
+    assert response.headers.get("ETag")
+
+
+def test_get_workspace_include_and_etag(
+    client, user_token, sample_thesis, query_counter
+):
+    """
+    ``include`` limits the sections and a matching ETag yields 304.
+    """
+    headers = {"Authorization": f"Bearer {user_token}"}
+    url = f"/api/thesis/{sample_thesis}/workspace?include=references,figures"
+    response = client.get(url, headers=headers)
+    assert response.status_code == 200
+    assert set(response.json["workspace"]) == {"thesis", "references", "figures"}
+
+    etag = response.headers["ETag"]
+    query_counter["statements"].clear()
+    cached = client.get(url, headers={**headers, "If-None-Match": etag})
+    assert cached.status_code == 304
+    # Answered from the thesis row without loading any section
+    assert not any(
+        "references" in sql or "figures" in sql for sql in query_counter["statements"]
+    )
+
+    client.post(
+        f"/api/thesis/{sample_thesis}/references",
+        json={"author": "Doe", "title": "A Study"},
+        headers=headers,
+    )
+    changed = client.get(url, headers={**headers, "If-None-Match": etag})
+    assert changed.status_code == 200
+    etag = changed.headers["ETag"]
+
+    # Writes to sections outside the requested ones change the ETag too
+    client.post(
+        f"/api/thesis/{sample_thesis}/footnotes",
+        json={"content": "Later"},
+        headers=headers,
+    )
+    assert (
+        client.get(url, headers={**headers, "If-None-Match": etag}).status_code == 200
+    )
+
+    # So do writes within the same second, which MySQL stores alike
+    from app.models.data import Thesis
+
+    def within_one_second():
+        Thesis.update(updated_at=datetime(2026, 1, 1, tzinfo=timezone.utc)).where(
+            Thesis.id == sample_thesis
+        ).execute()
+
+    within_one_second()
+    etag = client.get(url, headers=headers).headers["ETag"]
+    client.post(
+        f"/api/thesis/{sample_thesis}/footnotes",
+        json={"content": "Same second"},
+        headers=headers,
+    )
+    within_one_second()
+    assert (
+        client.get(url, headers={**headers, "If-None-Match": etag}).status_code == 200
+    )
+
+
+def test_get_workspace_errors(client, user_token, sample_thesis):
+    """
+    Unknown sections are rejected and foreign theses are not found.
+    """
+    headers = {"Authorization": f"Bearer {user_token}"}
+    bad = client.get(
+        f"/api/thesis/{sample_thesis}/workspace?include=secrets", headers=headers
+    )
+    assert bad.status_code == 400
+    missing = client.get("/api/thesis/999/workspace", headers=headers)
+    assert missing.status_code == 404
+
+
+# --- Sparse Fieldset Tests ---
+def test_sparse_fieldsets_limit_selected_columns(
+    client, user_token, sample_thesis, query_counter
+):
+    """
+    ``?fields=`` narrows the SELECT list itself and always keeps ``id``.
+    """
+    headers = {"Authorization": f"Bearer {user_token}"}
+    query_counter["statements"].clear()
+    response = client.get(
+        f"/api/thesis/{sample_thesis}?fields=title,status", headers=headers
+    )
+
+    assert response.status_code == 200
+    assert response.json["thesis"] == {
+        "id": sample_thesis,
+        "title": "Sample Thesis",
+        "status": "Draft",
+    }
+    thesis_select = next(
+        sql for sql in query_counter["statements"] if 'FROM "theses"' in sql
+    )
+    assert "course" not in thesis_select
+
+    listing = client.get("/api/thesis/theses?fields=title", headers=headers)
+    assert listing.json["theses"] == [{"id": sample_thesis, "title": "Sample Thesis"}]
+
+
+def test_sparse_fieldsets_reject_unknown_fields(client, user_token, sample_thesis):
+    """
+    Unknown field names are rejected with 400.
+    """
+    headers = {"Authorization": f"Bearer {user_token}"}
+    response = client.get(
+        f"/api/thesis/{sample_thesis}?fields=password", headers=headers
+    )
+    assert response.status_code == 400
+    profile = client.get("/api/user/profile?fields=first_name,role", headers=headers)
+    assert profile.status_code == 200
+    assert set(profile.json["user"]) == {"id", "first_name", "role"}
+    assert profile.json["user"]["role"]["name"] == "Student"
+
+
+# --- Ownership Tests ---
+def test_subresources_require_thesis_owner(client, user_token, sample_thesis):
+    """
+    Another user can neither reach a thesis' subresources nor address its
+    children by ID.
+    """
+    headers = {"Authorization": f"Bearer {user_token}"}
+    footnote_id = client.post(
+        f"/api/thesis/{sample_thesis}/footnotes",
+        json={"content": "Mine."},
+        headers=headers,
+    ).json["footnote"]["id"]
+
+    client.post(
+        "/api/auth/register",
+        json={
+            "first_name": "Other",
+            "last_name": "User",
+            "email": "other@example.com",
+            "institution": "National University",
+            "username": "otheruser",
+            "password": "password123",
+            "role": "Student",
+        },
+    )
+    other_token = client.post(
+        "/api/auth/signin",
+        json={"email": "other@example.com", "password": "password123"},
+    ).json["token"]
+    other_headers = {"Authorization": f"Bearer {other_token}"}
+
+    response = client.get(
+        f"/api/thesis/{sample_thesis}/footnotes", headers=other_headers
+    )
+    assert response.status_code == 404
+    response = client.delete(
+        f"/api/thesis/footnote/{footnote_id}", headers=other_headers
+    )
+    assert response.status_code == 404
+    response = client.put(
+        f"/api/thesis/{sample_thesis}/chapters/1", json={}, headers=other_headers
+    )
+    assert response.status_code == 404
+
+    response = client.delete(f"/api/thesis/footnote/{footnote_id}", headers=headers)
+    assert response.status_code == 200
+    response = client.delete(f"/api/thesis/footnote/{footnote_id}", headers=headers)
+    assert response.status_code == 404
+
+
+def test_ownership_checks_are_cached(app, client, user_token, sample_thesis):
+    """
+    Once a thesis' owner is known, authorizing its routes costs no query.
+    """
+    from app.utils.ownership import get_ownership_cache
+
+    headers = {"Authorization": f"Bearer {user_token}"}
+    url = f"/api/thesis/{sample_thesis}/outline"
+    assert client.get(url, headers=headers).status_code == 200
+
+    cache = get_ownership_cache()
+    with patch.object(cache, "_lookup", wraps=cache._lookup) as lookup:
+        with patch("app.models.data.Thesis.select") as select:
+            assert client.get(url, headers=headers).status_code == 200
+    lookup.assert_called_once()
+    select.assert_not_called()
+
+
+@pytest.fixture(params=["native", "inverted"])
+def thesis_search_backend(request, app):
+    """
+    Runs a test against native full-text search and against the inverted index
+    fallback.
+    """
+    from app.utils.db import database_proxy
+    from app.utils.thesis_search import InvertedThesisSearch
+
+    if request.param == "inverted":
+        index = InvertedThesisSearch(database_proxy.obj)
+        index.create()
+        native = app.extensions["thesis_search"]
+        app.extensions["thesis_search"] = index
+        yield index
+        index.drop()
+        app.extensions["thesis_search"] = native
+    else:
+        yield app.extensions["thesis_search"]
+
+
+def test_search_theses(client, user_token, thesis_search_backend):
+    """Thesis search finds sections with offsets and follows their edits."""
+    from unittest.mock import MagicMock
+
+    from app.services.thesisservice import ThesisService
+
+    headers = {"Authorization": f"Bearer {user_token}"}
+    thesis_id = client.post(
+        "/api/thesis/new",
+        json={"title": "Survey methodology", "status": "Draft"},
+        headers=headers,
+    ).json["id"]
+    service = ThesisService(MagicMock())
+    content = "This chapter explains the methodology & sampling."
+    chapter = service.create_chapter(thesis_id, "Methods", content)
+    reference = service.add_reference(
+        thesis_id, {"author": "Smith", "title": "Sampling theory"}
+    )
+
+    response = client.get("/api/thesis/search?q=methodology", headers=headers)
+    assert response.status_code == 200
+    results = {(r["section"], r["section_id"]): r for r in response.json["results"]}
+    assert set(results) == {("title", thesis_id), ("chapter", chapter.id)}
+    hit = results[("chapter", chapter.id)]
+    assert hit["thesis_id"] == thesis_id
+    assert hit["offset"] == content.index("methodology")
+    assert "<mark>methodology</mark> &amp; sampling" in hit["snippet"]
+
+    response = client.get("/api/thesis/search?q=sampling+smith", headers=headers)
+    assert [(r["section"], r["section_id"]) for r in response.json["results"]] == [
+        ("reference", reference.id)
+    ]
+    assert service.search(user_id=-1, query="sampling")["results"] == []
+
+    service.update_chapter(chapter.id, {"content": "Rewritten."})
+    service.delete_reference(reference.id)
+    response = client.get("/api/thesis/search?q=sampling", headers=headers)
+    assert response.json["results"] == []
+
+    thesis_search_backend.rebuild()
+    response = client.get("/api/thesis/search?q=rewritten", headers=headers)
+    assert [r["section"] for r in response.json["results"]] == ["chapter"]
+    assert client.get("/api/thesis/search?q=", headers=headers).status_code == 400
@@ -11,7 +11,24 @@ def user_service():
     return UserService(logger)
 
 
-def test_change_user_status_success_activate(user_service):
+@pytest.fixture(autouse=True)
+def mock_invalidate_identity():
+    """Fixture replacing identity cache invalidation, which needs Redis."""
+    with patch("app.services.userservice.invalidate_identity") as mock_invalidate:
+        yield mock_invalidate
+
+
+@pytest.fixture
+def mock_user_model():
+    """Fixture replacing the User model, whose status update changes one row."""
+    with patch("app.services.userservice.User") as mock_model:
+        mock_model.update.return_value.where.return_value.execute.return_value = 1
+        yield mock_model
+
+
+def test_change_user_status_success_activate(
+    user_service, mock_invalidate_identity, mock_user_model
+):
     """Test successfully activating a user."""
     mock_user = MagicMock()
     user_service._get_user_by_id = MagicMock(return_value=mock_user)
@@ -19,24 +36,39 @@ def test_change_user_status_success_activate(user_service):
     result = user_service.change_user_status(user_id=1, is_active=True)
 
     assert result is True
-    assert mock_user.is_active is True
-    mock_user.save.assert_called_once()
+    mock_user_model.update.assert_called_once_with(is_active=True)
+    mock_invalidate_identity.assert_called_once_with(1)
     user_service.logger.info.assert_called_with("User 1 activated successfully.")
 
 
-def test_change_user_status_success_deactivate(user_service):
+def test_change_user_status_success_deactivate(user_service, mock_user_model):
     """Test successfully deactivating a user."""
     mock_user = MagicMock()
     user_service._get_user_by_id = MagicMock(return_value=mock_user)
 
-    result = user_service.change_user_status(user_id=1, is_active=False)
+    with patch("app.services.userservice.bump_revocation_epoch") as mock_bump:
+        result = user_service.change_user_status(user_id=1, is_active=False)
 
     assert result is True
-    assert mock_user.is_active is False
-    mock_user.save.assert_called_once()
+    mock_user_model.update.assert_called_once_with(is_active=False)
+    mock_bump.assert_called_once_with(1)
     user_service.logger.info.assert_called_with("User 1 deactivated successfully.")
 
 
+def test_change_user_status_refuses_deleted_user(
+    user_service, mock_invalidate_identity, mock_user_model
+):
+    """Test that a deleted user's status is left alone."""
+    mock_user = MagicMock(is_active=False)
+    user_service._get_user_by_id = MagicMock(return_value=mock_user)
+    mock_user_model.update.return_value.where.return_value.execute.return_value = 0
+
+    result = user_service.change_user_status(user_id=1, is_active=True)
+
+    assert result is False
+    mock_invalidate_identity.assert_not_called()
+
+
 def test_change_user_status_user_not_found(user_service):
     """Test changing status when user is not found."""
     # Mock `_get_user_by_id` to simulate a missing user
@@ -48,20 +80,24 @@ def test_change_user_status_user_not_found(user_service):
         mock_abort.assert_called_once_with(404, description="User not found.")
 
 
-def test_change_user_status_with_token(user_service):
+def test_change_user_status_with_token(user_service, mock_user_model):
     """Test changing user status with token invalidation."""
     mock_user = MagicMock()
     user_service._get_user_by_id = MagicMock(return_value=mock_user)
 
-    with patch("app.services.userservice.blacklist_token") as mock_blacklist_token:
+    with patch(
+        "app.services.userservice.blacklist_token"
+    ) as mock_blacklist_token, patch(
+        "app.services.userservice.bump_revocation_epoch"
+    ) as mock_bump:
         result = user_service.change_user_status(
             user_id=1, is_active=False, token="test_token"
         )
 
         assert result is True
-        assert mock_user.is_active is False
-        mock_user.save.assert_called_once()
+        mock_user_model.update.assert_called_once_with(is_active=False)
         mock_blacklist_token.assert_called_once_with("test_token")
+        mock_bump.assert_called_once_with(1)
         user_service.logger.info.assert_any_call("JWT token invalidated for user 1.")
         user_service.logger.info.assert_any_call("User 1 deactivated successfully.")
 
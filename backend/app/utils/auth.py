@@ -1,3 +1,4 @@
+import secrets
 from datetime import datetime, timedelta, timezone
 from functools import wraps
 
@@ -5,7 +6,10 @@ import jwt
 from flask import current_app as app
 from flask import g, jsonify, request
 
-from ..utils.redis_helper import add_token_to_user, is_token_blacklisted
+from ..utils.identity import get_identity
+from ..utils.redis_helper import RedisUnavailableError, add_token_to_user
+from ..utils.revocation import current_revocation_epoch, is_token_revoked
+from ..utils.revocation_filter import is_token_blacklisted
 
 
 def generate_token(user_id):
@@ -13,25 +17,30 @@ def generate_token(user_id):
     Generates a JWT token for a user, adds it to Redis for tracking, and sets an expiry time.
 
     This method creates a JSON Web Token (JWT) containing the user ID, its expiration
-    time (set to 1 hour from the current time), and the issued-at time.
-    The token is then encoded with the application's secret key and "HS256" algorithm,
-    added to the Redis store with an expiry of one hour before being returned.
+    time (``JWT_EXPIRY_SECONDS`` from the current time, one hour by default), the
+    issued-at time, a random token ID (``jti``) and the user's current revocation
+    epoch (``rev``). The token is then encoded with the application's secret key and
+    "HS256" algorithm, and its ``jti`` is added to the user's token registry in
+    Redis with the same expiry before the token is returned.
 
     :param user_id: An identifier for the user for whom the token is being generated.
     :type user_id: str
     :return: A JWT token representing the user's session.
     :rtype: str
     """
+    expiry_seconds = app.config["JWT_EXPIRY_SECONDS"]
+    issued_at = datetime.now(timezone.utc)
     payload = {
         "user_id": user_id,
-        "exp": datetime.now(timezone.utc) + timedelta(hours=1),
-        "iat": datetime.now(timezone.utc),
+        "exp": issued_at + timedelta(seconds=expiry_seconds),
+        "iat": issued_at,
+        "jti": secrets.token_urlsafe(12),
+        "rev": current_revocation_epoch(user_id, fresh=True),
     }
     token = jwt.encode(payload, app.config["SECRET_KEY"], algorithm="HS256")
 
     # Add token to Redis
-    expiry_seconds = 3600  # 1 hour
-    add_token_to_user(user_id, token, expiry_seconds)
+    add_token_to_user(user_id, payload["jti"], expiry_seconds)
     return token
 
 
@@ -64,14 +73,20 @@ def jwt_required(f):
 
     This function wraps around an endpoint view function and ensures that an
     authorization header with a valid JWT token is included in the request.
-    The token is validated for format, expiration, potential blacklisting,
-    and decoding using the application's secret key. If the token passes all
-    checks, the user ID extracted from the token's payload is stored in the
-    global `g` context for downstream processing.
+    The token is validated for format, signature and expiration using the
+    application's secret key, then checked against the token blacklist through a
+    Bloom filter shared by the workers and against the user's revocation epoch,
+    which is served from an in-process cache, so the normal path makes no Redis
+    call. If the token passes all checks, the user ID and token ID (``jti``)
+    extracted from the token's payload are stored in the global `g` context for
+    downstream processing.
 
     The decorator handles error cases such as a missing or malformed header,
-    missing or blacklisted tokens, expired tokens, and invalid tokens,
-    and returns appropriate JSON responses with a 401 status.
+    missing or revoked tokens, expired tokens, and invalid tokens, including
+    tokens without a ``jti``, which could not be blacklisted on logout,
+    and returns appropriate JSON responses with a 401 status. If the revocation
+    state cannot be read because Redis is unavailable and the degraded policy
+    does not allow serving cached state, it responds with a 503 status.
 
     :param f: The endpoint function to be wrapped by the decorator.
     :returns: The decorated function with JWT enforcement applied.
@@ -97,9 +112,26 @@ def jwt_required(f):
             app.logger.error("JWT token is missing in request")
             return jsonify({"success": False, "message": "Token is missing"}), 401
 
+        # Sub-requests of a batch reuse the validation done for the batch itself
+        batch_auth = g.get("batch_auth")
+        if batch_auth and batch_auth[0] == token:
+            g.user_id, g.token_jti = batch_auth[1:]
+            return f(*args, **kwargs)
+
         try:
+            # Decode the JWT token
+            secret_key = app.config["SECRET_KEY"]
+            payload = jwt.decode(token, secret_key, algorithms=["HS256"])
+
+            # Tokens without an ID cannot be blacklisted, so logging out would
+            # not end them; their holders have to sign in again
+            jti = payload.get("jti")
+            if not jti:
+                app.logger.error("JWT token has no token ID")
+                return jsonify({"success": False, "message": "Invalid token"}), 401
+
             # Check if token is blacklisted
-            if is_token_blacklisted(token):
+            if is_token_blacklisted(jti):
                 app.logger.error("JWT token is blacklisted")
                 return (
                     jsonify(
@@ -111,10 +143,16 @@ def jwt_required(f):
                     401,
                 )
 
-            # Decode the JWT token
-            secret_key = app.config["SECRET_KEY"]
-            payload = jwt.decode(token, secret_key, algorithms=["HS256"])
+            # Reject tokens issued before the user's latest revocation
+            if is_token_revoked(payload):
+                app.logger.error("JWT token has been revoked")
+                return (
+                    jsonify({"success": False, "message": "Token has been revoked"}),
+                    401,
+                )
+
             g.user_id = payload["user_id"]
+            g.token_jti = jti
             app.logger.info(f"User ID {g.user_id} authenticated")
         except jwt.ExpiredSignatureError:
             app.logger.error("JWT token has expired")
@@ -122,7 +160,57 @@ def jwt_required(f):
         except jwt.InvalidTokenError as e:
             app.logger.error(f"JWT token is invalid: {str(e)}")
             return jsonify({"success": False, "message": "Invalid token"}), 401
+        except RedisUnavailableError as e:
+            app.logger.error(f"Token revocation state is unavailable: {e}")
+            return (
+                jsonify(
+                    {
+                        "success": False,
+                        "message": "Authentication is temporarily unavailable",
+                    }
+                ),
+                503,
+            )
+
+        return f(*args, **kwargs)
 
+    return decorated_function
+
+
+def optional_jwt(f):
+    """
+    A decorator for endpoints that anonymous clients may call too, but that
+    behave differently for a signed-in user.
+
+    If the request carries a bearer token that ``jwt_required`` would accept,
+    the user ID and token ID are stored in ``g`` as it does. A missing,
+    invalid, expired or revoked token, or one whose revocation state cannot be
+    read, leaves the request anonymous instead of rejecting it.
+
+    :param f: The endpoint function to be wrapped by the decorator.
+    :returns: The decorated function.
+    """
+
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        auth_header = request.headers.get("Authorization", "")
+        token = auth_header.replace("Bearer ", "")
+        if not auth_header.startswith("Bearer ") or not token:
+            return f(*args, **kwargs)
+
+        batch_auth = g.get("batch_auth")
+        if batch_auth and batch_auth[0] == token:
+            g.user_id, g.token_jti = batch_auth[1:]
+            return f(*args, **kwargs)
+
+        try:
+            payload = jwt.decode(token, app.config["SECRET_KEY"], algorithms=["HS256"])
+            jti = payload.get("jti")
+            if jti and not is_token_blacklisted(jti) and not is_token_revoked(payload):
+                g.user_id = payload["user_id"]
+                g.token_jti = jti
+        except (jwt.InvalidTokenError, RedisUnavailableError) as e:
+            app.logger.info(f"Treating request with unusable token as anonymous: {e}")
         return f(*args, **kwargs)
 
     return decorated_function
@@ -134,7 +222,8 @@ def admin_required(f):
     accessible only to users with admin privileges in the system. It performs
     the necessary checks to validate whether the request is coming from a logged-in
     user with administrative rights, and appropriately denies access or allows
-    the request to proceed.
+    the request to proceed. The check reads the user's cached identity record
+    (see ``get_identity``) rather than the database.
 
     :param f: The function to be decorated.
     :type f: Callable
@@ -154,25 +243,20 @@ def admin_required(f):
             return jsonify({"success": False, "message": "Unauthorized"}), 401
 
         # Check if the user is an admin
-        from ..models.data import User
-
-        user = User.get_or_none(User.id == g.user_id)
-        if not user:
+        identity = get_identity(g.user_id)
+        if not identity:
             return (
                 jsonify(
-                    {
-                        "success": False,
-                        "message": f"User {user.first_name} (id:{user.id}) not found!",
-                    }
+                    {"success": False, "message": f"User (id:{g.user_id}) not found!"}
                 ),
                 404,
             )
-        if not user.is_admin:
+        if not identity["is_admin"]:
             return (
                 jsonify(
                     {
                         "success": False,
-                        "message": f"Admin access required (user {user.first_name}, id: {user.id})",
+                        "message": f"Admin access required (user id: {g.user_id})",
                     }
                 ),
                 403,
@@ -185,20 +269,18 @@ def admin_required(f):
 def load_user():
     """
     Loads the current user based on the user_id stored in the global Flask object `g`.
-    This function interacts with the `UserService` to retrieve user data using the
-    `user_id`. If no user is found, it returns a JSON response indicating the
-    failure and an HTTP 404 status code. If the user is successfully loaded, it is
-    stored in the `g` object for further use within the request lifecycle.
+    This function retrieves the user's cached identity record (``id``, ``role``,
+    ``is_admin`` and ``is_active``) using the `user_id`. If no user is found, it
+    returns a JSON response indicating the failure and an HTTP 404 status code. If
+    the user is successfully loaded, it is stored in the `g` object for further use
+    within the request lifecycle.
 
     :return: A tuple containing a JSON response and an HTTP status code if the user
         is not found, otherwise no value is returned
     :rtype: tuple | None
     """
-    from ..services.userservice import UserService
-
-    user_service = UserService(app.logger)
     if hasattr(g, "user_id"):
-        user = user_service.fetch_user_data(g.user_id)
+        user = get_identity(g.user_id)
         if not user:
             return jsonify({"success": False, "message": "User not found"}), 404
         g.user = user
@@ -0,0 +1,281 @@
+import json
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from datetime import date, datetime
+
+from flask import current_app as app
+
+from . import redis_helper
+from .db import after_commit, in_batch_transaction
+
+KEY_PREFIX = "cache"
+
+
+class _Flight:
+    """
+    A load in progress that other threads asking for the same key wait for.
+    """
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.ok = False
+        self.value = None
+
+
+class GenerationalCache:
+    """
+    Read-through cache for query results, with an in-process tier in front of
+    Redis.
+
+    Entries belong to a namespace, such as all forum listings or everything
+    shown for one post. Each namespace has a generation number in Redis that
+    is part of every entry's key, so ``bump`` invalidates the whole namespace
+    at once: later reads use keys no entry has been stored under and the old
+    entries simply expire. A process trusts the generation it last read for
+    ``generation_ttl`` seconds, which bounds how long another process' bump
+    can go unnoticed; the process that bumps sees its own bump immediately.
+
+    On a miss only one caller loads the value. Threads of one process wait for
+    the thread already loading it, and other processes wait, for up to
+    ``lock_timeout`` seconds, for the process holding a short Redis lock on
+    the key. Loaders that return None are not cached.
+
+    Values are stored as JSON; datetimes and dates are tagged so they come
+    back as the same types. If Redis is unavailable, values are loaded on
+    every call. So are values read by a batch sub-request, which may see the
+    batch's uncommitted writes, and its bumps wait for the batch to commit.
+
+    :ivar name: Name of the cache, part of every Redis key.
+    :type name: str
+    :ivar ttl: Seconds an entry lives in Redis and in process.
+    :type ttl: int
+    :ivar maxsize: Entries kept in process.
+    :type maxsize: int
+    :ivar generation_ttl: Seconds a process trusts a namespace generation.
+    :type generation_ttl: float
+    :ivar lock_timeout: Seconds a caller waits for another one's load.
+    :type lock_timeout: float
+    """
+
+    def __init__(
+        self, app, name, ttl=300, maxsize=1000, generation_ttl=1.0, lock_timeout=2.0
+    ):
+        self.app = app
+        self.name = name
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.generation_ttl = generation_ttl
+        self.lock_timeout = lock_timeout
+        self._entries = OrderedDict()
+        self._generations = {}
+        self._flights = {}
+        self._lock = threading.Lock()
+
+    def get_or_load(self, namespace, key, loader):
+        """
+        Returns the cached value for a key, loading and caching it on a miss.
+
+        :param namespace: The namespace the entry belongs to.
+        :type namespace: str
+        :param key: The entry's key within the namespace.
+        :type key: str
+        :param loader: Computes the value on a miss.
+        :type loader: Callable[[], Any]
+        :return: The cached or loaded value.
+        """
+        if in_batch_transaction():
+            return loader()
+        try:
+            generation = self._generation(namespace)
+        except redis_helper.RedisUnavailableError as e:
+            self.app.logger.warning(f"Cache {self.name} unavailable: {e}")
+            return loader()
+
+        full_key = f"{KEY_PREFIX}:{self.name}:{namespace}:{generation}:{key}"
+        with self._lock:
+            entry = self._entries.get(full_key)
+            if entry is not None and time.monotonic() - entry[1] < self.ttl:
+                self._entries.move_to_end(full_key)
+                return entry[0]
+        return self._load_once(full_key, loader)
+
+    def bump(self, namespace):
+        """
+        Invalidates every entry of a namespace.
+
+        :param namespace: The namespace to invalidate.
+        :type namespace: str
+        """
+        after_commit(self._bump, namespace)
+
+    def _bump(self, namespace):
+        redis_client = redis_helper.get_redis_client()
+        try:
+            generation = int(
+                redis_helper.call_redis(
+                    redis_client.incr, self._generation_key(namespace)
+                )
+            )
+        except redis_helper.RedisUnavailableError as e:
+            # Entries cached before the outage may be served until they expire
+            self.app.logger.error(f"Failed to invalidate {self.name}:{namespace}: {e}")
+            with self._lock:
+                self._generations.pop(namespace, None)
+            return
+        with self._lock:
+            self._generations[namespace] = (generation, time.monotonic())
+
+    def _generation_key(self, namespace):
+        return f"{KEY_PREFIX}:{self.name}:gen:{namespace}"
+
+    def _generation(self, namespace):
+        with self._lock:
+            entry = self._generations.get(namespace)
+            if entry is not None and time.monotonic() - entry[1] < self.generation_ttl:
+                return entry[0]
+        redis_client = redis_helper.get_redis_client()
+        generation = int(
+            redis_helper.call_redis(redis_client.get, self._generation_key(namespace))
+            or 0
+        )
+        with self._lock:
+            self._generations[namespace] = (generation, time.monotonic())
+        return generation
+
+    def _load_once(self, full_key, loader):
+        with self._lock:
+            flight = self._flights.get(full_key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[full_key] = _Flight()
+        if not leader:
+            flight.done.wait(self.lock_timeout)
+            return flight.value if flight.ok else loader()
+
+        try:
+            flight.value = self._load_shared(full_key, loader)
+            flight.ok = True
+            return flight.value
+        finally:
+            with self._lock:
+                self._flights.pop(full_key, None)
+            flight.done.set()
+
+    def _load_shared(self, full_key, loader):
+        """
+        Reads an entry from Redis or, holding the key's lock, loads and stores
+        it. Callers that find the lock taken poll for the entry instead.
+        """
+        redis_client = redis_helper.get_redis_client()
+        lock_key = f"{full_key}:lock"
+        token = secrets.token_hex(8)
+        deadline = time.monotonic() + self.lock_timeout
+        try:
+            while True:
+                cached = redis_helper.call_redis(redis_client.get, full_key)
+                if cached is not None:
+                    value = _loads(cached)
+                    self._store(full_key, value)
+                    return value
+                if redis_helper.call_redis(
+                    redis_client.set,
+                    lock_key,
+                    token,
+                    nx=True,
+                    px=int(self.lock_timeout * 1000),
+                ):
+                    break
+                if time.monotonic() >= deadline:
+                    return loader()
+                time.sleep(0.025)
+        except redis_helper.RedisUnavailableError as e:
+            self.app.logger.warning(f"Cache {self.name} unavailable: {e}")
+            return loader()
+
+        try:
+            value = loader()
+            if value is not None:
+                self._store(full_key, value)
+                try:
+                    redis_helper.call_redis(
+                        redis_client.setex, full_key, self.ttl, _dumps(value)
+                    )
+                except redis_helper.RedisUnavailableError as e:
+                    self.app.logger.warning(f"Failed to cache {full_key}: {e}")
+            return value
+        finally:
+            try:
+                if (
+                    redis_helper.call_redis(redis_client.get, lock_key)
+                    == token.encode()
+                ):
+                    redis_helper.call_redis(redis_client.delete, lock_key)
+            except redis_helper.RedisUnavailableError:
+                pass
+
+    def _store(self, full_key, value):
+        with self._lock:
+            self._entries[full_key] = (value, time.monotonic())
+            self._entries.move_to_end(full_key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+
+def _encode(value):
+    if isinstance(value, datetime):
+        return {"__datetime__": value.isoformat()}
+    if isinstance(value, date):
+        return {"__date__": value.isoformat()}
+    raise TypeError(f"Cannot cache a value of type {type(value).__name__}")
+
+
+def _decode(obj):
+    if "__datetime__" in obj:
+        return datetime.fromisoformat(obj["__datetime__"])
+    if "__date__" in obj:
+        return date.fromisoformat(obj["__date__"])
+    return obj
+
+
+def _dumps(value):
+    return json.dumps(value, default=_encode)
+
+
+def _loads(data):
+    return json.loads(data, object_hook=_decode)
+
+
+def init_caches(app):
+    """
+    Creates the application's query caches and stores them by name in
+    ``app.extensions["caches"]``.
+
+    :param app: The Flask application.
+    :type app: flask.Flask
+    :return: The caches by name.
+    :rtype: dict[str, GenerationalCache]
+    """
+    caches = {
+        "forum": GenerationalCache(
+            app,
+            "forum",
+            ttl=app.config["FORUM_CACHE_TTL"],
+            maxsize=app.config["FORUM_CACHE_SIZE"],
+            generation_ttl=app.config["CACHE_GENERATION_TTL"],
+        ),
+    }
+    app.extensions["caches"] = caches
+    return caches
+
+
+def get_cache(name):
+    """
+    Returns one of the current application's query caches.
+
+    :param name: The cache's name.
+    :type name: str
+    :rtype: GenerationalCache
+    """
+    return app.extensions["caches"][name]
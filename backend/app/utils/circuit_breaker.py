@@ -0,0 +1,161 @@
+import threading
+import time
+
+
+class CircuitOpenError(Exception):
+    """
+    Raised instead of calling a dependency whose circuit breaker is open.
+    """
+
+
+class CircuitBreaker:
+    """
+    Stops calling a failing dependency so requests fail fast instead of each
+    waiting for its timeout.
+
+    The breaker starts ``closed`` and counts consecutive failures. Once
+    ``failure_threshold`` is reached it opens and every call is rejected with
+    ``CircuitOpenError`` for ``reset_timeout`` seconds. It then lets a single
+    trial call through (``half_open``): success closes the breaker, failure
+    opens it again.
+
+    :ivar name: Name of the protected dependency, used in errors and metrics.
+    :type name: str
+    :ivar failure_threshold: Consecutive failures that open the breaker.
+    :type failure_threshold: int
+    :ivar reset_timeout: Seconds the breaker stays open before a trial call.
+    :type reset_timeout: float
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(
+        self, name, failure_threshold=5, reset_timeout=10.0, exceptions=(Exception,)
+    ):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.exceptions = exceptions
+        self._state = self.CLOSED
+        self._consecutive_failures = 0
+        self._opened_at = None
+        self._failing_since = None
+        self._trial_in_flight = False
+        self._total_failures = 0
+        self._total_rejected = 0
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        """
+        The current state; an open breaker whose timeout has elapsed reports
+        ``half_open``.
+
+        :rtype: str
+        """
+        with self._lock:
+            return self._current_state()
+
+    def call(self, func, *args, **kwargs):
+        """
+        Calls ``func`` through the breaker.
+
+        :param func: The call to protect.
+        :type func: Callable
+        :return: Whatever ``func`` returns.
+        :raises CircuitOpenError: If the breaker is open.
+        """
+        self._before_call()
+        try:
+            result = func(*args, **kwargs)
+        except self.exceptions:
+            self._record_failure()
+            raise
+        except BaseException:
+            self._release_trial()
+            raise
+        self._record_success()
+        return result
+
+    def outage_seconds(self):
+        """
+        Returns how long calls have been failing without a success in between.
+
+        :return: Seconds since the first failure of the current outage, or None
+            if the last call succeeded.
+        :rtype: float or None
+        """
+        with self._lock:
+            if self._failing_since is None:
+                return None
+            return time.monotonic() - self._failing_since
+
+    def snapshot(self):
+        """
+        Returns the breaker's state and counters for metrics.
+
+        :rtype: dict
+        """
+        with self._lock:
+            now = time.monotonic()
+            return {
+                "name": self.name,
+                "state": self._current_state(),
+                "consecutive_failures": self._consecutive_failures,
+                "total_failures": self._total_failures,
+                "total_rejected": self._total_rejected,
+                "open_for_seconds": (
+                    None if self._opened_at is None else now - self._opened_at
+                ),
+                "outage_seconds": (
+                    None if self._failing_since is None else now - self._failing_since
+                ),
+            }
+
+    def _current_state(self):
+        if (
+            self._state == self.OPEN
+            and time.monotonic() - self._opened_at >= self.reset_timeout
+        ):
+            return self.HALF_OPEN
+        return self._state
+
+    def _before_call(self):
+        with self._lock:
+            state = self._current_state()
+            if state == self.CLOSED:
+                return
+            if state == self.HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return
+            self._total_rejected += 1
+        raise CircuitOpenError(f"Circuit breaker for {self.name} is open")
+
+    def _record_success(self):
+        with self._lock:
+            self._state = self.CLOSED
+            self._consecutive_failures = 0
+            self._opened_at = None
+            self._failing_since = None
+            self._trial_in_flight = False
+
+    def _record_failure(self):
+        with self._lock:
+            now = time.monotonic()
+            self._consecutive_failures += 1
+            self._total_failures += 1
+            if self._failing_since is None:
+                self._failing_since = now
+            if (
+                self._trial_in_flight
+                or self._consecutive_failures >= self.failure_threshold
+            ):
+                self._state = self.OPEN
+                self._opened_at = now
+            self._trial_in_flight = False
+
+    def _release_trial(self):
+        with self._lock:
+            self._trial_in_flight = False
@@ -1,11 +1,43 @@
 import inspect
+from functools import partial
 
+from flask import g, has_app_context
 from peewee import MySQLDatabase, Proxy, SqliteDatabase
 
 # Create a database proxy to allow initialization later
 database_proxy = Proxy()
 
 
+def in_batch_transaction():
+    """
+    Tells whether the current request is a sub-request of a batch, whose
+    writes stay uncommitted, and may still be rolled back, until the whole
+    batch has run.
+
+    :rtype: bool
+    """
+    return has_app_context() and g.get("commit_hooks") is not None
+
+
+def after_commit(callback, *args, **kwargs):
+    """
+    Runs a side effect of a write that the database transaction cannot undo,
+    such as a Redis update or a published event, once the write is committed.
+
+    Services commit their writes before calling this, so the callback normally
+    runs at once. In a batch sub-request it is queued in ``g.commit_hooks``
+    instead and run after the batch commits, or dropped if it rolls back.
+
+    :param callback: The side effect.
+    :type callback: Callable
+    :return: The callback's result, or None if it was queued.
+    """
+    if not in_batch_transaction():
+        return callback(*args, **kwargs)
+    g.commit_hooks.append(partial(callback, *args, **kwargs))
+    return None
+
+
 def initialize_database(app):
     """
     Initializes the application's database connection and schema.
@@ -43,7 +75,8 @@ def initialize_database(app):
         app.logger.info("Connecting to the database...")
         with database_proxy:
             # Dynamically detect all models in data.py and sync tables
-            from peewee import CharField, DateTimeField, Model
+            from peewee import (CharField, DateTimeField, IntegerField, Model,
+                                sort_models)
             from playhouse.migrate import (MySQLMigrator, SqliteMigrator,
                                            migrate)
 
@@ -61,8 +94,15 @@ def initialize_database(app):
             app.logger.info(
                 f"Found {len(database_models)} models to sync: {[model.__name__ for model in database_models]}"
             )
-            # Ensure tables exist
-            database_proxy.create_tables(database_models, safe=True)
+            # Ensure tables exist. Indexes of existing tables are created after
+            # the migrations below: SQLite would otherwise index a column that
+            # is yet to be added as a string literal and corrupt the table
+            # when it is
+            existing_tables = set(db.get_tables())
+            for model in sort_models(database_models):
+                model._schema.create_table(safe=True)
+                if model._meta.table_name not in existing_tables:
+                    model._schema.create_indexes(safe=True)
 
             # Perform schema migrations if necessary
             app.logger.info("Checking for missing columns...")
@@ -106,6 +146,14 @@ def initialize_database(app):
                         migrator.add_column("theses", "degree", CharField(null=True))
                     )
 
+                if "version" not in existing_column_names:
+                    app.logger.info("Adding missing column: version")
+                    migrations.append(
+                        migrator.add_column(
+                            "theses", "version", IntegerField(default=0)
+                        )
+                    )
+
                 existing_columns_signature = db.get_columns("signature_pages")
                 existing_columns_signature_name = {
                     col.name for col in existing_columns_signature
@@ -119,12 +167,108 @@ def initialize_database(app):
                         )
                     )
 
+                session_log_indexes = db.get_indexes("session_log")
+                if not any(
+                    index.columns == ["login_time"] for index in session_log_indexes
+                ):
+                    app.logger.info("Adding missing index: session_log.login_time")
+                    migrations.append(
+                        migrator.add_index("session_log", ("login_time",), False)
+                    )
+
+                existing_columns_posts = {col.name for col in db.get_columns("posts")}
+                backfill_post_activity = False
+                if "comment_count" not in existing_columns_posts:
+                    app.logger.info("Adding missing column: comment_count")
+                    migrations.append(
+                        migrator.add_column(
+                            "posts", "comment_count", IntegerField(default=0)
+                        )
+                    )
+                    backfill_post_activity = True
+
+                if "last_activity_at" not in existing_columns_posts:
+                    app.logger.info("Adding missing column: last_activity_at")
+                    migrations.append(
+                        migrator.add_column(
+                            "posts", "last_activity_at", DateTimeField(null=True)
+                        )
+                    )
+                    migrations.append(
+                        migrator.add_index("posts", ("last_activity_at",), False)
+                    )
+                    backfill_post_activity = True
+
+                if "deleted_at" not in existing_columns_posts:
+                    app.logger.info("Adding missing column: posts.deleted_at")
+                    migrations.append(
+                        migrator.add_column(
+                            "posts", "deleted_at", DateTimeField(null=True)
+                        )
+                    )
+
+                if "deleted_at" not in {col.name for col in db.get_columns("users")}:
+                    app.logger.info("Adding missing column: users.deleted_at")
+                    migrations.append(
+                        migrator.add_column(
+                            "users", "deleted_at", DateTimeField(null=True)
+                        )
+                    )
+
+                if "view_count" not in existing_columns_posts:
+                    app.logger.info("Adding missing columns: post view counts")
+                    migrations.extend(
+                        [
+                            migrator.add_column(
+                                "posts", "view_count", IntegerField(default=0)
+                            ),
+                            migrator.add_column(
+                                "posts", "unique_viewers", IntegerField(default=0)
+                            ),
+                        ]
+                    )
+
+                existing_columns_comments = {
+                    col.name for col in db.get_columns("post_comments")
+                }
+                backfill_comment_paths = False
+                if "path" not in existing_columns_comments:
+                    app.logger.info("Adding missing columns: comment threading")
+                    migrations.extend(
+                        [
+                            migrator.add_column(
+                                "post_comments", "parent_id", IntegerField(null=True)
+                            ),
+                            migrator.add_column(
+                                "post_comments",
+                                "path",
+                                CharField(max_length=255, default=""),
+                            ),
+                            migrator.add_column(
+                                "post_comments", "depth", IntegerField(default=0)
+                            ),
+                            migrator.add_column(
+                                "post_comments", "reply_count", IntegerField(default=0)
+                            ),
+                        ]
+                    )
+                    backfill_comment_paths = True
+
                 if migrations:
                     migrate(*migrations)
+                    if backfill_post_activity:
+                        _backfill_post_activity(app)
+                    if backfill_comment_paths:
+                        _backfill_comment_paths(app)
                     app.logger.info("Schema migration completed successfully.")
                 else:
                     app.logger.info("No schema changes detected.")
 
+                # Create the indexes declared on the models, including those
+                # on columns the migrations just added
+                for model in database_models:
+                    model._schema.create_indexes(safe=True)
+
         app.logger.info("Database initialization complete.")
     except Exception as e:
         app.logger.error(f"Database initialization failed: {e}")
@@ -133,6 +277,47 @@ def initialize_database(app):
     return db
 
 
+def _backfill_post_activity(app):
+    """
+    Fills in the comment counts and last activity times of posts that existed
+    before those columns were added.
+    """
+    from peewee import fn
+
+    from ..models.data import PostComment, Posts
+
+    with database_proxy.atomic():
+        updated = Posts.update(
+            comment_count=(
+                PostComment.select(fn.COUNT(PostComment.id)).where(
+                    PostComment.post == Posts.id
+                )
+            ),
+            last_activity_at=fn.COALESCE(
+                PostComment.select(fn.MAX(PostComment.created_at)).where(
+                    PostComment.post == Posts.id
+                ),
+                Posts.created_at,
+            ),
+        ).execute()
+    app.logger.info(f"Backfilled comment counts and activity of {updated} posts.")
+
+
+def _backfill_comment_paths(app):
+    """
+    Makes every comment that existed before threading a top-level comment.
+    """
+    from ..models.data import PostComment
+
+    comment_ids = [row[0] for row in PostComment.select(PostComment.id).tuples()]
+    with database_proxy.atomic():
+        for comment_id in comment_ids:
+            PostComment.update(path=PostComment.path_segment(comment_id)).where(
+                PostComment.id == comment_id
+            ).execute()
+    app.logger.info(f"Backfilled thread paths of {len(comment_ids)} comments.")
+
+
 def drop_tables(conn_info):
     """
     Drops existing database tables dynamically by retrieving model definitions
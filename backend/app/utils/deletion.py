@@ -0,0 +1,437 @@
+import os
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+from flask import current_app as app
+
+from .db import database_proxy
+
+
+class DeletionEngine:
+    """
+    Purges soft-deleted posts and users in bounded chunks.
+
+    Deleting a post or a user only marks its row deleted, which hides it at
+    once, and schedules a ``DeletionJob`` in the same transaction. The engine
+    then removes everything that belongs to it one step at a time: for a post,
+    its comments, the notifications about it and then the post; for a user,
+    their comments on other posts with the replies below them, the comments
+    and notifications on their posts, their posts,
+    every section of their theses, the theses, the rest of their rows and
+    finally the user. Each chunk deletes at most ``chunk_size`` rows, newest
+    first so replies go before the comments they answer, and records the
+    job's step and purged row count in its own transaction. Every transaction
+    is short and locks only the rows it deletes, no request waits for the
+    purge, and a job interrupted by a crash resumes after its last committed
+    chunk. The engine pauses ``chunk_pause`` seconds between chunks so a large
+    purge leaves room for other writes.
+
+    A worker claims a job by marking it running. Another worker takes over a
+    running job only when it has made no progress for ``lease_seconds``. A
+    failed chunk is retried on the next pass; after ``max_attempts`` failures
+    the job is marked failed and keeps its error.
+
+    :ivar chunk_size: Rows deleted per transaction.
+    :type chunk_size: int
+    :ivar chunk_pause: Seconds to wait between chunks.
+    :type chunk_pause: float
+    :ivar interval: Seconds between passes of the background worker.
+    :type interval: float
+    :ivar lease_seconds: Seconds after which a running job without progress
+        may be taken over.
+    :type lease_seconds: float
+    :ivar max_attempts: Failures after which a job is given up.
+    :type max_attempts: int
+    :ivar background: Whether the worker thread is started. Without it, jobs
+        wait until ``run_pending`` is called.
+    :type background: bool
+    """
+
+    def __init__(
+        self,
+        app,
+        chunk_size=500,
+        chunk_pause=0.05,
+        interval=5,
+        lease_seconds=300,
+        max_attempts=5,
+        background=True,
+    ):
+        self.app = app
+        self.chunk_size = chunk_size
+        self.chunk_pause = chunk_pause
+        self.interval = interval
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.background = background
+        self._lock = threading.Lock()
+        self._worker = None
+        self._worker_pid = None
+
+    def schedule(self, entity, entity_id):
+        """
+        Schedules the purge of a soft-deleted post or user. Call it in the
+        transaction that marks the entity deleted. A failed purge of the same
+        entity is started over.
+
+        :param entity: ``post`` or ``user``.
+        :type entity: str
+        :param entity_id: The ID of the post or user.
+        :type entity_id: int
+        :return: The job.
+        :rtype: DeletionJob
+        :raises ValueError: If ``entity`` is not a purgeable entity.
+        """
+        from ..models.data import DeletionJob
+
+        if entity not in ("post", "user"):
+            raise ValueError(f"Cannot purge {entity} entities.")
+        now = datetime.now(timezone.utc)
+        job = DeletionJob.get_or_none(
+            (DeletionJob.entity == entity) & (DeletionJob.entity_id == entity_id)
+        )
+        if job is None:
+            job = DeletionJob.create(
+                entity=entity, entity_id=entity_id, created_at=now, updated_at=now
+            )
+        elif job.status == "failed":
+            job.status = "pending"
+            job.attempts = 0
+            job.error = None
+            job.updated_at = now
+            job.save()
+        self._ensure_worker()
+        return job
+
+    def progress(self, job_id):
+        """
+        Returns a job's progress.
+
+        :param job_id: The job.
+        :type job_id: int
+        :return: The job's columns, or None if there is no such job.
+        :rtype: dict | None
+        """
+        from ..models.data import DeletionJob
+
+        return (
+            DeletionJob.select().where(DeletionJob.id == job_id).dicts().get_or_none()
+        )
+
+    def run_pending(self):
+        """
+        Purges every job that is pending or whose lease has expired, in the
+        calling thread. Each job is tried at most once per call.
+
+        :return: The number of jobs completed.
+        :rtype: int
+        """
+        completed = 0
+        tried = set()
+        while True:
+            job = self._claim(tried)
+            if job is None:
+                return completed
+            tried.add(job.id)
+            if self._purge(job):
+                completed += 1
+
+    def _claim(self, tried):
+        from ..models.data import DeletionJob
+
+        now = datetime.now(timezone.utc)
+        expired = now - timedelta(seconds=self.lease_seconds)
+        candidates = (
+            DeletionJob.select()
+            .where(
+                (DeletionJob.status == "pending")
+                | (
+                    (DeletionJob.status == "running")
+                    & (DeletionJob.updated_at < expired)
+                )
+            )
+            .order_by(DeletionJob.id)
+        )
+        if tried:
+            candidates = candidates.where(DeletionJob.id.not_in(list(tried)))
+        for job in candidates.limit(10):
+            # Only one worker updates the job from the state it read
+            claimed = (
+                DeletionJob.update(status="running", updated_at=now)
+                .where(
+                    (DeletionJob.id == job.id)
+                    & (DeletionJob.status == job.status)
+                    & (DeletionJob.updated_at == job.updated_at)
+                )
+                .execute()
+            )
+            if claimed:
+                job.status = "running"
+                return job
+        return None
+
+    def _purge(self, job):
+        """
+        Runs a claimed job's remaining steps.
+
+        :return: True if the job completed.
+        """
+        from ..models.data import DeletionJob
+
+        steps = self._steps(job)
+        names = [name for name, _ in steps]
+        start = names.index(job.step) if job.step in names else 0
+        for name, delete_chunk in steps[start:]:
+            while True:
+                try:
+                    with database_proxy.atomic():
+                        purged = delete_chunk(self.chunk_size)
+                        DeletionJob.update(
+                            step=name,
+                            purged_rows=DeletionJob.purged_rows + purged,
+                            updated_at=datetime.now(timezone.utc),
+                        ).where(DeletionJob.id == job.id).execute()
+                except Exception as e:
+                    self._fail(job, e)
+                    return False
+                if not purged:
+                    break
+                if self.chunk_pause:
+                    time.sleep(self.chunk_pause)
+
+        now = datetime.now(timezone.utc)
+        DeletionJob.update(
+            status="done", error=None, updated_at=now, finished_at=now
+        ).where(DeletionJob.id == job.id).execute()
+        self.app.logger.info(f"Purged {job.entity} {job.entity_id}.")
+        return True
+
+    def _fail(self, job, error):
+        from ..models.data import DeletionJob
+
+        attempts = job.attempts + 1
+        status = "failed" if attempts >= self.max_attempts else "pending"
+        DeletionJob.update(
+            status=status,
+            attempts=attempts,
+            error=str(error),
+            updated_at=datetime.now(timezone.utc),
+        ).where(DeletionJob.id == job.id).execute()
+        self.app.logger.error(
+            f"Failed to purge {job.entity} {job.entity_id} "
+            f"(attempt {attempts}): {error}"
+        )
+
+    def _steps(self, job):
+        """
+        Returns the named steps of a job in order. Each step deletes up to a
+        given number of rows and returns how many it deleted; a step is
+        finished when it deletes none.
+        """
+        from ..models.data import Notification, PostComment, Posts, Thesis, User
+
+        if job.entity == "post":
+            return [
+                ("comments", _rows(PostComment, PostComment.post == job.entity_id)),
+                (
+                    "notifications",
+                    _rows(Notification, Notification.post_id == job.entity_id),
+                ),
+                ("post", _rows(Posts, Posts.id == job.entity_id, _forget_posts)),
+            ]
+
+        user_id = job.entity_id
+        user_posts = Posts.select(Posts.id).where(Posts.user == user_id)
+        user_theses = Thesis.select(Thesis.id).where(Thesis.student == user_id)
+        steps = [
+            ("comment_threads", self._comment_threads(user_id)),
+            ("post_comments", _rows(PostComment, PostComment.post.in_(user_posts))),
+            (
+                "post_notifications",
+                _rows(Notification, Notification.post_id.in_(user_posts)),
+            ),
+            ("posts", _rows(Posts, Posts.user == user_id, _forget_posts)),
+        ]
+        # Tables added later are purged without changing this plan
+        for model, fields in _references(Thesis):
+            for field in fields:
+                steps.append(
+                    (
+                        f"{model._meta.table_name}.{field.name}",
+                        _rows(model, field.in_(user_theses)),
+                    )
+                )
+        steps.append(
+            ("theses", _rows(Thesis, Thesis.student == user_id, _forget_theses))
+        )
+        for model, fields in _references(User):
+            if model in (Posts, PostComment, Thesis):
+                continue
+            for field in fields:
+                steps.append(
+                    (
+                        f"{model._meta.table_name}.{field.name}",
+                        _rows(model, field == user_id),
+                    )
+                )
+        steps.append(("user", _rows(User, User.id == user_id)))
+        return steps
+
+    def _comment_threads(self, user_id):
+        """
+        Deletes the user's comments on other users' posts one thread at a
+        time, through the forum service so replies, counts and the search
+        index stay consistent.
+        """
+        from ..models.data import PostComment, Posts
+        from ..services.forumservice import ForumService
+
+        def delete_chunk(limit):
+            comments = list(
+                PostComment.select(
+                    PostComment.id, PostComment.post, PostComment.reply_count
+                )
+                .join(Posts, on=(PostComment.post == Posts.id))
+                .where((PostComment.user == user_id) & (Posts.user != user_id))
+                .order_by(PostComment.depth, PostComment.id)
+                .limit(limit)
+            )
+            service = ForumService(self.app.logger)
+            purged = 0
+            for comment in comments:
+                # An earlier thread of this chunk may have contained it
+                if not PostComment.get_or_none(PostComment.id == comment.id):
+                    continue
+                if not service.delete_comment(comment.post_id, comment.id, user_id):
+                    raise RuntimeError(f"Could not delete comment {comment.id}.")
+                purged += 1 + comment.reply_count
+                if purged >= limit:
+                    break
+            return purged
+
+        return delete_chunk
+
+    def _ensure_worker(self):
+        """
+        Starts the worker thread for this process, including in a worker
+        forked from a parent that started one.
+        """
+        if not self.background:
+            return
+        pid = os.getpid()
+        if self._worker_pid == pid and self._worker.is_alive():
+            return
+        with self._lock:
+            if self._worker_pid == pid and self._worker.is_alive():
+                return
+            self._worker = threading.Thread(
+                target=self._run, name="deletion-worker", daemon=True
+            )
+            self._worker_pid = pid
+            self._worker.start()
+
+    def _run(self):
+        with self.app.app_context():
+            while True:
+                try:
+                    self.run_pending()
+                except Exception as e:
+                    self.app.logger.error(f"Failed to purge deleted entities: {e}")
+                time.sleep(self.interval)
+
+
+def _rows(model, condition, after=None):
+    """
+    Returns a step deleting rows of ``model`` matching ``condition``, newest
+    first. The IDs are read first because MySQL does not allow ``LIMIT`` in a
+    subquery of ``DELETE``.
+
+    :param after: Called with the IDs of every deleted chunk, in its
+        transaction.
+    """
+
+    def delete_chunk(limit):
+        primary_key = model._meta.primary_key
+        ids = [
+            row[0]
+            for row in model.select(primary_key)
+            .where(condition)
+            .order_by(primary_key.desc())
+            .limit(limit)
+            .tuples()
+        ]
+        if ids:
+            model.delete().where(primary_key.in_(ids)).execute()
+            if after:
+                after(ids)
+        return len(ids)
+
+    return delete_chunk
+
+
+def _references(model):
+    """
+    Returns the models with foreign keys to ``model`` and those keys, ordered
+    by table name.
+    """
+    return sorted(
+        model._meta.model_backrefs.items(), key=lambda item: item[0]._meta.table_name
+    )
+
+
+def _forget_posts(post_ids):
+    from ..services.forumservice import ForumService
+    from .cache import get_cache
+    from .forum_search import get_forum_search
+    from .hot_posts import get_hot_ranking
+    from .post_views import get_post_views
+
+    for post_id in post_ids:
+        get_forum_search().remove_post(post_id)
+        get_hot_ranking().remove(post_id)
+        get_post_views().forget(post_id)
+        get_cache("forum").bump(ForumService.POST_NAMESPACE.format(post_id=post_id))
+
+
+def _forget_theses(thesis_ids):
+    from .ownership import forget_thesis
+    from .thesis_search import remove_thesis_sections
+
+    for thesis_id in thesis_ids:
+        forget_thesis(thesis_id)
+        remove_thesis_sections(thesis_id)
+
+
+def init_deletions(app):
+    """
+    Creates the application's deletion engine and stores it in
+    ``app.extensions["deletions"]``.
+
+    :param app: The Flask application.
+    :type app: flask.Flask
+    :return: The deletion engine.
+    :rtype: DeletionEngine
+    """
+    engine = DeletionEngine(
+        app,
+        chunk_size=app.config["DELETION_CHUNK_SIZE"],
+        chunk_pause=app.config["DELETION_CHUNK_PAUSE"],
+        interval=app.config["DELETION_INTERVAL"],
+        lease_seconds=app.config["DELETION_LEASE_SECONDS"],
+        max_attempts=app.config["DELETION_MAX_ATTEMPTS"],
+        background=app.config["DELETION_BACKGROUND"],
+    )
+    app.extensions["deletions"] = engine
+    # Resume jobs left unfinished by a previous run
+    engine._ensure_worker()
+    return engine
+
+
+def get_deletions():
+    """
+    Returns the current application's deletion engine.
+
+    :rtype: DeletionEngine
+    """
+    return app.extensions["deletions"]
@@ -0,0 +1,339 @@
+import json
+import os
+import queue
+import threading
+import time
+
+from flask import current_app as app
+
+from . import redis_helper
+from .db import after_commit
+
+STREAM_KEY = "forum:events"
+EVENTS_CHANNEL = "forum:events"
+
+# Comment line sent on idle streams so proxies do not close them.
+HEARTBEAT = ": keep-alive\n\n"
+
+# Milliseconds a client waits before reconnecting a dropped stream.
+RECONNECT_DELAY = 3000
+
+
+class _Connection:
+    """
+    One open event stream: the events waiting to be sent to it and the post it
+    is limited to, if any.
+    """
+
+    def __init__(self, post_id, queue_size):
+        self.post_id = post_id
+        self.events = queue.Queue(maxsize=queue_size)
+        self.overflowed = False
+
+    def wants(self, event):
+        if self.post_id is None or event["event"] == "reset":
+            return True
+        return event["data"].get("post_id") == self.post_id
+
+
+class ForumEventHub:
+    """
+    Fans new posts and comments out to clients as Server-Sent Events.
+
+    Every event is appended to a Redis stream, which gives it an ID and keeps
+    the latest ``stream_length`` events for resuming, and then published on
+    ``EVENTS_CHANNEL``. One background thread per process subscribes to the
+    channel and copies each event into the queue of every open connection on
+    that process, so a write on any worker or node reaches every client.
+
+    A client reconnecting with the ``Last-Event-ID`` of the last event it saw
+    is first sent the events it missed from the stream. If they have already
+    been trimmed it gets a ``reset`` event and should reload what it shows.
+
+    Each connection buffers at most ``queue_size`` events. A client that falls
+    further behind is sent what was buffered and then disconnected; it resumes
+    from the stream when it reconnects, so slow clients cost a bounded amount
+    of memory and never hold up others. Idle connections get a comment every
+    ``heartbeat`` seconds. Every stream ends after ``max_age`` seconds, so a
+    connection does not hold a server worker forever; the client reconnects
+    and resumes after the last event it received.
+
+    With the subscriber disabled, events are only delivered to connections of
+    the process that published them.
+
+    :ivar stream_length: Approximate number of events kept for resuming.
+    :type stream_length: int
+    :ivar queue_size: Events buffered per connection.
+    :type queue_size: int
+    :ivar heartbeat: Seconds between comments on an idle connection.
+    :type heartbeat: float
+    :ivar max_age: Seconds a connection stays open.
+    :type max_age: float
+    """
+
+    def __init__(
+        self,
+        app,
+        stream_length=1000,
+        queue_size=100,
+        heartbeat=15,
+        max_age=300,
+        subscribe=True,
+    ):
+        self.app = app
+        self.stream_length = stream_length
+        self.queue_size = queue_size
+        self.heartbeat = heartbeat
+        self.max_age = max_age
+        self.subscribe = subscribe
+        self._connections = set()
+        self._lock = threading.Lock()
+        self._listener = None
+        self._listener_pid = None
+
+    def publish(self, event_type, data):
+        """
+        Records an event and sends it to every connected client once the write
+        that caused it is committed. Failures are logged rather than raised:
+        the write cannot be undone by then.
+
+        :param event_type: ``post`` or ``comment``.
+        :type event_type: str
+        :param data: JSON-serializable payload; ``post_id`` is used to filter.
+        :type data: dict
+        :return: The event's ID, or None if Redis was unavailable or the event
+            waits for a batch to commit.
+        :rtype: str | None
+        """
+        return after_commit(self._publish, event_type, data)
+
+    def _publish(self, event_type, data):
+        redis_client = redis_helper.get_redis_client()
+        payload = json.dumps(data, default=str)
+        try:
+            event_id = redis_helper.call_redis(
+                redis_client.xadd,
+                STREAM_KEY,
+                {"event": event_type, "data": payload},
+                maxlen=self.stream_length,
+                approximate=True,
+            )
+            event_id = _decode(event_id)
+            event = {"id": event_id, "event": event_type, "data": data}
+            if self.subscribe:
+                redis_helper.call_redis(
+                    redis_client.publish,
+                    EVENTS_CHANNEL,
+                    json.dumps(event, default=str),
+                )
+        except redis_helper.RedisUnavailableError as e:
+            self.app.logger.warning(f"Failed to publish forum {event_type} event: {e}")
+            return None
+        if not self.subscribe:
+            self._dispatch(event)
+        return event_id
+
+    def stream(self, last_event_id=None, post_id=None):
+        """
+        Opens the event stream of one client connection, which lasts until the
+        client falls too far behind or disconnects, or for ``max_age``
+        seconds.
+
+        :param last_event_id: ID of the last event the client received, if it
+            is resuming.
+        :type last_event_id: str, optional
+        :param post_id: Only send events of this post.
+        :type post_id: int, optional
+        :return: A generator of formatted events and heartbeat comments.
+        :rtype: Iterator[str]
+        :raises ValueError: If ``last_event_id`` is not a stream ID.
+        """
+        last_seen = _parse_id(last_event_id) if last_event_id else None
+        self._ensure_listener()
+        return self._events(last_seen, post_id)
+
+    def _events(self, last_seen, post_id):
+        deadline = time.monotonic() + self.max_age
+        connection = _Connection(post_id, self.queue_size)
+        # Register before reading the backlog so no event falls in between;
+        # events that arrive both ways are skipped by ID below
+        with self._lock:
+            self._connections.add(connection)
+        try:
+            yield f"retry: {RECONNECT_DELAY}\n\n"
+            if last_seen is not None:
+                for event in self._backlog(last_seen):
+                    if connection.wants(event):
+                        yield _format(event)
+                    last_seen = _parse_id(event["id"])
+
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return
+                try:
+                    event = connection.events.get(
+                        timeout=min(self.heartbeat, remaining)
+                    )
+                except queue.Empty:
+                    if connection.overflowed or time.monotonic() >= deadline:
+                        return
+                    yield HEARTBEAT
+                    continue
+                if last_seen is not None and _parse_id(event["id"]) <= last_seen:
+                    continue
+                last_seen = _parse_id(event["id"])
+                yield _format(event)
+                if connection.overflowed and connection.events.empty():
+                    return
+        finally:
+            with self._lock:
+                self._connections.discard(connection)
+
+    def _backlog(self, last_seen):
+        """
+        Returns the recorded events after ``last_seen``, preceded by a
+        ``reset`` event if some of them have already been trimmed.
+        """
+        redis_client = redis_helper.get_redis_client()
+        start = f"{last_seen[0]}-{last_seen[1]}"
+        try:
+            oldest = redis_helper.call_redis(redis_client.xrange, STREAM_KEY, count=1)
+            entries = redis_helper.call_redis(
+                redis_client.xrange, STREAM_KEY, min=start, count=self.stream_length
+            )
+        except redis_helper.RedisUnavailableError as e:
+            self.app.logger.warning(f"Failed to read missed forum events: {e}")
+            return [{"id": start, "event": "reset", "data": {}}]
+
+        events = []
+        if not oldest or _parse_id(_decode(oldest[0][0])) > last_seen:
+            events.append({"id": start, "event": "reset", "data": {}})
+        for entry_id, fields in entries:
+            entry_id = _decode(entry_id)
+            if _parse_id(entry_id) <= last_seen:
+                continue
+            fields = {_decode(k): _decode(v) for k, v in fields.items()}
+            events.append(
+                {
+                    "id": entry_id,
+                    "event": fields["event"],
+                    "data": json.loads(fields["data"]),
+                }
+            )
+        return events
+
+    def _dispatch(self, event):
+        """
+        Queues an event for every interested connection of this process.
+        """
+        with self._lock:
+            connections = list(self._connections)
+        for connection in connections:
+            if connection.overflowed or not connection.wants(event):
+                continue
+            try:
+                connection.events.put_nowait(event)
+            except queue.Full:
+                connection.overflowed = True
+                self.app.logger.info(
+                    "Disconnecting forum event stream that fell behind."
+                )
+
+    def _ensure_listener(self):
+        """
+        Starts the pub/sub subscriber for this process if it is enabled and not
+        running, including in a worker forked from a parent that started one.
+        """
+        if not self.subscribe:
+            return
+        pid = os.getpid()
+        if self._listener_pid == pid and self._listener.is_alive():
+            return
+        with self._lock:
+            if self._listener_pid == pid and self._listener.is_alive():
+                return
+            if self._listener_pid != pid:
+                self._connections.clear()
+            self._listener = threading.Thread(
+                target=self._listen, name="forum-event-listener", daemon=True
+            )
+            self._listener_pid = pid
+            self._listener.start()
+
+    def _listen(self):
+        """
+        Dispatches events published by any process. Events published while
+        the subscription is down are not dispatched; clients get them from the
+        stream when they reconnect.
+        """
+        with self.app.app_context():
+            while True:
+                try:
+                    pubsub = redis_helper.get_redis_bulk_client().pubsub(
+                        ignore_subscribe_messages=True
+                    )
+                    pubsub.subscribe(EVENTS_CHANNEL)
+                    while True:
+                        # Poll instead of blocking in listen(), which would trip
+                        # the pool's socket timeout whenever it is idle
+                        message = pubsub.get_message(timeout=1.0)
+                        if message is None:
+                            continue
+                        self._dispatch(json.loads(_decode(message["data"])))
+                except Exception as e:
+                    self.app.logger.warning(f"Forum event subscriber disconnected: {e}")
+                    time.sleep(1)
+
+
+def _decode(value):
+    return value.decode("utf-8") if isinstance(value, bytes) else value
+
+
+def _parse_id(event_id):
+    """
+    Splits a stream ID into its numeric parts, which order events.
+
+    :raises ValueError: If the ID is not a stream ID.
+    """
+    try:
+        milliseconds, _, sequence = event_id.partition("-")
+        return int(milliseconds), int(sequence or 0)
+    except (AttributeError, ValueError):
+        raise ValueError("Invalid event ID.") from None
+
+
+def _format(event):
+    data = json.dumps(event["data"], default=str)
+    return f"id: {event['id']}\nevent: {event['event']}\ndata: {data}\n\n"
+
+
+def init_forum_events(app):
+    """
+    Creates the application's forum event hub and stores it in
+    ``app.extensions["forum_events"]``.
+
+    :param app: The Flask application.
+    :type app: flask.Flask
+    :return: The event hub.
+    :rtype: ForumEventHub
+    """
+    hub = ForumEventHub(
+        app,
+        stream_length=app.config["FORUM_EVENTS_STREAM_LENGTH"],
+        queue_size=app.config["FORUM_EVENTS_QUEUE_SIZE"],
+        heartbeat=app.config["FORUM_EVENTS_HEARTBEAT"],
+        max_age=app.config["FORUM_EVENTS_MAX_AGE"],
+        subscribe=app.config["FORUM_EVENTS_PUBSUB_ENABLED"],
+    )
+    app.extensions["forum_events"] = hub
+    return hub
+
+
+def get_forum_events():
+    """
+    Returns the current application's forum event hub.
+
+    :rtype: ForumEventHub
+    """
+    return app.extensions["forum_events"]
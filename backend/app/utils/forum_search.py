@@ -0,0 +1,356 @@
+from abc import ABC, abstractmethod
+
+from flask import current_app as app
+from peewee import MySQLDatabase
+
+from .db import database_proxy
+from .fulltext import (
+    MARK_END,
+    MARK_START,
+    SNIPPET_WORDS,
+    decode_cursor,
+    encode_cursor,
+    keyset_clause,
+    mark,
+    render,
+    search_terms,
+    snippet,
+)
+
+SEARCH_TABLE = "forum_search"
+
+
+class ForumSearchIndex(ABC):
+    """
+    Full-text index over forum posts and comments.
+
+    Every post and every comment is one document in ``forum_search``. Posts are
+    indexed with their title and their description and content as body;
+    comments have an empty title and their content as body. A document's row ID
+    is derived from its kind and ID, so writes replace and delete documents by
+    primary key. The forum service updates the index in the same transaction as
+    the post or comment it changes, and ``rebuild`` recreates it from the
+    tables.
+
+    Searches match every word of the query, are ranked by relevance and
+    paginated by keyset: a cursor holds the score and row ID of the last
+    result, so later pages cost the same as the first. Titles and snippets come
+    back HTML-escaped, with matches wrapped in ``<mark>`` tags.
+
+    Subclasses implement the index for one database engine.
+    """
+
+    def __init__(self, db):
+        self.db = db
+
+    @abstractmethod
+    def create(self):
+        """
+        Creates the index if it does not exist yet.
+        """
+
+    def drop(self):
+        """
+        Drops the index.
+        """
+        self.db.execute_sql(f"DROP TABLE IF EXISTS {SEARCH_TABLE}")
+
+    def index_post(self, post_id, title, description, content):
+        """
+        Adds a post to the index or replaces its document.
+
+        :param post_id: The post.
+        :type post_id: int
+        :param title: The post's title.
+        :type title: str
+        :param description: The post's description, if any.
+        :type description: str | None
+        :param content: The post's content.
+        :type content: str
+        """
+        body = " ".join(part for part in (description, content) if part)
+        self._replace(_post_rowid(post_id), "post", post_id, post_id, title, body)
+
+    def index_comment(self, comment_id, post_id, content):
+        """
+        Adds a comment to the index or replaces its document.
+
+        :param comment_id: The comment.
+        :type comment_id: int
+        :param post_id: The post it belongs to.
+        :type post_id: int
+        :param content: The comment's content.
+        :type content: str
+        """
+        self._replace(
+            _comment_rowid(comment_id), "comment", comment_id, post_id, "", content
+        )
+
+    def remove_post(self, post_id):
+        """
+        Removes a post and all of its comments from the index.
+
+        :param post_id: The post.
+        :type post_id: int
+        """
+        self._delete(f"post_id = {self.db.param}", (post_id,))
+
+    def remove_comment(self, comment_id):
+        """
+        Removes a comment from the index.
+
+        :param comment_id: The comment.
+        :type comment_id: int
+        """
+        self._delete_rowid(_comment_rowid(comment_id))
+
+    def remove_comments(self, post_id):
+        """
+        Removes every comment of a post from the index.
+
+        :param post_id: The post.
+        :type post_id: int
+        """
+        self._delete(
+            f"post_id = {self.db.param} AND kind = {self.db.param}",
+            (post_id, "comment"),
+        )
+
+    def rebuild(self):
+        """
+        Refills the index from the posts and comments tables in one
+        transaction.
+
+        :return: The number of documents indexed.
+        :rtype: int
+        """
+        self.create()
+        with database_proxy.atomic():
+            self.db.execute_sql(f"DELETE FROM {SEARCH_TABLE}")
+            self.db.execute_sql(self.REBUILD_POSTS_SQL)
+            self.db.execute_sql(self.REBUILD_COMMENTS_SQL)
+            cursor = self.db.execute_sql(f"SELECT COUNT(*) FROM {SEARCH_TABLE}")
+            return cursor.fetchone()[0]
+
+    def search(self, query, limit=20, cursor=None):
+        """
+        Searches posts and comments.
+
+        :param query: Words to search for. Punctuation and search operators
+            are ignored.
+        :type query: str
+        :param limit: Maximum number of results.
+        :type limit: int
+        :param cursor: The ``next_cursor`` of the previous page, if any.
+        :type cursor: str, optional
+        :return: The results, best first, and the cursor of the next page, or
+            None on the last page. Each result has ``kind`` (``post`` or
+            ``comment``), ``post_id``, ``comment_id`` (None for posts),
+            ``title`` (empty for comments), ``snippet`` and ``score``.
+        :rtype: dict
+        :raises ValueError: If the query has no words or the cursor is invalid.
+        """
+        terms = search_terms(query)
+        after = decode_cursor(cursor) if cursor else None
+
+        rows = self._search(terms, limit + 1, after)
+        results = [
+            {
+                "kind": kind,
+                "post_id": post_id,
+                "comment_id": doc_id if kind == "comment" else None,
+                "title": render(title),
+                "snippet": render(marked_snippet),
+                "score": score,
+            }
+            for _, kind, doc_id, post_id, title, marked_snippet, score in rows[:limit]
+        ]
+        next_cursor = None
+        if len(rows) > limit:
+            last = rows[limit - 1]
+            next_cursor = encode_cursor(last[6], last[0])
+        return {"results": results, "next_cursor": next_cursor}
+
+    @abstractmethod
+    def _replace(self, rowid, kind, doc_id, post_id, title, body):
+        """
+        Stores a document under a row ID, replacing any document there.
+        """
+
+    @abstractmethod
+    def _delete_rowid(self, rowid):
+        """
+        Deletes the document with a row ID, if there is one.
+        """
+
+    def _delete(self, where, params):
+        self.db.execute_sql(f"DELETE FROM {SEARCH_TABLE} WHERE {where}", params)
+
+    @abstractmethod
+    def _search(self, terms, limit, after):
+        """
+        Returns up to ``limit`` rows of ``(rowid, kind, doc_id, post_id,
+        marked title, marked snippet, score)``, best first, after the
+        ``(score, rowid)`` keyset position if one is given.
+        """
+
+
+class SqliteForumSearch(ForumSearchIndex):
+    """
+    Forum search on an SQLite FTS5 table, ranked by BM25 with title matches
+    counting twice.
+    """
+
+    REBUILD_POSTS_SQL = (
+        f"INSERT INTO {SEARCH_TABLE} (rowid, kind, doc_id, post_id, title, body) "
+        "SELECT id * 2, 'post', id, id, title, "
+        "COALESCE(description || ' ', '') || content FROM posts "
+        "WHERE deleted_at IS NULL"
+    )
+    REBUILD_COMMENTS_SQL = (
+        f"INSERT INTO {SEARCH_TABLE} (rowid, kind, doc_id, post_id, title, body) "
+        "SELECT id * 2 + 1, 'comment', id, post_id, '', content FROM post_comments "
+        "WHERE post_id IN (SELECT id FROM posts WHERE deleted_at IS NULL)"
+    )
+
+    def create(self):
+        self.db.execute_sql(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} USING fts5("
+            "kind UNINDEXED, doc_id UNINDEXED, post_id UNINDEXED, title, body, "
+            "tokenize = 'unicode61 remove_diacritics 2')"
+        )
+
+    def _replace(self, rowid, kind, doc_id, post_id, title, body):
+        self._delete_rowid(rowid)
+        self.db.execute_sql(
+            f"INSERT INTO {SEARCH_TABLE} (rowid, kind, doc_id, post_id, title, body) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (rowid, kind, doc_id, post_id, title, body),
+        )
+
+    def _delete_rowid(self, rowid):
+        self._delete("rowid = ?", (rowid,))
+
+    def _search(self, terms, limit, after):
+        match = " ".join(f'"{term}"' for term in terms)
+        keyset, keyset_params = keyset_clause("?", after)
+        # bm25 is lower for better matches; negate it so higher is better, as
+        # with MySQL
+        sql = (
+            "SELECT id, kind, doc_id, post_id, title, snippet, score FROM ("
+            "SELECT rowid AS id, kind, doc_id, post_id, "
+            f"highlight({SEARCH_TABLE}, 3, ?, ?) AS title, "
+            f"snippet({SEARCH_TABLE}, 4, ?, ?, '…', {2 * SNIPPET_WORDS}) AS snippet, "
+            f"-bm25({SEARCH_TABLE}, 0, 0, 0, 2.0, 1.0) AS score "
+            f"FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH ?"
+            f") {keyset} ORDER BY score DESC, id LIMIT ?"
+        )
+        params = (MARK_START, MARK_END, MARK_START, MARK_END, match)
+        return list(self.db.execute_sql(sql, params + keyset_params + (limit,)))
+
+
+class MySQLForumSearch(ForumSearchIndex):
+    """
+    Forum search on an InnoDB table with a FULLTEXT index, queried in boolean
+    mode with every word required and ranked by MySQL's relevance. MySQL
+    cannot highlight matches, so titles and snippets are marked up here.
+    """
+
+    REBUILD_POSTS_SQL = (
+        f"INSERT INTO {SEARCH_TABLE} (id, kind, doc_id, post_id, title, body) "
+        "SELECT id * 2, 'post', id, id, title, CONCAT_WS(' ', description, content) "
+        "FROM posts WHERE deleted_at IS NULL"
+    )
+    REBUILD_COMMENTS_SQL = (
+        f"INSERT INTO {SEARCH_TABLE} (id, kind, doc_id, post_id, title, body) "
+        "SELECT id * 2 + 1, 'comment', id, post_id, '', content FROM post_comments "
+        "WHERE post_id IN (SELECT id FROM posts WHERE deleted_at IS NULL)"
+    )
+
+    def create(self):
+        self.db.execute_sql(
+            f"CREATE TABLE IF NOT EXISTS {SEARCH_TABLE} ("
+            "id BIGINT PRIMARY KEY, kind VARCHAR(16) NOT NULL, "
+            "doc_id INT NOT NULL, post_id INT NOT NULL, "
+            "title VARCHAR(255) NOT NULL, body MEDIUMTEXT NOT NULL, "
+            "INDEX (post_id), FULLTEXT (title, body)"
+            ") ENGINE=InnoDB DEFAULT CHARSET=utf8mb4"
+        )
+
+    def _replace(self, rowid, kind, doc_id, post_id, title, body):
+        self.db.execute_sql(
+            f"REPLACE INTO {SEARCH_TABLE} (id, kind, doc_id, post_id, title, body) "
+            "VALUES (%s, %s, %s, %s, %s, %s)",
+            (rowid, kind, doc_id, post_id, title, body),
+        )
+
+    def _delete_rowid(self, rowid):
+        self._delete("id = %s", (rowid,))
+
+    def _search(self, terms, limit, after):
+        against = " ".join(f"+{term}" for term in terms)
+        keyset, keyset_params = keyset_clause("%s", after)
+        sql = (
+            "SELECT id, kind, doc_id, post_id, title, body, score FROM ("
+            "SELECT id, kind, doc_id, post_id, title, body, "
+            "MATCH (title, body) AGAINST (%s IN BOOLEAN MODE) AS score "
+            f"FROM {SEARCH_TABLE} "
+            "WHERE MATCH (title, body) AGAINST (%s IN BOOLEAN MODE)"
+            f") AS hits {keyset} ORDER BY score DESC, id LIMIT %s"
+        )
+        rows = self.db.execute_sql(sql, (against, against) + keyset_params + (limit,))
+        return [
+            (
+                rowid,
+                kind,
+                doc_id,
+                post_id,
+                mark(title, terms),
+                snippet(body, terms),
+                score,
+            )
+            for rowid, kind, doc_id, post_id, title, body, score in rows
+        ]
+
+
+def _post_rowid(post_id):
+    return post_id * 2
+
+
+def _comment_rowid(comment_id):
+    return comment_id * 2 + 1
+
+
+def init_forum_search(app):
+    """
+    Creates the forum search index for the application's database engine and
+    stores it in ``app.extensions["forum_search"]``. If the index table does
+    not exist yet, it is created and filled from existing posts and comments.
+
+    :param app: The Flask application.
+    :type app: flask.Flask
+    :return: The search index.
+    :rtype: ForumSearchIndex
+    """
+    db = database_proxy.obj
+    if isinstance(db, MySQLDatabase):
+        index = MySQLForumSearch(db)
+    else:
+        index = SqliteForumSearch(db)
+    with database_proxy:
+        if not db.table_exists(SEARCH_TABLE) and db.table_exists("posts"):
+            indexed = index.rebuild()
+            app.logger.info(f"Created forum search index of {indexed} documents.")
+        else:
+            index.create()
+    app.extensions["forum_search"] = index
+    return index
+
+
+def get_forum_search():
+    """
+    Returns the current application's forum search index.
+
+    :rtype: ForumSearchIndex
+    """
+    return app.extensions["forum_search"]
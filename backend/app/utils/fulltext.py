@@ -0,0 +1,169 @@
+import base64
+import binascii
+import html
+import json
+import re
+
+# Most words of a query that are searched for; the rest are ignored.
+MAX_QUERY_TERMS = 8
+
+# Highlighted terms are wrapped in these markers while the text is still raw,
+# then turned into <mark> tags once the text has been HTML-escaped.
+MARK_START = "\x02"
+MARK_END = "\x03"
+
+# Words of context shown on each side of the first match in a snippet.
+SNIPPET_WORDS = 12
+
+WORD_PATTERN = re.compile(r"\w+")
+
+
+def tokenize(text):
+    """
+    Splits a text into lower-case words.
+
+    :param text: The text.
+    :type text: str
+    :rtype: list[str]
+    """
+    return WORD_PATTERN.findall((text or "").lower())
+
+
+def search_terms(query):
+    """
+    Returns the words of a search query. Punctuation and search operators are
+    dropped, so the result can be quoted into any engine's query syntax.
+
+    :param query: The query as typed by the user.
+    :type query: str
+    :return: Up to ``MAX_QUERY_TERMS`` lower-case words.
+    :rtype: list[str]
+    :raises ValueError: If the query has no words.
+    """
+    terms = tokenize(query)[:MAX_QUERY_TERMS]
+    if not terms:
+        raise ValueError("Search query must contain at least one word.")
+    return terms
+
+
+def mark(text, terms):
+    """
+    Wraps the whole-word occurrences of the terms in a text in highlight
+    markers.
+
+    :param text: The text.
+    :type text: str
+    :param terms: Lower-case search terms.
+    :type terms: list[str]
+    :rtype: str
+    """
+    return _terms_pattern(terms).sub(
+        lambda m: f"{MARK_START}{m.group(0)}{MARK_END}", text or ""
+    )
+
+
+def first_match(text, terms):
+    """
+    Returns the character offset of the first whole-word occurrence of any of
+    the terms in a text.
+
+    :param text: The text.
+    :type text: str
+    :param terms: Lower-case search terms.
+    :type terms: list[str]
+    :return: The offset, or None if no term occurs verbatim.
+    :rtype: int | None
+    """
+    match = _terms_pattern(terms).search(text or "")
+    return match.start() if match else None
+
+
+def snippet(text, terms):
+    """
+    Cuts the words around the first match out of a text and marks the matches
+    in it.
+
+    :param text: The text.
+    :type text: str
+    :param terms: Lower-case search terms.
+    :type terms: list[str]
+    :rtype: str
+    """
+    words = (text or "").split()
+    first = next(
+        (i for i, word in enumerate(words) if set(tokenize(word)) & set(terms)), 0
+    )
+    start = max(0, first - SNIPPET_WORDS)
+    end = first + SNIPPET_WORDS
+    return (
+        ("…" if start > 0 else "")
+        + mark(" ".join(words[start:end]), terms)
+        + ("…" if end < len(words) else "")
+    )
+
+
+def render(text):
+    """
+    HTML-escapes a marked text and turns its highlight markers into ``<mark>``
+    tags.
+
+    :param text: Text with highlight markers.
+    :type text: str
+    :rtype: str
+    """
+    escaped = html.escape(text or "")
+    return escaped.replace(MARK_START, "<mark>").replace(MARK_END, "</mark>")
+
+
+def encode_cursor(score, rowid):
+    """
+    Encodes the keyset position of a search result, its score and row ID, as
+    an opaque cursor.
+
+    :rtype: str
+    """
+    raw = json.dumps([score, rowid]).encode()
+    return base64.urlsafe_b64encode(raw).decode()
+
+
+def decode_cursor(cursor):
+    """
+    Decodes a cursor made by ``encode_cursor``.
+
+    :param cursor: The cursor.
+    :type cursor: str
+    :return: The score and row ID.
+    :rtype: tuple[float, int]
+    :raises ValueError: If the cursor is invalid.
+    """
+    try:
+        score, rowid = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return float(score), int(rowid)
+    except (binascii.Error, ValueError, TypeError):
+        raise ValueError("Invalid search cursor.") from None
+
+
+def keyset_clause(param, after):
+    """
+    Returns the WHERE clause and parameters that skip results up to a keyset
+    position, for a query ordered by ``score DESC, id``.
+
+    :param param: The database's parameter placeholder.
+    :type param: str
+    :param after: The score and row ID of the last result seen, or None.
+    :type after: tuple[float, int] | None
+    :rtype: tuple[str, tuple]
+    """
+    if after is None:
+        return "", ()
+    score, rowid = after
+    return (
+        f"WHERE score < {param} OR (score = {param} AND id > {param})",
+        (score, score, rowid),
+    )
+
+
+def _terms_pattern(terms):
+    return re.compile(
+        r"\b(" + "|".join(re.escape(term) for term in terms) + r")\b", re.IGNORECASE
+    )
@@ -0,0 +1,317 @@
+import math
+import os
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+from flask import current_app as app
+
+from . import redis_helper
+from .db import after_commit
+from .fulltext import decode_cursor, encode_cursor
+
+HOT_KEY = "forum:hot"
+RESCORE_LOCK_KEY = "forum:hot:rescore"
+
+# Scores count time from here so they keep full float precision.
+EPOCH = datetime(2024, 1, 1, tzinfo=timezone.utc).timestamp()
+
+# Activity points per comment and per view.
+COMMENT_WEIGHT = 10
+VIEW_WEIGHT = 1
+
+# Posts rescored per query and ZADD.
+RESCORE_BATCH_SIZE = 500
+
+
+def hot_score(created_at, comment_count, view_count, decay_seconds):
+    """
+    Computes a post's hot score: the logarithm of its activity plus its age
+    in units of ``decay_seconds``. A post ``decay_seconds`` younger than
+    another ranks the same with a tenth of its activity, so every post's
+    standing decays over time although no score changes.
+
+    :param created_at: When the post was created.
+    :type created_at: datetime | str
+    :param comment_count: The post's comments.
+    :type comment_count: int
+    :param view_count: The post's views.
+    :type view_count: int
+    :param decay_seconds: Seconds over which a tenfold activity advantage is
+        lost.
+    :type decay_seconds: float
+    :rtype: float
+    """
+    activity = COMMENT_WEIGHT * comment_count + VIEW_WEIGHT * view_count
+    age = _timestamp(created_at) - EPOCH
+    return math.log10(1 + activity) + age / decay_seconds
+
+
+class HotRanking:
+    """
+    Keeps forum posts ranked by ``hot_score`` in a Redis sorted set, so the
+    hot listing is read from Redis and never computed from the posts table at
+    request time.
+
+    The forum service calls ``update`` whenever a post's activity changes and
+    ``remove`` when it is deleted; each costs one primary key lookup and one
+    Redis command. Because scores anchor time at the post's creation, they
+    only change with activity. A background job also rescores every post
+    active in the last ``window_days`` days every ``rescore_interval``
+    seconds, repairing updates missed while Redis was unavailable, and trims
+    the set to the best ``max_posts``. The job takes a Redis lock, so only one
+    worker runs it per interval.
+
+    Pages are read by keyset: the cursor holds the score and ID of the last
+    post returned, so every page is one ``ZREVRANGEBYSCORE``.
+
+    :ivar decay_seconds: See ``hot_score``.
+    :type decay_seconds: float
+    :ivar max_posts: Posts kept in the ranking.
+    :type max_posts: int
+    :ivar window_days: Days of activity the background job rescores.
+    :type window_days: int
+    :ivar rescore_interval: Seconds between rescoring runs.
+    :type rescore_interval: float
+    :ivar background: Whether the rescoring thread is started.
+    :type background: bool
+    """
+
+    def __init__(
+        self,
+        app,
+        decay_seconds=45000,
+        max_posts=1000,
+        window_days=14,
+        rescore_interval=300,
+        background=True,
+    ):
+        self.app = app
+        self.decay_seconds = decay_seconds
+        self.max_posts = max_posts
+        self.window_days = window_days
+        self.rescore_interval = rescore_interval
+        self.background = background
+        self._lock = threading.Lock()
+        self._worker = None
+        self._worker_pid = None
+
+    def update(self, post_ids):
+        """
+        Recomputes the scores of posts whose activity changed, once the
+        change is committed. Failures are logged; the next rescoring run
+        repairs them.
+
+        :param post_ids: The posts.
+        :type post_ids: Iterable[int]
+        """
+        after_commit(self._update, list(post_ids))
+
+    def _update(self, post_ids):
+        self._ensure_worker()
+        try:
+            self._store(self._scores(post_ids))
+        except redis_helper.RedisUnavailableError as e:
+            self.app.logger.warning(f"Failed to update hot posts: {e}")
+
+    def remove(self, post_id):
+        """
+        Removes a deleted post from the ranking once the deletion is
+        committed.
+
+        :param post_id: The post.
+        :type post_id: int
+        """
+        after_commit(self._remove, post_id)
+
+    def _remove(self, post_id):
+        redis_client = redis_helper.get_redis_client()
+        try:
+            redis_helper.call_redis(redis_client.zrem, HOT_KEY, post_id)
+        except redis_helper.RedisUnavailableError as e:
+            self.app.logger.warning(f"Failed to remove post {post_id} from hot: {e}")
+
+    def page(self, per_page, cursor=None):
+        """
+        Returns one page of the ranking.
+
+        :param per_page: Posts per page.
+        :type per_page: int
+        :param cursor: The ``next_cursor`` of the previous page, if any.
+        :type cursor: str, optional
+        :return: The page's post IDs, hottest first, and the cursor of the next
+            page, or None on the last page.
+        :rtype: tuple[list[int], str | None]
+        :raises ValueError: If the cursor is invalid.
+        :raises RedisUnavailableError: If Redis could not be read.
+        """
+        self._ensure_worker()
+        after = decode_cursor(cursor) if cursor else None
+        redis_client = redis_helper.get_redis_client()
+        entries = []
+        offset = 0
+        while len(entries) <= per_page:
+            chunk = redis_helper.call_redis(
+                redis_client.zrevrangebyscore,
+                HOT_KEY,
+                after[0] if after else "+inf",
+                "-inf",
+                start=offset,
+                num=per_page + 1,
+                withscores=True,
+            )
+            if not chunk:
+                break
+            offset += len(chunk)
+            for member, score in chunk:
+                member = member.decode() if isinstance(member, bytes) else member
+                # Ties come in descending member order; skip those already seen
+                if after and score == after[0] and member >= str(int(after[1])):
+                    continue
+                entries.append((int(member), score))
+
+        next_cursor = None
+        if len(entries) > per_page:
+            post_id, score = entries[per_page - 1]
+            next_cursor = encode_cursor(score, post_id)
+        return [post_id for post_id, _ in entries[:per_page]], next_cursor
+
+    def rescore(self):
+        """
+        Rescores every post active within the window and trims the ranking.
+
+        :return: The number of posts rescored.
+        :rtype: int
+        :raises RedisUnavailableError: If Redis could not be written.
+        """
+        from ..models.data import Posts
+
+        since = datetime.now(timezone.utc) - timedelta(days=self.window_days)
+        rescored = 0
+        last_id = 0
+        while True:
+            batch = list(
+                Posts.select(
+                    Posts.id, Posts.created_at, Posts.comment_count, Posts.view_count
+                )
+                .where(
+                    (Posts.last_activity_at >= since)
+                    & (Posts.id > last_id)
+                    & Posts.deleted_at.is_null()
+                )
+                .order_by(Posts.id)
+                .limit(RESCORE_BATCH_SIZE)
+                .tuples()
+            )
+            if not batch:
+                break
+            self._store(
+                {
+                    post_id: hot_score(created_at, comments, views, self.decay_seconds)
+                    for post_id, created_at, comments, views in batch
+                }
+            )
+            rescored += len(batch)
+            last_id = batch[-1][0]
+
+        redis_client = redis_helper.get_redis_client()
+        redis_helper.call_redis(
+            redis_client.zremrangebyrank, HOT_KEY, 0, -(self.max_posts + 1)
+        )
+        return rescored
+
+    def _scores(self, post_ids):
+        from ..models.data import Posts
+
+        if not post_ids:
+            return {}
+        return {
+            post_id: hot_score(created_at, comments, views, self.decay_seconds)
+            for post_id, created_at, comments, views in Posts.select(
+                Posts.id, Posts.created_at, Posts.comment_count, Posts.view_count
+            )
+            .where(Posts.id.in_(post_ids) & Posts.deleted_at.is_null())
+            .tuples()
+        }
+
+    def _store(self, scores):
+        if not scores:
+            return
+        redis_client = redis_helper.get_redis_client()
+        redis_helper.call_redis(redis_client.zadd, HOT_KEY, scores)
+
+    def _ensure_worker(self):
+        """
+        Starts the rescoring thread for this process, including in a worker
+        forked from a parent that started one.
+        """
+        if not self.background:
+            return
+        pid = os.getpid()
+        if self._worker_pid == pid and self._worker.is_alive():
+            return
+        with self._lock:
+            if self._worker_pid == pid and self._worker.is_alive():
+                return
+            self._worker = threading.Thread(
+                target=self._run, name="hot-posts-rescorer", daemon=True
+            )
+            self._worker_pid = pid
+            self._worker.start()
+
+    def _run(self):
+        with self.app.app_context():
+            while True:
+                try:
+                    redis_client = redis_helper.get_redis_client()
+                    if redis_helper.call_redis(
+                        redis_client.set,
+                        RESCORE_LOCK_KEY,
+                        os.getpid(),
+                        nx=True,
+                        ex=max(1, int(self.rescore_interval)),
+                    ):
+                        rescored = self.rescore()
+                        self.app.logger.info(f"Rescored {rescored} hot posts.")
+                except Exception as e:
+                    self.app.logger.error(f"Failed to rescore hot posts: {e}")
+                time.sleep(self.rescore_interval)
+
+
+def _timestamp(value):
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+
+def init_hot_ranking(app):
+    """
+    Creates the application's hot post ranking and stores it in
+    ``app.extensions["hot_ranking"]``.
+
+    :param app: The Flask application.
+    :type app: flask.Flask
+    :return: The ranking.
+    :rtype: HotRanking
+    """
+    ranking = HotRanking(
+        app,
+        decay_seconds=app.config["HOT_DECAY_SECONDS"],
+        max_posts=app.config["HOT_MAX_POSTS"],
+        window_days=app.config["HOT_WINDOW_DAYS"],
+        rescore_interval=app.config["HOT_RESCORE_INTERVAL"],
+        background=app.config["HOT_RESCORE_BACKGROUND"],
+    )
+    app.extensions["hot_ranking"] = ranking
+    return ranking
+
+
+def get_hot_ranking():
+    """
+    Returns the current application's hot post ranking.
+
+    :rtype: HotRanking
+    """
+    return app.extensions["hot_ranking"]
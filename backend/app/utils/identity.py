@@ -0,0 +1,96 @@
+import json
+
+from flask import current_app as app
+from flask import g
+
+from . import redis_helper
+from .db import in_batch_transaction
+
+IDENTITY_KEY = "user:{user_id}:identity"
+
+
+def get_identity(user_id):
+    """
+    Returns the compact identity record authorization checks need for a user:
+    ``id``, ``role`` (the role name), ``is_admin`` and ``is_active``.
+
+    Records are memoized on ``g`` for the rest of the request and cached in
+    Redis for ``IDENTITY_CACHE_TTL`` seconds, so repeated checks within a
+    request cost nothing and checks across requests cost a single Redis read
+    instead of a database query. Writes that change any of these fields must
+    call ``invalidate_identity``. If Redis is unavailable the record is read
+    from the database; records read inside a batch, which may reflect its
+    uncommitted writes, are not cached in Redis.
+
+    :param user_id: The user whose identity is requested.
+    :type user_id: int
+    :return: The identity record, or None if the user does not exist.
+    :rtype: dict | None
+    """
+    # g lives as long as the application context, which is pushed per request
+    memo = g.setdefault("identities", {})
+    if user_id in memo:
+        return memo[user_id]
+
+    key = IDENTITY_KEY.format(user_id=user_id)
+    redis_client = redis_helper.get_redis_client()
+    try:
+        cached = redis_helper.call_redis(redis_client.get, key)
+    except redis_helper.RedisUnavailableError as e:
+        app.logger.warning(f"Identity cache unavailable, reading user {user_id}: {e}")
+        cached = None
+        redis_client = None
+
+    if cached is not None:
+        identity = json.loads(cached)
+    else:
+        identity = _load_identity(user_id)
+        if (
+            identity is not None
+            and redis_client is not None
+            and not in_batch_transaction()
+        ):
+            try:
+                redis_helper.call_redis(
+                    redis_client.setex,
+                    key,
+                    app.config["IDENTITY_CACHE_TTL"],
+                    json.dumps(identity),
+                )
+            except redis_helper.RedisUnavailableError as e:
+                app.logger.warning(f"Failed to cache identity of user {user_id}: {e}")
+
+    memo[user_id] = identity
+    return identity
+
+
+def invalidate_identity(user_id):
+    """
+    Drops the cached identity record of a user so the next check reads the
+    database. If Redis cannot be reached the cached record lives on until its
+    TTL expires, which is logged.
+
+    :param user_id: The user whose identity changed.
+    :type user_id: int
+    """
+    g.setdefault("identities", {}).pop(user_id, None)
+
+    redis_client = redis_helper.get_redis_client()
+    try:
+        redis_helper.call_redis(
+            redis_client.delete, IDENTITY_KEY.format(user_id=user_id)
+        )
+    except redis_helper.RedisUnavailableError as e:
+        app.logger.error(f"Failed to invalidate identity of user {user_id}: {e}")
+
+
+def _load_identity(user_id):
+    from ..models.data import Role, User
+
+    return (
+        User.select(User.id, Role.name.alias("role"), User.is_admin, User.is_active)
+        .join(Role, on=(User.role == Role.id))
+        .where(User.id == user_id)
+        .dicts()
+        .get_or_none()
+    )
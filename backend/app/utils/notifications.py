@@ -0,0 +1,485 @@
+import json
+import os
+import secrets
+import socket
+import threading
+import time
+
+from flask import current_app as app
+
+from . import redis_helper
+from .db import after_commit, database_proxy
+
+QUEUE_KEY = "notifications:queue"
+# Events a worker took off the queue whose notifications are not committed yet.
+PROCESSING_KEY = "notifications:processing:{worker}"
+# Renewed by a worker on every pass; once it expires, its events are requeued.
+LEASE_KEY = "notifications:worker:{worker}"
+# Workers that may have a processing list.
+WORKERS_KEY = "notifications:workers"
+UNREAD_KEY = "notifications:{user_id}:unread"
+
+# Times an event whose fan-out fails is put back before it is dropped.
+MAX_EVENT_ATTEMPTS = 3
+
+
+class NotificationFeed:
+    """
+    Fans new comments out into the inboxes of the users they concern, and
+    keeps each user's unread count in Redis.
+
+    Adding a comment only appends an event to a Redis list. A background
+    thread takes up to ``batch_size`` events every ``flush_interval`` seconds,
+    works out who to notify (the post's author, the author of the comment
+    replied to and everyone else who commented in the same thread, except the
+    commenter) and writes one ``Notification`` row per recipient with batched
+    inserts of at most ``batch_size`` rows in one transaction. Taken events
+    are moved to the worker's own processing list and only removed from it
+    once their rows are committed, or put back on the queue if the write
+    fails. Each worker renews a lease of ``lease_ttl`` seconds on every pass;
+    the events of a worker whose lease has expired, because it stopped
+    mid-batch, are queued again by the others. Rows are unique per recipient
+    and comment, so writing an event twice is harmless. While Redis is
+    unavailable events are fanned out by the request that added the comment
+    instead.
+
+    Unread counts are served from a Redis counter per user, which the worker
+    increments by the rows it actually inserted. A missing counter is
+    recounted from the database, and counters expire after ``counter_ttl``
+    seconds so any drift corrects itself. Marking notifications read drops
+    the counter.
+
+    :ivar flush_interval: Seconds between fan-out passes.
+    :type flush_interval: float
+    :ivar batch_size: Events taken and rows inserted at a time.
+    :type batch_size: int
+    :ivar counter_ttl: Seconds an unread counter is kept.
+    :type counter_ttl: int
+    :ivar lease_ttl: Seconds a worker's lease lasts without renewal.
+    :type lease_ttl: int
+    :ivar background: Whether the fan-out thread is started. Without it,
+        events wait until ``flush`` is called.
+    :type background: bool
+    """
+
+    def __init__(
+        self,
+        app,
+        flush_interval=2.0,
+        batch_size=500,
+        counter_ttl=3600,
+        lease_ttl=60,
+        background=True,
+    ):
+        self.app = app
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.counter_ttl = counter_ttl
+        self.lease_ttl = lease_ttl
+        self.background = background
+        self._lock = threading.Lock()
+        self._worker = None
+        self._worker_pid = None
+        self._name = None
+        self._name_pid = None
+
+    def enqueue(self, event):
+        """
+        Queues a new comment for fan-out once it is committed.
+
+        :param event: The comment's ``post_id``, ``comment_id``, ``parent_id``,
+            ``user_id`` and ``content``.
+        :type event: dict
+        """
+        after_commit(self._enqueue, event)
+
+    def _enqueue(self, event):
+        self._ensure_worker()
+        redis_client = redis_helper.get_redis_client()
+        try:
+            redis_helper.call_redis(
+                redis_client.rpush, QUEUE_KEY, json.dumps(event, default=str)
+            )
+        except redis_helper.RedisUnavailableError as e:
+            self.app.logger.warning(f"Fanning out notifications inline: {e}")
+            try:
+                self._fan_out([event])
+            except Exception as e:
+                self.app.logger.error(
+                    f"Failed to notify about comment {event['comment_id']}: {e}"
+                )
+
+    def flush(self):
+        """
+        Fans out every queued event in the calling thread.
+
+        :return: The number of notifications written.
+        :rtype: int
+        """
+        written = 0
+        while True:
+            taken = self._take()
+            if not taken:
+                return written
+            events = [json.loads(payload) for payload in taken]
+            try:
+                written += self._fan_out(events)
+                self._restore(taken, [])
+                continue
+            except Exception as e:
+                self.app.logger.error(
+                    f"Failed to fan out {len(events)} notifications: {e}"
+                )
+            # Retry one by one so a bad event does not hold up the others
+            failed = []
+            for event in events:
+                try:
+                    written += self._fan_out([event])
+                except Exception:
+                    failed.append(event)
+            # Failed events wait for the next pass
+            self._restore(taken, failed)
+            return written
+
+    def unread_count(self, user_id):
+        """
+        Returns a user's number of unread notifications.
+
+        :param user_id: The user.
+        :type user_id: int
+        :rtype: int
+        """
+        redis_client = redis_helper.get_redis_client()
+        key = UNREAD_KEY.format(user_id=user_id)
+        try:
+            cached = redis_helper.call_redis(redis_client.get, key)
+            if cached is not None:
+                return int(cached)
+        except redis_helper.RedisUnavailableError as e:
+            self.app.logger.warning(f"Counting unread notifications in SQL: {e}")
+            return _count_unread(user_id)
+
+        count = _count_unread(user_id)
+        try:
+            # A counter created meanwhile already includes newer rows
+            redis_helper.call_redis(
+                redis_client.set, key, count, nx=True, ex=self.counter_ttl
+            )
+        except redis_helper.RedisUnavailableError:
+            pass
+        return count
+
+    def forget_unread(self, user_id):
+        """
+        Drops a user's unread counter after notifications were marked read;
+        the next read recounts it.
+
+        :param user_id: The user.
+        :type user_id: int
+        """
+        redis_client = redis_helper.get_redis_client()
+        try:
+            redis_helper.call_redis(
+                redis_client.delete, UNREAD_KEY.format(user_id=user_id)
+            )
+        except redis_helper.RedisUnavailableError as e:
+            self.app.logger.warning(
+                f"Failed to reset unread count of user {user_id}: {e}"
+            )
+
+    def _worker_name(self):
+        """
+        Returns the name of this process' worker, which is unique even if a
+        restarted process gets the PID of one that stopped.
+        """
+        pid = os.getpid()
+        if self._name_pid != pid:
+            self._name = f"{socket.gethostname()}:{pid}:{secrets.token_hex(4)}"
+            self._name_pid = pid
+        return self._name
+
+    def _take(self):
+        """
+        Renews the worker's lease, then moves up to ``batch_size`` events from
+        the queue to its processing list and returns them as queued.
+        """
+        worker = self._worker_name()
+        processing_key = PROCESSING_KEY.format(worker=worker)
+        redis_client = redis_helper.get_redis_client()
+        pipeline = redis_client.pipeline(transaction=False)
+        pipeline.set(LEASE_KEY.format(worker=worker), 1, ex=self.lease_ttl)
+        pipeline.sadd(WORKERS_KEY, worker)
+        for _ in range(self.batch_size):
+            pipeline.lmove(QUEUE_KEY, processing_key, "LEFT", "RIGHT")
+        try:
+            _, _, *taken = redis_helper.call_redis(pipeline.execute)
+        except redis_helper.RedisUnavailableError as e:
+            self.app.logger.warning(f"Failed to read queued notifications: {e}")
+            return []
+        return [payload for payload in taken if payload is not None]
+
+    def _restore(self, taken, failed):
+        """
+        Removes taken events from the processing list once they are done, and
+        puts the failed ones back at the head of the queue in the same
+        transaction, dropping those that failed too often.
+        """
+        retried = []
+        for event in failed:
+            event["attempts"] = event.get("attempts", 0) + 1
+            if event["attempts"] < MAX_EVENT_ATTEMPTS:
+                retried.append(json.dumps(event, default=str))
+            else:
+                self.app.logger.error(
+                    f"Dropped notifications about comment {event['comment_id']}."
+                )
+        processing_key = PROCESSING_KEY.format(worker=self._worker_name())
+        redis_client = redis_helper.get_redis_client()
+        pipeline = redis_client.pipeline()
+        for payload in taken:
+            pipeline.lrem(processing_key, 1, payload)
+        if retried:
+            pipeline.lpush(QUEUE_KEY, *reversed(retried))
+        try:
+            redis_helper.call_redis(pipeline.execute)
+        except redis_helper.RedisUnavailableError as e:
+            # Left in the processing list, they are queued again if this
+            # worker stops
+            self.app.logger.error(
+                f"Failed to release {len(taken)} notification events: {e}"
+            )
+
+    def _recover(self):
+        """
+        Queues again, in order, the events other workers had taken but not
+        finished when they stopped renewing their lease. Workers that are
+        still running keep theirs.
+        """
+        redis_client = redis_helper.get_redis_client()
+        recovered = 0
+        try:
+            for worker in redis_helper.call_redis(redis_client.smembers, WORKERS_KEY):
+                if isinstance(worker, bytes):
+                    worker = worker.decode("utf-8")
+                if worker == self._worker_name() or redis_helper.call_redis(
+                    redis_client.exists, LEASE_KEY.format(worker=worker)
+                ):
+                    continue
+                processing_key = PROCESSING_KEY.format(worker=worker)
+                while redis_helper.call_redis(
+                    redis_client.lmove, processing_key, QUEUE_KEY, "RIGHT", "LEFT"
+                ):
+                    recovered += 1
+                redis_helper.call_redis(redis_client.srem, WORKERS_KEY, worker)
+        except redis_helper.RedisUnavailableError as e:
+            self.app.logger.warning(f"Failed to recover notification events: {e}")
+        if recovered:
+            self.app.logger.info(
+                f"Requeued {recovered} unfinished notification events."
+            )
+
+    def _fan_out(self, events):
+        """
+        Writes the notifications of a batch of events and counts them as
+        unread. Rows that already exist, because an event was written twice,
+        are skipped; if a chunk skipped any, its recipients' counters are
+        dropped to be recounted, since which rows were new is not known.
+
+        :return: The number of notifications written.
+        """
+        from ..models.data import Notification
+
+        rows = []
+        for event in events:
+            rows.extend(self._notifications(event))
+        if not rows:
+            return 0
+        unread = {}
+        stale = set()
+        written = 0
+        with database_proxy.atomic():
+            for start in range(0, len(rows), self.batch_size):
+                chunk = rows[start : start + self.batch_size]
+                inserted = (
+                    Notification.insert_many(chunk)
+                    .on_conflict_ignore()
+                    .as_rowcount()
+                    .execute()
+                )
+                written += inserted
+                if inserted < len(chunk):
+                    stale.update(row["user"] for row in chunk)
+                    continue
+                for row in chunk:
+                    unread[row["user"]] = unread.get(row["user"], 0) + 1
+
+        for user_id in stale:
+            unread.pop(user_id, None)
+            self.forget_unread(user_id)
+        if unread:
+            self._count_unread(unread)
+        return written
+
+    def _notifications(self, event):
+        """
+        Returns the notification rows of one event.
+        """
+        from ..models.data import Notification, PostComment, Posts, User
+
+        post = (
+            Posts.select(Posts.user)
+            .where((Posts.id == event["post_id"]) & Posts.deleted_at.is_null())
+            .first()
+        )
+        comment = PostComment.get_or_none(PostComment.id == event["comment_id"])
+        if post is None or comment is None:
+            # Deleted before its notifications were written
+            return []
+
+        kinds = {}
+        if event.get("parent_id") is not None:
+            # Everyone in the thread, found with the (post_id, path) index
+            root = comment.path[: PostComment.PATH_SEGMENT_WIDTH]
+            for (participant,) in (
+                PostComment.select(PostComment.user)
+                .where(
+                    (PostComment.post == event["post_id"])
+                    & PostComment.thread_range(root)
+                )
+                .distinct()
+                .tuples()
+            ):
+                kinds[participant] = "thread"
+            kinds[post.user_id] = "comment"
+            parent = PostComment.get_or_none(PostComment.id == event["parent_id"])
+            if parent is not None:
+                kinds[parent.user_id] = "reply"
+        else:
+            kinds[post.user_id] = "comment"
+        kinds.pop(event["user_id"], None)
+        if not kinds:
+            return []
+
+        active = {
+            user_id
+            for (user_id,) in User.select(User.id)
+            .where(User.id.in_(list(kinds)) & User.deleted_at.is_null())
+            .tuples()
+        }
+        preview = event["content"][: Notification.PREVIEW_LENGTH]
+        created_at = comment.created_at
+        return [
+            {
+                "user": user_id,
+                "actor": event["user_id"],
+                "kind": kind,
+                "post_id": event["post_id"],
+                "comment_id": event["comment_id"],
+                "preview": preview,
+                "created_at": created_at,
+            }
+            for user_id, kind in kinds.items()
+            if user_id in active
+        ]
+
+    def _count_unread(self, unread):
+        """
+        Adds new notifications to the recipients' unread counters. Counters
+        that do not exist are left to be recounted from the database. The
+        counters are watched from the check to the increment, so one dropped
+        or expired in between is not recreated holding only the new
+        notifications and without an expiry.
+        """
+        redis_client = redis_helper.get_redis_client()
+        increments = {
+            UNREAD_KEY.format(user_id=user_id): count
+            for user_id, count in unread.items()
+        }
+
+        def increment(pipeline):
+            counters = pipeline.mget(list(increments))
+            pipeline.multi()
+            for (key, count), counter in zip(increments.items(), counters):
+                if counter is not None:
+                    pipeline.incrby(key, count)
+
+        try:
+            redis_helper.call_redis(redis_client.transaction, increment, *increments)
+        except redis_helper.RedisUnavailableError as e:
+            # The counters may now be short until they expire
+            self.app.logger.warning(f"Failed to count unread notifications: {e}")
+
+    def _ensure_worker(self):
+        """
+        Starts the fan-out thread for this process, including in a worker
+        forked from a parent that started one.
+        """
+        if not self.background:
+            return
+        pid = os.getpid()
+        if self._worker_pid == pid and self._worker.is_alive():
+            return
+        with self._lock:
+            if self._worker_pid == pid and self._worker.is_alive():
+                return
+            self._worker = threading.Thread(
+                target=self._run, name="notification-fan-out", daemon=True
+            )
+            self._worker_pid = pid
+            self._worker.start()
+
+    def _run(self):
+        with self.app.app_context():
+            recovered_at = float("-inf")
+            while True:
+                time.sleep(self.flush_interval)
+                try:
+                    # Leases of stopped workers run out at any time, not
+                    # just before this one started
+                    if time.monotonic() - recovered_at >= self.lease_ttl:
+                        self._recover()
+                        recovered_at = time.monotonic()
+                    self.flush()
+                except Exception as e:
+                    self.app.logger.error(f"Failed to fan out notifications: {e}")
+
+
+def _count_unread(user_id):
+    from ..models.data import Notification
+
+    return (
+        Notification.select()
+        .where((Notification.user == user_id) & Notification.read_at.is_null())
+        .count()
+    )
+
+
+def init_notifications(app):
+    """
+    Creates the application's notification feed and stores it in
+    ``app.extensions["notifications"]``.
+
+    :param app: The Flask application.
+    :type app: flask.Flask
+    :return: The notification feed.
+    :rtype: NotificationFeed
+    """
+    feed = NotificationFeed(
+        app,
+        flush_interval=app.config["NOTIFICATIONS_FLUSH_INTERVAL"],
+        batch_size=app.config["NOTIFICATIONS_BATCH_SIZE"],
+        counter_ttl=app.config["NOTIFICATIONS_COUNTER_TTL"],
+        lease_ttl=app.config["NOTIFICATIONS_WORKER_LEASE"],
+        background=app.config["NOTIFICATIONS_BACKGROUND"],
+    )
+    app.extensions["notifications"] = feed
+    return feed
+
+
+def get_notifications():
+    """
+    Returns the current application's notification feed.
+
+    :rtype: NotificationFeed
+    """
+    return app.extensions["notifications"]
@@ -0,0 +1,289 @@
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from flask import current_app as app
+from flask import g, jsonify
+
+from . import redis_helper
+from .db import after_commit
+
+OWNER_KEY = "thesis:{thesis_id}:owner"
+PARENT_KEY = "{kind}:{child_id}:thesis"
+
+# Child models addressed by their own ID in thesis routes, keyed by kind. The
+# route argument naming a child is ``<kind>_id``.
+CHILD_KINDS = ("reference", "footnote", "table", "figure", "appendix")
+
+
+class OwnershipCache:
+    """
+    Per-process map from theses to their owners and from thesis children
+    (references, footnotes, tables, figures and appendices) to their thesis,
+    so authorization checks on thesis routes need no database query.
+
+    Lookups go through a local LRU of ``maxsize`` entries, then Redis, where
+    entries are shared by every process for ``ttl`` seconds, and only then the
+    database. Neither mapping changes while a row exists, so creating a row
+    primes both cache levels and deleting it drops them. Other processes may
+    keep a deleted row's entry in their LRU for up to ``local_ttl`` seconds;
+    such an entry points at a row that no longer exists, which the routes
+    already report as not found. If Redis is unavailable, misses are read from
+    the database.
+
+    :ivar maxsize: Entries kept in the local LRU.
+    :type maxsize: int
+    :ivar local_ttl: Seconds a local entry is trusted.
+    :type local_ttl: float
+    :ivar ttl: Seconds an entry is kept in Redis.
+    :type ttl: int
+    """
+
+    def __init__(self, app, maxsize=10000, local_ttl=60, ttl=86400):
+        self.app = app
+        self.maxsize = maxsize
+        self.local_ttl = local_ttl
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def thesis_owner(self, thesis_id):
+        """
+        Returns the ID of the user who owns a thesis.
+
+        :param thesis_id: The thesis to look up.
+        :type thesis_id: int
+        :return: The owner's user ID, or None if the thesis does not exist.
+        :rtype: int | None
+        """
+        from ..models.data import Thesis
+
+        return self._lookup(
+            OWNER_KEY.format(thesis_id=thesis_id),
+            lambda: Thesis.select(Thesis.student_id)
+            .where(Thesis.id == thesis_id)
+            .scalar(),
+        )
+
+    def child_thesis(self, kind, child_id):
+        """
+        Returns the ID of the thesis a child row belongs to.
+
+        :param kind: One of ``CHILD_KINDS``.
+        :type kind: str
+        :param child_id: The child row to look up.
+        :type child_id: int
+        :return: The thesis ID, or None if the row does not exist.
+        :rtype: int | None
+        """
+        model = _child_model(kind)
+        return self._lookup(
+            PARENT_KEY.format(kind=kind, child_id=child_id),
+            lambda: model.select(model.thesis_id).where(model.id == child_id).scalar(),
+        )
+
+    def remember(self, key, value):
+        """
+        Stores a mapping in both cache levels once the row it was read from or
+        created with is committed.
+
+        :param key: An ``OWNER_KEY`` or ``PARENT_KEY``.
+        :type key: str
+        :param value: The owner or thesis ID.
+        :type value: int
+        """
+        after_commit(self._remember, key, value)
+
+    def _remember(self, key, value):
+        self._store(key, value)
+        redis_client = redis_helper.get_redis_client()
+        try:
+            redis_helper.call_redis(redis_client.setex, key, self.ttl, value)
+        except redis_helper.RedisUnavailableError as e:
+            self.app.logger.warning(f"Failed to cache {key}: {e}")
+
+    def forget(self, key):
+        """
+        Drops a mapping from both cache levels.
+
+        :param key: An ``OWNER_KEY`` or ``PARENT_KEY``.
+        :type key: str
+        """
+        with self._lock:
+            self._entries.pop(key, None)
+        redis_client = redis_helper.get_redis_client()
+        try:
+            redis_helper.call_redis(redis_client.delete, key)
+        except redis_helper.RedisUnavailableError as e:
+            self.app.logger.error(f"Failed to invalidate {key}: {e}")
+
+    def _lookup(self, key, load):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.monotonic() - entry[1] < self.local_ttl:
+                self._entries.move_to_end(key)
+                return entry[0]
+
+        redis_client = redis_helper.get_redis_client()
+        try:
+            value = redis_helper.call_redis(redis_client.get, key)
+        except redis_helper.RedisUnavailableError as e:
+            self.app.logger.warning(f"Ownership cache unavailable for {key}: {e}")
+            return load()
+
+        if value is not None:
+            value = int(value)
+            self._store(key, value)
+            return value
+
+        value = load()
+        if value is not None:
+            self.remember(key, value)
+        return value
+
+    def _store(self, key, value):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+
+def _child_model(kind):
+    from ..models.data import Appendix, Figure, Footnote, Reference, TableEntry
+
+    models = {
+        "reference": Reference,
+        "footnote": Footnote,
+        "table": TableEntry,
+        "figure": Figure,
+        "appendix": Appendix,
+    }
+    return models[kind]
+
+
+def init_ownership_cache(app):
+    """
+    Creates the application's ownership cache and stores it in
+    ``app.extensions["ownership_cache"]``.
+
+    :param app: The Flask application.
+    :type app: flask.Flask
+    :return: The ownership cache.
+    :rtype: OwnershipCache
+    """
+    cache = OwnershipCache(
+        app,
+        maxsize=app.config["OWNERSHIP_CACHE_SIZE"],
+        local_ttl=app.config["OWNERSHIP_LOCAL_TTL"],
+        ttl=app.config["OWNERSHIP_CACHE_TTL"],
+    )
+    app.extensions["ownership_cache"] = cache
+    return cache
+
+
+def get_ownership_cache():
+    """
+    Returns the current application's ownership cache.
+
+    :rtype: OwnershipCache
+    """
+    return app.extensions["ownership_cache"]
+
+
+def remember_thesis(thesis_id, owner_id):
+    """
+    Records the owner of a newly created thesis.
+
+    :param thesis_id: The new thesis.
+    :type thesis_id: int
+    :param owner_id: The user who owns it.
+    :type owner_id: int
+    """
+    get_ownership_cache().remember(OWNER_KEY.format(thesis_id=thesis_id), owner_id)
+
+
+def forget_thesis(thesis_id):
+    """
+    Drops the cached owner of a deleted thesis.
+
+    :param thesis_id: The deleted thesis.
+    :type thesis_id: int
+    """
+    get_ownership_cache().forget(OWNER_KEY.format(thesis_id=thesis_id))
+
+
+def remember_child(kind, child_id, thesis_id):
+    """
+    Records the thesis of a newly created child row.
+
+    :param kind: One of ``CHILD_KINDS``.
+    :type kind: str
+    :param child_id: The new row.
+    :type child_id: int
+    :param thesis_id: The thesis it belongs to.
+    :type thesis_id: int
+    """
+    get_ownership_cache().remember(
+        PARENT_KEY.format(kind=kind, child_id=child_id), thesis_id
+    )
+
+
+def forget_child(kind, child_id):
+    """
+    Drops the cached thesis of a deleted child row.
+
+    :param kind: One of ``CHILD_KINDS``.
+    :type kind: str
+    :param child_id: The deleted row.
+    :type child_id: int
+    """
+    get_ownership_cache().forget(PARENT_KEY.format(kind=kind, child_id=child_id))
+
+
+def thesis_owner_required(f):
+    """
+    Decorator that lets a request through only if the authenticated user owns
+    the thesis the route addresses. The thesis is taken from the ``thesis_id``
+    route argument or, for routes addressing a child row by its own ID (such as
+    ``reference_id``), from the row's thesis; when a route names both, the
+    child must belong to that thesis. The thesis ID is stored in ``g.thesis_id``.
+
+    Place it below ``jwt_required``. Missing and foreign theses both get a 404
+    response so thesis IDs cannot be probed.
+
+    :param f: The view function to protect.
+    :type f: Callable
+    :return: The decorated function.
+    :rtype: Callable
+    """
+
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        cache = get_ownership_cache()
+        thesis_id = kwargs.get("thesis_id")
+        for kind in CHILD_KINDS:
+            child_id = kwargs.get(f"{kind}_id")
+            if child_id is None:
+                continue
+            parent_id = cache.child_thesis(kind, child_id)
+            if parent_id is None or thesis_id not in (None, parent_id):
+                return _not_accessible()
+            thesis_id = parent_id
+
+        if thesis_id is None or cache.thesis_owner(thesis_id) != g.user_id:
+            app.logger.warning(f"User {g.user_id} denied access to thesis {thesis_id}")
+            return _not_accessible()
+
+        g.thesis_id = thesis_id
+        return f(*args, **kwargs)
+
+    return decorated_function
+
+
+def _not_accessible():
+    return (
+        jsonify({"success": False, "message": "Thesis not found or not accessible."}),
+        404,
+    )
@@ -0,0 +1,142 @@
+import hashlib
+import hmac
+import string
+import time
+from functools import lru_cache
+
+from flask import current_app as app
+from werkzeug.security import check_password_hash, generate_password_hash
+
+# Salt of the SHA-256 password hashes stored before werkzeug hashing was used.
+LEGACY_SALT = "thesis-genius-salt"
+
+# Candidate scrypt work factors tried by calibrate_hash_method, cheapest first.
+# With r=8 the largest needs 128 MiB per hash.
+SCRYPT_COST_FACTORS = [2**exponent for exponent in range(14, 18)]
+
+
+def legacy_password_hash(password):
+    """
+    Computes the salted SHA-256 hash used for legacy passwords.
+
+    :param password: The plain text password.
+    :type password: str
+    :return: The hash as a hexadecimal string.
+    :rtype: str
+    """
+    return hashlib.sha256((password + LEGACY_SALT).encode("utf-8")).hexdigest()
+
+
+def is_legacy_hash(stored_hash):
+    """
+    Tells whether a stored hash is a legacy SHA-256 hex digest rather than a
+    werkzeug ``method$salt$hash`` string.
+
+    :param stored_hash: The stored password hash.
+    :type stored_hash: str
+    :rtype: bool
+    """
+    return len(stored_hash) == 64 and all(c in string.hexdigits for c in stored_hash)
+
+
+def hash_password(password, method=None):
+    """
+    Hashes a password with the configured method.
+
+    :param password: The plain text password.
+    :type password: str
+    :param method: A werkzeug hash method such as ``scrypt:32768:8:1``. Defaults
+        to the application's ``PASSWORD_HASH_METHOD``.
+    :type method: str, optional
+    :return: The password hash.
+    :rtype: str
+    """
+    return generate_password_hash(password, method=method or _configured_method())
+
+
+def verify_password(stored_hash, password, method=None):
+    """
+    Checks a password against its stored hash and tells whether the hash should
+    be replaced, which is the case for legacy hashes and for hashes made with
+    parameters other than the configured ones, whether stronger or weaker.
+
+    :param stored_hash: The stored password hash.
+    :type stored_hash: str
+    :param password: The plain text password to check.
+    :type password: str
+    :param method: The hash method new hashes use. Defaults to the
+        application's ``PASSWORD_HASH_METHOD``.
+    :type method: str, optional
+    :return: Whether the password matches, and whether the caller should store
+        a new hash of it.
+    :rtype: tuple[bool, bool]
+    """
+    if not stored_hash:
+        return False, False
+    if is_legacy_hash(stored_hash):
+        matches = hmac.compare_digest(stored_hash, legacy_password_hash(password))
+        return matches, matches
+    if not check_password_hash(stored_hash, password):
+        return False, False
+    method = method or _configured_method()
+    return True, stored_hash.split("$", 1)[0] != _method_prefix(method)
+
+
+def calibrate_hash_method(target_ms, algorithm="scrypt", rounds=3):
+    """
+    Picks the strongest hash parameters whose hashing time on this machine
+    stays within a latency budget. Each candidate is timed ``rounds`` times and
+    its median is compared with the budget.
+
+    :param target_ms: The time one hash may take, in milliseconds.
+    :type target_ms: float
+    :param algorithm: ``scrypt`` or ``pbkdf2``.
+    :type algorithm: str
+    :param rounds: Timings per candidate.
+    :type rounds: int
+    :return: The hash method and its median hashing time in milliseconds. If
+        even the cheapest candidate is over budget, it is returned anyway.
+    :rtype: tuple[str, float]
+    :raises ValueError: If the algorithm is not supported.
+    """
+    if algorithm == "scrypt":
+        best = None
+        for cost in SCRYPT_COST_FACTORS:
+            method = f"scrypt:{cost}:8:1"
+            elapsed = _time_hash(method, rounds)
+            if elapsed > target_ms:
+                return best or (method, elapsed)
+            best = (method, elapsed)
+        return best
+
+    if algorithm == "pbkdf2":
+        # Cost grows linearly with the iteration count, so scale a sample.
+        sample = 100000
+        elapsed = _time_hash(f"pbkdf2:sha256:{sample}", rounds)
+        iterations = max(10000, int(sample * target_ms / elapsed) // 10000 * 10000)
+        method = f"pbkdf2:sha256:{iterations}"
+        return method, _time_hash(method, rounds)
+
+    raise ValueError(f"Unsupported hash algorithm: {algorithm}")
+
+
+def _configured_method():
+    return app.config["PASSWORD_HASH_METHOD"]
+
+
+@lru_cache(maxsize=None)
+def _method_prefix(method):
+    """
+    Returns the method part werkzeug writes into hashes made with ``method``,
+    which spells out defaults (``scrypt`` becomes ``scrypt:32768:8:1``).
+    """
+    return generate_password_hash("", method=method).split("$", 1)[0]
+
+
+def _time_hash(method, rounds):
+    timings = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        generate_password_hash("calibration-password", method=method)
+        timings.append((time.perf_counter() - start) * 1000)
+    return sorted(timings)[len(timings) // 2]
@@ -0,0 +1,269 @@
+import math
+import secrets
+import threading
+import time
+from collections import deque
+from functools import wraps
+
+from flask import current_app as app
+from flask import g, jsonify, request
+
+from . import redis_helper
+
+KEY_PREFIX = "ratelimit"
+
+WRITE_METHODS = {"POST", "PUT", "PATCH", "DELETE"}
+
+# Sliding window log kept in a sorted set scored by Redis server time in
+# microseconds, so every app server shares one clock. Returns whether the hit
+# was allowed, the hits left in the window and the milliseconds until the
+# oldest hit leaves it.
+SLIDING_WINDOW_SCRIPT = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000000 + tonumber(t[2])
+local window = tonumber(ARGV[1]) * 1000000
+local limit = tonumber(ARGV[2])
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', now - window)
+local count = redis.call('ZCARD', KEYS[1])
+if count < limit then
+    redis.call('ZADD', KEYS[1], now, ARGV[3])
+    redis.call('PEXPIRE', KEYS[1], math.ceil(window / 1000))
+    return {1, limit - count - 1, 0}
+end
+local oldest = redis.call('ZRANGE', KEYS[1], 0, 0, 'WITHSCORES')
+return {0, 0, math.ceil((tonumber(oldest[2]) + window - now) / 1000)}
+"""
+
+
+class RedisStore:
+    """
+    Sliding-window counters shared by every process, evaluated atomically by a
+    Lua script so concurrent hits cannot both take the last slot.
+    """
+
+    def __init__(self):
+        self._script = None
+
+    def hit(self, key, limit, window):
+        """
+        Records a hit if the window has room for it.
+
+        :param key: The counter key.
+        :type key: str
+        :param limit: Hits allowed per window.
+        :type limit: int
+        :param window: Window length in seconds.
+        :type window: int
+        :return: Whether the hit was allowed, the hits left, and the seconds
+            until another hit is allowed.
+        :rtype: tuple[bool, int, float]
+        :raises RedisUnavailableError: If the script could not be run.
+        """
+        redis_client = redis_helper.get_redis_client()
+        if self._script is None:
+            self._script = redis_client.register_script(SLIDING_WINDOW_SCRIPT)
+        allowed, remaining, retry_ms = redis_helper.call_redis(
+            self._script,
+            keys=[key],
+            args=[window, limit, secrets.token_hex(8)],
+            client=redis_client,
+        )
+        return bool(allowed), int(remaining), int(retry_ms) / 1000
+
+
+class MemoryStore:
+    """
+    Sliding-window counters private to the process. Used when Redis is not
+    configured as the store or cannot be reached, so limits keep applying per
+    worker during an outage.
+    """
+
+    # Hits between sweeps that drop counters whose window has emptied.
+    SWEEP_EVERY = 1000
+
+    def __init__(self):
+        self._hits = {}
+        self._lock = threading.Lock()
+        self._since_sweep = 0
+
+    def hit(self, key, limit, window):
+        """
+        Records a hit if the window has room for it.
+
+        :param key: The counter key.
+        :type key: str
+        :param limit: Hits allowed per window.
+        :type limit: int
+        :param window: Window length in seconds.
+        :type window: int
+        :return: Whether the hit was allowed, the hits left, and the seconds
+            until another hit is allowed.
+        :rtype: tuple[bool, int, float]
+        """
+        now = time.monotonic()
+        with self._lock:
+            self._since_sweep += 1
+            if self._since_sweep >= self.SWEEP_EVERY:
+                self._sweep(now)
+            hits, _ = self._hits.setdefault(key, (deque(), window))
+            while hits and hits[0] <= now - window:
+                hits.popleft()
+            if len(hits) < limit:
+                hits.append(now)
+                return True, limit - len(hits), 0
+            return False, 0, hits[0] + window - now
+
+    def _sweep(self, now):
+        self._since_sweep = 0
+        self._hits = {
+            key: (hits, window)
+            for key, (hits, window) in self._hits.items()
+            if hits and hits[-1] > now - window
+        }
+
+
+class RateLimiter:
+    """
+    Applies the rules in ``RATELIMITS`` to incoming requests.
+
+    Each rule has a window in seconds and a limit per scope: ``ip`` (the client
+    address), ``user`` (the authenticated user, or the client address with the
+    email submitted to signin and register, so failed attempts from one client
+    cannot lock everyone else out of an account), and ``institution`` (the
+    submitted institution, or the authenticated user's). A request must stay
+    within the limit of every scope that applies to it; scopes are counted in
+    order and the first one over its limit rejects the request without
+    charging it to the rest. Counters live in Redis when ``RATELIMIT_STORAGE``
+    is ``redis``; if Redis cannot be reached, the in-process store takes over.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.redis_store = RedisStore()
+        self.memory_store = MemoryStore()
+
+    def check(self, rule_name):
+        """
+        Counts the current request against a rule.
+
+        :param rule_name: A key of ``RATELIMITS``.
+        :type rule_name: str
+        :return: None if the request may proceed, otherwise the seconds until
+            it would be allowed.
+        :rtype: float or None
+        """
+        if not self.app.config["RATELIMIT_ENABLED"]:
+            return None
+        rule = self.app.config["RATELIMITS"][rule_name]
+        for scope, limit in rule["limits"].items():
+            value = _scope_value(scope)
+            if value is None:
+                continue
+            key = f"{KEY_PREFIX}:{rule_name}:{scope}:{value}"
+            allowed, _, wait = self._hit(key, limit, rule["window"])
+            if not allowed:
+                return wait
+        return None
+
+    def _hit(self, key, limit, window):
+        if self.app.config["RATELIMIT_STORAGE"] == "redis":
+            try:
+                return self.redis_store.hit(key, limit, window)
+            except redis_helper.RedisUnavailableError as e:
+                self.app.logger.warning(f"Rate limiting in process, Redis failed: {e}")
+        return self.memory_store.hit(key, limit, window)
+
+
+def _scope_value(scope):
+    """
+    Returns the value a scope keys its counter on for the current request, or
+    None if the scope does not apply to it.
+    """
+    if scope == "ip":
+        return request.remote_addr
+    data = request.get_json(silent=True)
+    data = data if isinstance(data, dict) else {}
+    if scope == "user":
+        if g.get("user_id"):
+            return str(g.user_id)
+        email = data.get("email")
+        if not isinstance(email, str) or not email.strip():
+            return None
+        return f"{request.remote_addr}:{email.strip().lower()}"
+    if scope == "institution":
+        institution = data.get("institution")
+        if not institution and g.get("user_id"):
+            from ..models.data import User
+
+            institution = (
+                User.select(User.institution).where(User.id == g.user_id).scalar()
+            )
+        if not isinstance(institution, str) or not institution.strip():
+            return None
+        return institution.strip().lower()
+    raise ValueError(f"Unknown rate limit scope: {scope}")
+
+
+def _too_many_requests(retry_after):
+    return (
+        jsonify({"success": False, "message": "Too many requests"}),
+        429,
+        {"Retry-After": str(max(1, math.ceil(retry_after)))},
+    )
+
+
+def init_rate_limiter(app):
+    """
+    Creates the application's rate limiter, stores it in
+    ``app.extensions["rate_limiter"]`` and, if a ``write`` rule is configured,
+    applies it to every mutating API request.
+
+    :param app: The Flask application.
+    :type app: flask.Flask
+    :return: The rate limiter.
+    :rtype: RateLimiter
+    """
+    limiter = RateLimiter(app)
+    app.extensions["rate_limiter"] = limiter
+
+    @app.before_request
+    def limit_writes():
+        if (
+            "write" in app.config["RATELIMITS"]
+            and request.method in WRITE_METHODS
+            and request.path.startswith("/api/")
+        ):
+            retry_after = limiter.check("write")
+            if retry_after is not None:
+                return _too_many_requests(retry_after)
+        return None
+
+    return limiter
+
+
+def rate_limit(rule_name):
+    """
+    Decorator that rejects requests over the limits of a ``RATELIMITS`` rule
+    with a 429 response carrying a ``Retry-After`` header. Place it below
+    ``jwt_required`` so user-scoped limits see the authenticated user.
+
+    :param rule_name: A key of ``RATELIMITS``.
+    :type rule_name: str
+    :return: The decorator.
+    :rtype: Callable
+    """
+
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            retry_after = app.extensions["rate_limiter"].check(rule_name)
+            if retry_after is not None:
+                app.logger.warning(
+                    f"Rate limit {rule_name} exceeded by {request.remote_addr}"
+                )
+                return _too_many_requests(retry_after)
+            return f(*args, **kwargs)
+
+        return decorated_function
+
+    return decorator
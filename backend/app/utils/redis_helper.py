@@ -1,115 +1,277 @@
-from datetime import datetime, timedelta, timezone
+import os
+import weakref
+from datetime import datetime, timezone
 
 import redis
 from flask import current_app as app
 
+from .circuit_breaker import CircuitBreaker, CircuitOpenError
 
-def get_redis_client():
+# Sorted set per user of issued token IDs, scored by expiry timestamp.
+USER_TOKENS_KEY = "user:{user_id}:tokens"
+# Sorted set of blacklisted token IDs, scored by expiry timestamp.
+REVOKED_TOKENS_KEY = "revoked_tokens"
+
+# Every pool created by init_redis_pool, so they can be reset after a fork.
+_pools = weakref.WeakSet()
+
+
+def _reset_pools_after_fork():
+    """
+    Drops connections inherited from the parent process. Pre-fork servers such
+    as gunicorn create the app before forking workers; a socket shared between
+    processes would interleave replies, so each child starts with an empty pool.
     """
-    Creates and returns a Redis client configured with the connection details provided
-    in the application configuration. If no specific connection details are provided,
-    it defaults to localhost, port 6379, database 0, with no password. The client
-    is configured to decode responses for convenience.
+    for pool in list(_pools):
+        pool.reset()
 
-    :return: A Redis client instance configured based on application settings.
-    :rtype: redis.StrictRedis
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_pools_after_fork)
+
+
+class RedisUnavailableError(Exception):
+    """
+    Raised when a Redis command fails or is not attempted because the circuit
+    breaker is open.
+    """
+
+
+def init_redis_pool(app):
+    """
+    Creates the process-wide Redis connection pools for the application and
+    stores them in ``app.extensions["redis_pool"]`` and
+    ``app.extensions["redis_bulk_pool"]``, along with the circuit breaker that
+    guards them in ``app.extensions["redis_breaker"]``. No connection is opened
+    until the first command is sent. Socket timeouts on the main pool are kept
+    short so a stalled server fails a command quickly instead of holding the
+    request; the small bulk pool allows ``bulk_socket_timeout`` for commands
+    whose cost grows with the data, and for pub/sub subscriptions.
+
+    :param app: The Flask application whose ``REDIS_CONNECTION_INFO`` is used.
+    :type app: flask.Flask
+    :return: The connection pool shared by every client of this application.
+    :rtype: redis.ConnectionPool
     """
     redis_connection_info = app.config.get("REDIS_CONNECTION_INFO", {})
-    return redis.StrictRedis(
-        host=redis_connection_info.get("host", "localhost"),
-        port=redis_connection_info.get("port", 6379),
-        db=redis_connection_info.get("db", 0),
-        password=redis_connection_info.get("password", None),
-        decode_responses=True,
+
+    def create_pool(max_connections, socket_timeout):
+        pool = redis.ConnectionPool(
+            host=redis_connection_info.get("host", "localhost"),
+            port=redis_connection_info.get("port", 6379),
+            db=redis_connection_info.get("db", 0),
+            password=redis_connection_info.get("password", None),
+            max_connections=max_connections,
+            socket_timeout=socket_timeout,
+            socket_connect_timeout=redis_connection_info.get(
+                "socket_connect_timeout", None
+            ),
+            decode_responses=True,
+        )
+        _pools.add(pool)
+        return pool
+
+    pool = create_pool(
+        redis_connection_info.get("max_connections", None),
+        redis_connection_info.get("socket_timeout", None),
+    )
+    app.extensions["redis_breaker"] = CircuitBreaker(
+        "redis",
+        failure_threshold=app.config.get("REDIS_BREAKER_FAILURE_THRESHOLD", 5),
+        reset_timeout=app.config.get("REDIS_BREAKER_RESET_TIMEOUT", 10),
+        exceptions=(redis.RedisError,),
     )
+    app.extensions["redis_bulk_pool"] = create_pool(
+        redis_connection_info.get("bulk_max_connections", None),
+        redis_connection_info.get("bulk_socket_timeout", None),
+    )
+    app.extensions["redis_pool"] = pool
+    return pool
+
+
+def get_redis_client():
+    """
+    Returns a Redis client bound to the application's shared connection pool.
+    Creating the client is cheap: connections are borrowed from the pool per
+    command and returned afterwards, so requests no longer open a new TCP
+    connection each time. The pool is created on first use if the app factory
+    did not set it up. The client is configured to decode responses for
+    convenience.
+
+    :return: A Redis client instance backed by the shared connection pool.
+    :rtype: redis.StrictRedis
+    """
+    pool = app.extensions.get("redis_pool") or init_redis_pool(app)
+    return redis.StrictRedis(connection_pool=pool)
+
+
+def get_redis_bulk_client():
+    """
+    Returns a Redis client bound to the application's bulk connection pool,
+    whose longer socket timeout suits scans, full reads of large keys and
+    pub/sub subscriptions. Request handling should use ``get_redis_client``.
+
+    :return: A Redis client instance backed by the bulk connection pool.
+    :rtype: redis.StrictRedis
+    """
+    if "redis_bulk_pool" not in app.extensions:
+        init_redis_pool(app)
+    return redis.StrictRedis(connection_pool=app.extensions["redis_bulk_pool"])
+
+
+def get_redis_breaker():
+    """
+    Returns the circuit breaker guarding the application's Redis pool.
+
+    :rtype: CircuitBreaker
+    """
+    if "redis_breaker" not in app.extensions:
+        init_redis_pool(app)
+    return app.extensions["redis_breaker"]
 
 
-def add_token_to_user(user_id, token, expiry_seconds):
+def call_redis(func, *args, **kwargs):
     """
-    Adds a token to the specified user in the Redis database with an associated expiry time.
+    Runs a Redis command (or a pipeline's ``execute``) through the circuit
+    breaker. Once enough consecutive commands have failed, later ones are
+    rejected immediately until the breaker lets a trial command through.
+
+    :param func: The bound client or pipeline method to call.
+    :type func: Callable
+    :return: The command's reply.
+    :raises RedisUnavailableError: If the command failed or was not attempted.
+    """
+    try:
+        return get_redis_breaker().call(func, *args, **kwargs)
+    except (redis.RedisError, CircuitOpenError) as e:
+        raise RedisUnavailableError(str(e)) from e
+
+
+def serve_stale_allowed():
+    """
+    Tells whether callers may fall back to locally cached state while Redis is
+    unavailable. That is the case under the ``serve_stale`` degraded policy
+    until the outage has lasted ``REDIS_STALE_GRACE_SECONDS``; under
+    ``fail_closed`` it never is.
+
+    :rtype: bool
+    """
+    if app.config.get("REDIS_DEGRADED_POLICY") != "serve_stale":
+        return False
+    outage = get_redis_breaker().outage_seconds()
+    return outage is None or outage < app.config["REDIS_STALE_GRACE_SECONDS"]
+
+
+def _now():
+    return datetime.now(timezone.utc).timestamp()
 
-    The function stores the provided token for a user in Redis using a hash structure
-    and sets an expiry time for the user's token list to ensure it gets cleaned up after
-    the token with the longest expiry duration is no longer valid. The `expiry_seconds`
-    parameter defines how long the token and the list of the user's tokens remain valid.
+
+def add_token_to_user(user_id, jti, expiry_seconds):
+    """
+    Records a token issued to the user in their token registry.
+
+    Tokens are identified by their short ``jti`` claim rather than the encoded
+    JWT, which keeps each entry to a few bytes. The registry is a sorted set
+    scored by expiry timestamp: entries that have expired are trimmed with
+    ZREMRANGEBYSCORE whenever a token is added, instead of giving every token a
+    key of its own with a TTL. The whole set expires once its newest token has.
 
     :param user_id: Identifier for the user to whom the token is added.
     :type user_id: str
-    :param token: Unique token associated with the user.
-    :type token: str
-    :param expiry_seconds: The length of time in seconds until the token and token list expires.
+    :param jti: The token's unique identifier.
+    :type jti: str
+    :param expiry_seconds: The length of time in seconds until the token expires.
     :type expiry_seconds: int
     :return: None
     """
     redis_client = get_redis_client()
-    token_key = f"user:{user_id}:tokens"
-    expiry_time = (
-        datetime.now(timezone.utc) + timedelta(seconds=expiry_seconds)
-    ).timestamp()
-    redis_client.hset(token_key, token, expiry_time)
-    redis_client.expire(
-        token_key, expiry_seconds
-    )  # Expire user's token list after the longest token expires
+    token_key = USER_TOKENS_KEY.format(user_id=user_id)
+    now = _now()
+    # All commands go out in a single round trip
+    pipeline = redis_client.pipeline()
+    pipeline.zremrangebyscore(token_key, "-inf", now)
+    pipeline.zadd(token_key, {jti: now + expiry_seconds})
+    pipeline.expire(token_key, expiry_seconds)
+    call_redis(pipeline.execute)
 
 
-def blacklist_token(token, ttl=3600):
+def blacklist_token(jti, ttl=3600):
     """
-    Blacklist a given token in a Redis cache.
+    Blacklist a token by its ``jti``.
 
-    This function takes a token and blacklists it by storing it in a Redis
-    cache with a specified time-to-live (TTL). The token is no longer valid
-    and should not be used further. An optional TTL parameter can be passed
-    to override the default time-to-live period.
+    The token is added to the revoked tokens sorted set, scored by the time
+    its entry can be dropped. An optional TTL parameter can be passed to
+    override the default, which matches the token lifetime. The token is also
+    added to the shared revocation filter so every worker rejects it right away.
 
-    :param token: The token to be blacklisted.
-    :type token: str
-    :param ttl: Time-to-live for the blacklisted token in seconds. Defaults
-        to 3600 seconds if not specified.
+    :param jti: The identifier of the token to be blacklisted.
+    :type jti: str
+    :param ttl: Seconds the token stays blacklisted. Defaults to 3600 seconds if
+        not specified.
     :type ttl: int, optional
     :return: None
     """
     redis_client = get_redis_client()
-    redis_client.setex(f"blacklist:{token}", ttl, "true")
+    call_redis(redis_client.zadd, REVOKED_TOKENS_KEY, {jti: _now() + ttl})
 
+    from .revocation_filter import record_blacklisted_tokens
 
-def is_token_blacklisted(token):
+    record_blacklisted_tokens([jti])
+
+
+def is_token_blacklisted(jti):
     """
     Checks whether a given token is blacklisted or not.
 
-    This function connects to a Redis instance to check if the
-    specific token exists in the blacklist. If the token exists
-    in the blacklist, it is considered invalid or unauthorized.
+    Entries past their expiry score count as absent even before they are
+    pruned.
 
-    :param token: The token to be checked against the blacklist.
-                  Must be a string representing the token.
+    :param jti: The identifier of the token to be checked against the blacklist.
+    :type jti: str
     :returns: A boolean indicating whether the token is
               blacklisted (True if blacklisted, False otherwise).
     :rtype: bool
     """
     redis_client = get_redis_client()
-    return redis_client.exists(f"blacklist:{token}") > 0
+    expiry = call_redis(redis_client.zscore, REVOKED_TOKENS_KEY, jti)
+    return expiry is not None and expiry > _now()
 
 
-def get_user_tokens(user_id):
+def get_revoked_tokens():
+    """
+    Prunes expired entries from the blacklist and returns the ones left, in a
+    single round trip on the bulk pool. Used to rebuild the revocation filter.
+
+    :return: The ``jti`` of every token that is still blacklisted.
+    :rtype: list[str]
     """
-    Retrieve all tokens associated with a specific user from Redis.
+    redis_client = get_redis_bulk_client()
+    now = _now()
+    pipeline = redis_client.pipeline()
+    pipeline.zremrangebyscore(REVOKED_TOKENS_KEY, "-inf", now)
+    pipeline.zrangebyscore(REVOKED_TOKENS_KEY, now, "+inf")
+    _, revoked = call_redis(pipeline.execute)
+    return [jti if isinstance(jti, str) else jti.decode("utf-8") for jti in revoked]
 
-    This function queries the Redis database for all tokens linked to a given
-    user ID. It uses a Redis hash structure where tokens are stored under a
-    specific key pattern associated with the user. The retrieved tokens are
-    returned as a dictionary.
+
+def get_user_tokens(user_id):
+    """
+    Retrieve the live tokens associated with a specific user from Redis.
 
     :param user_id: The unique identifier of the user for which tokens are
         being retrieved.
     :type user_id: str
-    :return: A dictionary containing all tokens associated with the user,
-        where the keys and values represent token attributes and their
-        respective information.
+    :return: A dictionary mapping each unexpired token's ``jti`` to its expiry
+        timestamp.
     :rtype: dict
     """
     redis_client = get_redis_client()
-    token_key = f"user:{user_id}:tokens"
-    return redis_client.hgetall(token_key)
+    token_key = USER_TOKENS_KEY.format(user_id=user_id)
+    return dict(
+        call_redis(
+            redis_client.zrangebyscore, token_key, _now(), "+inf", withscores=True
+        )
+    )
 
 
 def revoke_user_tokens(user_id):
@@ -118,32 +280,84 @@ def revoke_user_tokens(user_id):
     and removing the tokens from the Redis data store. This operation ensures that all
     access tokens linked to a user become invalid.
 
-    The function iterates through tokens stored in Redis for the given user, calculates
-    their remaining time-to-live (TTL), and adds them to a blacklist mechanism for
-    validation during future requests. Once all tokens are processed, the function
-    deletes the token entries in Redis.
+    The function reads every unexpired token and its expiry with a single
+    ZRANGEBYSCORE, then adds them to the blacklist with their expiry as score
+    and deletes the user's registry in one pipelined round trip, so revocation
+    costs two round trips regardless of how many tokens the user holds. Finally
+    the user's revocation epoch is bumped, which is what ``jwt_required``
+    checks, so tokens that were never recorded in the registry are revoked as
+    well.
 
     :param user_id: Unique identifier of the user whose tokens are to be revoked.
     :type user_id: str
     :return: None
     :rtype: NoneType
     """
-    redis_client = get_redis_client()
-    token_key = f"user:{user_id}:tokens"
-    tokens = redis_client.hkeys(token_key)
-
-    for token in tokens:
-        # Redis keys/values may be byte strings; decode if necessary
-        token_str = token if isinstance(token, str) else token.decode("utf-8")
-        expiry = redis_client.hget(token_key, token_str)
-        expiry = (
-            float(expiry) if isinstance(expiry, str) else float(expiry.decode("utf-8"))
+    token_key = USER_TOKENS_KEY.format(user_id=user_id)
+    tokens = get_user_tokens(user_id)
+    blacklisted = [
+        jti if isinstance(jti, str) else jti.decode("utf-8") for jti in tokens
+    ]
+
+    pipeline = get_redis_client().pipeline()
+    if tokens:
+        pipeline.zadd(REVOKED_TOKENS_KEY, dict(zip(blacklisted, tokens.values())))
+    pipeline.delete(token_key)
+    call_redis(pipeline.execute)
+
+    from .revocation import bump_revocation_epoch
+    from .revocation_filter import record_blacklisted_tokens
+
+    record_blacklisted_tokens(blacklisted)
+    bump_revocation_epoch(user_id)
+
+
+def get_token_registry_stats():
+    """
+    Reports how much the token registry and blacklist hold.
+
+    Every ``user:*:tokens`` key is visited with SCAN, and the sizes are read
+    in pipelined batches, all on the bulk pool. Memory figures come from
+    MEMORY USAGE and are None on servers that do not support it.
+
+    :return: Counts of registries, registered and blacklisted tokens, and their
+        memory footprint in bytes.
+    :rtype: dict
+    """
+    redis_client = get_redis_bulk_client()
+    registry_keys = call_redis(
+        lambda: list(
+            redis_client.scan_iter(
+                match=USER_TOKENS_KEY.format(user_id="*"), count=1000
+            )
         )
+    )
+
+    pipeline = redis_client.pipeline()
+    for key in registry_keys:
+        pipeline.zcard(key)
+    pipeline.zcard(REVOKED_TOKENS_KEY)
+    *registry_sizes, revoked_count = call_redis(pipeline.execute)
 
-        remaining_ttl = max(0, int(expiry - datetime.now(timezone.utc).timestamp()))
-        blacklist_token(token_str, remaining_ttl)
+    try:
+        pipeline = redis_client.pipeline()
+        for key in registry_keys:
+            pipeline.memory_usage(key)
+        pipeline.memory_usage(REVOKED_TOKENS_KEY)
+        *registry_bytes, revoked_bytes = call_redis(pipeline.execute)
+        registry_bytes = sum(size or 0 for size in registry_bytes)
+    except RedisUnavailableError as e:
+        if not isinstance(e.__cause__, redis.ResponseError):
+            raise
+        registry_bytes = revoked_bytes = None
 
-    redis_client.delete(token_key)
+    return {
+        "user_registries": len(registry_keys),
+        "registered_tokens": sum(registry_sizes),
+        "registered_tokens_bytes": registry_bytes,
+        "revoked_tokens": revoked_count,
+        "revoked_tokens_bytes": revoked_bytes,
+    }
 
 
 def is_token_expired(token):
@@ -0,0 +1,243 @@
+import os
+import threading
+import time
+
+from flask import current_app as app
+
+from . import redis_helper
+
+EPOCH_KEY = "user:{user_id}:revocation_epoch"
+EPOCH_CHANNEL = "revocation:epochs"
+
+
+class RevocationCache:
+    """
+    Per-process view of every user's token revocation epoch.
+
+    Each user has an integer epoch in Redis that starts at 0. Tokens record the
+    epoch that was current when they were issued (the ``rev`` claim), and a
+    token is revoked once the user's epoch has moved past it. Bumping the
+    epoch therefore revokes all of a user's outstanding tokens at once without
+    tracking them individually.
+
+    Epochs are served from a local dictionary so the authentication hot path
+    is a memory lookup. A background thread subscribed to ``EPOCH_CHANNEL``
+    applies bumps published by other processes as they happen; entries also
+    expire after ``ttl`` seconds to bound staleness if a message is missed or
+    the subscriber is disabled. Redis is only read on a cache miss.
+
+    If Redis is unavailable on a miss, an expired entry is still served while
+    the degraded policy allows it (see ``redis_helper.serve_stale_allowed``);
+    otherwise ``RedisUnavailableError`` is raised and the request fails closed.
+
+    Epoch keys never expire: if one were dropped the epoch would restart at 0
+    and tokens issued under a higher epoch could outlive a later revocation.
+    Each is a single small integer per user who has ever been revoked.
+
+    :ivar ttl: Seconds a cached epoch is trusted before it is re-read.
+    :type ttl: float
+    """
+
+    def __init__(self, app, ttl=300, subscribe=True):
+        self.app = app
+        self.ttl = ttl
+        self.subscribe = subscribe
+        self._epochs = {}
+        self._lock = threading.Lock()
+        self._listener = None
+        self._listener_pid = None
+
+    def current_epoch(self, user_id, fresh=False):
+        """
+        Returns the user's current revocation epoch, reading Redis only when
+        there is no fresh local entry.
+
+        :param user_id: The user whose epoch is requested.
+        :type user_id: int
+        :param fresh: Always read Redis. Token issuance uses this so a token is
+            never stamped with an epoch another process has already moved past.
+        :type fresh: bool
+        :return: The current epoch, 0 if the user was never revoked.
+        :rtype: int
+        :raises RedisUnavailableError: If Redis could not be read and no cached
+            epoch may be served.
+        """
+        self._ensure_listener()
+        entry = self._epochs.get(user_id)
+        if not fresh and entry is not None and time.monotonic() - entry[1] < self.ttl:
+            return entry[0]
+
+        redis_client = redis_helper.get_redis_client()
+        try:
+            epoch = int(
+                redis_helper.call_redis(
+                    redis_client.get, EPOCH_KEY.format(user_id=user_id)
+                )
+                or 0
+            )
+        except redis_helper.RedisUnavailableError:
+            if fresh or entry is None or not redis_helper.serve_stale_allowed():
+                raise
+            self.app.logger.warning(
+                f"Serving cached revocation epoch for user {user_id} while Redis "
+                f"is unavailable"
+            )
+            return entry[0]
+        self._store(user_id, epoch)
+        return epoch
+
+    def bump(self, user_id):
+        """
+        Advances the user's epoch, revoking every token issued before now, and
+        publishes the new value so other processes update their caches.
+
+        :param user_id: The user whose tokens are revoked.
+        :type user_id: int
+        :return: The new epoch.
+        :rtype: int
+        """
+        redis_client = redis_helper.get_redis_client()
+        epoch = int(
+            redis_helper.call_redis(
+                redis_client.incr, EPOCH_KEY.format(user_id=user_id)
+            )
+        )
+        redis_helper.call_redis(
+            redis_client.publish, EPOCH_CHANNEL, f"{user_id}:{epoch}"
+        )
+        self._store(user_id, epoch, force=True)
+        return epoch
+
+    def _store(self, user_id, epoch, force=False):
+        """
+        Caches an epoch. Epochs only move forward, so an older value arriving
+        late never overwrites a newer one unless ``force`` is set.
+        """
+        with self._lock:
+            entry = self._epochs.get(user_id)
+            if not force and entry is not None and entry[0] > epoch:
+                epoch = entry[0]
+            self._epochs[user_id] = (epoch, time.monotonic())
+
+    def _ensure_listener(self):
+        """
+        Starts the pub/sub subscriber for this process if it is enabled and not
+        running. Threads do not survive ``fork``, so a worker forked from a
+        parent that already started one starts its own and drops the inherited
+        entries, which the parent's subscriber was keeping fresh.
+        """
+        if not self.subscribe:
+            return
+        pid = os.getpid()
+        if self._listener_pid == pid and self._listener.is_alive():
+            return
+        with self._lock:
+            if self._listener_pid == pid and self._listener.is_alive():
+                return
+            if self._listener_pid != pid:
+                self._epochs.clear()
+            self._listener = threading.Thread(
+                target=self._listen, name="revocation-epoch-listener", daemon=True
+            )
+            self._listener_pid = pid
+            self._listener.start()
+
+    def _listen(self):
+        """
+        Applies epoch bumps published by any process. If the subscription drops,
+        every cached entry is marked as expired, since bumps may have been
+        missed, and the subscription is retried.
+        """
+        with self.app.app_context():
+            while True:
+                try:
+                    pubsub = redis_helper.get_redis_bulk_client().pubsub(
+                        ignore_subscribe_messages=True
+                    )
+                    pubsub.subscribe(EPOCH_CHANNEL)
+                    while True:
+                        # Poll instead of blocking in listen(), which would trip
+                        # the pool's socket timeout whenever it is idle
+                        message = pubsub.get_message(timeout=1.0)
+                        if message is None:
+                            continue
+                        data = message["data"]
+                        if isinstance(data, bytes):
+                            data = data.decode("utf-8")
+                        user_id, _, epoch = data.partition(":")
+                        self._store(int(user_id), int(epoch))
+                except Exception as e:
+                    self.app.logger.warning(f"Revocation subscriber disconnected: {e}")
+                    with self._lock:
+                        # Keep the epochs so they can still be served stale
+                        self._epochs = {
+                            user_id: (epoch, float("-inf"))
+                            for user_id, (epoch, _) in self._epochs.items()
+                        }
+                    time.sleep(1)
+
+
+def init_revocation_cache(app):
+    """
+    Creates the application's revocation cache and stores it in
+    ``app.extensions["revocation_cache"]``.
+
+    :param app: The Flask application.
+    :type app: flask.Flask
+    :return: The revocation cache.
+    :rtype: RevocationCache
+    """
+    cache = RevocationCache(
+        app,
+        ttl=app.config["REVOCATION_CACHE_TTL"],
+        subscribe=app.config["REVOCATION_PUBSUB_ENABLED"],
+    )
+    app.extensions["revocation_cache"] = cache
+    return cache
+
+
+def get_revocation_cache():
+    """
+    Returns the current application's revocation cache.
+
+    :rtype: RevocationCache
+    """
+    return app.extensions["revocation_cache"]
+
+
+def current_revocation_epoch(user_id, fresh=False):
+    """
+    Returns the user's current revocation epoch; new tokens embed it as ``rev``.
+
+    :param user_id: The user whose epoch is requested.
+    :type user_id: int
+    :param fresh: Bypass the local cache and read Redis.
+    :type fresh: bool
+    :rtype: int
+    """
+    return get_revocation_cache().current_epoch(user_id, fresh=fresh)
+
+
+def bump_revocation_epoch(user_id):
+    """
+    Revokes every token issued to the user so far.
+
+    :param user_id: The user whose tokens are revoked.
+    :type user_id: int
+    :return: The new epoch.
+    :rtype: int
+    """
+    return get_revocation_cache().bump(user_id)
+
+
+def is_token_revoked(payload):
+    """
+    Checks a decoded token against its user's revocation epoch. Tokens issued
+    before epochs existed carry no ``rev`` claim and count as epoch 0.
+
+    :param payload: The decoded JWT payload.
+    :type payload: dict
+    :return: True if the token was issued before the user's latest revocation.
+    :rtype: bool
+    """
+    return payload.get("rev", 0) < current_revocation_epoch(payload["user_id"])
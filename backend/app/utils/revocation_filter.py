@@ -0,0 +1,367 @@
+import fcntl
+import hashlib
+import math
+import mmap
+import os
+import struct
+import threading
+import time
+
+from flask import current_app as app
+
+from . import redis_helper
+
+# magic, number of hash functions, number of bits, build time (0 = never built)
+HEADER = struct.Struct("<4sIQd")
+MAGIC = b"RVBF"
+
+# How often a worker checks whether another worker replaced the shared file.
+REMAP_CHECK_SECONDS = 1.0
+
+# Confirmed-revoked tokens remembered per process so a revoked token that keeps
+# being retried costs one Redis lookup rather than one per request.
+POSITIVE_CACHE_SIZE = 1024
+
+
+def filter_parameters(capacity, error_rate):
+    """
+    Sizes a Bloom filter for the expected number of entries.
+
+    :param capacity: Expected number of revoked tokens.
+    :type capacity: int
+    :param error_rate: Acceptable false positive probability.
+    :type error_rate: float
+    :return: The number of bits and the number of hash functions.
+    :rtype: tuple[int, int]
+    """
+    num_bits = math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)
+    num_bits = max(8, (num_bits + 7) // 8 * 8)
+    num_hashes = max(1, round(num_bits / capacity * math.log(2)))
+    return num_bits, num_hashes
+
+
+def _digest(jti):
+    return hashlib.blake2b(jti.encode("utf-8"), digest_size=16).digest()
+
+
+def _bit_positions(digest, num_bits, num_hashes):
+    """
+    Derives the filter positions of an entry from one 128-bit digest using
+    double hashing.
+    """
+    first = int.from_bytes(digest[:8], "little")
+    second = int.from_bytes(digest[8:], "little") | 1
+    return [(first + i * second) % num_bits for i in range(num_hashes)]
+
+
+class RevocationFilter:
+    """
+    Bloom filter of blacklisted tokens shared by every worker on a host.
+
+    The filter lives in a memory-mapped file: one worker at a time rebuilds it
+    from the revoked tokens set in Redis and atomically replaces the file,
+    while every worker maps the same file and sees tokens blacklisted by the
+    others as soon as their bits are set. A token the filter has never seen is
+    accepted with a memory lookup; only a "maybe revoked" answer, either a real
+    revocation or a false positive, is confirmed against Redis. Confirmed
+    revocations are remembered in a small per-process exact set.
+
+    Until the filter has been built, for example when Redis was unreachable at
+    startup, every token is treated as "maybe revoked" so no revocation is
+    missed. If Redis cannot confirm a "maybe" answer, ``RedisUnavailableError``
+    propagates and the request fails closed. With ``path`` set to None the
+    filter is kept in anonymous memory private to the process, which is what
+    single-process setups and tests use.
+
+    :ivar path: File holding the shared filter, or None for a private filter.
+    :type path: str or None
+    :ivar refresh_interval: Seconds between rebuilds from Redis. With 0 the
+        filter is built once per process and then only updated by local
+        blacklisting.
+    :type refresh_interval: int
+    """
+
+    def __init__(
+        self, app, path=None, capacity=100000, error_rate=0.001, refresh_interval=60
+    ):
+        self.app = app
+        self.path = path
+        self.refresh_interval = refresh_interval
+        self.num_bits, self.num_hashes = filter_parameters(capacity, error_rate)
+        self.size = HEADER.size + self.num_bits // 8
+        self._map = None
+        self._inode = None
+        self._remap_checked_at = 0.0
+        self._positives = set()
+        self._lock = threading.Lock()
+        self._pid = None
+
+    def is_blacklisted(self, jti):
+        """
+        Checks whether a token has been blacklisted, going to Redis only when
+        the filter cannot rule it out.
+
+        :param jti: The token's unique identifier.
+        :type jti: str
+        :return: True if the token is blacklisted.
+        :rtype: bool
+        """
+        self._ensure_started()
+        self._maybe_remap()
+        buffer = self._map
+        digest = _digest(jti)
+        if self._is_built(buffer) and not self._contains(buffer, digest):
+            return False
+        if digest in self._positives:
+            return True
+
+        revoked = redis_helper.is_token_blacklisted(jti)
+        if revoked:
+            if len(self._positives) >= POSITIVE_CACHE_SIZE:
+                self._positives.clear()
+            self._positives.add(digest)
+        return revoked
+
+    def add(self, tokens):
+        """
+        Sets the bits of newly blacklisted tokens in the shared filter. The
+        tokens must already be stored in Redis, so a concurrent rebuild either
+        reads them or finishes before the bits are written to its new file.
+
+        :param tokens: The identifiers of the tokens.
+        :type tokens: Iterable[str]
+        """
+        digests = [_digest(jti) for jti in tokens]
+        if not digests:
+            return
+        self._ensure_started()
+        with self._exclusive():
+            if self.path is not None:
+                self._remap()
+            for digest in digests:
+                self._set_bits(self._map, digest)
+
+    def rebuild(self):
+        """
+        Builds a new filter from the revoked tokens set in Redis and swaps it
+        in. Expired entries are pruned from the set first, so the rebuild also
+        drops revocations that no longer matter.
+        """
+        buffer = mmap.mmap(-1, self.size)
+        revoked = redis_helper.get_revoked_tokens()
+        for jti in revoked:
+            self._set_bits(buffer, _digest(jti))
+        HEADER.pack_into(buffer, 0, MAGIC, self.num_hashes, self.num_bits, time.time())
+
+        if self.path is None:
+            self._map = buffer
+        else:
+            temp_path = f"{self.path}.{os.getpid()}.tmp"
+            with open(temp_path, "wb") as handle:
+                handle.write(buffer)
+            os.replace(temp_path, self.path)
+            self._remap()
+        self.app.logger.info(f"Revocation filter rebuilt with {len(revoked)} tokens")
+
+    def refresh(self):
+        """
+        Rebuilds the filter unless another worker did so within the refresh
+        interval or is doing so right now.
+        """
+        if self.path is None:
+            with self._lock:
+                self.rebuild()
+            return
+        with open(f"{self.path}.lock", "a") as lock_file:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return
+            try:
+                self._remap()
+                built_at = HEADER.unpack_from(self._map, 0)[3]
+                if time.time() - built_at >= self.refresh_interval:
+                    self.rebuild()
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _ensure_started(self):
+        """
+        Maps the filter and starts the refresher in the current process.
+        Threads do not survive ``fork``, so each worker starts its own; the
+        first call in a process with no refresher builds the filter directly.
+        """
+        pid = os.getpid()
+        if self._pid == pid:
+            return
+        with self._lock:
+            if self._pid == pid:
+                return
+            self._positives.clear()
+            if self.path is None:
+                self._map = mmap.mmap(-1, self.size)
+            else:
+                self._create_if_missing()
+                self._remap()
+            self._pid = pid
+        if self.refresh_interval > 0:
+            threading.Thread(
+                target=self._refresh_loop,
+                name="revocation-filter-refresher",
+                daemon=True,
+            ).start()
+        else:
+            try:
+                self.refresh()
+            except Exception as e:
+                self.app.logger.warning(f"Revocation filter build failed: {e}")
+
+    def _refresh_loop(self):
+        with self.app.app_context():
+            while True:
+                try:
+                    self.refresh()
+                except Exception as e:
+                    self.app.logger.warning(f"Revocation filter refresh failed: {e}")
+                time.sleep(self.refresh_interval)
+
+    def _create_if_missing(self):
+        """
+        Writes an empty, unbuilt filter file unless a compatible one exists.
+        """
+        try:
+            with open(self.path, "rb") as handle:
+                header = handle.read(HEADER.size)
+            if (
+                len(header) == HEADER.size
+                and HEADER.unpack(header)[:3] == (MAGIC, self.num_hashes, self.num_bits)
+                and os.path.getsize(self.path) == self.size
+            ):
+                return
+        except FileNotFoundError:
+            pass
+        temp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(temp_path, "wb") as handle:
+            handle.write(HEADER.pack(MAGIC, self.num_hashes, self.num_bits, 0.0))
+            handle.truncate(self.size)
+        os.replace(temp_path, self.path)
+
+    def _maybe_remap(self):
+        if self.path is None:
+            return
+        now = time.monotonic()
+        if now - self._remap_checked_at < REMAP_CHECK_SECONDS:
+            return
+        self._remap_checked_at = now
+        if os.stat(self.path).st_ino != self._inode:
+            with self._lock:
+                self._remap()
+
+    def _remap(self):
+        """
+        Maps the current filter file if it is not the one already mapped.
+        Mappings that are replaced are left for the garbage collector, since
+        another thread may still be reading from them.
+        """
+        with open(self.path, "r+b") as handle:
+            inode = os.fstat(handle.fileno()).st_ino
+            if inode != self._inode or self._map is None:
+                self._map = mmap.mmap(handle.fileno(), self.size)
+                self._inode = inode
+
+    def _exclusive(self):
+        """
+        Returns a lock that serializes writers to the filter: a file lock shared
+        by every worker when the filter is file-backed, a thread lock otherwise.
+        """
+        if self.path is None:
+            return self._lock
+        return _FileLock(f"{self.path}.lock")
+
+    def _is_built(self, buffer):
+        return HEADER.unpack_from(buffer, 0)[3] > 0
+
+    def _contains(self, buffer, digest):
+        for position in _bit_positions(digest, self.num_bits, self.num_hashes):
+            if not buffer[HEADER.size + (position >> 3)] & (1 << (position & 7)):
+                return False
+        return True
+
+    def _set_bits(self, buffer, digest):
+        for position in _bit_positions(digest, self.num_bits, self.num_hashes):
+            index = HEADER.size + (position >> 3)
+            buffer[index] = buffer[index] | (1 << (position & 7))
+
+
+class _FileLock:
+    """
+    Blocking exclusive ``flock`` held for the duration of a ``with`` block.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = None
+
+    def __enter__(self):
+        self._file = open(self.path, "a")
+        fcntl.flock(self._file, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc_info):
+        fcntl.flock(self._file, fcntl.LOCK_UN)
+        self._file.close()
+
+
+def init_revocation_filter(app):
+    """
+    Creates the application's revocation filter and stores it in
+    ``app.extensions["revocation_filter"]``. Nothing is mapped or read from
+    Redis until the first token is checked.
+
+    :param app: The Flask application.
+    :type app: flask.Flask
+    :return: The revocation filter.
+    :rtype: RevocationFilter
+    """
+    revocation_filter = RevocationFilter(
+        app,
+        path=app.config["REVOCATION_FILTER_PATH"],
+        capacity=app.config["REVOCATION_FILTER_CAPACITY"],
+        error_rate=app.config["REVOCATION_FILTER_ERROR_RATE"],
+        refresh_interval=app.config["REVOCATION_FILTER_REFRESH_INTERVAL"],
+    )
+    app.extensions["revocation_filter"] = revocation_filter
+    return revocation_filter
+
+
+def get_revocation_filter():
+    """
+    Returns the current application's revocation filter.
+
+    :rtype: RevocationFilter
+    """
+    return app.extensions["revocation_filter"]
+
+
+def is_token_blacklisted(jti):
+    """
+    Checks a token against the blacklist, consulting Redis only when the shared
+    filter reports it as possibly revoked.
+
+    :param jti: The token's unique identifier.
+    :type jti: str
+    :return: True if the token is blacklisted.
+    :rtype: bool
+    """
+    return get_revocation_filter().is_blacklisted(jti)
+
+
+def record_blacklisted_tokens(tokens):
+    """
+    Adds tokens that were just written to the Redis blacklist to the shared
+    filter so every worker rejects them before the next rebuild.
+
+    :param tokens: The encoded tokens.
+    :type tokens: Iterable[str]
+    """
+    get_revocation_filter().add(tokens)
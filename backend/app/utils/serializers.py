@@ -0,0 +1,291 @@
+"""
+Column projections and row serializers for list endpoints.
+
+Every list endpoint selects an explicit set of columns and materializes rows
+with ``.dicts()`` instead of building model instances and running them through
+``model_to_dict``. Foreign keys are projected as their raw id column, so
+serializing a page never triggers a lazy fetch of the related row and the
+number of queries stays constant regardless of page size.
+
+``*_SUMMARY_COLUMNS`` projections leave out large ``TextField`` bodies so list
+and outline views only read the columns they render; the full text is loaded
+by the matching detail endpoint on demand.
+
+Clients can narrow any projection further with a sparse fieldset: ``?fields=``
+for the endpoint's primary resource or ``?fields[<resource>]=`` for embedded
+ones. The requested names are applied to the SELECT list itself through
+``restrict_columns``, so unrequested columns are never read.
+"""
+
+from flask import request
+from peewee import fn
+
+from ..models.data import (
+    Appendix,
+    BodyPage,
+    Chapter,
+    Figure,
+    Footnote,
+    PostComment,
+    Posts,
+    Reference,
+    Role,
+    TableEntry,
+    TableOfContents,
+    Thesis,
+    User,
+)
+
+# Number of characters of a post body returned as its list preview.
+PREVIEW_LENGTH = 200
+
+THESIS_COLUMNS = (
+    Thesis.id,
+    Thesis.title,
+    Thesis.course,
+    Thesis.instructor,
+    Thesis.status,
+    Thesis.created_at,
+    Thesis.updated_at,
+    Thesis.student,
+    Thesis.author,
+    Thesis.affiliation,
+    Thesis.degree,
+    Thesis.due_date,
+)
+
+# Detail view of a thesis reports its owner as ``student_id``.
+THESIS_DETAIL_COLUMNS = tuple(
+    Thesis.student.alias("student_id") if column is Thesis.student else column
+    for column in THESIS_COLUMNS
+)
+
+USER_COLUMNS = (
+    User.id,
+    User.first_name,
+    User.last_name,
+    User.email,
+    User.username,
+    User.institution,
+    User.is_admin,
+    User.is_active,
+    User.is_authenticated,
+    User.created_at,
+    User.updated_at,
+    User.profile_picture,
+)
+
+TOC_COLUMNS = (
+    TableOfContents.id,
+    TableOfContents.thesis,
+    TableOfContents.section_title,
+    TableOfContents.page_number,
+    TableOfContents.order,
+)
+
+BODY_PAGE_COLUMNS = (
+    BodyPage.id,
+    BodyPage.thesis,
+    BodyPage.page_number,
+    BodyPage.body,
+)
+
+BODY_PAGE_SUMMARY_COLUMNS = (
+    BodyPage.id,
+    BodyPage.page_number,
+)
+
+CHAPTER_COLUMNS = (
+    Chapter.id,
+    Chapter.name,
+    Chapter.content,
+    Chapter.order,
+)
+
+CHAPTER_SUMMARY_COLUMNS = (
+    Chapter.id,
+    Chapter.name,
+    Chapter.order,
+)
+
+REFERENCE_COLUMNS = (
+    Reference.id,
+    Reference.thesis,
+    Reference.author,
+    Reference.title,
+    Reference.journal,
+    Reference.publication_year,
+    Reference.publisher,
+    Reference.doi,
+    Reference.created_at,
+)
+
+FOOTNOTE_COLUMNS = (
+    Footnote.id,
+    Footnote.thesis,
+    Footnote.content,
+)
+
+TABLE_COLUMNS = (
+    TableEntry.id,
+    TableEntry.thesis,
+    TableEntry.caption,
+    TableEntry.file_path,
+)
+
+FIGURE_COLUMNS = (
+    Figure.id,
+    Figure.thesis,
+    Figure.caption,
+    Figure.file_path,
+)
+
+APPENDIX_COLUMNS = (
+    Appendix.id,
+    Appendix.thesis,
+    Appendix.title,
+    Appendix.content,
+    Appendix.file_path,
+)
+
+APPENDIX_SUMMARY_COLUMNS = (
+    Appendix.id,
+    Appendix.title,
+)
+
+POST_SUMMARY_COLUMNS = (
+    Posts.id,
+    Posts.user,
+    Posts.title,
+    fn.SUBSTR(fn.COALESCE(Posts.description, Posts.content), 1, PREVIEW_LENGTH).alias(
+        "preview"
+    ),
+    Posts.created_at,
+    Posts.updated_at,
+    Posts.comment_count,
+    Posts.last_activity_at,
+    Posts.view_count,
+    Posts.unique_viewers,
+)
+
+POST_DETAIL_COLUMNS = (
+    Posts.id,
+    Posts.title,
+    Posts.description,
+    Posts.content,
+    Posts.created_at,
+    Posts.updated_at,
+    Posts.view_count,
+    Posts.unique_viewers,
+)
+
+POST_AUTHOR_COLUMNS = (
+    User.id.alias("user_id"),
+    User.username,
+    User.first_name,
+    User.last_name,
+)
+
+COMMENT_COLUMNS = (
+    PostComment.id,
+    PostComment.content,
+    PostComment.created_at,
+    PostComment.updated_at,
+    PostComment.user,
+    PostComment.post,
+    PostComment.parent,
+    PostComment.depth,
+    PostComment.reply_count,
+)
+
+ROLE_COLUMNS = (
+    Role.id.alias("role_id"),
+    Role.name.alias("role_name"),
+)
+
+
+def column_names(columns):
+    """
+    Returns the names under which a projection's columns appear in ``.dicts()``
+    rows.
+
+    :param columns: A projection tuple.
+    :type columns: tuple
+    :return: The output key of each column, in order.
+    :rtype: list[str]
+    """
+    return [column.name for column in columns]
+
+
+def requested_fields(resource, primary=True):
+    """
+    Reads the sparse fieldset requested for a resource type from the query
+    string. ``fields[<resource>]`` always applies; the bare ``fields``
+    parameter applies only to the endpoint's primary resource.
+
+    :param resource: The resource type name, e.g. ``"thesis"`` or ``"post"``.
+    :type resource: str
+    :param primary: Whether ``resource`` is the endpoint's primary resource.
+    :type primary: bool
+    :return: The requested field names, or None if no fieldset was given.
+    :rtype: list[str] or None
+    """
+    value = request.args.get(f"fields[{resource}]")
+    if value is None and primary:
+        value = request.args.get("fields")
+    if value is None:
+        return None
+    return [name.strip() for name in value.split(",") if name.strip()]
+
+
+def restrict_columns(columns, fields):
+    """
+    Narrows a projection to the requested field names. The ``id`` column is
+    always kept so clients can still key the returned rows.
+
+    :param columns: The full projection for the resource.
+    :type columns: tuple
+    :param fields: Requested field names, or None for the full projection.
+    :type fields: list[str] or None
+    :return: The narrowed projection, in the original column order.
+    :rtype: tuple
+    :raises ValueError: If a requested name is not part of the projection.
+    """
+    if not fields:
+        return columns
+    available = column_names(columns)
+    unknown = [name for name in fields if name not in available]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    return tuple(
+        column for column in columns if column.name in fields or column.name == "id"
+    )
+
+
+def project(model, columns, *conditions, order_by=None, page=None, per_page=None):
+    """
+    Runs a single projected SELECT and returns the rows as plain dictionaries.
+
+    :param model: The model class to select from.
+    :type model: type[peewee.Model]
+    :param columns: The fields to project. Foreign keys come back as raw ids.
+    :type columns: tuple
+    :param conditions: Optional WHERE expressions, combined with AND.
+    :param order_by: Optional field or tuple of fields to order by.
+    :param page: Optional 1-based page number; requires ``per_page``.
+    :type page: int, optional
+    :param per_page: Optional page size.
+    :type per_page: int, optional
+    :return: A list of dictionaries keyed by field name.
+    :rtype: list[dict]
+    """
+    query = model.select(*columns)
+    if conditions:
+        query = query.where(*conditions)
+    if order_by is not None:
+        query = query.order_by(
+            *(order_by if isinstance(order_by, (tuple, list)) else (order_by,))
+        )
+    if page is not None and per_page is not None:
+        query = query.paginate(page, per_page)
+    return list(query.dicts())
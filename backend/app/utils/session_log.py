@@ -0,0 +1,253 @@
+import atexit
+import os
+import queue
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+from flask import current_app as app
+from peewee import fn
+
+from .db import database_proxy
+
+SECONDS_PER_DAY = 86400
+
+
+class SessionLogWriter:
+    """
+    Records logins in ``SessionLog`` without making the sign-in request wait
+    for the insert.
+
+    ``record`` only puts the event on an in-process queue. A background thread
+    takes events off the queue and writes them with ``insert_many``, one
+    statement and commit per batch of up to ``batch_size`` rows; a batch is
+    written as soon as it is full or ``flush_interval`` seconds after its first
+    event. Events still queued when the process exits are flushed by an
+    ``atexit`` hook.
+
+    The queue holds at most ``max_queue`` events. If the database falls that
+    far behind, further logins are dropped and counted rather than slowing
+    down sign-in; a batch that fails to insert is dropped the same way.
+
+    :ivar batch_size: Maximum rows per insert.
+    :type batch_size: int
+    :ivar flush_interval: Seconds an event may wait for its batch to fill.
+    :type flush_interval: float
+    :ivar background: Whether the writer thread is started. Without it, events
+        stay queued until ``flush`` is called.
+    :type background: bool
+    :ivar dropped: Events dropped because the queue was full or their insert
+        failed.
+    :type dropped: int
+    """
+
+    def __init__(
+        self, app, batch_size=500, flush_interval=2.0, max_queue=10000, background=True
+    ):
+        self.app = app
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.background = background
+        self.dropped = 0
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._lock = threading.Lock()
+        self._writer = None
+        self._writer_pid = None
+
+    def record(self, user_id, login_time=None):
+        """
+        Queues a login for writing.
+
+        :param user_id: The user who logged in.
+        :type user_id: int
+        :param login_time: When the login happened. Defaults to now.
+        :type login_time: datetime, optional
+        """
+        self._ensure_writer()
+        event = {
+            "user": user_id,
+            "login_time": login_time or datetime.now(timezone.utc),
+        }
+        try:
+            self._queue.put_nowait(event)
+        except queue.Full:
+            self.dropped += 1
+            self.app.logger.warning(
+                f"Session log queue is full, dropped login of user {user_id}"
+            )
+
+    def flush(self):
+        """
+        Writes every queued event in the calling thread.
+
+        :return: The number of rows written.
+        :rtype: int
+        """
+        written = 0
+        while True:
+            batch = self._take(self.batch_size)
+            if not batch:
+                return written
+            written += self._write(batch)
+
+    def pending(self):
+        """
+        Returns the number of events waiting to be written.
+
+        :rtype: int
+        """
+        return self._queue.qsize()
+
+    def _take(self, limit, block=False):
+        batch = []
+        try:
+            if block:
+                batch.append(self._queue.get(timeout=self.flush_interval))
+            while len(batch) < limit:
+                batch.append(self._queue.get_nowait())
+        except queue.Empty:
+            pass
+        return batch
+
+    def _write(self, batch):
+        from ..models.data import SessionLog
+
+        try:
+            with database_proxy.atomic():
+                SessionLog.insert_many(batch).execute()
+            return len(batch)
+        except Exception as e:
+            self.dropped += len(batch)
+            self.app.logger.error(f"Failed to write {len(batch)} session logs: {e}")
+            return 0
+
+    def _ensure_writer(self):
+        """
+        Starts the writer thread for this process. Threads do not survive
+        ``fork``, so a worker forked after the parent started one starts its
+        own.
+        """
+        if not self.background:
+            return
+        pid = os.getpid()
+        if self._writer_pid == pid and self._writer.is_alive():
+            return
+        with self._lock:
+            if self._writer_pid == pid and self._writer.is_alive():
+                return
+            if self._writer_pid is None:
+                atexit.register(self.flush)
+            self._writer = threading.Thread(
+                target=self._run, name="session-log-writer", daemon=True
+            )
+            self._writer_pid = pid
+            self._writer.start()
+
+    def _run(self):
+        while True:
+            batch = self._take(self.batch_size, block=True)
+            if not batch:
+                continue
+            # Give a burst of logins the rest of the interval to fill the batch
+            if len(batch) < self.batch_size:
+                time.sleep(self.flush_interval)
+                batch += self._take(self.batch_size - len(batch))
+            self._write(batch)
+
+
+def init_session_log(app):
+    """
+    Creates the application's session log writer and stores it in
+    ``app.extensions["session_log"]``.
+
+    :param app: The Flask application.
+    :type app: flask.Flask
+    :return: The session log writer.
+    :rtype: SessionLogWriter
+    """
+    writer = SessionLogWriter(
+        app,
+        batch_size=app.config["SESSION_LOG_BATCH_SIZE"],
+        flush_interval=app.config["SESSION_LOG_FLUSH_INTERVAL"],
+        max_queue=app.config["SESSION_LOG_QUEUE_SIZE"],
+        background=app.config["SESSION_LOG_BACKGROUND"],
+    )
+    app.extensions["session_log"] = writer
+    return writer
+
+
+def get_session_log():
+    """
+    Returns the current application's session log writer.
+
+    :rtype: SessionLogWriter
+    """
+    return app.extensions["session_log"]
+
+
+def record_login(user_id):
+    """
+    Queues a session log entry for a login that just happened.
+
+    :param user_id: The user who logged in.
+    :type user_id: int
+    """
+    get_session_log().record(user_id)
+
+
+def compact_session_logs(retention_days, now=None, chunk_size=10000):
+    """
+    Rolls session log entries older than the retention period up into daily
+    per-user counts in ``SessionLogDaily`` and deletes them. Entries are taken
+    in ranges of ``chunk_size`` IDs, each counted with ``GROUP BY`` in the
+    database and deleted in its own short transaction, so compaction never
+    holds locks on more than one chunk. Counts are added to any existing count
+    for the same day, so the job can be interrupted and run again.
+
+    :param retention_days: Days of raw session log entries to keep.
+    :type retention_days: int
+    :param now: The current time. Defaults to now.
+    :type now: datetime, optional
+    :param chunk_size: IDs covered by each transaction.
+    :type chunk_size: int
+    :return: The number of entries compacted.
+    :rtype: int
+    """
+    from ..models.data import SessionLog, SessionLogDaily
+
+    cutoff = (now or datetime.now(timezone.utc)) - timedelta(days=retention_days)
+    old_entries = SessionLog.login_time < cutoff
+    # Login times are stored as Unix timestamps; this is the start of the day
+    day = SessionLog.login_time - SessionLog.login_time % SECONDS_PER_DAY
+    deleted = 0
+    start = SessionLog.select(fn.MIN(SessionLog.id)).where(old_entries).scalar()
+    while start is not None:
+        chunk = old_entries & SessionLog.id.between(start, start + chunk_size - 1)
+        with database_proxy.atomic():
+            counts = (
+                SessionLog.select(SessionLog.user, day, fn.COUNT(SessionLog.id))
+                .where(chunk)
+                .group_by(SessionLog.user, day)
+                .tuples()
+            )
+            for user_id, day_start, logins in counts:
+                day_date = datetime.fromtimestamp(day_start, timezone.utc).date()
+                updated = (
+                    SessionLogDaily.update(logins=SessionLogDaily.logins + logins)
+                    .where(
+                        (SessionLogDaily.user == user_id)
+                        & (SessionLogDaily.day == day_date)
+                    )
+                    .execute()
+                )
+                if not updated:
+                    SessionLogDaily.create(user=user_id, day=day_date, logins=logins)
+            deleted += SessionLog.delete().where(chunk).execute()
+        start = (
+            SessionLog.select(fn.MIN(SessionLog.id))
+            .where(old_entries & (SessionLog.id >= start + chunk_size))
+            .scalar()
+        )
+
+    app.logger.info(f"Compacted {deleted} session log entries older than {cutoff}")
+    return deleted
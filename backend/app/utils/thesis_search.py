@@ -0,0 +1,671 @@
+import math
+import sqlite3
+from abc import ABC, abstractmethod
+from collections import Counter, defaultdict
+
+from flask import current_app as app
+from peewee import (
+    BigIntegerField,
+    CharField,
+    CompositeKey,
+    IntegerField,
+    Model,
+    MySQLDatabase,
+    TextField,
+)
+
+from .db import database_proxy
+from .fulltext import (
+    MARK_END,
+    MARK_START,
+    SNIPPET_WORDS,
+    decode_cursor,
+    encode_cursor,
+    first_match,
+    keyset_clause,
+    render,
+    search_terms,
+    snippet,
+    tokenize,
+)
+from .ownership import get_ownership_cache
+
+SEARCH_TABLE = "thesis_search"
+
+# Searchable sections of a thesis and the code that makes their row IDs
+# unique: a document's row ID is its section row's ID times 8 plus the code.
+SECTIONS = {
+    "title": 0,
+    "abstract": 1,
+    "body_page": 2,
+    "chapter": 3,
+    "reference": 4,
+    "appendix": 5,
+}
+
+# Reference columns that are searched, joined with spaces.
+REFERENCE_FIELDS = ("author", "title", "journal", "publisher", "doi")
+
+
+class ThesisSearchIndex(ABC):
+    """
+    Full-text index over the theses of every user.
+
+    Each searchable section is one document: a thesis title, an abstract, a
+    body page, a chapter's content, a reference's author, title, journal,
+    publisher and DOI, or an appendix's content. Documents carry their owner,
+    so a search only ever sees the theses of the user running it and its cost
+    depends on that user's documents, not on the size of the whole index.
+    ``ThesisService`` mutators update the index after every write, and
+    ``rebuild`` recreates it from the tables.
+
+    Searches match every word of the query and are ranked by relevance. Each
+    result names the section and the character offset of the first verbatim
+    match in its text, along with a highlighted, HTML-escaped snippet.
+    Results are paginated by keyset, like forum search.
+
+    Subclasses implement the index on an engine's native full-text search or,
+    where there is none, on an inverted index kept in ordinary tables.
+    """
+
+    def __init__(self, db):
+        self.db = db
+
+    @abstractmethod
+    def create(self):
+        """
+        Creates the index if it does not exist yet.
+        """
+
+    def drop(self):
+        """
+        Drops the index.
+        """
+        self.db.execute_sql(f"DROP TABLE IF EXISTS {SEARCH_TABLE}")
+
+    def exists(self):
+        """
+        Tells whether the index has been created.
+
+        :rtype: bool
+        """
+        return self.db.table_exists(SEARCH_TABLE)
+
+    def index(self, section, doc_id, thesis_id, owner_id, text):
+        """
+        Adds a section to the index or replaces its document.
+
+        :param section: One of ``SECTIONS``.
+        :type section: str
+        :param doc_id: The section row's ID; the thesis ID for titles.
+        :type doc_id: int
+        :param thesis_id: The thesis the section belongs to.
+        :type thesis_id: int
+        :param owner_id: The user who owns the thesis.
+        :type owner_id: int
+        :param text: The section's searchable text.
+        :type text: str | None
+        """
+        self._replace(
+            _rowid(section, doc_id), section, doc_id, thesis_id, owner_id, text or ""
+        )
+
+    def remove(self, section, doc_id):
+        """
+        Removes a section from the index.
+
+        :param section: One of ``SECTIONS``.
+        :type section: str
+        :param doc_id: The section row's ID.
+        :type doc_id: int
+        """
+        self._delete_rowid(_rowid(section, doc_id))
+
+    def remove_thesis(self, thesis_id):
+        """
+        Removes every section of a thesis from the index.
+
+        :param thesis_id: The thesis.
+        :type thesis_id: int
+        """
+        self.db.execute_sql(
+            f"DELETE FROM {SEARCH_TABLE} WHERE thesis_id = {self.db.param}",
+            (thesis_id,),
+        )
+
+    def rebuild(self):
+        """
+        Refills the index from the thesis tables in one transaction.
+
+        :return: The number of documents indexed.
+        :rtype: int
+        """
+        self.create()
+        indexed = 0
+        with database_proxy.atomic():
+            self._clear()
+            for document in _documents():
+                self.index(*document)
+                indexed += 1
+        return indexed
+
+    def search(self, owner_id, query, limit=20, cursor=None):
+        """
+        Searches the sections of one user's theses.
+
+        :param owner_id: The user whose theses are searched.
+        :type owner_id: int
+        :param query: Words to search for. Punctuation and search operators
+            are ignored.
+        :type query: str
+        :param limit: Maximum number of results.
+        :type limit: int
+        :param cursor: The ``next_cursor`` of the previous page, if any.
+        :type cursor: str, optional
+        :return: The results, best first, and the cursor of the next page, or
+            None on the last page. Each result has ``section``, ``section_id``,
+            ``thesis_id``, ``offset`` (None when the words only match
+            inexactly, such as without accents), ``snippet`` and ``score``.
+        :rtype: dict
+        :raises ValueError: If the query has no words or the cursor is invalid.
+        """
+        terms = search_terms(query)
+        after = decode_cursor(cursor) if cursor else None
+
+        rows = self._search(owner_id, terms, limit + 1, after)
+        results = [
+            {
+                "section": section,
+                "section_id": doc_id,
+                "thesis_id": thesis_id,
+                "offset": first_match(body, terms),
+                "snippet": render(marked_snippet),
+                "score": score,
+            }
+            for _, section, doc_id, thesis_id, marked_snippet, body, score in rows[
+                :limit
+            ]
+        ]
+        next_cursor = None
+        if len(rows) > limit:
+            last = rows[limit - 1]
+            next_cursor = encode_cursor(last[6], last[0])
+        return {"results": results, "next_cursor": next_cursor}
+
+    def _clear(self):
+        self.db.execute_sql(f"DELETE FROM {SEARCH_TABLE}")
+
+    @abstractmethod
+    def _replace(self, rowid, section, doc_id, thesis_id, owner_id, body):
+        """
+        Stores a document under a row ID, replacing any document there.
+        """
+
+    @abstractmethod
+    def _delete_rowid(self, rowid):
+        """
+        Deletes the document with a row ID, if there is one.
+        """
+
+    @abstractmethod
+    def _search(self, owner_id, terms, limit, after):
+        """
+        Returns up to ``limit`` rows of ``(rowid, section, doc_id, thesis_id,
+        marked snippet, body, score)``, best first, after the ``(score,
+        rowid)`` keyset position if one is given.
+        """
+
+
+class SqliteThesisSearch(ThesisSearchIndex):
+    """
+    Thesis search on an SQLite FTS5 table ranked by BM25. The owner is an
+    indexed token, so FTS5 intersects it with the query words in the index.
+    """
+
+    def create(self):
+        self.db.execute_sql(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} USING fts5("
+            "owner, section UNINDEXED, doc_id UNINDEXED, thesis_id UNINDEXED, body, "
+            "tokenize = 'unicode61 remove_diacritics 2')"
+        )
+
+    def _replace(self, rowid, section, doc_id, thesis_id, owner_id, body):
+        self._delete_rowid(rowid)
+        self.db.execute_sql(
+            f"INSERT INTO {SEARCH_TABLE} "
+            "(rowid, owner, section, doc_id, thesis_id, body) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (rowid, _owner_token(owner_id), section, doc_id, thesis_id, body),
+        )
+
+    def _delete_rowid(self, rowid):
+        self.db.execute_sql(f"DELETE FROM {SEARCH_TABLE} WHERE rowid = ?", (rowid,))
+
+    def _search(self, owner_id, terms, limit, after):
+        words = " AND ".join(f'"{term}"' for term in terms)
+        match = f'owner : "{_owner_token(owner_id)}" AND body : ({words})'
+        keyset, keyset_params = keyset_clause("?", after)
+        sql = (
+            "SELECT id, section, doc_id, thesis_id, snippet, body, score FROM ("
+            "SELECT rowid AS id, section, doc_id, thesis_id, body, "
+            f"snippet({SEARCH_TABLE}, 4, ?, ?, '…', {2 * SNIPPET_WORDS}) AS snippet, "
+            f"-bm25({SEARCH_TABLE}, 0, 0, 0, 0, 1.0) AS score "
+            f"FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH ?"
+            f") {keyset} ORDER BY score DESC, id LIMIT ?"
+        )
+        params = (MARK_START, MARK_END, match) + keyset_params + (limit,)
+        return list(self.db.execute_sql(sql, params))
+
+
+class MySQLThesisSearch(ThesisSearchIndex):
+    """
+    Thesis search on an InnoDB table with a FULLTEXT index on the body,
+    queried in boolean mode and restricted to the owner's rows by an ordinary
+    predicate on the indexed ``owner`` column.
+    """
+
+    def create(self):
+        # Tables from before the owner became its own column are rebuilt
+        if not self.exists():
+            self.drop()
+        self.db.execute_sql(
+            f"CREATE TABLE IF NOT EXISTS {SEARCH_TABLE} ("
+            "id BIGINT PRIMARY KEY, owner INT NOT NULL, "
+            "section VARCHAR(16) NOT NULL, doc_id INT NOT NULL, "
+            "thesis_id INT NOT NULL, body MEDIUMTEXT NOT NULL, "
+            "INDEX (owner), INDEX (thesis_id), FULLTEXT (body)"
+            ") ENGINE=InnoDB DEFAULT CHARSET=utf8mb4"
+        )
+
+    def exists(self):
+        cursor = self.db.execute_sql(
+            "SELECT DATA_TYPE FROM information_schema.COLUMNS "
+            "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s "
+            "AND COLUMN_NAME = 'owner'",
+            (SEARCH_TABLE,),
+        )
+        row = cursor.fetchone()
+        return row is not None and row[0].lower() == "int"
+
+    def _replace(self, rowid, section, doc_id, thesis_id, owner_id, body):
+        self.db.execute_sql(
+            f"REPLACE INTO {SEARCH_TABLE} "
+            "(id, owner, section, doc_id, thesis_id, body) "
+            "VALUES (%s, %s, %s, %s, %s, %s)",
+            (rowid, owner_id, section, doc_id, thesis_id, body),
+        )
+
+    def _delete_rowid(self, rowid):
+        self.db.execute_sql(f"DELETE FROM {SEARCH_TABLE} WHERE id = %s", (rowid,))
+
+    def _search(self, owner_id, terms, limit, after):
+        against = " ".join(f"+{term}" for term in terms)
+        keyset, keyset_params = keyset_clause("%s", after)
+        sql = (
+            "SELECT id, section, doc_id, thesis_id, body, score FROM ("
+            "SELECT id, section, doc_id, thesis_id, body, "
+            "MATCH (body) AGAINST (%s IN BOOLEAN MODE) AS score "
+            f"FROM {SEARCH_TABLE} WHERE owner = %s "
+            "AND MATCH (body) AGAINST (%s IN BOOLEAN MODE)"
+            f") AS hits {keyset} ORDER BY score DESC, id LIMIT %s"
+        )
+        params = (against, owner_id, against) + keyset_params + (limit,)
+        rows = self.db.execute_sql(sql, params)
+        return [
+            (rowid, section, doc_id, thesis_id, snippet(body, terms), body, score)
+            for rowid, section, doc_id, thesis_id, body, score in rows
+        ]
+
+
+class ThesisSearchDocument(Model):
+    """
+    A section indexed by ``InvertedThesisSearch``.
+    """
+
+    id = BigIntegerField(primary_key=True)
+    owner = IntegerField(index=True)
+    section = CharField(max_length=16)
+    doc_id = IntegerField()
+    thesis_id = IntegerField(index=True)
+    body = TextField()
+
+    class Meta:
+        database = database_proxy
+        table_name = f"{SEARCH_TABLE}_documents"
+
+
+class ThesisSearchTerm(Model):
+    """
+    How often a word occurs in one of an owner's documents.
+    """
+
+    owner = IntegerField()
+    term = CharField(max_length=64)
+    document = BigIntegerField(index=True)
+    frequency = IntegerField()
+
+    class Meta:
+        database = database_proxy
+        table_name = f"{SEARCH_TABLE}_terms"
+        primary_key = CompositeKey("owner", "term", "document")
+
+
+class InvertedThesisSearch(ThesisSearchIndex):
+    """
+    Thesis search for databases without native full-text search. Documents
+    are split into words here and kept as postings of (owner, word, document,
+    frequency), looked up through the primary key, so a search reads only the
+    postings of the user's documents that contain the query words. Results
+    are ranked by TF-IDF over the user's documents.
+    """
+
+    def create(self):
+        self.db.create_tables([ThesisSearchDocument, ThesisSearchTerm], safe=True)
+
+    def drop(self):
+        self.db.drop_tables([ThesisSearchTerm, ThesisSearchDocument], safe=True)
+
+    def exists(self):
+        return ThesisSearchDocument.table_exists()
+
+    def remove_thesis(self, thesis_id):
+        documents = ThesisSearchDocument.select(ThesisSearchDocument.id).where(
+            ThesisSearchDocument.thesis_id == thesis_id
+        )
+        with database_proxy.atomic():
+            ThesisSearchTerm.delete().where(
+                ThesisSearchTerm.document.in_(documents)
+            ).execute()
+            ThesisSearchDocument.delete().where(
+                ThesisSearchDocument.thesis_id == thesis_id
+            ).execute()
+
+    def _clear(self):
+        ThesisSearchTerm.delete().execute()
+        ThesisSearchDocument.delete().execute()
+
+    def _replace(self, rowid, section, doc_id, thesis_id, owner_id, body):
+        frequencies = Counter(
+            term
+            for term in tokenize(body)
+            if len(term) <= ThesisSearchTerm.term.max_length
+        )
+        with database_proxy.atomic():
+            self._delete_rowid(rowid)
+            ThesisSearchDocument.insert(
+                id=rowid,
+                owner=owner_id,
+                section=section,
+                doc_id=doc_id,
+                thesis_id=thesis_id,
+                body=body,
+            ).execute()
+            postings = [
+                (owner_id, term, rowid, frequency)
+                for term, frequency in frequencies.items()
+            ]
+            fields = [
+                ThesisSearchTerm.owner,
+                ThesisSearchTerm.term,
+                ThesisSearchTerm.document,
+                ThesisSearchTerm.frequency,
+            ]
+            # Stay below SQLite's limit on bound parameters per statement
+            for start in range(0, len(postings), 200):
+                ThesisSearchTerm.insert_many(
+                    postings[start : start + 200], fields=fields
+                ).execute()
+
+    def _delete_rowid(self, rowid):
+        with database_proxy.atomic():
+            ThesisSearchTerm.delete().where(
+                ThesisSearchTerm.document == rowid
+            ).execute()
+            ThesisSearchDocument.delete().where(
+                ThesisSearchDocument.id == rowid
+            ).execute()
+
+    def _search(self, owner_id, terms, limit, after):
+        wanted = set(terms)
+        matches = defaultdict(dict)
+        document_frequency = Counter()
+        postings = (
+            ThesisSearchTerm.select(
+                ThesisSearchTerm.term,
+                ThesisSearchTerm.document,
+                ThesisSearchTerm.frequency,
+            )
+            .where(
+                (ThesisSearchTerm.owner == owner_id)
+                & ThesisSearchTerm.term.in_(list(wanted))
+            )
+            .tuples()
+        )
+        for term, document, frequency in postings:
+            matches[document][term] = frequency
+            document_frequency[term] += 1
+        matches = {
+            doc: freqs for doc, freqs in matches.items() if len(freqs) == len(wanted)
+        }
+        if not matches:
+            return []
+
+        documents = (
+            ThesisSearchDocument.select()
+            .where(ThesisSearchDocument.owner == owner_id)
+            .count()
+        )
+        ranked = sorted(
+            (
+                (
+                    sum(
+                        frequency * math.log(1 + documents / document_frequency[term])
+                        for term, frequency in freqs.items()
+                    ),
+                    rowid,
+                )
+                for rowid, freqs in matches.items()
+            ),
+            key=lambda hit: (-hit[0], hit[1]),
+        )
+        if after is not None:
+            ranked = [
+                hit
+                for hit in ranked
+                if hit[0] < after[0] or (hit[0] == after[0] and hit[1] > after[1])
+            ]
+        page = ranked[:limit]
+
+        bodies = {
+            document.id: document
+            for document in ThesisSearchDocument.select().where(
+                ThesisSearchDocument.id.in_([rowid for _, rowid in page])
+            )
+        }
+        return [
+            (
+                rowid,
+                bodies[rowid].section,
+                bodies[rowid].doc_id,
+                bodies[rowid].thesis_id,
+                snippet(bodies[rowid].body, terms),
+                bodies[rowid].body,
+                score,
+            )
+            for score, rowid in page
+        ]
+
+
+def _rowid(section, doc_id):
+    return doc_id * 8 + SECTIONS[section]
+
+
+def _owner_token(owner_id):
+    return f"owner{owner_id}"
+
+
+def reference_text(reference):
+    """
+    Returns the searchable text of a reference.
+
+    :param reference: The reference.
+    :type reference: app.models.data.Reference
+    :rtype: str
+    """
+    return " ".join(
+        str(value)
+        for value in (getattr(reference, field) for field in REFERENCE_FIELDS)
+        if value
+    )
+
+
+def _documents():
+    """
+    Yields the arguments of ``ThesisSearchIndex.index`` for every searchable
+    section in the database.
+    """
+    from ..models.data import Abstract, Appendix, BodyPage, Chapter, Reference, Thesis
+
+    for thesis_id, owner_id, title in (
+        Thesis.select(Thesis.id, Thesis.student_id, Thesis.title).tuples().iterator()
+    ):
+        yield "title", thesis_id, thesis_id, owner_id, title
+
+    sections = (
+        ("abstract", Abstract, Abstract.text),
+        ("body_page", BodyPage, BodyPage.body),
+        ("chapter", Chapter, Chapter.content),
+        ("appendix", Appendix, Appendix.content),
+    )
+    for section, model, text in sections:
+        rows = (
+            model.select(model.id, model.thesis_id, Thesis.student_id, text)
+            .join(Thesis, on=(model.thesis == Thesis.id))
+            .tuples()
+            .iterator()
+        )
+        for doc_id, thesis_id, owner_id, body in rows:
+            yield section, doc_id, thesis_id, owner_id, body
+
+    references = (
+        Reference.select(Reference, Thesis.student_id.alias("owner_id"))
+        .join(Thesis, on=(Reference.thesis == Thesis.id))
+        .objects()
+        .iterator()
+    )
+    for reference in references:
+        yield (
+            "reference",
+            reference.id,
+            reference.thesis_id,
+            reference.owner_id,
+            reference_text(reference),
+        )
+
+
+def index_section(section, doc_id, thesis_id, text, owner_id=None):
+    """
+    Adds or replaces a section of a thesis in the current application's
+    search index.
+
+    :param section: One of ``SECTIONS``.
+    :type section: str
+    :param doc_id: The section row's ID; the thesis ID for titles.
+    :type doc_id: int
+    :param thesis_id: The thesis.
+    :type thesis_id: int
+    :param text: The section's searchable text.
+    :type text: str | None
+    :param owner_id: The thesis' owner. Looked up in the ownership cache if
+        not given.
+    :type owner_id: int, optional
+    """
+    if owner_id is None:
+        owner_id = get_ownership_cache().thesis_owner(thesis_id)
+    get_thesis_search().index(section, doc_id, thesis_id, owner_id, text)
+
+
+def remove_section(section, doc_id):
+    """
+    Removes a deleted section from the current application's search index.
+
+    :param section: One of ``SECTIONS``.
+    :type section: str
+    :param doc_id: The deleted row's ID.
+    :type doc_id: int
+    """
+    get_thesis_search().remove(section, doc_id)
+
+
+def remove_thesis_sections(thesis_id):
+    """
+    Removes every section of a deleted thesis from the current application's
+    search index.
+
+    :param thesis_id: The deleted thesis.
+    :type thesis_id: int
+    """
+    get_thesis_search().remove_thesis(thesis_id)
+
+
+def _native_search_available(db):
+    if isinstance(db, MySQLDatabase):
+        return True
+    connection = sqlite3.connect(":memory:")
+    try:
+        connection.execute("CREATE VIRTUAL TABLE probe USING fts5(body)")
+        return True
+    except sqlite3.OperationalError:
+        return False
+    finally:
+        connection.close()
+
+
+def init_thesis_search(app):
+    """
+    Creates the thesis search index and stores it in
+    ``app.extensions["thesis_search"]``. ``THESIS_SEARCH_BACKEND`` picks the
+    implementation: ``native`` for the engine's full-text search, ``inverted``
+    for the inverted index in ordinary tables, or ``auto`` for native search
+    where the engine has it. If the index does not exist yet, it is created
+    and filled from existing theses.
+
+    :param app: The Flask application.
+    :type app: flask.Flask
+    :return: The search index.
+    :rtype: ThesisSearchIndex
+    :raises ValueError: If the configured backend is unknown.
+    """
+    db = database_proxy.obj
+    backend = app.config["THESIS_SEARCH_BACKEND"]
+    if backend == "auto":
+        backend = "native" if _native_search_available(db) else "inverted"
+        app.logger.info(f"Using {backend} thesis search.")
+
+    if backend == "inverted":
+        index = InvertedThesisSearch(db)
+    elif backend == "native":
+        if isinstance(db, MySQLDatabase):
+            index = MySQLThesisSearch(db)
+        else:
+            index = SqliteThesisSearch(db)
+    else:
+        raise ValueError(f"Unknown thesis search backend: {backend}")
+
+    with database_proxy:
+        if not index.exists() and db.table_exists("theses"):
+            indexed = index.rebuild()
+            app.logger.info(f"Created thesis search index of {indexed} documents.")
+        else:
+            index.create()
+    app.extensions["thesis_search"] = index
+    return index
+
+
+def get_thesis_search():
+    """
+    Returns the current application's thesis search index.
+
+    :rtype: ThesisSearchIndex
+    """
+    return app.extensions["thesis_search"]
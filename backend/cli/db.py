@@ -1,4 +1,5 @@
 import click
+
 from db.init_db import initialize_database
 
 
@@ -31,3 +32,113 @@ def init():
     """
     initialize_database()
     click.echo("Database initialized successfully.")
+
+
+@db_cli.command("compact-sessions")
+@click.option(
+    "--days",
+    type=int,
+    default=None,
+    help="Days of session log entries to keep (default: SESSION_LOG_RETENTION_DAYS).",
+)
+@click.option("--env", default="development", help="Runtime environment for Flask.")
+def compact_sessions(days, env):
+    """
+    Rolls session log entries older than the retention period up into daily
+    per-user login counts and deletes them. Meant to be run periodically, for
+    example from cron.
+
+    :param days: Days of individual session log entries to keep.
+    :type days: Optional[int]
+    :param env: The Flask runtime environment whose database is compacted.
+    :type env: str
+    :return: None
+    """
+    from app import create_app
+    from app.utils.session_log import compact_session_logs
+
+    app = create_app(env)
+    with app.app_context():
+        retention_days = days or app.config["SESSION_LOG_RETENTION_DAYS"]
+        compacted = compact_session_logs(
+            retention_days, chunk_size=app.config["SESSION_LOG_COMPACT_CHUNK_SIZE"]
+        )
+    click.echo(f"Compacted {compacted} session log entries into daily counts.")
+
+
+@db_cli.command("rebuild-search")
+@click.option(
+    "--index",
+    "index_name",
+    type=click.Choice(["all", "forum", "thesis"]),
+    default="all",
+    help="Search index to rebuild.",
+)
+@click.option("--env", default="development", help="Runtime environment for Flask.")
+def rebuild_search(index_name, env):
+    """
+    Rebuilds the full-text search indexes of the forum and of theses from
+    their tables. The application keeps the indexes up to date as posts,
+    comments and thesis sections change; this is for new deployments and
+    recovering from a damaged index.
+
+    :param index_name: ``forum``, ``thesis`` or ``all``.
+    :type index_name: str
+    :param env: The Flask runtime environment whose indexes are rebuilt.
+    :type env: str
+    :return: None
+    """
+    from app import create_app
+    from app.utils.forum_search import get_forum_search
+    from app.utils.thesis_search import get_thesis_search
+
+    app = create_app(env)
+    with app.app_context():
+        if index_name in ("all", "forum"):
+            indexed = get_forum_search().rebuild()
+            click.echo(f"Indexed {indexed} forum posts and comments.")
+        if index_name in ("all", "thesis"):
+            indexed = get_thesis_search().rebuild()
+            click.echo(f"Indexed {indexed} thesis sections.")
+
+
+@db_cli.command("rescore-hot")
+@click.option("--env", default="development", help="Runtime environment for Flask.")
+def rescore_hot(env):
+    """
+    Rescores the recently active posts in the hot ranking and trims it. The
+    application runs the same job periodically; this fills the ranking right
+    away, for example after Redis was emptied.
+
+    :param env: The Flask runtime environment whose ranking is rescored.
+    :type env: str
+    :return: None
+    """
+    from app import create_app
+    from app.utils.hot_posts import get_hot_ranking
+
+    app = create_app(env)
+    with app.app_context():
+        rescored = get_hot_ranking().rescore()
+    click.echo(f"Rescored {rescored} hot posts.")
+
+
+@db_cli.command("purge-deleted")
+@click.option("--env", default="development", help="Runtime environment for Flask.")
+def purge_deleted(env):
+    """
+    Purges the rows of deleted posts and users whose purge is pending or was
+    interrupted. The application does this in the background; this finishes
+    the work right away, for example when background purging is disabled.
+
+    :param env: The Flask runtime environment whose database is purged.
+    :type env: str
+    :return: None
+    """
+    from app import create_app
+    from app.utils.deletion import get_deletions
+
+    app = create_app(env)
+    with app.app_context():
+        completed = get_deletions().run_pending()
+    click.echo(f"Purged {completed} deleted posts and users.")
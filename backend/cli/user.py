@@ -1,5 +1,7 @@
 import click
 from app.models.data import Role, User
+from app.utils.identity import invalidate_identity
+from app.utils.passwords import calibrate_hash_method
 from peewee import DoesNotExist
 
 
@@ -72,22 +74,35 @@ def create(email, password, role, first_name, last_name, institution):
 
 @user_cli.command()
 @click.argument("email")
-def delete(email):
+@click.option("--env", default="development", help="Runtime environment for Flask.")
+def delete(email, env):
     """
-    Delete a user from the database based on their email. This method retrieves a user
-    using the provided email and removes the corresponding record from the database.
-    If the user does not exist, it displays an appropriate error message.
+    Delete a user based on their email. The user is deactivated and hidden at
+    once, as by ``DELETE /api/user/<id>``, and their data is purged in the
+    background by the running application. If the user does not exist, it
+    displays an appropriate error message.
 
     :param email: The email of the user to delete
     :type email: str
+    :param env: The Flask runtime environment whose user is deleted.
+    :type env: str
     :return: None
     """
-    try:
-        user = User.get(User.email == email)
-        user.delete_instance()
-        click.echo(f"User '{email}' deleted successfully.")
-    except DoesNotExist:
-        click.echo(f"Error: User with email '{email}' does not exist.")
+    from app import create_app
+    from app.services.userservice import UserService
+
+    app = create_app(env)
+    with app.app_context():
+        try:
+            user = User.get(User.email == email)
+        except DoesNotExist:
+            click.echo(f"Error: User with email '{email}' does not exist.")
+            return
+        deletion = UserService(app.logger).delete_user(user.id)
+    if deletion is None:
+        click.echo(f"Error: Failed to delete user '{email}'.")
+        return
+    click.echo(f"User '{email}' deleted; purge {deletion['id']} scheduled.")
 
 
 @user_cli.command()
@@ -132,7 +147,8 @@ def list(role):
 @click.option("--last-name", help="Update the user's last name.")
 @click.option("--role", help="Update the user's role.")
 @click.option("--institution", help="Update the user's institution.")
-def update(email, password, first_name, last_name, role, institution):
+@click.option("--env", default="development", help="Runtime environment for Flask.")
+def update(email, password, first_name, last_name, role, institution, env):
     """
     Updates the properties of an existing user in the system. Allows updating the
     user's password, first name, last name, role, and institution by providing
@@ -150,29 +166,66 @@ def update(email, password, first_name, last_name, role, institution):
     :type role: Optional[str]
     :param institution: New institution of the user
     :type institution: Optional[str]
+    :param env: The Flask runtime environment whose user is updated; its
+        Redis holds the identity cache entry that is dropped.
+    :type env: str
     :return: None
     :rtype: None
     """
-    try:
-        user = User.get(User.email == email)
-        if password:
-            user.password = password  # In production, hash this password
-        if first_name:
-            user.first_name = first_name
-        if last_name:
-            user.last_name = last_name
-        if role:
-            try:
-                role_obj = Role.get(Role.name == role)
-                user.role = role_obj
-                user.is_admin = role == "Admin"
-            except DoesNotExist:
-                click.echo(f"Error: Role '{role}' does not exist.")
-                return
-        if institution:
-            user.institution = institution
-
-        user.save()
-        click.echo(f"User '{email}' updated successfully.")
-    except DoesNotExist:
-        click.echo(f"Error: User with email '{email}' does not exist.")
+    from app import create_app
+
+    with create_app(env).app_context():
+        try:
+            user = User.get(User.email == email)
+            if password:
+                user.password = password  # In production, hash this password
+            if first_name:
+                user.first_name = first_name
+            if last_name:
+                user.last_name = last_name
+            if role:
+                try:
+                    role_obj = Role.get(Role.name == role)
+                    user.role = role_obj
+                    user.is_admin = role == "Admin"
+                except DoesNotExist:
+                    click.echo(f"Error: Role '{role}' does not exist.")
+                    return
+            if institution:
+                user.institution = institution
+
+            user.save()
+            invalidate_identity(user.id)
+            click.echo(f"User '{email}' updated successfully.")
+        except DoesNotExist:
+            click.echo(f"Error: User with email '{email}' does not exist.")
+
+
+@user_cli.command("calibrate-hash")
+@click.option(
+    "--target-ms",
+    default=250.0,
+    help="Time one password hash may take, in milliseconds (default: 250).",
+)
+@click.option(
+    "--algorithm",
+    type=click.Choice(["scrypt", "pbkdf2"]),
+    default="scrypt",
+    help="Hash algorithm to tune (default: scrypt).",
+)
+def calibrate_hash(target_ms, algorithm):
+    """
+    Times password hashing on this machine and prints the strongest
+    ``PASSWORD_HASH_METHOD`` that stays within the given latency budget. Run it
+    on the production hardware; existing hashes are upgraded to the new method
+    as users log in.
+
+    :param target_ms: Time one password hash may take, in milliseconds.
+    :type target_ms: float
+    :param algorithm: Hash algorithm to tune, ``scrypt`` or ``pbkdf2``.
+    :type algorithm: str
+    :return: None. Outputs the suggested setting to the console.
+    """
+    method, elapsed = calibrate_hash_method(target_ms, algorithm=algorithm)
+    click.echo(f"PASSWORD_HASH_METHOD={method}")
+    click.echo(f"Measured {elapsed:.0f} ms per hash (target {target_ms:.0f} ms).")
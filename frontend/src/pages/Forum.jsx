@@ -1,5 +1,6 @@
 import React, { useEffect, useState } from "react";
 import apiClient from "../services/apiClient";
+import forumAPI from "../services/forumEndpoint";
 import "../styles/Forum.css";
 
 const Forum = () => {
@@ -12,7 +13,7 @@ const Forum = () => {
     const fetchPosts = async () => {
       try {
         const response = await apiClient.get("/forum/posts");
-        setPosts(response.data.posts);
+        setPosts(response.data.results);
       } catch (error) {
         console.error("Failed to fetch posts:", error);
       } finally {
@@ -21,6 +22,10 @@ const Forum = () => {
     };
 
     fetchPosts();
+    // Reload the listing when a post is created anywhere instead of polling
+    return forumAPI.subscribe((type) => {
+      if (type === "post" || type === "reset") fetchPosts();
+    });
   }, []);
 
   // Handle input changes for creating a new post
@@ -83,7 +88,7 @@ const Forum = () => {
           posts.map((post) => (
             <div key={post.id} className="post">
               <h3>{post.title}</h3>
-              <p>{post.content}</p>
+              <p>{post.preview}</p>
               <small>
                 Posted on: {new Date(post.created_at).toLocaleString()}
               </small>
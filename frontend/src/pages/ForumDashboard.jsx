@@ -33,6 +33,10 @@ const ForumDashboard = () => {
 
   useEffect(() => {
     fetchPosts();
+    // Reload the listing when a post is created anywhere instead of polling
+    return forumAPI.subscribe((type) => {
+      if (type === "post" || type === "reset") fetchPosts();
+    });
   }, []);
 
   // Handle input changes for creating a new post
@@ -54,16 +58,14 @@ const ForumDashboard = () => {
           )
         : [];
 
-      // Attempt to find the newly created post by matching on its content or title
+      // Attempt to find the newly created post by matching on its title;
+      // listings only carry a preview of the content
       if (
         newPostData &&
-        (!newPostData.id || newPostData.id.startsWith("temp"))
+        (!newPostData.id || String(newPostData.id).startsWith("temp"))
       ) {
         const matchingPost = refreshedPosts.find(
-          (post) =>
-            post.title === newPostData.title &&
-            post.content === newPostData.content &&
-            new Date(post.created_at).toISOString() === newPostData.created_at,
+          (post) => post.title === newPostData.title,
         );
 
         if (matchingPost) {
@@ -92,9 +94,9 @@ const ForumDashboard = () => {
       // Check if the new post response is a string (assume it's an ID fallback)
       if (typeof postResponse.post === "string") {
         newPostData = {
-          id: undefined, // We will resolve this after refreshing
+          id: postResponse.id, // Resolved after refreshing if missing
           title: newPost.title,
-          content: newPost.content,
+          preview: newPost.content,
           created_at: new Date().toISOString(), // Use current date as a fallback
         };
       } else if (
@@ -137,7 +139,7 @@ const ForumDashboard = () => {
         onClick={() => navigate(`/forum/posts/${post.id}`)}
       >
         <h3>{post.title}</h3>
-        <p>{post.content}</p>
+        <p>{post.preview}</p>
         <small>Posted on: {new Date(post.created_at).toLocaleString()}</small>
       </div>
     ));
@@ -1,4 +1,4 @@
-import { request } from "./apiClient";
+import apiClient, { request } from "./apiClient";
 
 const forumAPI = {
   getPosts: () => request("get", "/forum/posts"),
@@ -18,6 +18,28 @@ const forumAPI = {
     request("get", `/forum/posts/${postId}/comments/${commentId}`),
   updateComment: (postId, commentId, commentData) =>
     request("put", `/forum/posts/${postId}/comments/${commentId}`, commentData),
+
+  /**
+   * Subscribes to new posts and comments pushed by the server. The browser
+   * reconnects dropped streams and resumes after the last event received.
+   *
+   * @param {function(string, object): void} onEvent - Called with the event
+   *   type ("post", "comment" or "reset") and its payload.
+   * @param {number} [postId] - Only receive comments on this post.
+   * @returns {function(): void} - Closes the stream.
+   */
+  subscribe: (onEvent, postId) => {
+    const query = postId ? `?post_id=${postId}` : "";
+    const source = new EventSource(
+      `${apiClient.defaults.baseURL}/forum/events${query}`,
+    );
+    ["post", "comment", "reset"].forEach((type) =>
+      source.addEventListener(type, (event) =>
+        onEvent(type, JSON.parse(event.data)),
+      ),
+    );
+    return () => source.close();
+  },
 };
 
 export default forumAPI;
@@ -11,6 +11,11 @@ const userAPI = {
   activateUser: (userId) => request("put", `/user/activate/${userId}`),
   deactivateUser: () => request("put", "/user/deactivate"),
   deleteUser: (userId) => request("delete", `/user/${userId}`),
+  getNotifications: (params) => request("get", "/user/notifications", params),
+  getUnreadNotificationCount: () =>
+    request("get", "/user/notifications/unread-count"),
+  markNotificationsRead: (ids) =>
+    request("post", "/user/notifications/read", ids ? { ids } : {}),
 };
 
 export default userAPI;